@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+订单导出吞吐量基准（不访问网络）
+
+对比:
+- legacy: 先把全部订单放进列表，再用json.dump(indent=2)一次写出（旧的save_orders_to_file）
+- 流式导出: order_export.export_records按块写入CSV / JSON Lines / JSON数组 / Parquet / Arrow（后两者需要pyarrow）
+
+用法:
+    python bench/bench_export.py [订单数]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import order_export
+from order_export import export_records
+from weex_sdk import WeexClient
+
+BASE_TIME = 1716595200000
+
+
+def _records(client, count):
+    # 每次格式化一页，模拟从分页迭代器取订单
+    for start in range(0, count, 1000):
+        page = [{"symbol": "cmt_btcusdt", "order_id": str(i), "client_oid": f"ai_{i}",
+                 "createTime": BASE_TIME + i * 1000, "price": "65000.5", "size": "0.01", "filled_qty": "0.01",
+                 "fee": "0.5", "status": "filled", "type": "open_long", "order_type": "normal",
+                 "totalProfits": "1.5"} for i in range(start, min(start + 1000, count))]
+        yield from client._format_history_orders(page)["orders"]
+
+
+def legacy_export(records, path):
+    orders = [{key: value for key, value in order.items() if key != "info"} for order in records]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"export_time": "", "total_orders": len(orders), "orders": orders}, f, ensure_ascii=False, indent=2)
+
+
+def bench(label, func, client, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(_records(client, count))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<20} {count / elapsed:12,.0f} 行/秒   峰值内存 {peak / 1e6:7.1f}MB")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    client = WeexClient("key", "secret", "pass", rate_limits={})
+    names = ["orders.csv", "orders.jsonl", "orders.json"]
+    if order_export.pa is not None:
+        names += ["orders.parquet", "orders.arrow"]
+    else:
+        print("未安装pyarrow，跳过Parquet/Arrow")
+
+    print(f"导出 {count} 条订单（峰值内存包含tracemalloc开销）")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bench("legacy（json indent）", lambda records: legacy_export(records, os.path.join(tmpdir, "legacy.json")),
+              client, count)
+        for name in names:
+            path = os.path.join(tmpdir, name)
+            bench(order_export.export_format(name), lambda records: export_records(records, path), client, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+技术指标吞吐量基准：每根新K线用增量引擎更新 vs 用pandas对整个窗口重新计算
+
+用法:
+    python bench/bench_indicators.py [窗口K线数] [新K线数]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import IncrementalIndicators, calculate_technical_indicators_pandas
+
+TF_MS = 15 * 60 * 1000
+
+
+def make_ohlcv(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 50, n))
+    high = close + rng.random(n) * 30
+    low = close - rng.random(n) * 30
+    volume = rng.random(n) * 100
+    return [[1700000000000 + i * TF_MS, close[i], high[i], low[i], close[i], volume[i]] for i in range(n)]
+
+
+def main():
+    window = int(sys.argv[1]) if len(sys.argv) > 1 else 96
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    ohlcv = make_ohlcv(window + updates)
+    columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+    pandas_rounds = min(updates, 200)
+    start = time.perf_counter()
+    for i in range(pandas_rounds):
+        calculate_technical_indicators_pandas(pd.DataFrame(ohlcv[i + 1:i + 1 + window], columns=columns))
+    pandas_cost = (time.perf_counter() - start) / pandas_rounds
+
+    engine = IncrementalIndicators.from_ohlcv(ohlcv[:window])
+    start = time.perf_counter()
+    for candle in ohlcv[window:]:
+        engine.update(candle)
+    incremental_cost = (time.perf_counter() - start) / updates
+
+    print(f"窗口{window}根K线，每根新K线的指标计算耗时:")
+    print(f"  pandas全量重算: {pandas_cost * 1e6:10.1f} 微秒（{1 / pandas_cost:10.0f} 根/秒）")
+    print(f"  增量引擎:       {incremental_cost * 1e6:10.1f} 微秒（{1 / incremental_cost:10.0f} 根/秒）")
+    print(f"  加速比: {pandas_cost / incremental_cost:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
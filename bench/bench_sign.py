@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+下单请求的签名+发送准备开销微基准（不访问网络）
+
+对比:
+- legacy: 签名时json.dumps一次，requests发送时再用json=data序列化一次（旧实现）
+- single: 请求体只序列化一次，签名与发送使用同一份字节（当前实现，使用weex_sdk.JSON_BACKEND）
+
+用法:
+    python bench/bench_sign.py [次数]
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import weex_sdk
+from weex_sdk import WeexClient, new_client_oid
+
+SECRET = "bench_secret"
+
+
+def _order_data():
+    return {
+        "symbol": "cmt_btcusdt",
+        "client_oid": new_client_oid(),
+        "size": "0.01",
+        "type": "1",
+        "order_type": "0",
+        "match_price": "1",
+        "presetTakeProfitPrice": "72000.5",
+        "presetStopLossPrice": "65000.5",
+        "marginMode": 1
+    }
+
+
+def legacy_sign(path, data):
+    timestamp = str(int(time.time() * 1000))
+    message = timestamp + "POST" + path + json.dumps(data)
+    signature = base64.b64encode(hmac.new(SECRET.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).digest()).decode("utf-8")
+    return {"Content-Type": "application/json", "locale": "zh-CN", "ACCESS-KEY": "key", "ACCESS-SIGN": signature,
+            "ACCESS-PASSPHRASE": "pass", "ACCESS-TIMESTAMP": timestamp}
+
+
+def legacy_prepare(session, url, path, data):
+    headers = legacy_sign(path, data)
+    return session.prepare_request(requests.Request("POST", url, headers=headers, json=data))
+
+
+def single_prepare(client, session, path, data):
+    url, headers, params, body = client._prepare_request("POST", path, data=data)
+    return session.prepare_request(requests.Request("POST", url, headers=headers, data=body, params=params))
+
+
+def bench(label, func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    per_order = (time.perf_counter() - start) / rounds * 1e6
+    print(f"{label:<28} {per_order:8.1f} 微秒/单")
+    return per_order
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    path = "/capi/v2/order/placeOrder"
+    client = WeexClient("key", SECRET, "pass", rate_limits={})
+    # 基准只测CPU开销，跳过服务器时间同步
+    client.server_clock.mark_attempt()
+    client.server_clock.resync_interval = None
+    session = requests.Session()
+    url = f"{client.base_url}{path}"
+    data = _order_data()
+
+    print(f"JSON后端: {weex_sdk.JSON_BACKEND}，每组 {rounds} 次")
+    print("-- 序列化+签名 --")
+    legacy_sign_cost = bench("legacy", lambda: legacy_sign(path, data), rounds)
+    sign_cost = bench(f"single（{weex_sdk.JSON_BACKEND}）", lambda: client._prepare_request("POST", path, data=data), rounds)
+    print("-- 序列化+签名+构建requests请求 --")
+    legacy = bench("legacy（两次序列化）", lambda: legacy_prepare(session, url, path, data), rounds)
+    single = bench(f"single（{weex_sdk.JSON_BACKEND}）", lambda: single_prepare(client, session, path, data), rounds)
+    if weex_sdk.orjson is not None:
+        saved = weex_sdk.orjson
+        weex_sdk.orjson = None
+        try:
+            bench("single（json）", lambda: single_prepare(client, session, path, data), rounds)
+        finally:
+            weex_sdk.orjson = saved
+    print(f"序列化+签名每单节省: {legacy_sign_cost - sign_cost:.1f} 微秒，"
+          f"含requests构建每单节省: {legacy - single:.1f} 微秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+技术指标批量计算基准：numpy向量化版本 vs pandas rolling/ewm版本
+
+用法:
+    python bench/bench_vectorized_indicators.py [K线数 ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import calculate_technical_indicators, calculate_technical_indicators_pandas, compute_indicators
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def make_frame(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 50, n))
+    return pd.DataFrame({
+        'timestamp': 1700000000000 + np.arange(n) * 900000,
+        'open': close,
+        'high': close + rng.random(n) * 30,
+        'low': close - rng.random(n) * 30,
+        'close': close,
+        'volume': rng.random(n) * 100,
+    }, columns=COLUMNS)
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 10_000, 1_000_000]
+    print(f"{'K线数':>10} {'pandas DataFrame':>18} {'numpy适配层':>14} {'numpy数组':>12} {'加速比':>8}")
+    for n in sizes:
+        df = make_frame(n)
+        repeat = 20 if n <= 10_000 else 3
+        high, low, close, volume = (df[c].to_numpy() for c in ('high', 'low', 'close', 'volume'))
+        pandas_cost = best_of(lambda: calculate_technical_indicators_pandas(df.copy()), repeat)
+        adapter_cost = best_of(lambda: calculate_technical_indicators(df.copy()), repeat)
+        array_cost = best_of(lambda: compute_indicators(high, low, close, volume), repeat)
+        print(f"{n:>10} {pandas_cost * 1000:>16.2f}ms {adapter_cost * 1000:>12.2f}ms {array_cost * 1000:>10.2f}ms "
+              f"{pandas_cost / array_cost:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
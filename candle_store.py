@@ -0,0 +1,274 @@
+"""
+本地K线存储
+按(交易对, 周期)把K线保存在SQLite文件中，首次使用时回填历史，之后只从交易所拉取最新存储时间之后的增量
+
+用法:
+    store = CandleStore()
+    ohlcv = store.get_ohlcv(exchange, "cmt_btcusdt", "15m", limit=96)
+
+exchange可以是WeexClient，也可以是ccxt交易所对象，只要求提供fetch_ohlcv(symbol, timeframe, limit=...)方法
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from weex_sdk import MAX_CANDLES_PER_REQUEST, timeframe_to_ms
+
+logger = logging.getLogger("candle_store")
+
+# K线数据库文件，默认放在当前目录
+WEEX_CANDLE_DB = os.getenv('WEEX_CANDLE_DB') or "candles.db"
+
+# 单次请求最多拉取的K线条数
+MAX_FETCH_LIMIT = MAX_CANDLES_PER_REQUEST
+
+
+class CandleStore:
+    """
+    基于SQLite的K线本地存储，多个进程可共享同一个数据库文件（WAL模式）
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str, optional): 数据库文件路径，默认读取WEEX_CANDLE_DB环境变量，否则为当前目录下的candles.db；
+                传入":memory:"使用内存数据库
+        """
+        self.path = path or WEEX_CANDLE_DB
+        # 当前时间（秒），用于判断缺失的K线条数
+        self.clock = time.time
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS candles (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                PRIMARY KEY (symbol, timeframe, ts)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+        # 同步统计
+        self.stats = {"syncs": 0, "fetched": 0, "served": 0, "fetch_errors": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
+
+    def upsert(self, symbol, timeframe, ohlcv):
+        """
+        写入K线，已存在的时间戳会被覆盖（最新一根K线在收盘前会不断变化）
+
+        Args:
+            symbol (str): 交易对
+            timeframe (str): K线周期
+            ohlcv (list): [[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量], ...]
+
+        Returns:
+            int: 写入的条数
+        """
+        rows = [(symbol, timeframe, int(c[0]), float(c[1]), float(c[2]), float(c[3]), float(c[4]), float(c[5]))
+                for c in ohlcv]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def last_timestamp(self, symbol, timeframe):
+        """
+        获取已存储的最新K线时间戳，没有数据时返回None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(ts) FROM candles WHERE symbol = ? AND timeframe = ?",
+                                     (symbol, timeframe)).fetchone()
+        return row[0]
+
+    def count(self, symbol, timeframe, since=None):
+        """
+        统计已存储的K线条数
+
+        Args:
+            since (int, optional): 只统计时间戳不早于该值的K线
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM candles WHERE symbol = ? AND timeframe = ? AND ts >= ?",
+                (symbol, timeframe, since if since is not None else 0)
+            ).fetchone()
+        return row[0]
+
+    def load(self, symbol, timeframe, limit=None, since=None):
+        """
+        从本地读取K线，按时间升序
+
+        Args:
+            symbol (str): 交易对
+            timeframe (str): K线周期
+            limit (int, optional): 只返回最新的limit条
+            since (int, optional): 只返回时间戳不早于该值的K线
+
+        Returns:
+            list: [[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量], ...]
+        """
+        query = "SELECT ts, open, high, low, close, volume FROM candles WHERE symbol = ? AND timeframe = ? AND ts >= ?"
+        args = [symbol, timeframe, since if since is not None else 0]
+        if limit is not None:
+            query += " ORDER BY ts DESC LIMIT ?"
+            args.append(limit)
+            with self._lock:
+                rows = self._conn.execute(query, args).fetchall()
+            rows.reverse()
+        else:
+            with self._lock:
+                rows = self._conn.execute(query + " ORDER BY ts", args).fetchall()
+        return [list(row) for row in rows]
+
+    def _fetch_count(self, symbol, timeframe, limit, now_ms):
+        """
+        计算需要从交易所拉取的K线条数：没有数据或历史不足时回填limit条，否则只拉取增量
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        newest = self.last_timestamp(symbol, timeframe)
+        if newest is None:
+            return limit
+        current = now_ms - now_ms % tf_ms
+        # 最新存储的那根K线可能还没收盘，需要连同之后的新K线一起重新拉取
+        missing = max((current - newest) // tf_ms, 0) + 1
+        oldest_needed = current - (limit - 1) * tf_ms
+        if self.count(symbol, timeframe, since=oldest_needed) + missing - 1 < limit:
+            return limit
+        return min(missing, limit)
+
+    def sync(self, exchange, symbol, timeframe, limit=100):
+        """
+        从交易所拉取缺失的K线并写入本地
+
+        Args:
+            exchange: 提供fetch_ohlcv(symbol, timeframe, limit=...)方法的交易所客户端
+            symbol (str): 交易对
+            timeframe (str): K线周期
+            limit (int): 需要保证本地至少有最新的limit条K线
+
+        Returns:
+            int: 本次拉取的K线条数，拉取失败时返回0
+        """
+        fetch_count = min(self._fetch_count(symbol, timeframe, limit, int(self.clock() * 1000)), MAX_FETCH_LIMIT)
+        try:
+            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=fetch_count)
+        except Exception as e:
+            self.stats["fetch_errors"] += 1
+            logger.warning("拉取%s %s K线失败，使用本地数据: %s", symbol, timeframe, e)
+            return 0
+        self.upsert(symbol, timeframe, ohlcv)
+        self.stats["syncs"] += 1
+        self.stats["fetched"] += len(ohlcv)
+        logger.debug("%s %s 请求%s条，拉取到%s条K线", symbol, timeframe, fetch_count, len(ohlcv))
+        return len(ohlcv)
+
+    def _missing_ranges(self, symbol, timeframe, start, tf_ms):
+        """
+        计算start之后本地缺失的K线区间：开头缺失、中间断档，以及从最新存储的K线（可能未收盘）到当前
+
+        Returns:
+            list: [(开始时间戳, 结束时间戳或None), ...]，None表示到当前时间
+        """
+        with self._lock:
+            timestamps = [row[0] for row in self._conn.execute(
+                "SELECT ts FROM candles WHERE symbol = ? AND timeframe = ? AND ts >= ? ORDER BY ts",
+                (symbol, timeframe, start))]
+        if not timestamps:
+            return [(start, None)]
+        ranges = []
+        expected = start
+        for ts in timestamps:
+            if ts > expected:
+                ranges.append((expected, ts - tf_ms))
+            expected = ts + tf_ms
+        ranges.append((timestamps[-1], None))
+        return ranges
+
+    def fill_range(self, exchange, symbol, timeframe, since):
+        """
+        补齐since之后缺失的K线并写入本地，已存储的连续部分不再下载
+
+        与sync不同，不受单次请求条数限制，可以补齐任意长的断档（如长时间停机或上次回填中途失败）
+
+        Args:
+            exchange: 提供fetch_ohlcv_range(symbol, timeframe, start, end=None)方法的交易所客户端（WeexClient）
+            symbol (str): 交易对
+            timeframe (str): K线周期
+            since (int): 开始时间戳（毫秒）
+
+        Returns:
+            int: 本次拉取的K线条数
+
+        Raises:
+            Exception: 拉取失败时抛出交易所客户端的异常，失败前拉取到的K线已写入本地，下次从第一个缺口继续
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        start = since - since % tf_ms + (tf_ms if since % tf_ms else 0)
+        fetched = 0
+        for gap_start, gap_end in self._missing_ranges(symbol, timeframe, start, tf_ms):
+            for chunk in exchange.fetch_ohlcv_range(symbol, timeframe, gap_start, gap_end):
+                fetched += self.upsert(symbol, timeframe, chunk.tolist())
+        self.stats["syncs"] += 1
+        self.stats["fetched"] += fetched
+        logger.debug("%s %s 从%s补齐%s条K线", symbol, timeframe, since, fetched)
+        return fetched
+
+    def get_ohlcv(self, exchange, symbol, timeframe, limit=100):
+        """
+        获取最新的limit条K线：先增量同步，再从本地读取
+        交易所不可用时返回本地已有的数据
+
+        Args:
+            exchange: 提供fetch_ohlcv(symbol, timeframe, limit=...)方法的交易所客户端
+            symbol (str): 交易对
+            timeframe (str): K线周期
+            limit (int): 返回的K线条数
+
+        Returns:
+            list: [[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量], ...]，按时间升序
+        """
+        self.sync(exchange, symbol, timeframe, limit)
+        ohlcv = self.load(symbol, timeframe, limit=limit)
+        self.stats["served"] += len(ohlcv)
+        return ohlcv
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store():
+    """
+    获取进程内共享的默认K线存储（使用WEEX_CANDLE_DB）
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CandleStore()
+        return _default_store
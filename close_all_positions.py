@@ -1,31 +1,54 @@
+import argparse
 import re
 import time
 import os
 import json
-from weex_sdk import WeexClient
+from concurrent.futures import ThreadPoolExecutor
+from weex_records import plan_order_type
+from weex_sdk import WeexClient, new_client_oid
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
-# 从环境变量获取API凭证
-api_key = os.getenv('WEEX_API_KEY')
-api_secret = os.getenv('WEEX_SECRET')
-api_passphrase = os.getenv('WEEX_API_PASSPHRASE') or os.getenv('WEEX_ACCESS_PASSPHRASE')
-
-# 检查环境变量
-if not api_key:
-    print("错误: WEEX_API_KEY 环境变量未设置")
-    exit(1)
-if not api_secret:
-    print("错误: WEEX_SECRET 环境变量未设置")
-    exit(1)
-if not api_passphrase:
-    print("错误: WEEX_API_PASSPHRASE 或 WEEX_ACCESS_PASSPHRASE 环境变量未设置")
-    exit(1)
-
-print("环境变量检查通过，正在初始化客户端...")
-client = WeexClient(api_key, api_secret, api_passphrase)
+# 等待持仓归零/订单撤销生效的最长时间（秒）和轮询间隔（秒）
+FLAT_TIMEOUT = 10.0
+POLL_INTERVAL = 0.2
+
+# 并发平仓的交易对数量上限（不超过连接池大小）
+MAX_WORKERS = 8
+
+# 平仓时会与市价平仓单冲突的计划委托类型（英文代码，交易所返回的数字代码经plan_order_type统一）
+CLOSE_PLAN_TYPES = ("CLOSE_LONG", "CLOSE_SHORT", "PARTIAL_CLOSE_LONG", "PARTIAL_CLOSE_SHORT")
+
+# 由main()或调用方设置
+client = None
+
+
+def create_client_from_env():
+    """
+    从环境变量创建客户端
+
+    Returns:
+        WeexClient: 客户端，环境变量缺失时返回None
+    """
+    api_key = os.getenv('WEEX_API_KEY')
+    api_secret = os.getenv('WEEX_SECRET')
+    api_passphrase = os.getenv('WEEX_API_PASSPHRASE') or os.getenv('WEEX_ACCESS_PASSPHRASE')
+
+    # 检查环境变量
+    if not api_key:
+        print("错误: WEEX_API_KEY 环境变量未设置")
+        return None
+    if not api_secret:
+        print("错误: WEEX_SECRET 环境变量未设置")
+        return None
+    if not api_passphrase:
+        print("错误: WEEX_API_PASSPHRASE 或 WEEX_ACCESS_PASSPHRASE 环境变量未设置")
+        return None
+
+    print("环境变量检查通过，正在初始化客户端...")
+    return WeexClient(api_key, api_secret, api_passphrase)
 
 def extract_order_id(error_message):
     """从错误消息中提取订单ID"""
@@ -37,32 +60,6 @@ def extract_order_id(error_message):
         print(f"提取订单ID时出错: {e}")
     return None
 
-def cancel_conflicting_order(order_id, symbol):
-    """尝试取消冲突订单，使用多种API路径"""
-    if not order_id:
-        return False
-    
-    print(f"尝试取消冲突订单: {order_id}")
-    
-    # 尝试不同的取消订单API路径
-    paths = [
-        ("/capi/v2/order/cancelOrder", {"order_id": order_id, "symbol": symbol}),
-        ("/capi/v2/order/cancel-batch", {"order_id": order_id, "symbol": symbol}),
-        ("/capi/v2/order/cancel", {"order_id": order_id})
-    ]
-    
-    for path, data in paths:
-        try:
-            print(f"尝试路径: {path}, 参数: {data}")
-            # 使用data参数而不是params，与SDK保持一致
-            response = client._request('POST', path, data=data, need_sign=True)
-            print(f"成功取消订单: {order_id}")
-            return True
-        except Exception as e:
-            print(f"使用路径 {path} 取消订单失败: {e}")
-    
-    return False
-
 def parse_error_response(error_response):
     """解析错误响应，提取错误消息"""
     try:
@@ -94,8 +91,125 @@ def normalize_order_size(amount, step_size=0.0001):
     # 确保数量大于0
     return max(normalized, step_size)
 
-def close_position_with_adaptive_strategy(symbol, position_side, position_size):
-    """使用自适应策略平仓"""
+def wait_until(check, timeout=FLAT_TIMEOUT, interval=POLL_INTERVAL):
+    """
+    轮询直到check()返回真值，代替固定时长的sleep
+
+    Args:
+        check (callable): 无参数的检查函数，抛出异常视为条件未满足
+        timeout (float): 最长等待时间（秒）
+        interval (float): 轮询间隔（秒）
+
+    Returns:
+        check()的真值结果，超时返回None
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = check()
+            if result:
+                return result
+        except Exception as e:
+            print(f"轮询状态时出错: {e}")
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(interval)
+
+
+def fetch_open_positions(symbol=None):
+    """
+    查询交易所上的当前持仓（数量大于0的）
+
+    Args:
+        symbol (str, optional): 交易对，不提供则查询所有持仓
+
+    Returns:
+        list: 持仓列表
+
+    Raises:
+        Exception: 查询失败（不能当作没有持仓）
+    """
+    return client.fetch_open_positions(symbol)
+
+
+def fetch_position_size(symbol, position_side):
+    """
+    查询交易所上某个方向的当前持仓数量
+
+    Returns:
+        float: 持仓数量
+
+    Raises:
+        Exception: 查询失败（不能当作已平仓）
+    """
+    return sum(position["size"] for position in fetch_open_positions(symbol) if position["side"] == position_side)
+
+
+def wait_position_flat(symbol, position_side, timeout=FLAT_TIMEOUT):
+    """轮询直到持仓归零，返回是否已平"""
+    return wait_until(lambda: fetch_position_size(symbol, position_side) <= 0, timeout) is not None
+
+
+def fetch_open_order_ids(symbol):
+    """查询交易对的未完成订单ID"""
+    return client.fetch_open_order_ids(symbol)
+
+
+def cancel_open_orders(symbol, order_ids=None, timeout=FLAT_TIMEOUT):
+    """
+    取消交易对的未完成订单并轮询直到它们从未完成列表中消失
+
+    Args:
+        symbol (str): 交易对
+        order_ids (list, optional): 要取消的订单ID，默认取消该交易对的全部未完成订单
+
+    Returns:
+        bool: 是否有订单被取消且已生效
+    """
+    if order_ids is None:
+        result = client.cancel_all_orders(symbol, include_plan=False)
+    else:
+        result = client.cancel_orders(order_ids)
+    cancelled = set(result["cancelled"])
+    for failure in result["failed"]:
+        print(f"[{symbol}] 取消订单 {failure['order_id']} 失败: {failure['error']}")
+    if not cancelled:
+        return False
+    gone = wait_until(lambda: not cancelled.intersection(fetch_open_order_ids(symbol)), timeout)
+    print(f"[{symbol}] 冲突订单{'已撤销' if gone else '撤销未在超时内生效'}: {', '.join(sorted(cancelled))}")
+    return gone is not None
+
+
+def resolve_plan_conflicts(symbol):
+    """
+    并发撤销交易对上的平仓类计划委托（止盈止损等），避免与市价平仓单冲突
+
+    Args:
+        symbol (str): 交易对
+
+    Returns:
+        int: 撤销成功的计划委托数量
+    """
+    try:
+        plan_ids = [order["order_id"] for order in client.iter_current_plan_orders(symbol=symbol)
+                    if plan_order_type(order.type_code) in CLOSE_PLAN_TYPES and order["order_id"]]
+    except Exception as e:
+        print(f"[{symbol}] 获取计划委托失败: {e}")
+        return 0
+    if not plan_ids:
+        return 0
+    result = client.cancel_plan_orders(plan_ids)
+    print(f"[{symbol}] 已撤销 {len(result['cancelled'])}/{len(plan_ids)} 个平仓计划委托")
+    return len(result["cancelled"])
+
+
+def close_position_with_adaptive_strategy(symbol, position_side, position_size, timeout=FLAT_TIMEOUT):
+    """
+    使用自适应策略平仓：下单后轮询持仓直到归零，冲突订单撤销后轮询直到撤销生效，不使用固定等待
+
+    Returns:
+        bool: 是否已平仓
+    """
     # 确定平仓方向 - 修复持仓方向判断
     close_side = "buy" if position_side == "short" else "sell"
     
@@ -109,110 +223,123 @@ def close_position_with_adaptive_strategy(symbol, position_side, position_size):
     
     while retry_count < max_retries:
         retry_count += 1
-        print(f"\n尝试第 {retry_count}/{max_retries} 次平仓，数量: {current_size}")
+        print(f"\n[{symbol}] 尝试第 {retry_count}/{max_retries} 次平仓，数量: {current_size}")
         
         try:
-            # 生成客户端订单ID
-            client_oid = f"close_{symbol}_{position_side}_{int(time.time() * 1000)}"
+            # 生成客户端订单ID，数量调整后是新订单，需要新的ID；网络抖动的重发由SDK内部用同一ID完成
+            client_oid = new_client_oid(f"close_{symbol}_{position_side}_")
             
             # 使用SDK中已定义的create_market_order方法进行平仓
             # 设置reduce_only=True表示平仓操作
-            print(f"发送市价{close_side}平仓请求: 交易对={symbol}, 数量={current_size}")
+            print(f"[{symbol}] 发送市价{close_side}平仓请求: 数量={current_size}")
             order = client.create_market_order(symbol, close_side, current_size, client_oid=client_oid, reduce_only=True)
             
             # 检查订单创建结果
             if order and order.get('id'):
-                print(f"✓ 平仓成功! 订单ID: {order['id']}")
-                return True
+                print(f"[{symbol}] 平仓订单已提交，订单ID: {order['id']}，等待持仓归零")
+                if wait_position_flat(symbol, position_side, timeout):
+                    print(f"✓ [{symbol}] 平仓成功!")
+                    return True
             elif order is None:
-                # 订单创建失败，尝试提取冲突订单信息
-                print("订单创建失败，尝试查找冲突订单")
-                
-                # 尝试获取并取消未完成的订单
+                # 订单创建失败，取消该交易对的未完成订单后重试
+                print(f"[{symbol}] 订单创建失败，尝试取消未完成订单")
                 try:
-                    # 获取未完成订单
-                    print("尝试获取未完成订单...")
-                    open_orders = client._request('GET', '/capi/v2/order/openOrders', need_sign=True)
-                    if isinstance(open_orders, list):
-                        # 取消相关交易对的未完成订单
-                        for open_order in open_orders:
-                            if open_order.get('symbol') == symbol:
-                                order_id = open_order.get('id') or open_order.get('order_id')
-                                if order_id:
-                                    print(f"发现相关未完成订单: {order_id}")
-                                    if cancel_conflicting_order(order_id, symbol):
-                                        print("冲突订单已取消，准备重试")
-                                        time.sleep(1)  # 等待订单取消生效
-                                        continue
+                    cancel_open_orders(symbol, timeout=timeout)
                 except Exception as get_orders_error:
-                    print(f"获取未完成订单时出错: {get_orders_error}")
-                
-                print("准备重试")
-                time.sleep(1)  # 等待后重试
-                continue
+                    print(f"[{symbol}] 获取未完成订单时出错: {get_orders_error}")
             else:
-                print(f"未预期的订单格式: {order}")
+                print(f"[{symbol}] 未预期的订单格式: {order}")
             
         except Exception as e:
             error_str = str(e)
-            print(f"平仓请求出错: {error_str}")
+            print(f"[{symbol}] 平仓请求出错: {error_str}")
             
             # 尝试解析错误消息
             error_msg = parse_error_response(error_str)
             
             # 检查是否为冲突订单错误
             if any(keyword in error_msg for keyword in ['FAILED_PRECONDITION', 'position side invalid', 'conflict', 'conflicting']):
-                # 提取并取消冲突订单
+                # 提取并取消冲突订单，无法提取订单ID时取消所有相关未完成订单
                 conflict_order_id = extract_order_id(error_msg)
-                if conflict_order_id:
-                    if cancel_conflicting_order(conflict_order_id, symbol):
-                        print("冲突订单已取消，准备重试")
-                        time.sleep(1)  # 等待订单取消生效
-                        continue
-                else:
-                    # 如果无法提取订单ID，尝试获取并取消所有相关未完成订单
-                    try:
-                        print("无法提取订单ID，尝试获取所有未完成订单...")
-                        open_orders = client._request('GET', '/capi/v2/order/openOrders', need_sign=True)
-                        if isinstance(open_orders, list):
-                            for open_order in open_orders:
-                                if open_order.get('symbol') == symbol:
-                                    order_id = open_order.get('id') or open_order.get('order_id')
-                                    if order_id:
-                                        print(f"取消未完成订单: {order_id}")
-                                        cancel_conflicting_order(order_id, symbol)
-                        print("未完成订单清理完成，准备重试")
-                        time.sleep(2)  # 等待订单取消生效
+                try:
+                    if cancel_open_orders(symbol, [conflict_order_id] if conflict_order_id else None, timeout):
                         continue
-                    except Exception as cleanup_error:
-                        print(f"清理未完成订单时出错: {cleanup_error}")
+                except Exception as cleanup_error:
+                    print(f"[{symbol}] 清理未完成订单时出错: {cleanup_error}")
         
+        # 以交易所上的实际持仓为准：已经归零则成功，否则按剩余数量重试
+        try:
+            remaining = fetch_position_size(symbol, position_side)
+        except Exception as e:
+            print(f"[{symbol}] 查询剩余持仓失败: {e}")
+            remaining = current_size
+        if remaining <= 0:
+            print(f"✓ [{symbol}] 持仓已归零")
+            return True
         # 调整数量并重试，确保符合stepSize要求
-        current_size *= 0.97  # 减少3%
-        current_size = normalize_order_size(current_size)
-        print(f"调整平仓数量为: {current_size}")
-        time.sleep(1.5)  # 等待后重试
+        current_size = normalize_order_size(min(remaining, current_size * 0.97))  # 至少减少3%
+        print(f"[{symbol}] 调整平仓数量为: {current_size}")
     
-    print(f"❌ 平仓失败，已尝试 {max_retries} 次")
+    print(f"❌ [{symbol}] 平仓失败，已尝试 {max_retries} 次")
     return False
 
-def close_all_positions():
-    """获取所有持仓并全部平仓"""
+
+def flatten_symbol(symbol, positions, timeout=FLAT_TIMEOUT):
+    """
+    平掉一个交易对的全部持仓：先撤销冲突的计划委托，再逐个方向平仓
+
+    Args:
+        symbol (str): 交易对
+        positions (list): 该交易对的持仓
+
+    Returns:
+        tuple: (成功数量, 失败数量)
+    """
+    resolve_plan_conflicts(symbol)
+    success_count = failed_count = 0
+    for position in positions:
+        if close_position_with_adaptive_strategy(symbol, position.get('side'), float(position.get('size', 0)), timeout):
+            success_count += 1
+        else:
+            failed_count += 1
+    return success_count, failed_count
+
+
+def close_all_positions(parallel=True, max_workers=MAX_WORKERS, timeout=FLAT_TIMEOUT):
+    """
+    获取所有持仓并全部平仓
+
+    Args:
+        parallel (bool): 是否按交易对并发平仓（每个交易对一个工作线程），False时逐个交易对处理
+        max_workers (int): 并发处理的交易对数量上限
+        timeout (float): 每次等待持仓归零/撤单生效的最长时间（秒）
+
+    Returns:
+        dict: total、success、failed、failed_symbols、flat（最终复核是否已无持仓）和elapsed（从开始到平仓完成的秒数）
+    """
+    start = time.perf_counter()
+    summary = {"total": 0, "success": 0, "failed": 0, "failed_symbols": [], "flat": False, "elapsed": 0.0}
     try:
         # 获取所有持仓
         print("获取所有持仓...")
-        positions = client.fetch_positions()
+        try:
+            positions = fetch_open_positions()
+        except Exception as e:
+            # 查询失败时无法确认是否已平仓，不能报告为已平
+            print(f"获取持仓失败，无法确认持仓状态: {e}")
+            summary["elapsed"] = time.perf_counter() - start
+            return summary
         
         if not positions:
             print("没有找到持仓")
-            return
+            summary["flat"] = True
+            return summary
         
         print(f"获取到 {len(positions)} 个持仓")
-        
-        success_count = 0
-        failed_count = 0
-        
-        # 遍历持仓进行平仓
+        summary["total"] = len(positions)
+
+        # 按交易对分组，同一交易对的多空持仓由同一个工作线程处理
+        by_symbol = {}
         for i, position in enumerate(positions):
             symbol = position.get('symbol')
             side = position.get('side')
@@ -220,35 +347,72 @@ def close_all_positions():
             
             if not symbol or not side or size <= 0:
                 print(f"无效的持仓数据 ({i+1}/{len(positions)}): {position}")
-                failed_count += 1
+                summary["failed"] += 1
                 continue
-            
-            print(f"\n处理持仓 {i+1}/{len(positions)}: {symbol} {side} {size}")
-            
-            if close_position_with_adaptive_strategy(symbol, side, size):
-                success_count += 1
-            else:
-                failed_count += 1
-            
-            # 持仓间隔处理
-            if i < len(positions) - 1:
-                print("\n等待2秒后处理下一个持仓...")
-                time.sleep(2)
+            by_symbol.setdefault(symbol, []).append(position)
+
+        workers = min(max_workers, len(by_symbol)) if parallel else 1
+        print(f"{'并发' if workers > 1 else '逐个'}平仓 {len(by_symbol)} 个交易对")
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = {symbol: executor.submit(flatten_symbol, symbol, symbol_positions, timeout)
+                       for symbol, symbol_positions in by_symbol.items()}
+            for symbol, future in futures.items():
+                try:
+                    success_count, failed_count = future.result()
+                except Exception as e:
+                    print(f"[{symbol}] 平仓时出错: {e}")
+                    success_count, failed_count = 0, len(by_symbol[symbol])
+                summary["success"] += success_count
+                summary["failed"] += failed_count
+                if failed_count:
+                    summary["failed_symbols"].append(symbol)
+
+        # 最终复核：交易所上已无持仓才算平仓完成
+        try:
+            summary["flat"] = not fetch_open_positions()
+        except Exception as e:
+            print(f"复核持仓时出错: {e}")
+        summary["elapsed"] = time.perf_counter() - start
         
         # 输出结果摘要
         print(f"\n{'=' * 50}")
         print("平仓操作完成")
-        print(f"总持仓数量: {len(positions)}")
-        print(f"成功平仓: {success_count}")
-        print(f"平仓失败: {failed_count}")
+        print(f"总持仓数量: {summary['total']}")
+        print(f"成功平仓: {summary['success']}")
+        print(f"平仓失败: {summary['failed']}")
+        if summary["failed_symbols"]:
+            print(f"失败交易对: {', '.join(summary['failed_symbols'])}")
+        print(f"{'已全部平仓' if summary['flat'] else '仍有持仓'}，耗时 {summary['elapsed']:.2f} 秒")
         print(f"{'=' * 50}")
         
     except Exception as e:
         print(f"执行过程中出错: {e}")
         import traceback
         traceback.print_exc()
+    summary["elapsed"] = time.perf_counter() - start
+    return summary
 
-if __name__ == "__main__":
+
+def main():
+    """主函数"""
+    global client
+    parser = argparse.ArgumentParser(description='平掉WEEX账户的全部持仓')
+    parser.add_argument('--serial', action='store_true',
+                        help='逐个交易对平仓（默认按交易对并发）')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'并发处理的交易对数量上限（默认{MAX_WORKERS}）')
+    parser.add_argument('--timeout', type=float, default=FLAT_TIMEOUT,
+                        help=f'等待持仓归零/撤单生效的最长秒数（默认{FLAT_TIMEOUT}）')
+    args = parser.parse_args()
+
+    client = create_client_from_env()
+    if client is None:
+        return 1
     print("开始执行平仓操作...")
-    close_all_positions()
+    summary = close_all_positions(parallel=not args.serial, max_workers=args.workers, timeout=args.timeout)
     print("平仓操作结束")
+    return 0 if summary["flat"] else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -10,6 +10,10 @@ from dotenv import load_dotenv
 
 # 导入我们的WEEX SDK
 from weex_sdk import WeexClient
+from candle_store import default_store
+from indicators import (calculate_technical_indicators, generate_technical_analysis_text, get_market_trend,
+                        get_support_resistance_levels)
+from multi_timeframe import MultiTimeframePipeline, generate_multi_timeframe_text
 
 load_dotenv()
 
@@ -45,13 +49,17 @@ TRADE_CONFIG = {
         'short_term': 20,  # 短期均线周期
         'medium_term': 50,  # 中期均线周期
         'long_term': 96,  # 长期均线周期（对应24小时）
-    }
+    },
+    # 多周期趋势：由1分钟K线在内存中聚合，不额外请求各周期K线
+    'mtf_timeframes': ['5m', '15m', '1h', '4h'],
+    'mtf_warmup_hours': 200,  # 启动时用于初始化的1分钟K线时长（4h周期约50根），本地K线存储已有的部分不再下载
 }
 
 # 全局变量存储历史数据
 # price_history = []
 signal_history = []
 position = None
+mtf_pipeline = MultiTimeframePipeline(TRADE_CONFIG['mtf_timeframes'])
 
 
 def setup_exchange():
@@ -78,13 +86,39 @@ def setup_exchange():
         return False
 
 
+def update_multi_timeframe():
+    """用1分钟K线增量更新多周期指标，返回多周期趋势文本"""
+    try:
+        store = default_store()
+        symbol = TRADE_CONFIG['symbol']
+        since = mtf_pipeline.last_timestamp
+        if since is None:
+            # 启动时：用本地存储的1分钟K线初始化，只从交易所补齐缺失的部分
+            since = int(time.time() * 1000) - TRADE_CONFIG['mtf_warmup_hours'] * 3600 * 1000
+        # 从上次处理的最新K线开始补齐，停机较久或上次补齐中途失败留下的断档也一并补上，
+        # 补齐失败时不更新流水线，下次从断档处重试
+        store.fill_range(exchange, symbol, '1m', since)
+        ohlcv = store.load(symbol, '1m', since=since)
+        previous = mtf_pipeline.last_timestamp
+        for candle in ohlcv:
+            if previous is not None and candle[0] - previous > 60 * 1000:
+                print(f"1分钟K线在交易所缺失: {previous} - {candle[0]}")
+            previous = candle[0]
+        mtf_pipeline.update_many(ohlcv)
+        return generate_multi_timeframe_text(mtf_pipeline)
+    except Exception as e:
+        print(f"多周期指标更新失败: {e}")
+        return "【多周期趋势】数据暂不可用"
+
+
 def get_btc_ohlcv():
     """获取BTC/USDT的K线数据并计算技术指标"""
     try:
-        # 获取K线数据
-        ohlcv = exchange.fetch_ohlcv(
-            TRADE_CONFIG['symbol'], 
-            TRADE_CONFIG['timeframe'], 
+        # 获取K线数据：本地存储只向交易所拉取增量
+        ohlcv = default_store().get_ohlcv(
+            exchange,
+            TRADE_CONFIG['symbol'],
+            TRADE_CONFIG['timeframe'],
             limit=TRADE_CONFIG['data_points']
         )
 
@@ -129,6 +163,7 @@ def get_btc_ohlcv():
             },
             'trend_analysis': trend_analysis,
             'levels_analysis': levels_analysis,
+            'multi_timeframe_text': update_multi_timeframe(),
             'full_data': df
         }
     except Exception as e:
@@ -138,151 +173,6 @@ def get_btc_ohlcv():
         return None
 
 
-def calculate_technical_indicators(df):
-    """计算技术指标"""
-    try:
-        # 移动平均线
-        df['sma_5'] = df['close'].rolling(window=5, min_periods=1).mean()
-        df['sma_20'] = df['close'].rolling(window=20, min_periods=1).mean()
-        df['sma_50'] = df['close'].rolling(window=50, min_periods=1).mean()
-
-        # 指数移动平均线
-        df['ema_12'] = df['close'].ewm(span=12).mean()
-        df['ema_26'] = df['close'].ewm(span=26).mean()
-        df['macd'] = df['ema_12'] - df['ema_26']
-        df['macd_signal'] = df['macd'].ewm(span=9).mean()
-        df['macd_histogram'] = df['macd'] - df['macd_signal']
-
-        # 相对强弱指数 (RSI)
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-
-        # 布林带
-        df['bb_middle'] = df['close'].rolling(20).mean()
-        bb_std = df['close'].rolling(20).std()
-        df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-        df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-        df['bb_position'] = (df['close'] - df['bb_lower']) / (df['bb_upper'] - df['bb_lower'])
-
-        # 成交量均线
-        df['volume_ma'] = df['volume'].rolling(20).mean()
-        df['volume_ratio'] = df['volume'] / df['volume_ma']
-
-        # 支撑阻力位
-        df['resistance'] = df['high'].rolling(20).max()
-        df['support'] = df['low'].rolling(20).min()
-
-        # 填充NaN值
-        df = df.bfill().ffill()
-
-        return df
-    except Exception as e:
-        print(f"技术指标计算失败: {e}")
-        return df
-
-
-def get_support_resistance_levels(df, lookback=20):
-    """计算支撑阻力位"""
-    try:
-        recent_high = df['high'].tail(lookback).max()
-        recent_low = df['low'].tail(lookback).min()
-        current_price = df['close'].iloc[-1]
-
-        resistance_level = recent_high
-        support_level = recent_low
-
-        # 动态支撑阻力（基于布林带）
-        bb_upper = df['bb_upper'].iloc[-1]
-        bb_lower = df['bb_lower'].iloc[-1]
-
-        return {
-            'static_resistance': resistance_level,
-            'static_support': support_level,
-            'dynamic_resistance': bb_upper,
-            'dynamic_support': bb_lower,
-            'price_vs_resistance': ((resistance_level - current_price) / current_price) * 100,
-            'price_vs_support': ((current_price - support_level) / support_level) * 100
-        }
-    except Exception as e:
-        print(f"支撑阻力计算失败: {e}")
-        return {}
-
-
-def get_market_trend(df):
-    """判断市场趋势"""
-    try:
-        current_price = df['close'].iloc[-1]
-
-        # 多时间框架趋势分析
-        trend_short = "上涨" if current_price > df['sma_20'].iloc[-1] else "下跌"
-        trend_medium = "上涨" if current_price > df['sma_50'].iloc[-1] else "下跌"
-
-        # MACD趋势
-        macd_trend = "bullish" if df['macd'].iloc[-1] > df['macd_signal'].iloc[-1] else "bearish"
-
-        # 综合趋势判断
-        if trend_short == "上涨" and trend_medium == "上涨":
-            overall_trend = "强势上涨"
-        elif trend_short == "下跌" and trend_medium == "下跌":
-            overall_trend = "强势下跌"
-        else:
-            overall_trend = "震荡整理"
-
-        return {
-            'short_term': trend_short,
-            'medium_term': trend_medium,
-            'macd': macd_trend,
-            'overall': overall_trend,
-            'rsi_level': df['rsi'].iloc[-1]
-        }
-    except Exception as e:
-        print(f"趋势分析失败: {e}")
-        return {}
-
-
-def generate_technical_analysis_text(price_data):
-    """生成技术分析文本"""
-    if 'technical_data' not in price_data:
-        return "技术指标数据不可用"
-
-    tech = price_data['technical_data']
-    trend = price_data.get('trend_analysis', {})
-    levels = price_data.get('levels_analysis', {})
-
-    # 检查数据有效性
-    def safe_float(value, default=0):
-        return float(value) if value and pd.notna(value) else default
-
-    analysis_text = f"""
-    【技术指标分析】
-    📈 移动平均线:
-    - 5周期: {safe_float(tech['sma_5']):.2f} | 价格相对: {(price_data['price'] - safe_float(tech['sma_5'])) / safe_float(tech['sma_5']) * 100:+.2f}%
-    - 20周期: {safe_float(tech['sma_20']):.2f} | 价格相对: {(price_data['price'] - safe_float(tech['sma_20'])) / safe_float(tech['sma_20']) * 100:+.2f}%
-    - 50周期: {safe_float(tech['sma_50']):.2f} | 价格相对: {(price_data['price'] - safe_float(tech['sma_50'])) / safe_float(tech['sma_50']) * 100:+.2f}%
-
-    🎯 趋势分析:
-    - 短期趋势: {trend.get('short_term', 'N/A')}
-    - 中期趋势: {trend.get('medium_term', 'N/A')}
-    - 整体趋势: {trend.get('overall', 'N/A')}
-    - MACD方向: {trend.get('macd', 'N/A')}
-
-    📊 动量指标:
-    - RSI: {safe_float(tech['rsi']):.2f} ({'超买' if safe_float(tech['rsi']) > 70 else '超卖' if safe_float(tech['rsi']) < 30 else '中性'})
-    - MACD: {safe_float(tech['macd']):.4f}
-    - 信号线: {safe_float(tech['macd_signal']):.4f}
-
-    🎚️ 布林带位置: {safe_float(tech['bb_position']):.2%} ({'上部' if safe_float(tech['bb_position']) > 0.7 else '下部' if safe_float(tech['bb_position']) < 0.3 else '中部'})
-
-    💰 关键水平:
-    - 静态阻力: {safe_float(levels.get('static_resistance', 0)):.2f}
-    - 静态支撑: {safe_float(levels.get('static_support', 0)):.2f}
-    """
-    return analysis_text
-
-
 def get_current_position():
     """获取当前持仓情况"""
     try:
@@ -426,6 +316,7 @@ def analyze_with_deepseek(price_data):
 
     print(f"K线数据:\n{kline_text}")
     print(f"技术分析:\n{technical_analysis}")
+    print(f"多周期趋势:\n{price_data.get('multi_timeframe_text', '')}")
     print(f"上次交易信号:\n{signal_text}")
     print(f"情绪数据: {sentiment_text}")
 
@@ -438,6 +329,8 @@ def analyze_with_deepseek(price_data):
 
     {technical_analysis}
 
+    {price_data.get('multi_timeframe_text', '')}
+
     {signal_text}
 
     {sentiment_text}  # 添加情绪分析
@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 
 # 导入Weex SDK
 from weex_sdk import WeexClient
+from candle_store import default_store
 
 
 def load_environment_variables():
@@ -49,18 +50,15 @@ def initialize_client(api_key, api_secret, api_passphrase):
         sys.exit(1)
 
 
-def fetch_15min_kline(client, symbol, limit=10):
+def fetch_15min_kline(client, symbol, limit=10, store=None):
     """
     获取指定交易对的15分钟K线数据
+    K线从本地存储读取，只向交易所拉取上次运行之后的新K线
     """
     try:
         print(f"正在获取{symbol}的15分钟K线数据，限制{limit}条")
-        # 使用fetch_ohlcv方法，timeframe设置为'15m'表示15分钟
-        ohlcv_data = client.fetch_ohlcv(
-            symbol=symbol,
-            timeframe='15m',  # 15分钟K线
-            limit=limit       # 限制返回10条数据
-        )
+        store = store or default_store()
+        ohlcv_data = store.get_ohlcv(client, symbol, '15m', limit=limit)
         
         return ohlcv_data
     except Exception as e:
@@ -25,6 +25,7 @@ load_dotenv()
 # 导入WeexClient类
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from weex_sdk import WeexClient
+from order_export import export_records
 
 
 class OrderDisplay:
@@ -221,29 +222,22 @@ class OrderDisplay:
 
 def save_orders_to_file(orders, filename):
     """
-    保存订单数据到文件
+    按块流式保存订单数据到文件，格式由扩展名决定（.json/.jsonl/.csv/.parquet/.arrow）
     
     Args:
-        orders (list): 订单列表
+        orders (iterable): 订单列表或订单迭代器
         filename (str): 输出文件名
+
+    Returns:
+        int: 保存的订单数，失败时为None
     """
-    import json
-    
     try:
-        # 准备要保存的数据
-        export_data = {
-            "export_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "total_orders": len(orders),
-            "orders": orders
-        }
-        
-        # 保存到文件
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"\n订单数据已保存到: {filename}")
+        count = export_records(orders, filename)
+        print(f"\n{count}条订单数据已保存到: {filename}")
+        return count
     except Exception as e:
         print(f"保存订单数据失败: {str(e)}")
+        return None
 
 
 def main():
@@ -264,8 +258,10 @@ def main():
                         help='订单类型: 1: 开多, 2: 开空, 3: 平多, 4: 平空')
     parser.add_argument('--page-size', type=int, default=100,
                         help='每页数量（默认100，最大500）')
+    parser.add_argument('--all', action='store_true',
+                        help='自动翻页获取时间范围内的全部订单')
     parser.add_argument('--output', type=str, default=None,
-                        help='将订单数据保存到指定文件（JSON格式）')
+                        help='将订单数据保存到指定文件（按扩展名: .json/.jsonl/.csv/.parquet/.arrow）')
     args = parser.parse_args()
     
     # 从环境变量获取API配置
@@ -323,26 +319,55 @@ def main():
         print(f"正在获取历史计划订单...")
         print(f"查询条件: {', '.join(query_info)}")
         
-        # 获取历史订单
-        result = client.get_order_history(
-            symbol=args.symbol,
-            start_time=start_time_ms,
-            end_time=end_time_ms,
-            delegate_type=args.order_type,
-            page_size=args.page_size
-        )
+        if args.all and args.output and not args.verbose:
+            # 边翻页边写入文件，内存中只保留一块订单（SDK返回的订单已经格式化）
+            orders = client.iter_order_history(
+                symbol=args.symbol,
+                start_time=start_time_ms,
+                end_time=end_time_ms,
+                delegate_type=args.order_type,
+                page_size=args.page_size
+            )
+            if save_orders_to_file(orders, args.output) is None:
+                return 1
+            print(f"\n任务完成!")
+            print(f"结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            return 0
 
-        
-        # 检查是否有错误
-        if result.get("error"):
-            print(OrderDisplay.colorize(f"获取历史订单失败: {result['error']}", "red"))
-            if result.get("error_code"):
-                print(f"错误代码: {result['error_code']}")
-            return 1
-        
-        # 获取订单列表
-        order_list = result.get("orders", [])
-        has_more = result.get("has_more", False)
+        if args.all:
+            # 自动翻页，下一页在处理当前页时预取
+            try:
+                order_list = list(client.iter_order_history(
+                    symbol=args.symbol,
+                    start_time=start_time_ms,
+                    end_time=end_time_ms,
+                    delegate_type=args.order_type,
+                    page_size=args.page_size
+                ))
+            except RuntimeError as e:
+                print(OrderDisplay.colorize(f"获取历史订单失败: {e}", "red"))
+                return 1
+            has_more = False
+        else:
+            # 获取历史订单
+            result = client.get_order_history(
+                symbol=args.symbol,
+                start_time=start_time_ms,
+                end_time=end_time_ms,
+                delegate_type=args.order_type,
+                page_size=args.page_size
+            )
+
+            # 检查是否有错误
+            if result.get("error"):
+                print(OrderDisplay.colorize(f"获取历史订单失败: {result['error']}", "red"))
+                if result.get("error_code"):
+                    print(f"错误代码: {result['error_code']}")
+                return 1
+
+            # 获取订单列表
+            order_list = result.get("orders", [])
+            has_more = result.get("has_more", False)
         
         # 订单类型映射
         order_type_map = {
@@ -411,14 +436,14 @@ def main():
         
         # 显示是否有更多数据
         if has_more:
-            print(OrderDisplay.colorize("\n注意: 还有更多历史订单未显示，请调整时间范围或增加page_size参数。", "yellow"))
+            print(OrderDisplay.colorize("\n注意: 还有更多历史订单未显示，请使用--all获取全部订单，或调整时间范围。", "yellow"))
         
         # 保存到文件（如果指定）
         if args.output:
             save_orders_to_file(orders, args.output)
         
         print(f"\n任务完成!")
-        print(f"结束时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}")
+        print(f"结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
         return 0
         
@@ -100,7 +100,7 @@ class PositionDisplay:
     def print_position_header(cls):
         """打印持仓信息表头"""
         headers = [
-            "交易对", "方向", "持仓量", "入场价", 
+            "交易对", "方向", "持仓量", "入场价", "最新价",
             "杠杆倍数", "未实现盈亏", "盈亏百分比", 
             "强平价格", "保证金模式", "更新时间"
         ]
@@ -111,12 +111,13 @@ class PositionDisplay:
         col_widths[1] = max(col_widths[1], 8)   # 方向列宽
         col_widths[2] = max(col_widths[2], 10)  # 持仓量列宽
         col_widths[3] = max(col_widths[3], 12)  # 入场价列宽
-        col_widths[4] = max(col_widths[4], 8)   # 杠杆倍数列宽
-        col_widths[5] = max(col_widths[5], 12)  # 未实现盈亏列宽
-        col_widths[6] = max(col_widths[6], 12)  # 盈亏百分比列宽
-        col_widths[7] = max(col_widths[7], 12)  # 强平价格列宽
-        col_widths[8] = max(col_widths[8], 12)  # 保证金模式列宽
-        col_widths[9] = max(col_widths[9], 16)  # 更新时间列宽
+        col_widths[4] = max(col_widths[4], 12)  # 最新价列宽
+        col_widths[5] = max(col_widths[5], 8)   # 杠杆倍数列宽
+        col_widths[6] = max(col_widths[6], 12)  # 未实现盈亏列宽
+        col_widths[7] = max(col_widths[7], 12)  # 盈亏百分比列宽
+        col_widths[8] = max(col_widths[8], 12)  # 强平价格列宽
+        col_widths[9] = max(col_widths[9], 12)  # 保证金模式列宽
+        col_widths[10] = max(col_widths[10], 16)  # 更新时间列宽
         
         # 打印表头
         header_line = "|".join(f"{h:<{w}}".format(h, w) for h, w in zip(headers, col_widths))
@@ -127,7 +128,7 @@ class PositionDisplay:
         print(f"+{separator_line}+")
     
     @classmethod
-    def print_position_row(cls, position):
+    def print_position_row(cls, position, last_price=None):
         """打印持仓信息行"""
         # 格式化数据
         symbol = position.get("symbol", "").replace("cmt_", "")
@@ -135,6 +136,7 @@ class PositionDisplay:
                           "green" if position.get("side") == "long" else "red")
         size = cls.format_position_value(position.get("size", 0))
         entry_price = cls.format_position_value(position.get("entryPrice", 0))
+        last = cls.format_position_value(last_price) if last_price is not None else "N/A"
         leverage = cls.format_position_value(position.get("leverage", 1), 2)
         unrealized_pnl = position.get("unrealizedPnl", 0)
         pnl_formatted = cls.format_pnl(unrealized_pnl)
@@ -157,10 +159,10 @@ class PositionDisplay:
             update_time = "N/A"
         
         # 计算列宽
-        col_widths = [15, 8, 10, 12, 8, 12, 12, 12, 12, 16]
+        col_widths = [15, 8, 10, 12, 12, 8, 12, 12, 12, 12, 16]
         
         # 打印数据行
-        data = [symbol, side, size, entry_price, leverage, pnl_formatted, pnl_percentage, 
+        data = [symbol, side, size, entry_price, last, leverage, pnl_formatted, pnl_percentage, 
                 liquidation_price, margin_mode, update_time]
         
         # 确保颜色标记不会影响宽度计算
@@ -194,7 +196,7 @@ class PositionDisplay:
                 print(f"  {key}: {value}")
         
         # 显示原始信息
-        if 'info' in position:
+        if position.get('info'):
             print(f"  原始API数据:")
             for k, v in position['info'].items():
                 print(f"    {k}: {v}")
@@ -228,12 +230,18 @@ def main():
     
     try:
         # 初始化WeexClient
-        client = WeexClient(api_key, api_secret, api_passphrase, testnet=args.testnet)
+        # 详细模式需要显示原始API数据，让SDK保留持仓的原始响应
+        client = WeexClient(api_key, api_secret, api_passphrase, testnet=args.testnet, keep_raw=args.verbose)
         print(f"已初始化WeexClient ({'测试网络' if args.testnet else '主网络'})")
         
-        # 获取持仓信息
+        # 获取持仓快照（一次持仓请求加一次行情请求，包含每个持仓交易对的最新价）
         print(f"正在获取持仓信息{'' if args.symbol is None else f'，交易对: {args.symbol}'}...")
-        positions = client.fetch_positions(symbol=args.symbol)
+        snapshot = client.fetch_snapshot(symbols=[args.symbol] if args.symbol else None)
+        if snapshot['error']:
+            print(PositionDisplay.colorize(f"获取持仓信息失败: {snapshot['error']}", "red"))
+            return 1
+        positions = snapshot['positions']
+        prices = snapshot['prices']
 
         print(positions)
         
@@ -249,7 +257,7 @@ def main():
         # 打印持仓信息表格
         PositionDisplay.print_position_header()
         for position in positions:
-            PositionDisplay.print_position_row(position)
+            PositionDisplay.print_position_row(position, prices.get(position.get("symbol")))
         
         # 打印表格底部边框
         PositionDisplay.print_separator()
@@ -0,0 +1,852 @@
+"""
+技术指标计算
+- compute_indicators: 基于numpy float64数组一次批量计算全部指标
+- average_true_range: 平均真实波幅，用于衡量近期波动
+- calculate_technical_indicators_pandas: 原pandas rolling/ewm实现，作为对照基准
+- calculate_technical_indicators: pandas适配层，对DataFrame添加指标列（策略文件共用）
+- get_support_resistance_levels / get_market_trend / generate_technical_analysis_text: 基于指标的分析
+- IncrementalIndicators: 增量指标引擎，每根新K线只做O(1)的状态更新，结果与pandas版本逐值一致
+
+用法:
+    engine = IncrementalIndicators.from_ohlcv(ohlcv)
+    latest = engine.update([ts, open, high, low, close, volume])
+    print(latest['rsi'], latest['macd'])
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+# 指标列，与calculate_technical_indicators添加的列一致
+INDICATOR_COLUMNS = [
+    'sma_5', 'sma_20', 'sma_50',
+    'ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_histogram',
+    'rsi',
+    'bb_middle', 'bb_upper', 'bb_lower', 'bb_position',
+    'volume_ma', 'volume_ratio',
+    'resistance', 'support'
+]
+
+
+def _as_array(values):
+    """
+    转换为连续的float64数组
+    """
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _full_windows(x, window, func):
+    """
+    对所有完整窗口计算func(x, window, m)，窗口未满的位置为NaN
+
+    Returns:
+        np.ndarray: 与x等长的结果
+    """
+    out = np.full(len(x), np.nan)
+    m = len(x) - window + 1
+    if m > 0:
+        out[window - 1:] = func(x, window, m)
+    return out
+
+
+def _window_extreme(x, window, m, ufunc):
+    """
+    倍增法求m个窗口的最大/最小值：span_k[i]为x[i:i + 2^k]的极值，
+    窗口极值由两个长度为2^k（不超过window）的重叠区间合并得到，共O(log window)次整段运算
+    """
+    span = x
+    width = 1
+    while width * 2 <= window:
+        span = ufunc(span[:-width], span[width:])
+        width *= 2
+    return ufunc(span[:m], span[window - width:window - width + m])
+
+
+def _window_mean(x, window, m):
+    """
+    m个完整窗口的均值：相对x[0]的前缀和相减得到窗口和，O(n)
+    窗口内全是相同值时直接返回该值（与pandas一致，也保证横盘时标准差为精确的0）
+    """
+    prefix = np.empty(len(x) + 1)
+    prefix[0] = 0.0
+    np.cumsum(x - x[0], out=prefix[1:])
+    mean = (prefix[window:] - prefix[:m]) / window + x[0]
+    flat = _window_extreme(x, window, m, np.maximum) == _window_extreme(x, window, m, np.minimum)
+    return np.where(flat, x[:m], mean)
+
+
+def _window_std(x, window, m):
+    """
+    m个完整窗口的样本标准差：先求窗口均值，再对偏差平方求和（两遍法，避免大数平方相减的精度损失）
+    """
+    mean = _window_mean(x, window, m)
+    squares = np.zeros(m)
+    diff = np.empty(m)
+    for k in range(window):
+        np.subtract(x[k:k + m], mean, out=diff)
+        np.multiply(diff, diff, out=diff)
+        squares += diff
+    squares /= window - 1
+    return np.sqrt(squares, out=squares)
+
+
+def rolling_mean(x, window, min_periods=None):
+    """
+    滚动均值，与Series.rolling(window, min_periods).mean()一致
+
+    Args:
+        x (np.ndarray): 一维float64数组（不含NaN）
+        window (int): 窗口长度
+        min_periods (int, optional): 最少观测数，默认等于window
+    """
+    x = _as_array(x)
+    out = _full_windows(x, window, _window_mean)
+    min_periods = window if min_periods is None else min_periods
+    head = min(window - 1, len(x))
+    if min_periods < window and head > 0:
+        # 窗口未满的部分按已有观测数求平均
+        partial = np.cumsum(x[:head]) / np.arange(1, head + 1)
+        partial[:min_periods - 1] = np.nan
+        out[:head] = partial
+    return out
+
+
+def rolling_std(x, window):
+    """
+    滚动样本标准差（ddof=1），与Series.rolling(window).std()一致
+    """
+    return _full_windows(_as_array(x), window, _window_std)
+
+
+def rolling_max(x, window):
+    """
+    滚动最大值，与Series.rolling(window).max()一致
+    """
+    return _full_windows(_as_array(x), window, lambda x, window, m: _window_extreme(x, window, m, np.maximum))
+
+
+def rolling_min(x, window):
+    """
+    滚动最小值，与Series.rolling(window).min()一致
+    """
+    return _full_windows(_as_array(x), window, lambda x, window, m: _window_extreme(x, window, m, np.minimum))
+
+
+def ewm_mean(x, span):
+    """
+    指数加权均值，与Series.ewm(span=span).mean()（adjust=True）一致
+
+    分子 num_t = x_t + w*num_{t-1}（w = 1 - alpha）按块展开为 w^(j+1) * cumsum(x_k * w^-(k+1))，
+    块长度保证 w^-(k+1) 不溢出，块之间传递上一块末尾的分子；分母为等比数列和(1 - w^(t+1)) / (1 - w)
+
+    Args:
+        x (np.ndarray): 一维float64数组（不含NaN）
+        span (int): 跨度，alpha = 2 / (span + 1)
+    """
+    x = _as_array(x)
+    n = len(x)
+    decay = 1.0 - 2.0 / (span + 1)
+    block_size = max(1, min(n, int(600 / -math.log(decay))))
+    powers = decay ** np.arange(1, block_size + 1)
+    inverse = 1.0 / powers
+    numerator = np.empty(n)
+    carry = 0.0
+    for start in range(0, n, block_size):
+        m = min(block_size, n - start)
+        num = numerator[start:start + m]
+        np.multiply(x[start:start + m], inverse[:m], out=num)
+        np.cumsum(num, out=num)
+        num += carry
+        num *= powers[:m]
+        carry = num[-1]
+    # w^(t+1)在块长度之后已小于1e-260，分母视为常数
+    denominator = np.full(n, 1.0 / (1.0 - decay))
+    head = min(n, block_size)
+    denominator[:head] = (1.0 - powers[:head]) / (1.0 - decay)
+    return numerator / denominator
+
+
+def average_true_range(high, low, close, period=14):
+    """
+    平均真实波幅（ATR），真实波幅取 最高-最低、|最高-前收|、|最低-前收| 中的最大值，按period根K线简单平均
+
+    Args:
+        high, low, close: 按时间升序的一维数组
+        period (int): 平均的K线根数
+
+    Returns:
+        np.ndarray: 与输入等长的ATR，K线不足period根的位置按已有K线平均
+    """
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    true_range = high - low
+    if len(close) > 1:
+        prev_close = close[:-1]
+        true_range[1:] = np.maximum(true_range[1:], np.maximum(np.abs(high[1:] - prev_close),
+                                                               np.abs(low[1:] - prev_close)))
+    return rolling_mean(true_range, period, min_periods=1)
+
+
+def compute_indicators(high, low, close, volume):
+    """
+    基于numpy数组一次批量计算全部技术指标，指标定义与calculate_technical_indicators一致
+
+    Args:
+        high, low, close, volume: 按时间升序的一维数组（可以是列表、Series或ndarray）
+
+    Returns:
+        dict: 指标名 -> 与输入等长的float64数组（窗口未满处为NaN，不做填充），键为INDICATOR_COLUMNS
+    """
+    high, low, close, volume = _as_array(high), _as_array(low), _as_array(close), _as_array(volume)
+    result = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 移动平均线
+        result['sma_5'] = rolling_mean(close, 5, min_periods=1)
+        result['sma_20'] = rolling_mean(close, 20, min_periods=1)
+        result['sma_50'] = rolling_mean(close, 50, min_periods=1)
+
+        # 指数移动平均线
+        ema_12 = ewm_mean(close, 12)
+        ema_26 = ewm_mean(close, 26)
+        macd = ema_12 - ema_26
+        macd_signal = ewm_mean(macd, 9)
+        result['ema_12'] = ema_12
+        result['ema_26'] = ema_26
+        result['macd'] = macd
+        result['macd_signal'] = macd_signal
+        result['macd_histogram'] = macd - macd_signal
+
+        # 相对强弱指数 (RSI)，第一根K线的涨跌幅视为0
+        delta = np.zeros(len(close))
+        delta[1:] = np.diff(close)
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), 14)
+        loss = rolling_mean(np.where(delta < 0, -delta, 0.0), 14)
+        result['rsi'] = 100 - (100 / (1 + gain / loss))
+
+        # 布林带，中轨与sma_20相同，只是要求完整窗口
+        bb_middle = result['sma_20'].copy()
+        bb_middle[:19] = np.nan
+        bb_std = rolling_std(close, 20)
+        bb_upper = bb_middle + (bb_std * 2)
+        bb_lower = bb_middle - (bb_std * 2)
+        result['bb_middle'] = bb_middle
+        result['bb_upper'] = bb_upper
+        result['bb_lower'] = bb_lower
+        result['bb_position'] = (close - bb_lower) / (bb_upper - bb_lower)
+
+        # 成交量均线
+        volume_ma = rolling_mean(volume, 20)
+        result['volume_ma'] = volume_ma
+        result['volume_ratio'] = volume / volume_ma
+
+        # 支撑阻力位
+        result['resistance'] = rolling_max(high, 20)
+        result['support'] = rolling_min(low, 20)
+    return {name: result[name] for name in INDICATOR_COLUMNS}
+
+
+def fill_nan(values):
+    """
+    先向后填充再向前填充NaN，与Series.bfill().ffill()一致
+
+    Args:
+        values (np.ndarray): 一维float64数组
+
+    Returns:
+        np.ndarray: 填充后的新数组，全部为NaN时原样返回
+    """
+    valid = ~np.isnan(values)
+    if valid.all() or not valid.any():
+        return values
+    n = len(values)
+    positions = np.arange(n)
+    # 每个位置之后（含）第一个有效值的下标，末尾没有有效值的位置改用之前最后一个有效值
+    next_valid = np.minimum.accumulate(np.where(valid, positions, n)[::-1])[::-1]
+    prev_valid = np.maximum.accumulate(np.where(valid, positions, -1))
+    return values[np.where(next_valid < n, next_valid, prev_valid)]
+
+
+def calculate_technical_indicators(df):
+    """计算技术指标"""
+    try:
+        indicators = compute_indicators(df['high'].to_numpy(), df['low'].to_numpy(),
+                                        df['close'].to_numpy(), df['volume'].to_numpy())
+        # 填充NaN值
+        for name, values in indicators.items():
+            df[name] = fill_nan(values)
+
+        # K线本身有缺失值时按原逻辑对整个DataFrame填充
+        if df.isna().to_numpy().any():
+            df = df.bfill().ffill()
+
+        return df
+    except Exception as e:
+        print(f"技术指标计算失败: {e}")
+        return df
+
+
+def get_support_resistance_levels(df, lookback=20):
+    """计算支撑阻力位"""
+    try:
+        recent_high = df['high'].tail(lookback).max()
+        recent_low = df['low'].tail(lookback).min()
+        current_price = df['close'].iloc[-1]
+
+        resistance_level = recent_high
+        support_level = recent_low
+
+        # 动态支撑阻力（基于布林带）
+        bb_upper = df['bb_upper'].iloc[-1]
+        bb_lower = df['bb_lower'].iloc[-1]
+
+        return {
+            'static_resistance': resistance_level,
+            'static_support': support_level,
+            'dynamic_resistance': bb_upper,
+            'dynamic_support': bb_lower,
+            'price_vs_resistance': ((resistance_level - current_price) / current_price) * 100,
+            'price_vs_support': ((current_price - support_level) / support_level) * 100
+        }
+    except Exception as e:
+        print(f"支撑阻力计算失败: {e}")
+        return {}
+
+
+def get_market_trend(df):
+    """判断市场趋势"""
+    try:
+        current_price = df['close'].iloc[-1]
+
+        # 多时间框架趋势分析
+        trend_short = "上涨" if current_price > df['sma_20'].iloc[-1] else "下跌"
+        trend_medium = "上涨" if current_price > df['sma_50'].iloc[-1] else "下跌"
+
+        # MACD趋势
+        macd_trend = "bullish" if df['macd'].iloc[-1] > df['macd_signal'].iloc[-1] else "bearish"
+
+        # 综合趋势判断
+        if trend_short == "上涨" and trend_medium == "上涨":
+            overall_trend = "强势上涨"
+        elif trend_short == "下跌" and trend_medium == "下跌":
+            overall_trend = "强势下跌"
+        else:
+            overall_trend = "震荡整理"
+
+        return {
+            'short_term': trend_short,
+            'medium_term': trend_medium,
+            'macd': macd_trend,
+            'overall': overall_trend,
+            'rsi_level': df['rsi'].iloc[-1]
+        }
+    except Exception as e:
+        print(f"趋势分析失败: {e}")
+        return {}
+
+
+def generate_technical_analysis_text(price_data):
+    """生成技术分析文本"""
+    if 'technical_data' not in price_data:
+        return "技术指标数据不可用"
+
+    tech = price_data['technical_data']
+    trend = price_data.get('trend_analysis', {})
+    levels = price_data.get('levels_analysis', {})
+
+    # 检查数据有效性
+    def safe_float(value, default=0):
+        return float(value) if value and pd.notna(value) else default
+
+    analysis_text = f"""
+    【技术指标分析】
+    📈 移动平均线:
+    - 5周期: {safe_float(tech['sma_5']):.2f} | 价格相对: {(price_data['price'] - safe_float(tech['sma_5'])) / safe_float(tech['sma_5']) * 100:+.2f}%
+    - 20周期: {safe_float(tech['sma_20']):.2f} | 价格相对: {(price_data['price'] - safe_float(tech['sma_20'])) / safe_float(tech['sma_20']) * 100:+.2f}%
+    - 50周期: {safe_float(tech['sma_50']):.2f} | 价格相对: {(price_data['price'] - safe_float(tech['sma_50'])) / safe_float(tech['sma_50']) * 100:+.2f}%
+
+    🎯 趋势分析:
+    - 短期趋势: {trend.get('short_term', 'N/A')}
+    - 中期趋势: {trend.get('medium_term', 'N/A')}
+    - 整体趋势: {trend.get('overall', 'N/A')}
+    - MACD方向: {trend.get('macd', 'N/A')}
+
+    📊 动量指标:
+    - RSI: {safe_float(tech['rsi']):.2f} ({'超买' if safe_float(tech['rsi']) > 70 else '超卖' if safe_float(tech['rsi']) < 30 else '中性'})
+    - MACD: {safe_float(tech['macd']):.4f}
+    - 信号线: {safe_float(tech['macd_signal']):.4f}
+
+    🎚️ 布林带位置: {safe_float(tech['bb_position']):.2%} ({'上部' if safe_float(tech['bb_position']) > 0.7 else '下部' if safe_float(tech['bb_position']) < 0.3 else '中部'})
+
+    💰 关键水平:
+    - 静态阻力: {safe_float(levels.get('static_resistance', 0)):.2f}
+    - 静态支撑: {safe_float(levels.get('static_support', 0)):.2f}
+    """
+    return analysis_text
+
+
+def calculate_technical_indicators_pandas(df):
+    """
+    基于pandas rolling/ewm的原始实现，作为numpy版本和增量引擎的对照基准
+    """
+    try:
+        # 移动平均线
+        df['sma_5'] = df['close'].rolling(window=5, min_periods=1).mean()
+        df['sma_20'] = df['close'].rolling(window=20, min_periods=1).mean()
+        df['sma_50'] = df['close'].rolling(window=50, min_periods=1).mean()
+
+        # 指数移动平均线
+        df['ema_12'] = df['close'].ewm(span=12).mean()
+        df['ema_26'] = df['close'].ewm(span=26).mean()
+        df['macd'] = df['ema_12'] - df['ema_26']
+        df['macd_signal'] = df['macd'].ewm(span=9).mean()
+        df['macd_histogram'] = df['macd'] - df['macd_signal']
+
+        # 相对强弱指数 (RSI)
+        delta = df['close'].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        rs = gain / loss
+        df['rsi'] = 100 - (100 / (1 + rs))
+
+        # 布林带
+        df['bb_middle'] = df['close'].rolling(20).mean()
+        bb_std = df['close'].rolling(20).std()
+        df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
+        df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
+        df['bb_position'] = (df['close'] - df['bb_lower']) / (df['bb_upper'] - df['bb_lower'])
+
+        # 成交量均线
+        df['volume_ma'] = df['volume'].rolling(20).mean()
+        df['volume_ratio'] = df['volume'] / df['volume_ma']
+
+        # 支撑阻力位
+        df['resistance'] = df['high'].rolling(20).max()
+        df['support'] = df['low'].rolling(20).min()
+
+        # 填充NaN值
+        df = df.bfill().ffill()
+
+        return df
+    except Exception as e:
+        print(f"技术指标计算失败: {e}")
+        return df
+
+
+def _div(a, b):
+    """
+    按numpy/IEEE语义做除法：除以0得到带符号的无穷大，0/0得到NaN
+    """
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class _RollingMean:
+    """
+    滚动均值，增量实现pandas roll_mean的Kahan补偿求和（增加和移除各自维护补偿项）
+    """
+
+    def __init__(self, window, min_periods):
+        self.window = window
+        self.min_periods = min_periods
+        self.values = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        # 连续相同值计数，窗口内全是同一个值时pandas直接返回该值
+        self.same_count = 0
+        self.prev_value = None
+
+    def _state(self):
+        return (self.nobs, self.neg_ct, self.sum_x, self.comp_add, self.comp_remove, self.same_count, self.prev_value)
+
+    def push(self, x):
+        """
+        加入一个新值，返回用于undo的令牌
+        """
+        token = self._state()
+        evicted = None
+        if len(self.values) == self.window:
+            evicted = self.values.popleft()
+            self.nobs -= 1
+            y = -evicted - self.comp_remove
+            t = self.sum_x + y
+            self.comp_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, evicted) < 0:
+                self.neg_ct -= 1
+        if self.prev_value is None:
+            self.prev_value = x
+        self.values.append(x)
+        self.nobs += 1
+        y = x - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, x) < 0:
+            self.neg_ct += 1
+        if x == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = x
+        return token, evicted
+
+    def undo(self, token):
+        """
+        撤销最近一次push
+        """
+        state, evicted = token
+        self.values.pop()
+        if evicted is not None:
+            self.values.appendleft(evicted)
+        (self.nobs, self.neg_ct, self.sum_x, self.comp_add, self.comp_remove,
+         self.same_count, self.prev_value) = state
+
+    def value(self):
+        if self.nobs < self.min_periods or self.nobs == 0:
+            return NAN
+        if self.same_count >= self.nobs:
+            return self.prev_value
+        result = self.sum_x / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class _RollingVar:
+    """
+    滚动样本方差（ddof=1），增量实现pandas roll_var的带补偿Welford算法
+    """
+
+    def __init__(self, window, min_periods):
+        self.window = window
+        self.min_periods = min_periods
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+
+    def _state(self):
+        return (self.nobs, self.mean_x, self.ssqdm_x, self.comp_add, self.comp_remove)
+
+    def push(self, x):
+        token = self._state()
+        evicted = None
+        if len(self.values) == self.window:
+            evicted = self.values.popleft()
+            self.nobs -= 1
+            if self.nobs:
+                prev_mean = self.mean_x - self.comp_remove
+                y = evicted - self.comp_remove
+                t = y - self.mean_x
+                self.comp_remove = t + self.mean_x - y
+                self.mean_x -= t / self.nobs
+                self.ssqdm_x -= (evicted - prev_mean) * (evicted - self.mean_x)
+            else:
+                self.mean_x = 0.0
+                self.ssqdm_x = 0.0
+        self.values.append(x)
+        self.nobs += 1
+        prev_mean = self.mean_x - self.comp_add
+        y = x - self.comp_add
+        t = y - self.mean_x
+        self.comp_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (x - prev_mean) * (x - self.mean_x)
+        return token, evicted
+
+    def undo(self, token):
+        state, evicted = token
+        self.values.pop()
+        if evicted is not None:
+            self.values.appendleft(evicted)
+        self.nobs, self.mean_x, self.ssqdm_x, self.comp_add, self.comp_remove = state
+
+    def std(self):
+        if self.nobs < self.min_periods or self.nobs <= 1:
+            return NAN
+        var = self.ssqdm_x / (self.nobs - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class _RollingExtreme:
+    """
+    滚动最大值/最小值，单调队列实现，均摊O(1)
+    """
+
+    def __init__(self, window, is_max=True):
+        self.window = window
+        self.is_max = is_max
+        self.queue = deque()  # (序号, 值)，值单调
+        self.count = 0
+
+    def push(self, x):
+        evicted = None
+        if self.queue and self.queue[0][0] <= self.count - self.window:
+            evicted = self.queue.popleft()
+        popped = []
+        queue = self.queue
+        if self.is_max:
+            while queue and queue[-1][1] <= x:
+                popped.append(queue.pop())
+        else:
+            while queue and queue[-1][1] >= x:
+                popped.append(queue.pop())
+        queue.append((self.count, x))
+        self.count += 1
+        return evicted, popped
+
+    def undo(self, token):
+        evicted, popped = token
+        self.queue.pop()
+        self.queue.extend(reversed(popped))
+        if evicted is not None:
+            self.queue.appendleft(evicted)
+        self.count -= 1
+
+    def value(self):
+        if self.count < self.window:
+            return NAN
+        return self.queue[0][1]
+
+
+class _Ewm:
+    """
+    指数加权均值，与pandas ewm(span=...).mean()（adjust=True）的递推完全一致
+    """
+
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.weighted = None
+        self.old_wt = 1.0
+
+    def push(self, x):
+        token = (self.weighted, self.old_wt)
+        if self.weighted is None:
+            self.weighted = x
+            self.old_wt = 1.0
+        else:
+            self.old_wt *= 1.0 - self.alpha
+            if self.weighted != x:
+                self.weighted = ((self.old_wt * self.weighted) + x) / (self.old_wt + 1.0)
+            self.old_wt += 1.0
+        return token
+
+    def undo(self, token):
+        self.weighted, self.old_wt = token
+
+    def value(self):
+        return NAN if self.weighted is None else self.weighted
+
+
+class _WilderRsi:
+    """
+    Wilder平滑RSI：前period个涨跌幅取简单平均作为初值，之后 avg = (avg * (period - 1) + x) / period
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def push(self, gain, loss):
+        token = (self.count, self.avg_gain, self.avg_loss)
+        self.count += 1
+        if self.count <= self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return token
+
+    def undo(self, token):
+        self.count, self.avg_gain, self.avg_loss = token
+
+    def value(self):
+        if self.count < self.period:
+            return NAN
+        return 100 - 100 / (1 + _div(self.avg_gain, self.avg_loss))
+
+
+class IncrementalIndicators:
+    """
+    增量技术指标引擎
+
+    每根K线只更新各指标的O(1)状态（滚动和、EMA递推值、单调队列），不再对整个DataFrame重新计算。
+    指标定义与calculate_technical_indicators一致（包括用14期简单平均计算的rsi），
+    另外提供Wilder平滑的rsi_wilder。
+
+    同一时间戳的K线再次传入时（未收盘K线的价格更新），会先撤销上一次的更新再重新计算。
+    返回的是原始值，窗口未满时为NaN；latest()返回向前填充后的最新值，与pandas版本最后一行一致。
+    """
+
+    def __init__(self):
+        self._sma_5 = _RollingMean(5, 1)
+        self._sma_20 = _RollingMean(20, 1)
+        self._sma_50 = _RollingMean(50, 1)
+        self._ema_12 = _Ewm(12)
+        self._ema_26 = _Ewm(26)
+        self._macd_signal = _Ewm(9)
+        self._gain = _RollingMean(14, 14)
+        self._loss = _RollingMean(14, 14)
+        self._wilder = _WilderRsi(14)
+        self._bb_std = _RollingVar(20, 20)
+        self._volume_ma = _RollingMean(20, 20)
+        self._resistance = _RollingExtreme(20, is_max=True)
+        self._support = _RollingExtreme(20, is_max=False)
+
+        self.last_timestamp = None
+        self.count = 0
+        self._prev_close = None
+        self._undo = None
+        self._values = {}
+        self._filled = {}
+        self._filled_before = {}
+
+    @classmethod
+    def from_ohlcv(cls, ohlcv):
+        """
+        用历史K线初始化引擎
+
+        Args:
+            ohlcv (list): [[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量], ...]，按时间升序
+        """
+        engine = cls()
+        for candle in ohlcv:
+            engine.update(candle)
+        return engine
+
+    def _rollback(self):
+        """
+        撤销最近一根K线的更新
+        """
+        tokens, prev_close, filled = self._undo
+        for component, token in tokens:
+            component.undo(token)
+        self._prev_close = prev_close
+        self._filled = filled
+        self.count -= 1
+
+    def update(self, candle):
+        """
+        加入一根K线并返回该K线的指标值
+
+        Args:
+            candle (list): [时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
+
+        Returns:
+            dict: 指标名 -> 值，包含INDICATOR_COLUMNS中的所有指标和rsi_wilder
+
+        Raises:
+            ValueError: K线时间早于已处理的最新K线
+        """
+        ts = candle[0]
+        if self.last_timestamp is not None:
+            if ts == self.last_timestamp:
+                self._rollback()
+            elif ts < self.last_timestamp:
+                raise ValueError(f"K线时间戳{ts}早于最新K线{self.last_timestamp}")
+
+        high, low, close, volume = float(candle[2]), float(candle[3]), float(candle[4]), float(candle[5])
+        prev_close = self._prev_close
+        if prev_close is None:
+            # 与pandas一致：第一根K线的涨跌幅为NaN，被where替换为0
+            gain, loss = 0.0, -0.0
+        else:
+            delta = close - prev_close
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else -0.0
+
+        tokens = [
+            (self._sma_5, self._sma_5.push(close)),
+            (self._sma_20, self._sma_20.push(close)),
+            (self._sma_50, self._sma_50.push(close)),
+            (self._ema_12, self._ema_12.push(close)),
+            (self._ema_26, self._ema_26.push(close)),
+            (self._gain, self._gain.push(gain)),
+            (self._loss, self._loss.push(loss)),
+            (self._bb_std, self._bb_std.push(close)),
+            (self._volume_ma, self._volume_ma.push(volume)),
+            (self._resistance, self._resistance.push(high)),
+            (self._support, self._support.push(low)),
+        ]
+        if prev_close is not None:
+            tokens.append((self._wilder, self._wilder.push(gain, abs(loss))))
+
+        ema_12 = self._ema_12.value()
+        ema_26 = self._ema_26.value()
+        macd = ema_12 - ema_26
+        tokens.append((self._macd_signal, self._macd_signal.push(macd)))
+        macd_signal = self._macd_signal.value()
+
+        rs = _div(self._gain.value(), self._loss.value())
+        rsi = 100 - (100 / (1 + rs))
+
+        bb_middle = self._sma_20.value() if self._sma_20.nobs >= 20 else NAN
+        bb_std = self._bb_std.std()
+        bb_upper = bb_middle + (bb_std * 2)
+        bb_lower = bb_middle - (bb_std * 2)
+        volume_ma = self._volume_ma.value()
+
+        values = {
+            'sma_5': self._sma_5.value(),
+            'sma_20': self._sma_20.value(),
+            'sma_50': self._sma_50.value(),
+            'ema_12': ema_12,
+            'ema_26': ema_26,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_histogram': macd - macd_signal,
+            'rsi': rsi,
+            'bb_middle': bb_middle,
+            'bb_upper': bb_upper,
+            'bb_lower': bb_lower,
+            'bb_position': _div(close - bb_lower, bb_upper - bb_lower),
+            'volume_ma': volume_ma,
+            'volume_ratio': _div(volume, volume_ma),
+            'resistance': self._resistance.value(),
+            'support': self._support.value(),
+            'rsi_wilder': self._wilder.value(),
+        }
+
+        self._undo = (tokens, prev_close, self._filled)
+        # 向前填充：NaN沿用上一根K线的有效值
+        filled = dict(self._filled)
+        for name, value in values.items():
+            if value == value:
+                filled[name] = value
+        self._filled = filled
+
+        self._prev_close = close
+        self.last_timestamp = ts
+        self.count += 1
+        self._values = values
+        return values
+
+    @property
+    def values(self):
+        """
+        最新一根K线的原始指标值
+        """
+        return self._values
+
+    def latest(self):
+        """
+        最新一根K线向前填充后的指标值，没有任何有效值的指标为NaN
+        """
+        return {name: self._filled.get(name, NAN) for name in self._values}
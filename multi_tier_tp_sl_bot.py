@@ -11,6 +11,11 @@ import logging
 
 # 导入我们的WEEX SDK
 from weex_sdk import WeexClient
+from weex_stream import TICKER_CHANNEL, WEEX_REPLAY_URL, MarketStream
+from tier_engine import TierEngine, next_check_interval, profit_percentage, tier_stop_price
+from indicators import average_true_range
+from plan_order_sync import PlanOrderSync
+from state_journal import StateJournal
 
 # 设置日志
 logging.basicConfig(
@@ -40,7 +45,25 @@ exchange = WeexClient(
 # 多档位止盈策略配置
 STRATEGY_CONFIG = {
     'symbol': 'cmt_btcusdt',
-    'monitor_interval': 4,  # 监控间隔（秒）
+    'monitor_interval': 4,  # 固定监控间隔（秒），关闭自适应轮询时使用，也是出错后的重试间隔
+    'stream_max_age': 5,  # 回放价格的最长有效秒数，过期时回退到REST查询
+    
+    # 交易所计划委托止损：把当前档位的止损价同步为交易所的平仓条件单，机器人离线时持仓仍受保护
+    'server_side_stops': True,
+    'protected_monitor_interval': 30,  # 全部持仓都有交易所止损保护时的监控间隔（秒），只用于检查升档
+    'plan_verify_interval': 300,  # 止损价没有变化时核对交易所委托的间隔（秒）
+    
+    # 自适应轮询：按到最近触发价的距离和近期ATR安排每个交易对的下一次价格检查
+    'adaptive_polling': True,
+    'min_interval': 1,  # 最短检查间隔（秒）
+    'max_interval': 30,  # 最长检查间隔（秒）
+    'atr_period': 14,  # 1分钟K线ATR周期
+    'atr_refresh': 300,  # ATR更新间隔（秒）
+    'position_refresh_interval': 20,  # 自适应轮询时的持仓同步间隔（秒）
+    
+    # 档位状态日志：重启后恢复各持仓的档位和最高盈利
+    'state_file': os.getenv('MULTI_TIER_STATE_FILE', 'multi_tier_state.jsonl'),
+    'state_flush_interval': 1.0,  # 状态批量写盘间隔（秒），升档和平仓时立即写盘
     
     # 固定止损设置
     'fixed_stop_loss': 0.05,  # 5% 强制止损
@@ -67,133 +90,85 @@ STRATEGY_CONFIG = {
     'test_mode': False  # 测试模式
 }
 
-# 全局状态变量
-class PositionTracker:
-    def __init__(self):
-        self.positions = {}        # symbol -> position_amount
-        self.highest_profits = {}  # symbol -> highest_profit_pct
-        self.current_tiers = {}    # symbol -> current_tier_level
-        self.entry_prices = {}     # symbol -> entry_price
-        self.position_sides = {}   # symbol -> side (long/short)
-        
-    def update_position(self, symbol, amount, side, entry_price):
-        """更新持仓信息"""
-        self.positions[symbol] = amount
-        self.position_sides[symbol] = side
-        self.entry_prices[symbol] = entry_price
-        
-        # 初始化最高盈利记录
-        if symbol not in self.highest_profits:
-            self.highest_profits[symbol] = 0.0
-        
-        # 初始化档位记录
-        if symbol not in self.current_tiers:
-            self.current_tiers[symbol] = -1
-    
-    def remove_position(self, symbol):
-        """移除持仓信息"""
-        self.positions.pop(symbol, None)
-        self.highest_profits.pop(symbol, None)
-        self.current_tiers.pop(symbol, None)
-        self.entry_prices.pop(symbol, None)
-        self.position_sides.pop(symbol, None)
+# 多档位止盈引擎：按价格推送检查预先计算好的触发价
+engine = TierEngine.from_config(STRATEGY_CONFIG)
+
+# 价格来自REST轮询（每monitor_interval秒一次）。
+# 回放测试：测试模式下配置WEEX_REPLAY_URL（weex_replay_server）时，改为由回放的每个价格驱动止盈止损检查；
+# 回放价格不是真实行情，非测试模式下忽略
+market_stream = MarketStream(WEEX_REPLAY_URL) if WEEX_REPLAY_URL and STRATEGY_CONFIG['test_mode'] else None
 
-# 初始化持仓跟踪器
-tracker = PositionTracker()
+# 档位状态日志
+state_journal = StateJournal(STRATEGY_CONFIG['state_file'], flush_interval=STRATEGY_CONFIG['state_flush_interval'])
+# 上次保存状态的时间和当时的升档/平仓计数
+last_state_save = {'time': 0.0, 'events': 0}
+
+# 交易对 -> (每分钟相对波动, 更新时间)
+volatility_cache = {}
+
+# 交易所计划委托止损同步：只在升档或持仓变化时修改交易所的委托
+plan_sync = None
+if STRATEGY_CONFIG['server_side_stops'] and not STRATEGY_CONFIG['test_mode']:
+    plan_sync = PlanOrderSync(exchange, verify_interval=STRATEGY_CONFIG['plan_verify_interval'])
+
+def get_market_prices(symbols):
+    """获取多个交易对的最新价：回放测试时优先使用回放价格，其余交易对合并为一次行情请求"""
+    prices = {}
+    if market_stream is not None:
+        for symbol in symbols:
+            price = market_stream.latest_price(symbol, max_age=STRATEGY_CONFIG['stream_max_age'])
+            if price is not None:
+                prices[symbol] = price
+    missing = [symbol for symbol in symbols if symbol not in prices]
+    if missing:
+        try:
+            for symbol, ticker in exchange.fetch_tickers(missing).items():
+                if ticker['last'] is not None:
+                    prices[symbol] = ticker['last']
+        except Exception as e:
+            logging.error(f"获取市场价格失败 {missing}: {e}")
+    return prices
 
 def get_current_market_price(symbol):
     """获取当前市场价格"""
-    try:
-        # 获取最新的OHLCV数据
-        ohlcv = exchange.fetch_ohlcv(symbol, '1m', limit=1)
-        if ohlcv and len(ohlcv) > 0:
-            return ohlcv[0][4]  # close价格
-        return None
-    except Exception as e:
-        logging.error(f"获取市场价格失败 {symbol}: {e}")
+    return get_market_prices([symbol]).get(symbol)
+
+def get_snapshot():
+    """获取持仓快照：全部持仓和持仓交易对的最新价（一次持仓请求加一次行情请求），失败时返回None"""
+    snapshot = exchange.fetch_snapshot([STRATEGY_CONFIG['symbol']])
+    if snapshot['error']:
+        logging.error(f"获取持仓失败: {snapshot['error']}")
         return None
+    return snapshot
 
-def get_current_positions():
-    """获取当前持仓"""
-    try:
-        positions = exchange.fetch_positions(STRATEGY_CONFIG['symbol'])
-        active_positions = []
-        
-        for pos in positions:
-            if pos['symbol'] == STRATEGY_CONFIG['symbol'] and pos['size'] > 0:
-                active_positions.append({
-                    'symbol': pos['symbol'],
-                    'side': pos['side'],  # 'long' or 'short'
-                    'size': pos['size'],
-                    'entry_price': pos['entryPrice'],
-                    'current_price': get_current_market_price(pos['symbol']),
-                    'unrealized_pnl': pos['unrealizedPnl'],
-                    'leverage': pos['leverage']
-                })
-        
-        return active_positions
-    except Exception as e:
-        logging.error(f"获取持仓失败: {e}")
-        return []
+def get_current_positions(snapshot=None):
+    """获取当前持仓，失败时返回None"""
+    if snapshot is None:
+        snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    active_positions = []
+    
+    for pos in snapshot['positions']:
+        active_positions.append({
+            'symbol': pos['symbol'],
+            'side': pos['side'],  # 'long' or 'short'
+            'size': pos['size'],
+            'entry_price': pos['entryPrice'],
+            'unrealized_pnl': pos['unrealizedPnl'],
+            'leverage': pos['leverage']
+        })
+    
+    return active_positions
 
 def calculate_profit_percentage(position, current_price):
     """计算盈利百分比"""
-    if position['side'] == 'long':
-        return (current_price - position['entry_price']) / position['entry_price']
-    else:  # short
-        return (position['entry_price'] - current_price) / position['entry_price']
+    return profit_percentage(position['side'], position['entry_price'], current_price)
 
 def calculate_dynamic_stop_loss(position, current_price, tier_level):
     """计算动态止损价格"""
-    entry_price = position['entry_price']
-    stop_loss_ratio = STRATEGY_CONFIG['tiers'][tier_level]['stop_loss_ratio']
-    
-    if position['side'] == 'long':
-        # 多仓：止损价格 = 入场价格 * (1 - 止损比例)
-        return entry_price * (1 - stop_loss_ratio)
-    else:  # short
-        # 空仓：止损价格 = 入场价格 * (1 + 止损比例)
-        return entry_price * (1 + stop_loss_ratio)
-
-def should_close_position(position, current_price):
-    """判断是否应该平仓"""
-    profit_pct = calculate_profit_percentage(position, current_price)
-    symbol = position['symbol']
-    
-    # 检查固定止损
-    if profit_pct <= -STRATEGY_CONFIG['fixed_stop_loss']:
-        return True, f"固定止损触发: {profit_pct:.2%}"
-    
-    # 更新最高盈利记录
-    if profit_pct > tracker.highest_profits[symbol]:
-        tracker.highest_profits[symbol] = profit_pct
-    
-    # 检查档位止损
-    current_tier = tracker.current_tiers[symbol]
-    
-    for tier_level in range(len(STRATEGY_CONFIG['tiers']) - 1, -1, -1):
-        tier_config = STRATEGY_CONFIG['tiers'][tier_level]
-        trigger_profit = tier_config['trigger_profit']
-        
-        # 如果达到触发条件
-        if tracker.highest_profits[symbol] >= trigger_profit:
-            # 如果档位升级或者当前档位匹配
-            if tier_level > current_tier or current_tier == -1:
-                # 更新当前档位
-                tracker.current_tiers[symbol] = tier_level
-                
-                # 计算新的止损价格
-                stop_loss_price = calculate_dynamic_stop_loss(position, current_price, tier_level)
-                
-                # 检查是否触发止损
-                if position['side'] == 'long' and current_price <= stop_loss_price:
-                    return True, f"{tier_config['description']}止损触发: {stop_loss_price:.2f}"
-                elif position['side'] == 'short' and current_price >= stop_loss_price:
-                    return True, f"{tier_config['description']}止损触发: {stop_loss_price:.2f}"
-                
-                break
-    
-    return False, ""
+    return tier_stop_price(position['side'], position['entry_price'],
+                           STRATEGY_CONFIG['tiers'][tier_level]['stop_loss_ratio'])
 
 def execute_close_order(position, reason):
     """执行平仓操作"""
@@ -216,78 +191,147 @@ def execute_close_order(position, reason):
         logging.info(f"平仓成功: {reason}")
         logging.info(f"平仓结果: {result}")
         
-        # 移除持仓跟踪
-        tracker.remove_position(position['symbol'])
-        
         return True
         
     except Exception as e:
         logging.error(f"平仓失败: {e}")
         return False
 
+def log_position_status(position, current_price):
+    """记录持仓状态"""
+    logging.info(f"持仓监控 {position.symbol}:")
+    logging.info(f"  方向: {position.side}")
+    logging.info(f"  数量: {position.size}")
+    logging.info(f"  入场价: {position.entry_price:.2f}")
+    logging.info(f"  当前价: {current_price:.2f}")
+    logging.info(f"  盈亏: {profit_percentage(position.side, position.entry_price, current_price):.2%}")
+    logging.info(f"  最高盈利: {engine.highest_profit(position):.2%}")
+    logging.info(f"  当前档位: {position.tier}")
+    if position.tier >= 0:
+        logging.info(f"  当前档位: {STRATEGY_CONFIG['tiers'][position.tier]['description']}")
+    logging.info(f"  止损价格: {position.stop_price:.2f}")
+    if plan_sync is not None:
+        logging.info(f"  交易所止损委托: {'已同步' if plan_sync.is_protected(position) else '未同步'}")
+
+def process_price(symbol, price):
+    """把价格交给止盈引擎，平掉触发止损的持仓"""
+    for position, reason in engine.on_tick(symbol, price):
+        logging.warning(f"执行平仓: {reason}")
+        if execute_close_order(position.as_dict(), reason):
+            engine.remove_position(position.key)
+
+def sync_plan_orders():
+    """把持仓当前的止损价同步到交易所计划委托（等待平仓确认的持仓保留委托）"""
+    if plan_sync is not None:
+        plan_sync.sync(engine.positions() + engine.closing())
+
+def save_state():
+    """保存档位状态：升档或平仓后立即写盘，否则按state_flush_interval批量写盘（不在每个价格上做磁盘IO）"""
+    events = engine.stats['tier_ups'] + engine.stats['closes']
+    force = events != last_state_save['events']
+    if not force and time.monotonic() - last_state_save['time'] < STRATEGY_CONFIG['state_flush_interval']:
+        return
+    state_journal.update(engine.state(), force=force)
+    last_state_save['time'] = time.monotonic()
+    last_state_save['events'] = events
+
+def current_monitor_interval():
+    """监控间隔：全部持仓都有交易所止损保护时只需低频检查升档"""
+    positions = engine.positions()
+    if plan_sync is not None and positions and all(plan_sync.is_protected(p) for p in positions):
+        return STRATEGY_CONFIG['protected_monitor_interval']
+    return STRATEGY_CONFIG['monitor_interval']
+
+def get_volatility(symbol):
+    """近期每根1分钟K线的相对波动（ATR / 收盘价），每atr_refresh秒更新一次，失败时返回上次的值"""
+    cached = volatility_cache.get(symbol)
+    if cached is not None and time.monotonic() - cached[1] < STRATEGY_CONFIG['atr_refresh']:
+        return cached[0]
+    try:
+        ohlcv = exchange.fetch_ohlcv(symbol, '1m', limit=STRATEGY_CONFIG['atr_period'] + 1)
+        if ohlcv:
+            atr = average_true_range([c[2] for c in ohlcv], [c[3] for c in ohlcv], [c[4] for c in ohlcv],
+                                     STRATEGY_CONFIG['atr_period'])[-1]
+            volatility_cache[symbol] = (atr / ohlcv[-1][4], time.monotonic())
+    except Exception as e:
+        logging.error(f"获取ATR失败 {symbol}: {e}")
+    cached = volatility_cache.get(symbol)
+    return cached[0] if cached is not None else None
+
+def check_interval(symbol, price):
+    """下一次检查该交易对价格的间隔：离最近的触发价越近、波动越大，检查越频繁"""
+    if not STRATEGY_CONFIG['adaptive_polling']:
+        return current_monitor_interval()
+    # 止损已由交易所委托执行时只需关注升档价
+    positions = engine.positions(symbol)
+    include_stops = plan_sync is None or not all(plan_sync.is_protected(p) for p in positions)
+    distance = engine.trigger_distance(symbol, price, include_stops=include_stops)
+    return next_check_interval(distance, get_volatility(symbol), STRATEGY_CONFIG['min_interval'],
+                               STRATEGY_CONFIG['max_interval'])
+
+def position_refresh_interval():
+    """持仓同步间隔"""
+    if STRATEGY_CONFIG['adaptive_polling']:
+        return STRATEGY_CONFIG['position_refresh_interval']
+    return current_monitor_interval()
+
+def wait_for_next_check(deadline):
+    """等待到deadline（time.monotonic()）；回放测试时收到新价格立即返回"""
+    timeout = max(0.0, deadline - time.monotonic())
+    if market_stream is not None:
+        market_stream.wait_for_update(STRATEGY_CONFIG['symbol'], timeout=timeout)
+    else:
+        time.sleep(timeout)
+
 def monitor_positions():
     """监控持仓并执行止盈止损"""
     logging.info("开始监控持仓...")
     
+    next_refresh = 0.0
+    # 交易对 -> 下一次检查价格的时间
+    next_check = {}
+    
     while True:
         try:
-            # 获取当前持仓
-            current_positions = get_current_positions()
-            
-            # 同步持仓跟踪器中的持仓信息
-            current_symbols = {pos['symbol'] for pos in current_positions}
-            tracked_symbols = set(tracker.positions.keys())
+            # 持仓按同步间隔刷新；之间只检查到期的交易对（回放测试时每个回放价格都检查）
+            refreshed = time.monotonic() >= next_refresh
+            prices = {}
+            if refreshed:
+                # 获取持仓快照并同步到引擎（新增、更新、移除已平仓的持仓），快照中已包含各交易对的最新价
+                snapshot = get_snapshot()
+                if snapshot is not None:
+                    engine.sync_positions(get_current_positions(snapshot))
+                    prices = snapshot['prices']
+                next_refresh = time.monotonic() + position_refresh_interval()
             
-            # 添加新持仓
-            for position in current_positions:
-                tracker.update_position(
-                    position['symbol'],
-                    position['size'],
-                    position['side'],
-                    position['entry_price']
-                )
-            
-            # 移除已平仓的记录
-            for symbol in tracked_symbols - current_symbols:
-                tracker.remove_position(symbol)
-            
-            # 检查每个持仓
-            for position in current_positions:
-                symbol = position['symbol']
-                current_price = position['current_price']
-                
+            # 到期的交易对合并为一次行情请求，由引擎检查该交易对的全部持仓
+            symbols = engine.symbols()
+            due = [symbol for symbol in symbols
+                   if market_stream is not None or refreshed or time.monotonic() >= next_check.get(symbol, 0.0)]
+            missing = [symbol for symbol in due if symbol not in prices]
+            if missing:
+                prices.update(get_market_prices(missing))
+            for symbol in due:
+                current_price = prices.get(symbol)
                 if current_price is None:
+                    next_check[symbol] = time.monotonic() + STRATEGY_CONFIG['monitor_interval']
                     continue
                 
-                profit_pct = calculate_profit_percentage(position, current_price)
-                current_tier = tracker.current_tiers[symbol]
-                
-                # 记录状态
-                logging.info(f"持仓监控 {symbol}:")
-                logging.info(f"  方向: {position['side']}")
-                logging.info(f"  数量: {position['size']}")
-                logging.info(f"  入场价: {position['entry_price']:.2f}")
-                logging.info(f"  当前价: {current_price:.2f}")
-                logging.info(f"  盈亏: {profit_pct:.2%}")
-                logging.info(f"  最高盈利: {tracker.highest_profits[symbol]:.2%}")
-                logging.info(f"  当前档位: {current_tier}")
+                if refreshed:
+                    for position in engine.positions(symbol):
+                        log_position_status(position, current_price)
                 
-                # 检查是否需要平仓
-                should_close, close_reason = should_close_position(position, current_price)
-                
-                if should_close:
-                    logging.warning(f"执行平仓: {close_reason}")
-                    execute_close_order(position, close_reason)
-                else:
-                    # 显示当前档位信息
-                    if current_tier >= 0:
-                        tier_config = STRATEGY_CONFIG['tiers'][current_tier]
-                        stop_loss_price = calculate_dynamic_stop_loss(position, current_price, current_tier)
-                        logging.info(f"  当前档位: {tier_config['description']}")
-                        logging.info(f"  止损价格: {stop_loss_price:.2f}")
+                process_price(symbol, current_price)
+                next_check[symbol] = time.monotonic() + check_interval(symbol, current_price)
             
-            logging.info(f"监控完成，等待 {STRATEGY_CONFIG['monitor_interval']} 秒后继续...")
-            time.sleep(STRATEGY_CONFIG['monitor_interval'])
+            # 止损价变化（升档、持仓变化）时同步交易所计划委托，没有变化时不发送请求
+            sync_plan_orders()
+            save_state()
+            
+            deadline = min([next_refresh] + [next_check[symbol] for symbol in symbols if symbol in next_check])
+            if refreshed:
+                logging.info(f"监控完成，{max(0.0, deadline - time.monotonic()):.1f} 秒后继续...")
+            wait_for_next_check(deadline)
             
         except KeyboardInterrupt:
             logging.info("用户中断监控")
@@ -305,7 +349,11 @@ def main():
     # 显示策略配置
     logging.info("策略配置:")
     logging.info(f"  交易对: {STRATEGY_CONFIG['symbol']}")
-    logging.info(f"  监控间隔: {STRATEGY_CONFIG['monitor_interval']} 秒")
+    if STRATEGY_CONFIG['adaptive_polling']:
+        logging.info(f"  监控间隔: 自适应 {STRATEGY_CONFIG['min_interval']}-{STRATEGY_CONFIG['max_interval']} 秒"
+                     f"（持仓同步 {STRATEGY_CONFIG['position_refresh_interval']} 秒）")
+    else:
+        logging.info(f"  监控间隔: {STRATEGY_CONFIG['monitor_interval']} 秒")
     logging.info(f"  固定止损: {STRATEGY_CONFIG['fixed_stop_loss']:.1%}")
     
     for tier_level, config in STRATEGY_CONFIG['tiers'].items():
@@ -313,6 +361,9 @@ def main():
         logging.info(f"    触发盈利: {config['trigger_profit']:.1%}")
         logging.info(f"    止损比例: {config['stop_loss_ratio']:.1%}")
     
+    if plan_sync is not None:
+        logging.info(f"  交易所止损委托: 已启用（全部持仓受保护时监控间隔 {STRATEGY_CONFIG['protected_monitor_interval']} 秒）")
+    
     if STRATEGY_CONFIG['test_mode']:
         logging.warning("当前为测试模式，不会真实执行交易")
     
@@ -324,8 +375,26 @@ def main():
         logging.error(f"交易所连接失败: {e}")
         return
     
-    # 开始监控
-    monitor_positions()
+    # 订阅回放行情
+    if market_stream is not None:
+        market_stream.subscribe(TICKER_CHANNEL, STRATEGY_CONFIG['symbol'])
+        market_stream.start()
+        logging.info(f"  回放行情: {WEEX_REPLAY_URL}（每个回放价格都检查止盈止损）")
+    elif WEEX_REPLAY_URL:
+        logging.warning("  已配置WEEX_REPLAY_URL，但回放行情只在测试模式下使用，当前使用REST轮询")
+    
+    # 恢复重启前的档位状态
+    engine.restore(state_journal.load())
+    
+    # 开始监控，退出时保存状态并释放连接池
+    try:
+        monitor_positions()
+    finally:
+        state_journal.update(engine.state(), force=True)
+        state_journal.close()
+        if market_stream is not None:
+            market_stream.stop()
+        exchange.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""
+多周期K线与指标
+由一路1分钟K线在内存中增量聚合出5m/15m/1h/4h等更高周期的K线，并用IncrementalIndicators增量计算各周期指标，
+不需要为每个周期单独请求K线，也不需要对整个序列重新计算
+
+用法:
+    pipeline = MultiTimeframePipeline(['5m', '15m', '1h', '4h'])
+    pipeline.update_many(ohlcv_1m)
+    print(generate_multi_timeframe_text(pipeline))
+"""
+
+from collections import deque
+
+from indicators import IncrementalIndicators
+from weex_sdk import timeframe_to_ms
+
+# 默认聚合的周期
+DEFAULT_TIMEFRAMES = ('5m', '15m', '1h', '4h')
+
+
+class BarResampler:
+    """
+    把基础周期K线聚合成更高周期K线（按UTC对齐，如4h的K线从0/4/8/...点开始）
+
+    未收盘的基础K线可以重复传入（同一时间戳），只替换该K线对聚合结果的贡献，每次更新都是O(1)
+    """
+
+    def __init__(self, timeframe, base_timeframe='1m'):
+        """
+        Args:
+            timeframe (str): 目标周期，如"1h"
+            base_timeframe (str): 输入K线的周期，目标周期必须是它的整数倍
+
+        Raises:
+            ValueError: 目标周期不是基础周期的整数倍
+        """
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_to_ms(timeframe)
+        base_ms = timeframe_to_ms(base_timeframe)
+        if self.tf_ms < base_ms or self.tf_ms % base_ms:
+            raise ValueError(f"周期{timeframe}不是{base_timeframe}的整数倍")
+        self.bar_timestamp = None
+        # 当前K线中已经被后续基础K线取代的部分：[开盘价, 最高价, 最低价, 成交量]
+        self._closed = None
+        # 当前K线中最新的一根基础K线，可能还会被更新
+        self._last = None
+
+    def update(self, candle):
+        """
+        加入一根基础K线
+
+        Args:
+            candle (list): [时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
+
+        Returns:
+            list: 该基础K线所属的聚合K线 [时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
+
+        Raises:
+            ValueError: K线时间早于已处理的最新K线
+        """
+        ts = int(candle[0])
+        candle = [ts, float(candle[1]), float(candle[2]), float(candle[3]), float(candle[4]), float(candle[5])]
+        bar_timestamp = ts - ts % self.tf_ms
+
+        if self._last is not None and ts < self._last[0]:
+            raise ValueError(f"K线时间戳{ts}早于最新K线{self._last[0]}")
+        if bar_timestamp != self.bar_timestamp:
+            # 新的聚合K线
+            self.bar_timestamp = bar_timestamp
+            self._closed = None
+        elif ts != self._last[0]:
+            # 上一根基础K线已收盘，并入当前K线的固定部分
+            last = self._last
+            if self._closed is None:
+                self._closed = [last[1], last[2], last[3], last[5]]
+            else:
+                closed = self._closed
+                closed[1] = max(closed[1], last[2])
+                closed[2] = min(closed[2], last[3])
+                closed[3] += last[5]
+        self._last = candle
+        return self.bar()
+
+    def bar(self):
+        """
+        当前（最新）聚合K线，还没有数据时返回None
+        """
+        last = self._last
+        if last is None:
+            return None
+        closed = self._closed
+        if closed is None:
+            return [self.bar_timestamp, last[1], last[2], last[3], last[4], last[5]]
+        return [self.bar_timestamp, closed[0], max(closed[1], last[2]), min(closed[2], last[3]), last[4],
+                closed[3] + last[5]]
+
+
+class MultiTimeframePipeline:
+    """
+    多周期指标流水线：每根基础K线依次更新各周期的聚合K线和指标
+    """
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, base_timeframe='1m', history=100):
+        """
+        Args:
+            timeframes (iterable): 需要聚合的周期
+            base_timeframe (str): 输入K线的周期
+            history (int): 每个周期在内存中保留的最近K线条数
+        """
+        self.base_timeframe = base_timeframe
+        self.timeframes = list(timeframes)
+        self._resamplers = {tf: BarResampler(tf, base_timeframe) for tf in self.timeframes}
+        self._indicators = {tf: IncrementalIndicators() for tf in self.timeframes}
+        self._bars = {tf: deque(maxlen=history) for tf in self.timeframes}
+        self.last_timestamp = None
+        self.count = 0
+
+    @classmethod
+    def from_ohlcv(cls, ohlcv, timeframes=DEFAULT_TIMEFRAMES, base_timeframe='1m', history=100):
+        """
+        用历史基础K线初始化流水线
+        """
+        pipeline = cls(timeframes, base_timeframe, history)
+        pipeline.update_many(ohlcv)
+        return pipeline
+
+    def update(self, candle):
+        """
+        加入一根基础K线（同一时间戳再次传入时替换上一次的值）
+
+        Args:
+            candle (list): [时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
+
+        Returns:
+            dict: 周期 -> 该周期当前K线的指标值
+
+        Raises:
+            ValueError: K线时间早于已处理的最新K线
+        """
+        ts = int(candle[0])
+        if self.last_timestamp is not None and ts < self.last_timestamp:
+            raise ValueError(f"K线时间戳{ts}早于最新K线{self.last_timestamp}")
+        if ts != self.last_timestamp:
+            self.count += 1
+        self.last_timestamp = ts
+
+        result = {}
+        for tf in self.timeframes:
+            bar = self._resamplers[tf].update(candle)
+            bars = self._bars[tf]
+            if bars and bars[-1][0] == bar[0]:
+                bars[-1] = bar
+            else:
+                bars.append(bar)
+            result[tf] = self._indicators[tf].update(bar)
+        return result
+
+    def update_many(self, ohlcv):
+        """
+        批量加入基础K线，早于已处理最新K线的部分会被跳过，
+        因此可以直接传入与上次有重叠的最新N根K线
+
+        Returns:
+            int: 实际处理的K线条数
+        """
+        processed = 0
+        for candle in ohlcv:
+            if self.last_timestamp is not None and candle[0] < self.last_timestamp:
+                continue
+            self.update(candle)
+            processed += 1
+        return processed
+
+    def bars(self, timeframe, limit=None):
+        """
+        某个周期最近的聚合K线（最后一根可能未收盘）
+
+        Returns:
+            list: [[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量], ...]，按时间升序
+        """
+        bars = list(self._bars[timeframe])
+        return bars[-limit:] if limit else bars
+
+    def latest(self, timeframe):
+        """
+        某个周期当前K线向前填充后的指标值
+        """
+        return self._indicators[timeframe].latest()
+
+    def bar_count(self, timeframe):
+        """
+        某个周期已聚合的K线数量
+        """
+        return self._indicators[timeframe].count
+
+    def trend(self, timeframe):
+        """
+        某个周期的趋势判断，口径与get_market_trend一致
+
+        Returns:
+            dict: short_term/medium_term/macd/overall/rsi_level，还没有数据时返回空字典
+        """
+        bar = self._resamplers[timeframe].bar()
+        if bar is None:
+            return {}
+        values = self.latest(timeframe)
+        price = bar[4]
+        trend_short = "上涨" if price > values['sma_20'] else "下跌"
+        trend_medium = "上涨" if price > values['sma_50'] else "下跌"
+        macd_trend = "bullish" if values['macd'] > values['macd_signal'] else "bearish"
+        if trend_short == "上涨" and trend_medium == "上涨":
+            overall_trend = "强势上涨"
+        elif trend_short == "下跌" and trend_medium == "下跌":
+            overall_trend = "强势下跌"
+        else:
+            overall_trend = "震荡整理"
+        return {
+            'short_term': trend_short,
+            'medium_term': trend_medium,
+            'macd': macd_trend,
+            'overall': overall_trend,
+            'rsi_level': values['rsi']
+        }
+
+    def context(self):
+        """
+        各周期的最新K线、指标和趋势，供提示词和日志使用
+
+        Returns:
+            dict: 周期 -> {'bar', 'bars', 'indicators', 'trend'}
+        """
+        return {
+            tf: {
+                'bar': self._resamplers[tf].bar(),
+                'bars': self.bar_count(tf),
+                'indicators': self.latest(tf),
+                'trend': self.trend(tf),
+            }
+            for tf in self.timeframes if self._resamplers[tf].bar() is not None
+        }
+
+
+def generate_multi_timeframe_text(pipeline):
+    """生成多周期趋势文本"""
+    context = pipeline.context()
+    if not context:
+        return "【多周期趋势】数据暂不可用"
+
+    lines = ["【多周期趋势】"]
+    for tf, data in context.items():
+        values = data['indicators']
+        trend = data['trend']
+        rsi, bb_position = values['rsi'], values['bb_position']
+        # 周期K线不足时指标为NaN
+        rsi_text = f"{rsi:.1f}" if rsi == rsi else "N/A"
+        bb_text = f"{bb_position:.2%}" if bb_position == bb_position else "N/A"
+        lines.append(
+            f"- {tf}: 收盘{data['bar'][4]:.2f} | 整体{trend['overall']} (短期{trend['short_term']}/中期{trend['medium_term']}) "
+            f"| MACD {trend['macd']} | RSI {rsi_text} | 布林带位置 {bb_text} | 样本{data['bars']}根"
+        )
+    return "\n    ".join(lines)
@@ -0,0 +1,224 @@
+"""
+订单和持仓记录的流式导出
+按块把记录写入CSV、JSON Lines、JSON数组，或安装了pyarrow时写入Parquet / Arrow IPC，
+每次只在内存中保留一块记录，可以直接接SDK的分页迭代器导出任意长的历史
+
+用法:
+    count = export_records(client.iter_order_history("cmt_btcusdt"), "plan_orders.csv")
+    export_records(client.iter_history_orders(), "orders.parquet", chunk_size=10000)
+    export_records(client.fetch_positions(), "positions.jsonl")
+"""
+
+import csv
+import itertools
+import logging
+import os
+from collections.abc import Mapping
+
+from weex_sdk import dumps_json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 未安装pyarrow时不支持Parquet/Arrow格式
+    pa = pq = None
+
+logger = logging.getLogger("order_export")
+
+# 文件扩展名 -> 导出格式
+EXPORT_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".json": "json",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+# 每块记录数
+DEFAULT_CHUNK_SIZE = 5000
+
+# 需要固定列的表格格式
+TABULAR_FORMATS = ("csv", "parquet", "arrow")
+
+
+def export_format(path):
+    """
+    根据文件扩展名判断导出格式
+
+    Returns:
+        str: csv、jsonl、json、parquet或arrow
+
+    Raises:
+        ValueError: 不支持的扩展名
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {ext}，支持: {', '.join(sorted(EXPORT_FORMATS))}")
+    return EXPORT_FORMATS[ext]
+
+
+class _CsvWriter:
+    def __init__(self, path, columns):
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self.columns = columns
+        if columns is not None:
+            self._writer.writerow(columns)
+
+    def write(self, rows):
+        if self.columns is None:
+            # 未指定列时以第一条记录的字段为表头
+            self.columns = list(rows[0])
+            self._writer.writerow(self.columns)
+        columns = self.columns
+        self._writer.writerows([row.get(column, "") for column in columns] for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonLinesWriter:
+    def __init__(self, path, columns):
+        self._file = open(path, "wb")
+        self.columns = columns
+
+    def _encode(self, row):
+        if self.columns is not None:
+            row = {column: row.get(column) for column in self.columns}
+        return dumps_json(row)
+
+    def write(self, rows):
+        # 逐行写入带缓冲的文件，不在内存中拼接整块（orjson返回的bytes有预留容量，整块保留会占用数倍内存）
+        write = self._file.write
+        for row in rows:
+            write(self._encode(row))
+            write(b"\n")
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonArrayWriter(_JsonLinesWriter):
+    def __init__(self, path, columns):
+        super().__init__(path, columns)
+        self._file.write(b"[")
+        self._first = True
+
+    def write(self, rows):
+        write = self._file.write
+        for row in rows:
+            if not self._first:
+                write(b",\n")
+            self._first = False
+            write(self._encode(row))
+
+    def close(self):
+        self._file.write(b"]\n")
+        self._file.close()
+
+
+class _ArrowWriter:
+    def __init__(self, path, columns, parquet):
+        if pa is None:
+            raise ImportError("导出Parquet/Arrow格式需要安装pyarrow: pip install pyarrow")
+        self.path = path
+        self.columns = columns
+        self.parquet = parquet
+        self._schema = None
+        self._writer = None
+
+    def write(self, rows):
+        if self.columns is not None:
+            rows = [{column: row.get(column) for column in self.columns} for row in rows]
+        # 第一块确定列类型，之后的块按同一schema转换，缺少的字段为null
+        table = pa.Table.from_pylist(rows, schema=self._schema)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.parquet:
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _open_writer(path, fmt, columns):
+    if fmt == "csv":
+        return _CsvWriter(path, columns)
+    if fmt == "jsonl":
+        return _JsonLinesWriter(path, columns)
+    if fmt == "json":
+        return _JsonArrayWriter(path, columns)
+    if fmt in ("parquet", "arrow"):
+        return _ArrowWriter(path, columns, parquet=fmt == "parquet")
+    raise ValueError(f"不支持的导出格式: {fmt}")
+
+
+def _row(record, exclude):
+    # 紧凑记录（Mapping）和普通字典都转换为不含排除字段的字典
+    if not isinstance(record, Mapping):
+        raise TypeError(f"导出的记录必须是字典，收到 {type(record).__name__}")
+    return {key: value for key, value in record.items() if key not in exclude}
+
+
+def _default_columns(record, exclude):
+    """
+    未指定列时的表头：SDK记录使用该类型的固定字段（某条记录缺少的字段留空，而不是以第一条记录为准丢掉整列），
+    字段之外的键和普通字典按第一条记录的键
+    """
+    keys = [key for key in record.keys() if key not in exclude]
+    field_names = getattr(type(record), "field_names", None)
+    if field_names is None:
+        return keys
+    columns = [column for column in field_names() if column not in exclude]
+    known = set(columns)
+    return columns + [key for key in keys if key not in known]
+
+
+def export_records(records, path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, exclude=("info",)):
+    """
+    把记录按块流式写入文件
+
+    Args:
+        records (iterable): 订单或持仓记录（字典或SDK的紧凑记录），可以是分页迭代器
+        path (str): 输出文件路径
+        fmt (str, optional): csv、jsonl、json、parquet或arrow，默认按扩展名判断
+        chunk_size (int): 每块记录数，内存中最多保留一块
+        columns (list, optional): 导出的列及顺序；表格格式默认为第一条记录所属类型的全部字段（普通字典取第一条记录的键），
+            JSON格式默认逐条写出每条记录自己的字段
+        exclude (tuple): 不导出的字段，默认跳过原始数据info
+
+    Returns:
+        int: 导出的记录数
+
+    Raises:
+        ImportError: 导出Parquet/Arrow但没有安装pyarrow
+    """
+    fmt = fmt or export_format(path)
+    records = iter(records)
+    exclude = frozenset(exclude)
+    if columns is None and fmt in TABULAR_FORMATS:
+        # 表格格式的列在第一块确定，之后不能再加列；JSON格式逐条原样写出，不需要固定列
+        first = next(records, None)
+        if first is not None:
+            columns = _default_columns(first, exclude)
+            records = itertools.chain((first,), records)
+    writer = _open_writer(path, fmt, list(columns) if columns is not None else None)
+    count = 0
+    try:
+        while True:
+            chunk = [_row(record, exclude) for record in itertools.islice(records, chunk_size)]
+            if not chunk:
+                break
+            writer.write(chunk)
+            count += len(chunk)
+    finally:
+        writer.close()
+    logger.info("已导出%s条记录到%s（%s）", count, path, fmt)
+    return count
@@ -0,0 +1,484 @@
+"""
+本地订单账本
+把历史订单、历史计划订单和成交明细保存在SQLite文件中，每类数据按创建时间记录高水位，
+之后每次同步只从交易所拉取高水位之后的新记录（同一创建时间的记录按ID覆盖写入，不会重复）；
+按交易对、时间、状态建立索引，每日盈亏、按信号统计胜率等报表直接在本地查询
+
+用法:
+    ledger = OrderLedger()
+    ledger.sync(client, symbols=["cmt_btcusdt"])
+    for row in ledger.daily_pnl(since=...):
+        ...
+    stats = ledger.win_rate_by_signal()
+
+client需要提供iter_history_orders、iter_order_history、iter_fills方法（WeexClient）
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("order_ledger")
+
+# 账本数据库文件，默认放在当前目录
+WEEX_LEDGER_DB = os.getenv('WEEX_LEDGER_DB') or "orders.db"
+
+# 不会再变化的订单状态，其余状态的订单在下次同步时重新拉取
+FINAL_STATUSES = ("filled", "canceled")
+
+# 每批写入的记录数
+BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    create_time INTEGER NOT NULL,
+    status TEXT,
+    type TEXT,
+    order_type TEXT,
+    price REAL,
+    price_avg REAL,
+    size REAL,
+    filled_qty REAL,
+    fee REAL,
+    pnl REAL,
+    client_oid TEXT,
+    signal TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_symbol_time ON orders (symbol, create_time);
+CREATE INDEX IF NOT EXISTS orders_time ON orders (create_time);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status, create_time);
+CREATE INDEX IF NOT EXISTS orders_signal ON orders (signal, create_time);
+
+CREATE TABLE IF NOT EXISTS plan_orders (
+    order_id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    create_time INTEGER NOT NULL,
+    update_time INTEGER,
+    status INTEGER,
+    order_type INTEGER,
+    price REAL,
+    volume REAL,
+    trigger_price REAL
+);
+CREATE INDEX IF NOT EXISTS plan_orders_symbol_time ON plan_orders (symbol, create_time);
+CREATE INDEX IF NOT EXISTS plan_orders_status ON plan_orders (status, create_time);
+
+CREATE TABLE IF NOT EXISTS fills (
+    trade_id TEXT PRIMARY KEY,
+    order_id TEXT,
+    symbol TEXT NOT NULL,
+    create_time INTEGER NOT NULL,
+    side TEXT,
+    direction TEXT,
+    size REAL,
+    value REAL,
+    fee REAL,
+    pnl REAL
+);
+CREATE INDEX IF NOT EXISTS fills_symbol_time ON fills (symbol, create_time);
+CREATE INDEX IF NOT EXISTS fills_time ON fills (create_time);
+CREATE INDEX IF NOT EXISTS fills_order ON fills (order_id);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    stream TEXT PRIMARY KEY,
+    high_water INTEGER NOT NULL,
+    last_id TEXT,
+    synced_at INTEGER NOT NULL
+);
+"""
+
+
+def signal_from_client_oid(client_oid):
+    """
+    从client_oid提取信号（策略）标签：new_client_oid(prefix)生成的ID以"前缀_"开头，取第一个"_"之前的部分
+
+    Returns:
+        str: 信号标签，没有前缀时返回None
+    """
+    if not client_oid or "_" not in client_oid:
+        return None
+    return client_oid.split("_", 1)[0] or None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _batches(records, size=BATCH_SIZE):
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+class OrderLedger:
+    """
+    基于SQLite的订单账本，多个进程可共享同一个数据库文件（WAL模式）
+    """
+
+    def __init__(self, path=None, signal_of=signal_from_client_oid):
+        """
+        Args:
+            path (str, optional): 数据库文件路径，默认读取WEEX_LEDGER_DB环境变量，否则为当前目录下的orders.db；
+                传入":memory:"使用内存数据库
+            signal_of (callable): 从client_oid得到信号标签的函数
+        """
+        self.path = path or WEEX_LEDGER_DB
+        self.signal_of = signal_of
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        # 同步统计
+        self.stats = {"syncs": 0, "orders": 0, "plan_orders": 0, "fills": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, query, args=()):
+        with self._lock:
+            return self._conn.execute(query, args).fetchall()
+
+    # ---- 写入 ----
+
+    def upsert_orders(self, orders):
+        """
+        写入历史订单（get_history_orders返回的格式），已存在的订单按order_id覆盖
+
+        Returns:
+            int: 写入的条数
+        """
+        rows = []
+        for order in orders:
+            client_oid = order.get("client_oid") or None
+            rows.append((
+                str(order.get("order_id")), order.get("symbol", ""), _int(order.get("createTime")) or 0,
+                order.get("status"), order.get("type"), order.get("order_type"),
+                _float(order.get("price")), _float(order.get("price_avg")), _float(order.get("size")),
+                _float(order.get("filled_qty")), _float(order.get("fee")), _float(order.get("totalProfits")),
+                client_oid, self.signal_of(client_oid)
+            ))
+        if not rows:
+            return 0
+        with self._lock:
+            # 手动标记的信号不被覆盖
+            self._conn.executemany("""
+                INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(order_id) DO UPDATE SET
+                    symbol = excluded.symbol, create_time = excluded.create_time, status = excluded.status,
+                    type = excluded.type, order_type = excluded.order_type, price = excluded.price,
+                    price_avg = excluded.price_avg, size = excluded.size, filled_qty = excluded.filled_qty,
+                    fee = excluded.fee, pnl = excluded.pnl, client_oid = excluded.client_oid,
+                    signal = COALESCE(orders.signal, excluded.signal)
+            """, rows)
+            self._conn.commit()
+        return len(rows)
+
+    def upsert_plan_orders(self, orders):
+        """
+        写入历史计划订单（get_order_history返回的格式），已存在的订单按order_id覆盖
+
+        Returns:
+            int: 写入的条数
+        """
+        rows = [(str(order.get("order_id")), order.get("symbol", ""), _int(order.get("create_time")) or 0,
+                 _int(order.get("update_time")), _int(order.get("status_code")), _int(order.get("order_type_code")),
+                 _float(order.get("price")), _float(order.get("volume")), _float(order.get("trigger_price")))
+                for order in orders]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO plan_orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def upsert_fills(self, fills):
+        """
+        写入成交明细（get_fills返回的格式），已存在的成交按trade_id覆盖
+
+        Returns:
+            int: 写入的条数
+        """
+        rows = [(str(fill.get("trade_id")), str(fill.get("order_id")), fill.get("symbol", ""),
+                 _int(fill.get("create_time")) or 0, fill.get("side"), fill.get("direction"),
+                 _float(fill.get("size")), _float(fill.get("value")), _float(fill.get("fee")),
+                 _float(fill.get("realized_pnl")))
+                for fill in fills]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO fills VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def tag_signal(self, order_ids, signal):
+        """
+        手动给订单标记信号标签（如AI策略的BUY/SELL信号），之后的同步不会覆盖
+
+        Returns:
+            int: 更新的订单数
+        """
+        order_ids = [str(order_id) for order_id in order_ids]
+        with self._lock:
+            cursor = self._conn.executemany("UPDATE orders SET signal = ? WHERE order_id = ?",
+                                            [(signal, order_id) for order_id in order_ids])
+            self._conn.commit()
+        return cursor.rowcount
+
+    # ---- 增量同步 ----
+
+    def high_water(self, stream):
+        """
+        获取某类数据已同步到的最新创建时间（毫秒），没有同步过时返回None
+        """
+        rows = self._execute("SELECT high_water FROM sync_state WHERE stream = ?", (stream,))
+        return rows[0][0] if rows else None
+
+    def _set_high_water(self, stream, high_water, last_id):
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO sync_state VALUES (?, ?, ?, ?)
+                ON CONFLICT(stream) DO UPDATE SET
+                    high_water = MAX(high_water, excluded.high_water), last_id = excluded.last_id,
+                    synced_at = excluded.synced_at
+            """, (stream, high_water, last_id, int(time.time() * 1000)))
+            self._conn.commit()
+
+    def _sync_stream(self, stream, records, upsert, time_field, key_field):
+        """
+        分批写入迭代器返回的记录，完整走完迭代器后才推进高水位，内存中只保留一批。
+        迭代器中途抛出异常（如翻页没有取完）时已写入的记录保留，高水位不变，下次同步从原位置重新拉取
+
+        Returns:
+            int: 写入的条数
+
+        Raises:
+            RuntimeError: 迭代器没有完整返回全部记录
+        """
+        count, newest, newest_id = 0, self.high_water(stream), None
+        for batch in _batches(records):
+            count += upsert(batch)
+            for record in batch:
+                created = _int(record.get(time_field))
+                if created is not None and (newest is None or created >= newest):
+                    newest, newest_id = created, record.get(key_field)
+        if newest is not None:
+            self._set_high_water(stream, newest, newest_id)
+        return count
+
+    def _orders_since(self, stream, symbol=None):
+        # 从高水位开始（包含高水位时间，同一时间的订单覆盖写入），尚未终结的订单状态还会变化，从其中最早的一个开始
+        high_water = self.high_water(stream)
+        query = "SELECT MIN(create_time) FROM orders WHERE status NOT IN (%s)" % ", ".join("?" * len(FINAL_STATUSES))
+        args = list(FINAL_STATUSES)
+        if symbol is not None:
+            query += " AND symbol = ?"
+            args.append(symbol)
+        oldest_open = self._execute(query, args)[0][0]
+        if high_water is None or oldest_open is None:
+            return high_water
+        return min(high_water, oldest_open)
+
+    def sync_orders(self, exchange, symbol=None, page_size=100):
+        """
+        增量同步历史订单
+
+        Returns:
+            int: 本次拉取并写入的订单数
+        """
+        stream = f"orders:{symbol or '*'}"
+        since = self._orders_since(stream, symbol)
+        records = exchange.iter_history_orders(symbol=symbol, page_size=page_size, create_date=since)
+        count = self._sync_stream(stream, records, self.upsert_orders, "createTime", "order_id")
+        self.stats["orders"] += count
+        return count
+
+    def sync_plan_orders(self, exchange, symbol, page_size=100):
+        """
+        增量同步一个交易对的历史计划订单（接口要求指定交易对）
+
+        Returns:
+            int: 本次拉取并写入的计划订单数
+        """
+        stream = f"plan_orders:{symbol}"
+        records = exchange.iter_order_history(symbol, start_time=self.high_water(stream), page_size=page_size)
+        count = self._sync_stream(stream, records, self.upsert_plan_orders, "create_time", "order_id")
+        self.stats["plan_orders"] += count
+        return count
+
+    def sync_fills(self, exchange, symbol=None, limit=100):
+        """
+        增量同步成交明细
+
+        Returns:
+            int: 本次拉取并写入的成交数
+        """
+        stream = f"fills:{symbol or '*'}"
+        records = exchange.iter_fills(symbol=symbol, start_time=self.high_water(stream), limit=limit)
+        count = self._sync_stream(stream, records, self.upsert_fills, "create_time", "trade_id")
+        self.stats["fills"] += count
+        return count
+
+    def sync(self, exchange, symbols=None):
+        """
+        增量同步订单、成交和计划订单
+
+        Args:
+            exchange: WeexClient
+            symbols (list, optional): 同步计划订单的交易对，默认为账本中出现过的全部交易对
+
+        Returns:
+            dict: 各类数据本次写入的条数
+        """
+        result = {"orders": self.sync_orders(exchange), "fills": self.sync_fills(exchange), "plan_orders": 0}
+        if symbols is None:
+            symbols = self.symbols()
+        for symbol in symbols:
+            result["plan_orders"] += self.sync_plan_orders(exchange, symbol)
+        self.stats["syncs"] += 1
+        logger.info("账本同步完成: %s", result)
+        return result
+
+    # ---- 查询 ----
+
+    def symbols(self):
+        """
+        账本中出现过的交易对
+        """
+        return [row[0] for row in self._execute("SELECT DISTINCT symbol FROM orders ORDER BY symbol")]
+
+    def orders(self, symbol=None, status=None, since=None, until=None, limit=None):
+        """
+        按条件查询订单，按创建时间升序
+
+        Returns:
+            list: 订单字典列表
+        """
+        query, args = "SELECT * FROM orders WHERE create_time >= ?", [since or 0]
+        if until is not None:
+            query += " AND create_time <= ?"
+            args.append(until)
+        if symbol is not None:
+            query += " AND symbol = ?"
+            args.append(symbol)
+        if status is not None:
+            query += " AND status = ?"
+            args.append(status)
+        query += " ORDER BY create_time"
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            cursor = self._conn.execute(query, args)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def daily_pnl(self, symbol=None, since=None, until=None, source="orders", tz_offset_hours=0):
+        """
+        每日已实现盈亏
+
+        Args:
+            symbol (str, optional): 只统计该交易对
+            since (int, optional): 开始时间戳（毫秒）
+            until (int, optional): 结束时间戳（毫秒）
+            source (str): "orders"按订单的totalProfits统计，"fills"按成交明细的已实现盈亏统计
+            tz_offset_hours (float): 按该时区划分日期，默认UTC
+
+        Returns:
+            list: [{"day": "YYYY-MM-DD", "pnl": 盈亏, "fee": 手续费, "net": 扣除手续费后的盈亏, "trades": 笔数}, ...]
+        """
+        table = "fills" if source == "fills" else "orders"
+        query = (f"SELECT date((create_time + ?) / 1000, 'unixepoch') AS day, "
+                 f"SUM(COALESCE(pnl, 0)), SUM(COALESCE(fee, 0)), COUNT(*) FROM {table} "
+                 f"WHERE create_time >= ? AND create_time <= ?")
+        args = [int(tz_offset_hours * 3600 * 1000), since or 0, until if until is not None else 2 ** 62]
+        if table == "orders":
+            query += " AND filled_qty > 0"
+        if symbol is not None:
+            query += " AND symbol = ?"
+            args.append(symbol)
+        query += " GROUP BY day ORDER BY day"
+        return [{"day": day, "pnl": pnl, "fee": fee, "net": pnl - abs(fee), "trades": trades}
+                for day, pnl, fee, trades in self._execute(query, args)]
+
+    def win_rate_by_signal(self, symbol=None, since=None, until=None):
+        """
+        按信号标签统计平仓订单的胜率（已实现盈亏大于0为盈利）
+
+        Returns:
+            dict: 信号 -> {"trades": 平仓笔数, "wins": 盈利笔数, "win_rate": 胜率, "pnl": 总盈亏}，未标记信号的订单归入None
+        """
+        query = ("SELECT signal, COUNT(*), SUM(pnl > 0), SUM(COALESCE(pnl, 0)) FROM orders "
+                 "WHERE create_time >= ? AND create_time <= ? AND filled_qty > 0 AND type NOT LIKE 'open%'")
+        args = [since or 0, until if until is not None else 2 ** 62]
+        if symbol is not None:
+            query += " AND symbol = ?"
+            args.append(symbol)
+        query += " GROUP BY signal"
+        return {signal: {"trades": trades, "wins": wins, "win_rate": wins / trades if trades else 0.0, "pnl": pnl}
+                for signal, trades, wins, pnl in self._execute(query, args)}
+
+
+def main():
+    """命令行: 同步账本并打印每日盈亏和按信号统计的胜率"""
+    parser = argparse.ArgumentParser(description='同步并查询本地订单账本')
+    parser.add_argument('--db', default=None, help='账本数据库文件，默认读取WEEX_LEDGER_DB环境变量或orders.db')
+    parser.add_argument('-s', '--symbol', action='append', default=None, help='同步计划订单的交易对，可重复')
+    parser.add_argument('--no-sync', action='store_true', help='不访问交易所，只查询本地账本')
+    parser.add_argument('--days', type=int, default=30, help='报表统计最近几天')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with OrderLedger(args.db) as ledger:
+        if not args.no_sync:
+            from weex_sdk import WeexClient, WEEX_ACCESS_PASSPHRASE, WEEX_API_KEY, WEEX_SECRET
+            client = WeexClient(WEEX_API_KEY, WEEX_SECRET, WEEX_ACCESS_PASSPHRASE)
+            try:
+                print(f"同步结果: {ledger.sync(client, symbols=args.symbol)}")
+            finally:
+                client.close()
+
+        since = int((time.time() - args.days * 86400) * 1000)
+        print(f"\n最近{args.days}天每日盈亏:")
+        for row in ledger.daily_pnl(since=since):
+            print(f"  {row['day']}  盈亏 {row['pnl']:>12.4f}  手续费 {row['fee']:>10.4f}  净 {row['net']:>12.4f}  {row['trades']}笔")
+        print("\n按信号统计胜率:")
+        for signal, stats in sorted(ledger.win_rate_by_signal(since=since).items(), key=lambda item: str(item[0])):
+            print(f"  {signal or '未标记'}: {stats['trades']}笔, 胜率 {stats['win_rate']:.1%}, 盈亏 {stats['pnl']:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
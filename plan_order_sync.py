@@ -0,0 +1,195 @@
+"""
+交易所计划委托止损同步
+把多档位止盈引擎中每个持仓当前生效的止损价同步为交易所的平仓计划委托（条件单），
+止损由交易所执行，机器人崩溃或两次轮询之间价格击穿止损价时持仓仍受保护
+
+只有持仓的止损价或数量变化（升档、加减仓）时才查询和修改交易所的计划委托，
+并对比期望的委托和交易所现有的委托，只撤销/新建有差异的部分，不会反复撤单重下
+
+用法:
+    plan_sync = PlanOrderSync(exchange)
+    plan_sync.sync(engine.positions())
+"""
+
+import logging
+import time
+
+from weex_records import plan_order_type
+from weex_sdk import new_client_oid
+
+logger = logging.getLogger("plan_order_sync")
+
+# 本模块创建的计划委托的client_oid前缀，用于区分手动下的计划委托
+PLAN_ORDER_PREFIX = "tiersl_"
+
+# 平仓计划委托类型：3: Close long, 4: Close short（交易所返回英文或数字代码）
+CLOSE_TYPES = {'long': "3", 'short': "4"}
+_TYPE_CODES = {"CLOSE_LONG": "3", "CLOSE_SHORT": "4"}
+
+
+class PlanOrderSync:
+    """
+    把持仓的止损价同步为交易所的平仓计划委托
+    """
+
+    def __init__(self, exchange, price_tolerance=1e-4, verify_interval=300, prefix=PLAN_ORDER_PREFIX):
+        """
+        Args:
+            exchange (WeexClient): 交易所客户端
+            price_tolerance (float): 触发价的相对误差小于该值时认为委托无需修改
+            verify_interval (float): 即使止损价没有变化，也每隔该秒数核对一次交易所的委托（被手动撤销时补上），
+                None或0表示不定期核对
+            prefix (str): 本模块创建的计划委托的client_oid前缀
+        """
+        self.exchange = exchange
+        self.price_tolerance = price_tolerance
+        self.verify_interval = verify_interval
+        self.prefix = prefix
+        # 持仓key -> 已同步到交易所的(交易对, 止损价, 数量)
+        self._synced = {}
+        # 交易对 -> 上次核对交易所委托的时间
+        self._verified = {}
+        self.stats = {"syncs": 0, "queries": 0, "placed": 0, "cancelled": 0, "failures": 0}
+
+    def desired_order(self, position):
+        """
+        持仓需要的平仓计划委托
+
+        Returns:
+            dict: {'symbol', 'type', 'size', 'trigger_price'}
+        """
+        return {
+            'symbol': position.symbol,
+            'type': CLOSE_TYPES[position.side],
+            'size': position.size,
+            'trigger_price': position.stop_price,
+        }
+
+    def is_protected(self, position):
+        """
+        持仓当前的止损价是否已经由交易所的计划委托保护
+        """
+        return self._synced.get(position.key) == (position.symbol, position.stop_price, position.size)
+
+    def sync(self, positions, force=False):
+        """
+        同步持仓的平仓计划委托；止损价和数量都没有变化的交易对不发送任何请求
+
+        Args:
+            positions (list): 需要保护的持仓（TrackedPosition），不在列表中的持仓的委托会被撤销
+            force (bool): 是否强制核对所有交易对的委托
+
+        Returns:
+            dict: {'placed': 新建数量, 'cancelled': 撤销数量, 'failures': 失败数量}
+        """
+        self.stats["syncs"] += 1
+        now = time.monotonic()
+        by_symbol = {}
+        for position in positions:
+            by_symbol.setdefault(position.symbol, []).append(position)
+
+        # 需要处理的交易对：有持仓止损价变化、有持仓已平仓或到了定期核对时间
+        symbols = set()
+        keys = set()
+        for symbol, symbol_positions in by_symbol.items():
+            for position in symbol_positions:
+                keys.add(position.key)
+                if not self.is_protected(position):
+                    symbols.add(symbol)
+            last = self._verified.get(symbol)
+            if force or (self.verify_interval and (last is None or now - last >= self.verify_interval)):
+                symbols.add(symbol)
+        for key, (symbol, _, _) in self._synced.items():
+            if key not in keys:
+                symbols.add(symbol)
+
+        result = {'placed': 0, 'cancelled': 0, 'failures': 0}
+        for symbol in symbols:
+            counts = self._sync_symbol(symbol, by_symbol.get(symbol, []))
+            for name, count in counts.items():
+                result[name] += count
+            self._verified[symbol] = now
+        return result
+
+    def _existing_orders(self, symbol):
+        """
+        查询交易所中本模块创建、尚未触发的平仓计划委托
+
+        Returns:
+            list: 委托列表，查询失败时返回None
+        """
+        self.stats["queries"] += 1
+        result = self.exchange.getCurrentPlanOrders(symbol=symbol)
+        if result.get("error"):
+            logger.error("查询计划委托失败 %s: %s", symbol, result["error"])
+            return None
+        orders = []
+        for order in result["orders"]:
+            type_code = _TYPE_CODES.get(plan_order_type(order.get("type_code")))
+            if type_code is None or not str(order.get("client_oid", "")).startswith(self.prefix):
+                continue
+            if order.get("status_code") not in (None, "", "UNTRIGGERED", "PENDING", "0"):
+                continue
+            orders.append(dict(order, type_code=type_code))
+        return orders
+
+    def _matches(self, order, desired):
+        trigger = order.get("triggerPrice")
+        if trigger is None or order["type_code"] != desired['type']:
+            return False
+        if abs(float(order["size"]) - float(desired['size'])) > 1e-12:
+            return False
+        return abs(trigger - desired['trigger_price']) <= self.price_tolerance * desired['trigger_price']
+
+    def _sync_symbol(self, symbol, positions):
+        """
+        对比一个交易对期望的委托和交易所现有的委托，撤销多余的委托、补上缺少的委托
+        """
+        counts = {'placed': 0, 'cancelled': 0, 'failures': 0}
+        existing = self._existing_orders(symbol)
+        if existing is None:
+            counts['failures'] += 1
+            self.stats["failures"] += 1
+            return counts
+
+        # 先为每个持仓找到可以保留的委托
+        remaining = list(existing)
+        missing = []
+        for position in positions:
+            desired = self.desired_order(position)
+            match = next((order for order in remaining if self._matches(order, desired)), None)
+            if match is not None:
+                remaining.remove(match)
+                self._synced[position.key] = (symbol, position.stop_price, position.size)
+            else:
+                missing.append((position, desired))
+
+        # 先新建缺少的委托，再撤销旧委托，避免中间出现没有止损保护的空档
+        for position, desired in missing:
+            self._synced.pop(position.key, None)
+            order = self.exchange.place_plan_order(symbol, desired['size'], desired['type'], desired['trigger_price'],
+                                                   client_oid=new_client_oid(self.prefix))
+            if order is None:
+                logger.error("同步止损计划委托失败 %s %s: 触发价%.2f", symbol, position.side, desired['trigger_price'])
+                counts['failures'] += 1
+                self.stats["failures"] += 1
+                continue
+            logger.info("止损计划委托已同步 %s %s: 触发价%.2f", symbol, position.side, desired['trigger_price'])
+            counts['placed'] += 1
+            self.stats["placed"] += 1
+            self._synced[position.key] = (symbol, desired['trigger_price'], desired['size'])
+
+        # 再撤销不再需要的委托（止损价已变化或持仓已平仓）
+        for order in remaining:
+            if self.exchange.cancel_plan_order(order["order_id"]):
+                counts['cancelled'] += 1
+                self.stats["cancelled"] += 1
+            else:
+                counts['failures'] += 1
+                self.stats["failures"] += 1
+
+        # 清除已平仓持仓的同步记录
+        live = {position.key for position in positions}
+        for key in [key for key, synced in self._synced.items() if synced[0] == symbol and key not in live]:
+            self._synced.pop(key)
+        return counts
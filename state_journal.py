@@ -0,0 +1,191 @@
+"""
+持仓档位状态日志
+把多档位止盈引擎的持仓状态（档位、最有利价格）以追加写的JSON Lines记录到磁盘，重启时回放恢复，
+避免进程重启后所有持仓回到档位-1、丢失最高盈利
+
+- 只记录有变化的持仓，写入在内存中累积，按flush_interval批量写入并fsync，价格推送的热路径上没有磁盘IO
+- 日志条数超过compact_every时写一次完整快照（先写临时文件再原子替换）并清空日志
+- 每条记录带递增序号，快照记录已包含的最大序号，快照替换后、清空日志前崩溃也不会回放旧记录
+- 最后一行写了一半（崩溃）时忽略并截掉该行
+
+用法:
+    journal = StateJournal("multi_tier_state.jsonl")
+    engine.restore(journal.load())
+    ...
+    journal.update(engine.state())
+"""
+
+import logging
+import os
+import time
+
+from weex_sdk import dumps_json, loads_json
+
+logger = logging.getLogger("state_journal")
+
+
+def _encode_key(key):
+    # JSON没有元组，持仓key (交易对, 方向) 存为列表
+    return list(key) if isinstance(key, tuple) else key
+
+
+def _decode_key(key):
+    return tuple(key) if isinstance(key, list) else key
+
+
+class StateJournal:
+    """
+    追加写的持仓状态日志，定期压缩为快照
+    """
+
+    def __init__(self, path, flush_interval=1.0, compact_every=1000):
+        """
+        Args:
+            path (str): 日志文件路径，快照保存在 path + ".snapshot"
+            flush_interval (float): 两次写盘之间的最短间隔（秒）
+            compact_every (int): 日志记录数超过该值时压缩为快照
+        """
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        # 持仓key -> 已记录（含待写入）的状态
+        self._states = {}
+        self._pending = []
+        self._seq = 0
+        self._lines = 0
+        self._last_flush = 0.0
+        self._file = None
+        self.stats = {"records": 0, "flushes": 0, "compactions": 0, "load_ms": 0.0}
+
+    def load(self):
+        """
+        读取快照并回放日志
+
+        Returns:
+            dict: 持仓key -> 状态字典
+        """
+        start = time.perf_counter()
+        states = {}
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = loads_json(f.read())
+            snapshot_seq = snapshot["seq"]
+            for key, state in snapshot["states"]:
+                states[_decode_key(key)] = state
+
+        seq, lines, valid_size = snapshot_seq, 0, 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = f.read()
+            offset = 0
+            while offset < len(data):
+                end = data.find(b"\n", offset)
+                if end < 0:
+                    # 最后一行没有写完
+                    break
+                try:
+                    record = loads_json(data[offset:end])
+                except ValueError:
+                    break
+                offset = end + 1
+                valid_size = offset
+                lines += 1
+                if record["n"] <= snapshot_seq:
+                    continue
+                seq = record["n"]
+                key = _decode_key(record["k"])
+                if record.get("x"):
+                    states.pop(key, None)
+                else:
+                    states[key] = record["v"]
+            if valid_size < len(data):
+                logger.warning("状态日志末尾有%s字节不完整的记录，已忽略", len(data) - valid_size)
+                with open(self.path, "r+b") as f:
+                    f.truncate(valid_size)
+
+        self._states = dict(states)
+        self._seq = seq
+        self._lines = lines
+        self.stats["load_ms"] = (time.perf_counter() - start) * 1000
+        logger.info("已恢复%s个持仓状态，耗时%.2f毫秒", len(states), self.stats["load_ms"])
+        return states
+
+    def update(self, states, force=False):
+        """
+        记录有变化的持仓状态和已消失的持仓，到达写盘间隔（或force）时批量写入并fsync
+
+        Args:
+            states (dict): 持仓key -> 状态字典（可JSON序列化）
+            force (bool): 是否立即写盘
+
+        Returns:
+            int: 本次新增的记录数
+        """
+        added = 0
+        for key, state in states.items():
+            if self._states.get(key) != state:
+                self._states[key] = dict(state)
+                self._append({"k": _encode_key(key), "v": state})
+                added += 1
+        for key in [key for key in self._states if key not in states]:
+            del self._states[key]
+            self._append({"k": _encode_key(key), "x": 1})
+            added += 1
+        if self._pending and (force or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+        return added
+
+    def _append(self, record):
+        self._seq += 1
+        record["n"] = self._seq
+        self._pending.append(dumps_json(record) + b"\n")
+        self.stats["records"] += 1
+
+    def flush(self):
+        """
+        把待写入的记录写入日志并fsync，必要时压缩
+        """
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        if self._lines + len(self._pending) > self.compact_every:
+            # 快照已包含全部待写入的状态
+            self._pending = []
+            self.compact()
+            return
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(b"".join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._lines += len(self._pending)
+        self._pending = []
+        self.stats["flushes"] += 1
+
+    def compact(self):
+        """
+        把当前全部状态写为快照并清空日志
+        """
+        snapshot = {"seq": self._seq, "states": [[_encode_key(key), state] for key, state in self._states.items()]}
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(dumps_json(snapshot))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, "wb")
+        self._lines = 0
+        self.stats["compactions"] += 1
+
+    def close(self):
+        """
+        写入剩余记录并关闭文件
+        """
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
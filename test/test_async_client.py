@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+测试AsyncWeexClient：与同步客户端结果一致，并发请求的总耗时接近单个请求（使用本地替身服务器）
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_sdk import WeexClient
+from weex_async_sdk import AsyncWeexClient
+from weex_stub_server import WeexStubServer
+
+CANDLES = [["1716707460000", "69174.3", "69174.4", "69174.1", "69174.3", "0", "0.011"]]
+POSITIONS = [{"id": 1, "symbol": "cmt_btcusdt", "side": "LONG", "size": "0.01", "open_value": "690",
+              "leverage": "10", "unrealizePnl": "1.5", "margin_mode": "SHARED"}]
+DELAY = 0.3
+CONCURRENCY = 10
+
+
+def _make_server():
+    server = WeexStubServer(delay=DELAY)
+    server.add_route("GET", "/capi/v2/market/candles", CANDLES)
+    server.add_route("GET", "/capi/v2/account/position/allPosition", POSITIONS)
+    server.add_route("POST", "/capi/v2/order/placeOrder", {"order_id": "123", "client_oid": "abc"})
+    return server
+
+
+def test_same_results_as_sync_client():
+    """异步客户端的格式化结果与同步客户端一致，签名头相同"""
+    with _make_server() as server:
+        sync_client = WeexClient("key", "secret", "pass")
+        sync_client.base_url = server.base_url
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass") as client:
+                client.base_url = server.base_url
+                return (await client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1),
+                        await client.fetch_positions("cmt_btcusdt"),
+                        await client.open_long("cmt_btcusdt", 0.01, client_oid="abc"))
+
+        ohlcv, positions, order = asyncio.run(run())
+        assert ohlcv == sync_client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1)
+        assert positions == sync_client.fetch_positions("cmt_btcusdt")
+        assert order == sync_client.open_long("cmt_btcusdt", 0.01, client_oid="abc")
+        sync_client.close()
+
+        signed = [r for r in server.requests if r["path"] == "/capi/v2/order/placeOrder"]
+        for request in signed:
+            assert request["headers"]["ACCESS-KEY"] == "key"
+            assert request["headers"]["ACCESS-SIGN"]
+
+
+def test_concurrent_calls_overlap():
+    """N个并发请求的总耗时应接近单个请求，而不是N倍"""
+    with _make_server() as server:
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass", pool_maxsize_per_host=CONCURRENCY) as client:
+                client.base_url = server.base_url
+                start = time.perf_counter()
+                results = await asyncio.gather(*[
+                    client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1) for _ in range(CONCURRENCY)
+                ])
+                return time.perf_counter() - start, results
+
+        elapsed, results = asyncio.run(run())
+        print(f"{CONCURRENCY}个并发请求耗时: {elapsed:.3f}秒（单个请求约{DELAY}秒）")
+        assert all(results)
+        assert elapsed < DELAY * 3
+
+
+if __name__ == "__main__":
+    test_same_results_as_sync_client()
+    test_concurrent_calls_overlap()
+    print("异步客户端测试通过")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+测试批量下单：按交易对每20个订单打包为一个请求、多个请求并发发送、逐单结果按client_oid对应回来（使用本地替身服务器）
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_async_sdk import AsyncWeexClient
+from weex_sdk import BATCH_ORDER_LIMIT, WeexClient
+from weex_stub_server import WeexStubServer
+
+BATCH_ORDERS_PATH = "/capi/v2/order/batchOrders"
+
+
+class FakeBatchOrders:
+    """
+    模拟批量下单接口：价格为0的订单被拒绝，failing_symbols中的交易对整批返回错误
+    """
+
+    def __init__(self, failing_symbols=()):
+        self.lock = threading.Lock()
+        self.bodies = []
+        self.next_id = 5000
+        self.failing_symbols = set(failing_symbols)
+
+    def batch_orders(self, method, path, query, body):
+        data = json.loads(body)
+        assert len(data["orderDataList"]) <= BATCH_ORDER_LIMIT
+        with self.lock:
+            self.bodies.append(data)
+            if data["symbol"] in self.failing_symbols:
+                return 500, {"code": "50000", "msg": "system busy"}
+            info = []
+            for order in data["orderDataList"]:
+                if order["client_oid"].startswith("dup"):
+                    # 此前已用同一client_oid下单成功
+                    info.append({"order_id": None, "client_oid": order["client_oid"], "result": False,
+                                 "error_code": "40020", "error_message": "Duplicate client_oid"})
+                elif float(order.get("price", 1)) == 0:
+                    info.append({"order_id": None, "client_oid": order["client_oid"], "result": False,
+                                 "error_code": "40015", "error_message": "invalid price"})
+                else:
+                    self.next_id += 1
+                    info.append({"order_id": str(self.next_id), "client_oid": order["client_oid"], "result": True})
+        # 逐单结果的顺序与请求不同，只能按client_oid对应
+        return 200, {"order_info": info[::-1], "result": True}
+
+
+def _ladder(symbol, count, prefix):
+    return [{"symbol": symbol, "type": "open_long", "amount": 0.001, "price": 60000 - i * 10, "match_price": "0",
+             "client_oid": f"{prefix}{i}"} for i in range(count)]
+
+
+def _run(fake, orders, delay=0.0, **kwargs):
+    with WeexStubServer(delay=delay) as server:
+        server.add_route("POST", BATCH_ORDERS_PATH, fake.batch_orders)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        client.sync_time()
+        start = time.perf_counter()
+        results = client.place_orders(orders, **kwargs)
+        elapsed = time.perf_counter() - start
+        client.close()
+    return results, elapsed
+
+
+def test_chunks_and_maps_results():
+    orders = _ladder("cmt_btcusdt", 45, "btc") + _ladder("cmt_ethusdt", 7, "eth")
+    orders[3]["price"] = 0
+    fake = FakeBatchOrders()
+    results, _ = _run(fake, orders)
+
+    assert list(results) == [order["client_oid"] for order in orders]
+    assert sorted(len(body["orderDataList"]) for body in fake.bodies) == [5, 7, 20, 20]
+    assert all(body["orderDataList"][0].keys().isdisjoint({"symbol"}) for body in fake.bodies)
+    assert not results["btc3"]["ok"] and results["btc3"]["error"] == "invalid price"
+    ok = [result for result in results.values() if result["ok"]]
+    assert len(ok) == 51 and len({result["id"] for result in ok}) == 51
+    assert results["eth6"]["symbol"] == "cmt_ethusdt" and results["eth6"]["type"] == "limit"
+    # 请求体里的订单参数与单个下单一致
+    sent = next(order for body in fake.bodies for order in body["orderDataList"] if order["client_oid"] == "btc1")
+    assert sent == {"client_oid": "btc1", "size": "0.001", "type": "1", "order_type": "0", "match_price": "0",
+                    "price": "59990"}
+
+
+def test_failed_chunk_and_invalid_orders():
+    orders = _ladder("cmt_btcusdt", 3, "btc") + _ladder("cmt_solusdt", 3, "sol")
+    orders.append({"symbol": "cmt_btcusdt", "type": "sideways", "amount": 1, "client_oid": "bad"})
+    results, _ = _run(FakeBatchOrders(failing_symbols={"cmt_solusdt"}), orders)
+    assert [results[f"btc{i}"]["ok"] for i in range(3)] == [True] * 3
+    assert not any(results[f"sol{i}"]["ok"] for i in range(3)) and "500" in results["sol0"]["error"]
+    assert not results["bad"]["ok"] and "订单参数无效" in results["bad"]["error"]
+    # 未指定client_oid时自动生成
+    results, _ = _run(FakeBatchOrders(), [{"symbol": "cmt_btcusdt", "type": 3, "amount": 0.5}])
+    (client_oid, result), = results.items()
+    assert client_oid and result["ok"] and result["orderType"] == "3"
+
+
+def test_duplicate_client_oid_is_success():
+    orders = _ladder("cmt_btcusdt", 2, "dup") + _ladder("cmt_btcusdt", 2, "new")
+    results, _ = _run(FakeBatchOrders(), orders)
+    assert all(result["ok"] for result in results.values())
+    assert results["dup0"]["error"] is None and results["new1"]["id"]
+
+
+def test_repeated_client_oid_not_sent():
+    """同一批中重复的client_oid只发送第一个订单，之后的标记为无效"""
+    orders = _ladder("cmt_btcusdt", 3, "btc") + _ladder("cmt_btcusdt", 2, "btc")
+    fake = FakeBatchOrders()
+    results, _ = _run(fake, orders)
+    assert list(results) == ["btc0", "btc1", "btc2", "btc0#2", "btc1#2"]
+    assert [order["client_oid"] for order in fake.bodies[0]["orderDataList"]] == ["btc0", "btc1", "btc2"]
+    assert results["btc0"]["ok"] and results["btc0"]["price"] == "60000"
+    assert not results["btc0#2"]["ok"] and "client_oid" in results["btc0#2"]["error"]
+    assert results["btc1#2"]["clientOrderId"] == "btc1" and results["btc1#2"]["id"] == ""
+
+
+def test_chunks_are_sent_in_parallel():
+    delay = 0.2
+    orders = _ladder("cmt_btcusdt", 80, "btc")
+    results, elapsed = _run(FakeBatchOrders(), orders, delay=delay)
+    assert all(result["ok"] for result in results.values())
+    print(f"80个订单（4个请求）批量下单耗时{elapsed:.2f}秒，顺序发送至少{4 * delay:.2f}秒")
+    assert elapsed < 2 * delay
+
+
+def test_async_matches_sync():
+    orders = _ladder("cmt_btcusdt", 25, "btc") + _ladder("cmt_ethusdt", 3, "eth")
+    expected, _ = _run(FakeBatchOrders(), orders)
+    fake = FakeBatchOrders()
+    with WeexStubServer() as server:
+        server.add_route("POST", BATCH_ORDERS_PATH, fake.batch_orders)
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass", rate_limits={}) as client:
+                client.base_url = server.base_url
+                return await client.place_orders(orders)
+
+        results = asyncio.run(run())
+    assert list(results) == list(expected)
+    assert all(result["ok"] for result in results.values()) and len(fake.bodies) == 3
+
+
+if __name__ == "__main__":
+    test_chunks_and_maps_results()
+    test_failed_chunk_and_invalid_orders()
+    test_duplicate_client_oid_is_success()
+    test_repeated_client_oid_not_sent()
+    test_chunks_are_sent_in_parallel()
+    test_async_matches_sync()
+    print("批量下单测试通过")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+测试批量撤单：优先用全部撤单/批量撤单接口，接口不可用时回退为有并发上限的逐个撤单，并汇总为一个结果（使用本地替身服务器）
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_async_sdk import AsyncWeexClient
+from weex_sdk import CANCEL_BATCH_LIMIT, WeexClient
+from weex_stub_server import WeexStubServer
+
+CANCEL_ALL_PATH = "/capi/v2/order/cancelAllOrders"
+CANCEL_BATCH_PATH = "/capi/v2/order/cancel_batch_orders"
+CANCEL_ORDER_PATH = "/capi/v2/order/cancel_order"
+CANCEL_PLAN_PATH = "/capi/v2/order/cancel_plan"
+
+
+class FakeOrders:
+    """
+    模拟普通委托和计划委托，可以关闭全部撤单/批量撤单接口
+    """
+
+    def __init__(self, cancel_all=True, batch=True, reject=()):
+        self.lock = threading.Lock()
+        self.orders = {str(100 + i): "cmt_btcusdt" if i % 5 else "cmt_ethusdt" for i in range(25)}
+        self.plans = {str(700 + i): "cmt_btcusdt" for i in range(6)}
+        self.cancel_all = cancel_all
+        self.batch = batch
+        self.reject = set(reject)
+
+    def install(self, server):
+        if self.cancel_all:
+            server.add_route("POST", CANCEL_ALL_PATH, self.cancel_all_orders)
+        if self.batch:
+            server.add_route("POST", CANCEL_BATCH_PATH, self.cancel_batch)
+        server.add_route("POST", CANCEL_ORDER_PATH, self.cancel_order)
+        server.add_route("POST", CANCEL_PLAN_PATH, self.cancel_plan)
+        server.add_route("GET", "/capi/v2/order/openOrders", self.open_orders)
+        server.add_route("GET", "/capi/v2/order/currentPlan", self.current_plan)
+
+    def _cancel(self, book, order_id):
+        with self.lock:
+            if order_id in self.reject or book.pop(order_id, None) is None:
+                return False
+        return True
+
+    def cancel_all_orders(self, method, path, query, body):
+        data = json.loads(body)
+        book = self.plans if data["cancelOrderType"] == "plan" else self.orders
+        with self.lock:
+            order_ids = [order_id for order_id, symbol in book.items() if data.get("symbol") in (None, symbol)]
+        return 200, [{"orderId": order_id, "success": self._cancel(book, order_id)} for order_id in order_ids]
+
+    def cancel_batch(self, method, path, query, body):
+        order_ids = json.loads(body)["ids"]
+        assert len(order_ids) <= CANCEL_BATCH_LIMIT
+        return 200, {"result": True, "cancelOrderResultList": [
+            {"order_id": order_id, "result": self._cancel(self.orders, order_id), "err_msg": ""} for order_id in order_ids]}
+
+    def cancel_order(self, method, path, query, body):
+        order_id = json.loads(body)["orderId"]
+        ok = self._cancel(self.orders, order_id)
+        return 200, {"order_id": order_id, "result": ok, "err_msg": "" if ok else "order not found"}
+
+    def cancel_plan(self, method, path, query, body):
+        return 200, {"result": self._cancel(self.plans, json.loads(body)["orderId"])}
+
+    def open_orders(self, method, path, query, body):
+        symbol = parse_qs(query).get("symbol", [None])[0]
+        with self.lock:
+            return 200, [{"order_id": order_id, "symbol": s} for order_id, s in self.orders.items()
+                         if symbol in (None, s)]
+
+    def current_plan(self, method, path, query, body):
+        symbol = parse_qs(query).get("symbol", [None])[0]
+        with self.lock:
+            return 200, [{"order_id": order_id, "symbol": s, "type": "CLOSE_LONG", "size": "0.1"}
+                         for order_id, s in self.plans.items() if symbol in (None, s)]
+
+
+def _calls(server, path):
+    return sum(1 for request in server.requests if request["path"] == path)
+
+
+def _run(fake, action, delay=0.0):
+    with WeexStubServer(delay=delay) as server:
+        fake.install(server)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        client.sync_time()
+        start = time.perf_counter()
+        result = action(client)
+        elapsed = time.perf_counter() - start
+        client.close()
+    return result, server, elapsed
+
+
+def test_cancel_all_endpoint():
+    fake = FakeOrders()
+    result, server, _ = _run(fake, lambda client: client.cancel_all_orders())
+    assert result["ok"] and len(result["cancelled"]) == 31
+    assert not fake.orders and not fake.plans
+    # 普通委托和计划委托各一次请求
+    assert _calls(server, CANCEL_ALL_PATH) == 2 and _calls(server, CANCEL_ORDER_PATH) == 0
+
+
+def test_fallback_to_batch_endpoint():
+    fake = FakeOrders(cancel_all=False)
+    result, server, _ = _run(fake, lambda client: client.cancel_all_orders("cmt_btcusdt"))
+    assert result["ok"] and len(result["cancelled"]) == 20 + 6
+    assert set(fake.orders) == {str(100 + i) for i in range(0, 25, 5)} and not fake.plans
+    # 20个普通委托分两批，计划委托逐个撤销
+    assert _calls(server, CANCEL_BATCH_PATH) == 2 and _calls(server, CANCEL_ORDER_PATH) == 0
+    assert _calls(server, CANCEL_PLAN_PATH) == 6
+
+
+def test_fallback_to_parallel_single_cancels():
+    fake = FakeOrders(cancel_all=False, batch=False, reject={"101"})
+    result, server, _ = _run(fake, lambda client: client.cancel_all_orders(include_plan=False))
+    assert not result["ok"] and len(result["cancelled"]) == 24
+    assert result["failed"] == [{"order_id": "101", "error": "order not found"}]
+    assert _calls(server, CANCEL_ORDER_PATH) == 25 and len(fake.plans) == 6
+
+    # 逐个撤单有并发上限，但不是一个接一个地等待
+    delay = 0.05
+    order_ids = [str(100 + i) for i in range(25)]
+    result, server, elapsed = _run(FakeOrders(batch=False), lambda client: client.cancel_orders(order_ids, max_workers=5),
+                                   delay)
+    assert result["ok"] and result["cancelled"] == order_ids
+    print(f"25个订单逐个撤单（并发5）耗时{elapsed:.2f}秒，顺序执行至少{25 * delay:.2f}秒")
+    assert elapsed < 25 * delay * 0.6
+
+
+def test_cancel_orders_reports_missing():
+    fake = FakeOrders()
+    result, server, _ = _run(fake, lambda client: client.cancel_orders(["100", "101", "999"]))
+    assert result["cancelled"] == ["100", "101"]
+    assert [failure["order_id"] for failure in result["failed"]] == ["999"]
+    empty, _, _ = _run(FakeOrders(), lambda client: client.cancel_orders([]))
+    assert empty == {"cancelled": [], "failed": [], "errors": [], "ok": True}
+
+
+def test_async_matches_sync():
+    for kwargs in ({}, {"cancel_all": False}, {"cancel_all": False, "batch": False}):
+        expected, _, _ = _run(FakeOrders(**kwargs), lambda client: client.cancel_all_orders("cmt_btcusdt"))
+        fake = FakeOrders(**kwargs)
+        with WeexStubServer() as server:
+            fake.install(server)
+
+            async def run():
+                async with AsyncWeexClient("key", "secret", "pass", rate_limits={}) as client:
+                    client.base_url = server.base_url
+                    return await client.cancel_all_orders("cmt_btcusdt")
+
+            result = asyncio.run(run())
+        assert sorted(result["cancelled"]) == sorted(expected["cancelled"]) and result["ok"], kwargs
+
+
+if __name__ == "__main__":
+    test_cancel_all_endpoint()
+    test_fallback_to_batch_endpoint()
+    test_fallback_to_parallel_single_cancels()
+    test_cancel_orders_reports_missing()
+    test_async_matches_sync()
+    print("批量撤单测试通过")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+测试本地K线存储：首次回填历史，之后只拉取增量；交易所不可用时返回本地数据
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candle_store import CandleStore, timeframe_to_ms
+
+TF_MS = 15 * 60 * 1000
+NOW_MS = 1716707700000 - 1716707700000 % TF_MS + 5 * 60 * 1000
+
+
+class FakeExchange:
+    """按当前时间生成15分钟K线的假交易所，记录每次请求的条数"""
+
+    def __init__(self):
+        self.now_ms = NOW_MS
+        self.limits = []
+        self.ranges = []
+        self.fail = False
+        self.fail_after = None
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100):
+        if self.fail:
+            raise ConnectionError("exchange down")
+        self.limits.append(limit)
+        current = self.now_ms - self.now_ms % TF_MS
+        # 和WEEX一样按时间倒序返回，最新一根K线的收盘价随时间变化
+        return [[current - i * TF_MS, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i + (self.now_ms % TF_MS) / 1e9, 10.0]
+                for i in range(limit)]
+
+
+    def fetch_ohlcv_range(self, symbol, timeframe, start, end=None):
+        # 按时间范围分块返回，每块最多10根，返回fail_after块之后失败
+        self.ranges.append((start, end))
+        last = min(end if end is not None else self.now_ms, self.now_ms)
+        timestamps = list(range(start, last + 1, TF_MS))
+        for i in range(0, len(timestamps), 10):
+            if self.fail_after is not None and i // 10 >= self.fail_after:
+                raise ConnectionError("exchange down")
+            yield np.array([[ts, 100.0, 101.0, 99.0, 100.5, 10.0] for ts in timestamps[i:i + 10]])
+
+
+def _make_store(tmpdir, exchange):
+    store = CandleStore(os.path.join(tmpdir, "candles.db"))
+    store.clock = lambda: exchange.now_ms / 1000
+    return store
+
+
+def test_timeframe_to_ms():
+    assert timeframe_to_ms("1m") == 60000
+    assert timeframe_to_ms("15m") == TF_MS
+    assert timeframe_to_ms("4h") == 4 * 3600 * 1000
+    assert timeframe_to_ms("1w") == 7 * 86400 * 1000
+    try:
+        timeframe_to_ms("15x")
+        assert False
+    except ValueError:
+        pass
+
+
+def test_backfill_then_delta():
+    exchange = FakeExchange()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _make_store(tmpdir, exchange)
+        first = store.get_ohlcv(exchange, "cmt_btcusdt", "15m", limit=96)
+        assert exchange.limits == [96]
+        assert len(first) == 96
+        assert [c[0] for c in first] == sorted(c[0] for c in first)
+
+        # 同一根K线内再次获取：只刷新最新一根
+        exchange.now_ms += 60 * 1000
+        second = store.get_ohlcv(exchange, "cmt_btcusdt", "15m", limit=96)
+        assert exchange.limits[-1] == 1
+        assert second[-1][4] != first[-1][4]
+
+        # 过了两根K线：拉取最新存储的那根加两根新K线
+        exchange.now_ms += 2 * TF_MS
+        third = store.get_ohlcv(exchange, "cmt_btcusdt", "15m", limit=96)
+        assert exchange.limits[-1] == 3
+        assert len(third) == 96 and third[-1][0] == second[-1][0] + 2 * TF_MS
+
+        # 需要更多历史时重新回填
+        store.get_ohlcv(exchange, "cmt_btcusdt", "15m", limit=200)
+        assert exchange.limits[-1] == 200
+        store.close()
+
+        # 新进程打开同一个文件，直接走增量
+        store = _make_store(tmpdir, exchange)
+        store.get_ohlcv(exchange, "cmt_btcusdt", "15m", limit=96)
+        assert exchange.limits[-1] == 1
+        print(f"各次拉取条数: {exchange.limits}")
+        store.close()
+
+
+def test_serves_local_data_when_exchange_down():
+    exchange = FakeExchange()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _make_store(tmpdir, exchange)
+        store.get_ohlcv(exchange, "cmt_btcusdt", "15m", limit=10)
+        exchange.fail = True
+        ohlcv = store.get_ohlcv(exchange, "cmt_btcusdt", "15m", limit=10)
+        assert len(ohlcv) == 10
+        assert store.stats["fetch_errors"] == 1
+        store.close()
+
+
+def test_fill_range_fetches_only_missing():
+    exchange = FakeExchange()
+    current = NOW_MS - NOW_MS % TF_MS
+    since = current - 99 * TF_MS
+    with CandleStore(":memory:") as store:
+        # 回填中途失败：已拉取的块保留，下次从缺口继续
+        exchange.fail_after = 1
+        try:
+            store.fill_range(exchange, "cmt_btcusdt", "15m", since)
+            assert False
+        except ConnectionError:
+            pass
+        assert store.count("cmt_btcusdt", "15m") == 10
+        exchange.fail_after = None
+        exchange.ranges.clear()
+        assert store.fill_range(exchange, "cmt_btcusdt", "15m", since) == 91
+        assert exchange.ranges == [(since + 9 * TF_MS, None)]
+
+        # 中间断档和开头缺失只补缺失的区间，最新一根连同之后的新K线重新拉取
+        store._conn.execute("DELETE FROM candles WHERE ts IN (?, ?, ?)",
+                            (since, since + 50 * TF_MS, since + 51 * TF_MS))
+        exchange.ranges.clear()
+        exchange.now_ms += 2 * TF_MS
+        assert store.fill_range(exchange, "cmt_btcusdt", "15m", since) == 6
+        assert exchange.ranges == [(since, since), (since + 50 * TF_MS, since + 51 * TF_MS), (current, None)]
+        ohlcv = store.load("cmt_btcusdt", "15m", since=since)
+        assert [c[0] for c in ohlcv] == list(range(since, current + 2 * TF_MS + 1, TF_MS))
+
+
+if __name__ == "__main__":
+    test_timeframe_to_ms()
+    test_backfill_then_delta()
+    test_serves_local_data_when_exchange_down()
+    test_fill_range_fetches_only_missing()
+    print("K线存储测试通过")
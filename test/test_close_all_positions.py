@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+测试并发平仓：多个交易对同时平仓、先撤销冲突的平仓计划委托、轮询持仓归零而不是固定等待（使用本地替身服务器）
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import close_all_positions
+from weex_async_sdk import AsyncWeexClient
+from weex_sdk import WeexClient
+from weex_stub_server import WeexStubServer
+
+SYMBOLS = ["cmt_btcusdt", "cmt_ethusdt", "cmt_solusdt", "cmt_dogeusdt"]
+# 市价平仓单成交后持仓延迟消失的时间（秒）
+SETTLE = 0.3
+
+
+class FakeExchange:
+    """
+    模拟持仓、市价平仓和计划委托；还有平仓计划委托时市价平仓会失败
+    numeric_types为True时计划委托类型按接口文档返回数字代码（3: 平多, 2: 开空）
+    """
+
+    def __init__(self, numeric_types=False):
+        self.lock = threading.Lock()
+        self.positions = {(symbol, "LONG"): 0.5 for symbol in SYMBOLS}
+        self.positions[("cmt_btcusdt", "SHORT")] = 0.2
+        self.settle_at = {}
+        self.plans = {"7001": {"symbol": "cmt_ethusdt", "order_id": "7001",
+                               "type": "3" if numeric_types else "CLOSE_LONG", "size": "0.5",
+                               "status": "UNTRIGGERED", "triggerPrice": "3000"},
+                      "7002": {"symbol": "cmt_ethusdt", "order_id": "7002",
+                               "type": "2" if numeric_types else "OPEN_SHORT", "size": "0.5",
+                               "status": "UNTRIGGERED", "triggerPrice": "2500"}}
+        self.conflicts = 0
+
+    def install(self, server):
+        server.add_route("GET", "/capi/v2/account/position/allPosition", self.all_position)
+        server.add_route("POST", "/capi/v2/order/placeOrder", self.place_order)
+        server.add_route("GET", "/capi/v2/order/currentPlan", self.current_plan)
+        server.add_route("POST", "/capi/v2/order/cancel_plan", self.cancel_plan)
+        server.add_route("GET", "/capi/v2/order/openOrders", [])
+
+    def all_position(self, method, path, query, body):
+        symbol = parse_qs(query).get("symbol", [None])[0]
+        now = time.monotonic()
+        with self.lock:
+            for key, at in list(self.settle_at.items()):
+                if now >= at:
+                    self.positions[key] = 0.0
+                    del self.settle_at[key]
+            return 200, [{"symbol": s, "side": side, "size": str(size), "leverage": "10"}
+                         for (s, side), size in self.positions.items() if size > 0 and symbol in (None, s)]
+
+    def place_order(self, method, path, query, body):
+        data = json.loads(body)
+        # SDK把reduce_only的sell映射为4，buy映射为3
+        side = "LONG" if data["type"] == "4" else "SHORT"
+        with self.lock:
+            if any(plan["symbol"] == data["symbol"] and plan["type"] in ("3", "4", "CLOSE_LONG", "CLOSE_SHORT")
+                   for plan in self.plans.values()):
+                self.conflicts += 1
+                return 400, {"code": "FAILED_PRECONDITION", "msg": "conflicting plan order"}
+            self.settle_at[(data["symbol"], side)] = time.monotonic() + SETTLE
+        return 200, {"order_id": f"9{len(self.settle_at)}", "client_oid": data["client_oid"]}
+
+    def current_plan(self, method, path, query, body):
+        symbol = parse_qs(query).get("symbol", [None])[0]
+        with self.lock:
+            return 200, [plan for plan in self.plans.values() if symbol in (None, plan["symbol"])]
+
+    def cancel_plan(self, method, path, query, body):
+        with self.lock:
+            self.plans.pop(json.loads(body)["orderId"], None)
+        return 200, {"result": True}
+
+
+def _flatten(parallel, delay=0.05, exchange=None):
+    exchange = exchange or FakeExchange()
+    with WeexStubServer(delay=delay) as server:
+        exchange.install(server)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        client.sync_time()
+        close_all_positions.client = client
+        try:
+            summary = close_all_positions.close_all_positions(parallel=parallel, timeout=5.0)
+        finally:
+            close_all_positions.client = None
+            client.close()
+    return summary, exchange
+
+
+def test_parallel_flatten():
+    summary, exchange = _flatten(parallel=True)
+    assert summary["flat"] and summary["total"] == 5 and summary["success"] == 5 and summary["failed"] == 0
+    assert not any(size > 0 for size in exchange.positions.values())
+    # 只撤销平仓类计划委托，开仓计划委托保留；撤销在下单之前完成，没有冲突
+    assert list(exchange.plans) == ["7002"] and exchange.conflicts == 0
+
+
+def test_numeric_plan_types():
+    """交易所返回数字类型代码时同样撤销平仓计划委托"""
+    summary, exchange = _flatten(parallel=True, exchange=FakeExchange(numeric_types=True))
+    assert summary["flat"] and summary["failed"] == 0
+    assert list(exchange.plans) == ["7002"] and exchange.conflicts == 0
+
+
+def test_parallel_is_faster_than_serial():
+    parallel, _ = _flatten(parallel=True)
+    serial, _ = _flatten(parallel=False)
+    print(f"4个交易对平仓耗时: 并发{parallel['elapsed']:.2f}秒，逐个{serial['elapsed']:.2f}秒")
+    assert parallel["flat"] and serial["flat"]
+    # 持仓在成交后SETTLE秒归零：逐个平仓至少要等4次，并发只需要等待约一次
+    assert serial["elapsed"] > SETTLE * 4
+    assert parallel["elapsed"] < serial["elapsed"] * 0.6
+    # 旧实现在每个持仓之间固定等待2秒
+    assert parallel["elapsed"] < 2.0
+
+
+def test_no_positions():
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/account/position/allPosition", [])
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        close_all_positions.client = client
+        try:
+            summary = close_all_positions.close_all_positions()
+        finally:
+            close_all_positions.client = None
+            client.close()
+    assert summary["flat"] and summary["total"] == 0
+
+
+def test_failed_listing_is_not_flat():
+    """第一次查询持仓失败时不能报告为已平仓"""
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/account/position/allPosition", {"code": "40001", "msg": "denied"}, status=403)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        close_all_positions.client = client
+        try:
+            summary = close_all_positions.close_all_positions()
+        finally:
+            close_all_positions.client = None
+            client.close()
+    assert not summary["flat"] and summary["total"] == 0
+
+
+def test_public_queries_raise_on_failure():
+    """平仓脚本使用的持仓/未完成订单查询：只返回数量大于0的持仓，失败时抛出异常（同步和异步客户端一致）"""
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/account/position/allPosition",
+                         [{"symbol": "cmt_btcusdt", "side": "LONG", "size": "0.5"},
+                          {"symbol": "cmt_ethusdt", "side": "LONG", "size": "0"}])
+        server.add_route("GET", "/capi/v2/order/openOrders", {"code": "40001", "msg": "denied"}, status=403)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        assert [position["symbol"] for position in client.fetch_open_positions()] == ["cmt_btcusdt"]
+        try:
+            client.fetch_open_order_ids("cmt_btcusdt")
+            raise AssertionError("expected an exception")
+        except AssertionError:
+            raise
+        except Exception:
+            pass
+        client.close()
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass", rate_limits={}) as async_client:
+                async_client.base_url = server.base_url
+                positions = await async_client.fetch_open_positions("cmt_btcusdt")
+                try:
+                    await async_client.fetch_open_order_ids()
+                except Exception as e:
+                    return positions, e
+                return positions, None
+
+        positions, error = asyncio.run(run())
+    assert len(positions) == 1 and positions[0]["size"] == 0.5 and error is not None
+
+
+if __name__ == "__main__":
+    test_parallel_flatten()
+    test_numeric_plan_types()
+    test_parallel_is_faster_than_serial()
+    test_no_positions()
+    test_failed_listing_is_not_flat()
+    test_public_queries_raise_on_failure()
+    print("并发平仓测试通过")
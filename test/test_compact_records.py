@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+测试紧凑的持仓和订单记录：与原来的字典格式一致、原始数据按需保留、内存占用明显更低（使用本地替身服务器）
+"""
+
+import asyncio
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_async_sdk import AsyncWeexClient
+from weex_records import (PLAN_ORDER_DETAIL_TYPE_NAMES, PLAN_ORDER_STATUS_NAMES, PLAN_ORDER_TYPE_NAMES, CurrentPlanOrder,
+                          plan_order_type)
+from weex_sdk import WeexClient, dumps_json, loads_json
+from weex_stub_server import WeexStubServer
+
+POSITIONS = [
+    {"id": 1, "symbol": "cmt_btcusdt", "side": "LONG", "size": "0.01", "open_value": "690", "leverage": "10",
+     "unrealizePnl": "1.5", "liquidatePrice": "60000", "margin_mode": "SHARED", "updated_time": "1716707460000"},
+    {"id": 2, "symbol": "cmt_ethusdt", "side": "SHORT", "size": "0", "open_value": "0", "margin_mode": "ISOLATED"},
+]
+PLAN_ORDERS = [
+    {"symbol": "cmt_btcusdt", "size": "0.01", "client_oid": "tiersl_1", "createTime": "1716707460000",
+     "filled_qty": "0", "fee": "0", "order_id": "1001", "price": "0", "status": "UNTRIGGERED",
+     "type": "CLOSE_LONG", "order_type": "NORMAL", "totalProfits": "0", "triggerPrice": "65000.5",
+     "triggerPriceType": "MARK", "triggerTime": "", "presetTakeProfitPrice": "", "presetStopLossPrice": "60000"},
+    {"symbol": "cmt_ethusdt", "size": "0.5", "order_id": "1002", "price": "3500", "price_avg": "3499.5",
+     "status": "SOMETHING_NEW", "type": "OPEN_SHORT"},
+]
+
+
+def _history_orders(n):
+    return [{"symbol": "cmt_btcusdt", "size": "0.01", "client_oid": "oid_%d" % i, "createTime": 1716595200000 + i,
+             "filled_qty": "0.01", "fee": "0.0345", "order_id": str(5716595202300 + i), "price": "65000",
+             "price_avg": "65001.5", "status": "filled", "type": "open_long", "order_type": "normal",
+             "totalProfits": "0", "contracts": 10} for i in range(n)]
+
+
+def _legacy_position(pos):
+    # 原来_format_positions生成的字典
+    return {
+        "id": pos.get("id", ""),
+        "symbol": pos.get("symbol", ""),
+        "side": "long" if pos.get("side") == "LONG" else "short",
+        "size": float(pos.get("size", 0)),
+        "entryPrice": float(pos.get("open_value", 0)) / float(pos.get("size", 1)) if float(pos.get("size", 0)) > 0 else 0,
+        "leverage": float(pos.get("leverage", 1)),
+        "unrealizedPnl": float(pos.get("unrealizePnl", 0)),
+        "liquidationPrice": float(pos.get("liquidatePrice", 0)),
+        "marginMode": "isolated" if pos.get("margin_mode") == "ISOLATED" else "cross",
+        "timestamp": pos.get("updated_time", 0),
+        "info": pos,
+    }
+
+
+def _legacy_plan_order(order):
+    # 原来_format_current_plan_orders生成的字典
+    formatted = {
+        "symbol": order.get("symbol", ""),
+        "size": float(order.get("size", 0.0)),
+        "client_oid": order.get("client_oid", ""),
+        "create_time": order.get("createTime", ""),
+        "filled_qty": float(order.get("filled_qty", 0.0)),
+        "fee": float(order.get("fee", 0.0)),
+        "order_id": order.get("order_id", ""),
+        "price": float(order.get("price", 0.0)),
+        "price_avg": float(order.get("price_avg", 0.0)) if order.get("price_avg") else None,
+        "status": PLAN_ORDER_STATUS_NAMES.get(order.get("status"), "未知"),
+        "status_code": order.get("status"),
+        "type": PLAN_ORDER_TYPE_NAMES.get(order.get("type"), "未知"),
+        "type_code": order.get("type"),
+        "order_type": PLAN_ORDER_DETAIL_TYPE_NAMES.get(order.get("order_type"), "未知"),
+        "order_type_code": order.get("order_type"),
+        "totalProfits": float(order.get("totalProfits", 0.0)),
+        "triggerPrice": float(order.get("triggerPrice", 0.0)) if order.get("triggerPrice") else None,
+        "triggerPriceType": order.get("triggerPriceType", ""),
+        "triggerTime": order.get("triggerTime", ""),
+        "presetTakeProfitPrice": float(order.get("presetTakeProfitPrice", 0.0)) if order.get("presetTakeProfitPrice") else None,
+        "presetStopLossPrice": float(order.get("presetStopLossPrice", 0.0)) if order.get("presetStopLossPrice") else None,
+    }
+    formatted["order_value"] = round(formatted["price"] * formatted["size"], 8)
+    return formatted
+
+
+def _make_server(history):
+    server = WeexStubServer()
+    server.add_route("GET", "/capi/v2/account/position/allPosition", POSITIONS)
+    server.add_route("GET", "/capi/v2/order/currentPlan", PLAN_ORDERS)
+    server.add_route("GET", "/capi/v2/order/history", history)
+    return server
+
+
+def test_records_match_legacy_dicts():
+    history = _history_orders(3) + [{"order_id": "1", "price": "1", "undocumented": [1, 2]}]
+    with _make_server(history) as server:
+        for keep_raw in (False, True):
+            client = WeexClient("key", "secret", "pass", rate_limits={}, keep_raw=keep_raw)
+            client.base_url = server.base_url
+            positions = client.fetch_positions()
+            plan_orders = client.getCurrentPlanOrders()["orders"]
+            history_orders = client.get_history_orders()["orders"]
+            client.close()
+
+            expected = [_legacy_position(pos) for pos in POSITIONS]
+            if not keep_raw:
+                for position in expected:
+                    del position["info"]
+            assert positions == expected
+            assert [dict(position) for position in positions] == expected
+            assert list(positions[0]) == list(expected[0])
+            expected = [_legacy_plan_order(order) for order in PLAN_ORDERS]
+            if keep_raw:
+                for formatted, order in zip(expected, PLAN_ORDERS):
+                    formatted["info"] = order
+            assert plan_orders == expected
+            assert plan_orders[1]["status"] == "未知" and plan_orders[1]["order_value"] == 1750.0
+            # 历史订单按键读取与原始字典完全一致，包括文档之外的字段
+            assert history_orders == history
+            assert "info" not in history_orders[0] and "contracts" not in history_orders[-1]
+            assert history_orders[-1]["undocumented"] == [1, 2]
+
+            # 属性读取
+            assert positions[0].entryPrice == 69000.0 and positions[1].side == "short"
+            assert plan_orders[0].triggerPrice == 65000.5 and plan_orders[0].type_code == "CLOSE_LONG"
+            assert history_orders[0].price == 65000.0 and history_orders[0].status == "filled"
+            assert history_orders[-1].size is None
+
+            # 原始数据只在keep_raw时保留
+            assert (positions[0].info is not None) == keep_raw
+            assert (plan_orders[0].info == PLAN_ORDERS[0]) == keep_raw == ("info" in plan_orders[0])
+            assert (history_orders[0].info == history[0]) == keep_raw
+            assert loads_json(dumps_json({"positions": positions}))["positions"][0]["size"] == 0.01
+
+
+def test_async_client_returns_same_records():
+    with _make_server(_history_orders(2)) as server:
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        expected = (client.fetch_positions(), client.getCurrentPlanOrders(), client.get_history_orders())
+        client.close()
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass") as async_client:
+                async_client.base_url = server.base_url
+                return (await async_client.fetch_positions(), await async_client.getCurrentPlanOrders(),
+                        await async_client.get_history_orders())
+
+        assert asyncio.run(run()) == expected
+
+
+def _retained(build, payload):
+    # 解析响应并格式化，原始响应释放后仍占用的内存
+    tracemalloc.start()
+    rows = build(loads_json(payload))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, rows
+
+
+def test_numeric_plan_order_types():
+    """接口文档中的数字类型代码与英文代码统一"""
+    assert plan_order_type("3") == plan_order_type("CLOSE_LONG") == "CLOSE_LONG"
+    assert plan_order_type(6) == "PARTIAL_CLOSE_SHORT"
+    assert plan_order_type(None) is None and plan_order_type("99") is None
+    order = CurrentPlanOrder({"symbol": "cmt_btcusdt", "type": "4", "order_id": "1"})
+    assert order["type"] == "平空" and order["type_code"] == "4"
+
+
+def test_memory_is_lower():
+    client = WeexClient("key", "secret", "pass", rate_limits={})
+    history = dumps_json(_history_orders(5000))
+    plan_orders = dumps_json(PLAN_ORDERS[:1] * 5000)
+
+    legacy_history, rows = _retained(lambda response: response, history)
+    compact_history, rows = _retained(lambda response: client._format_history_orders(response)["orders"], history)
+    legacy_plan, rows = _retained(lambda response: [_legacy_plan_order(order) for order in response], plan_orders)
+    compact_plan, rows = _retained(lambda response: client._format_current_plan_orders(response)["orders"],
+                                   plan_orders)
+    client.close()
+    print(f"5000条历史订单: 原始字典{legacy_history / 1024:.0f}KB，紧凑记录{compact_history / 1024:.0f}KB")
+    print(f"5000条计划订单: 格式化字典{legacy_plan / 1024:.0f}KB，紧凑记录{compact_plan / 1024:.0f}KB")
+    assert compact_history < legacy_history * 0.6
+    assert compact_plan < legacy_plan * 0.6
+
+
+if __name__ == "__main__":
+    test_records_match_legacy_dicts()
+    test_async_client_returns_same_records()
+    test_numeric_plan_order_types()
+    test_memory_is_lower()
+    print("紧凑记录测试通过")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试WeexClient的连接池复用、空闲回收和生命周期（使用本地替身服务器）
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_sdk import WeexClient
+from weex_stub_server import WeexStubServer
+
+CANDLES = [["1716707460000", "69174.3", "69174.4", "69174.1", "69174.3", "0", "0.011"]]
+
+
+def test_connection_reuse():
+    """连续请求只应建立一次连接"""
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/candles", CANDLES)
+        with WeexClient("key", "secret", "pass") as client:
+            client.base_url = server.base_url
+            for _ in range(5):
+                assert client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1)
+
+            stats = client.pool_stats()
+            print(f"连接池统计: {stats}")
+            assert stats["requests"] == 5
+            assert stats["misses"] == 1
+            assert stats["hits"] == 4
+
+
+def test_idle_eviction():
+    """空闲超时后应回收连接池，统计仍然累计"""
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/candles", CANDLES)
+        client = WeexClient("key", "secret", "pass", pool_idle_timeout=0.05)
+        client.base_url = server.base_url
+
+        client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1)
+        time.sleep(0.1)
+        client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1)
+
+        stats = client.pool_stats()
+        print(f"连接池统计: {stats}")
+        assert stats["idle_evictions"] == 1
+        assert stats["requests"] == 2
+        assert stats["misses"] == 2
+        client.close()
+
+
+def test_close_releases_session():
+    """close之后再次请求会重建连接池"""
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/candles", CANDLES)
+        client = WeexClient("key", "secret", "pass")
+        client.base_url = server.base_url
+        client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1)
+        client.close()
+        assert client._session is None
+        client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1)
+        assert client.pool_stats()["misses"] == 2
+        client.close()
+
+
+if __name__ == "__main__":
+    test_connection_reuse()
+    test_idle_eviction()
+    test_close_releases_session()
+    print("连接池测试通过")
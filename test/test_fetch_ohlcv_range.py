@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+测试分页获取历史K线：按窗口并发请求、有序逐块返回、去重并报告缺口（使用本地替身服务器）
+"""
+
+import os
+import sys
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from weex_sdk import WeexClient, timeframe_to_ms
+from weex_stub_server import WeexStubServer
+
+TF_MS = timeframe_to_ms("15m")
+START = 1700000000000 - 1700000000000 % TF_MS
+COUNT = 2000
+# 交易所缺失的K线
+MISSING = set(range(START + 500 * TF_MS, START + 503 * TF_MS, TF_MS))
+
+
+def _candles_route(method, path, query, body):
+    params = {key: values[0] for key, values in parse_qs(query).items()}
+    start, end, limit = int(params["startTime"]), int(params["endTime"]), int(params["limit"])
+    # 多返回前一根K线，模拟交易所按闭区间返回导致的窗口重叠
+    first = max(start - TF_MS, START)
+    candles = [[str(ts), "1", "2", "0.5", str(ts % 997), "0", "3"]
+               for ts in range(first, min(end, START + (COUNT - 1) * TF_MS) + 1, TF_MS) if ts not in MISSING]
+    # 和WEEX一样按时间倒序返回
+    return 200, list(reversed(candles[:limit + 1]))
+
+
+def _make_client(server):
+    client = WeexClient("key", "secret", "pass", rate_limits={})
+    client.base_url = server.base_url
+    return client
+
+
+def test_range_is_ordered_deduped_and_reports_gaps():
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/candles", _candles_route)
+        client = _make_client(server)
+        gaps = []
+        chunks = list(client.fetch_ohlcv_range("cmt_btcusdt", "15m", START, START + (COUNT - 1) * TF_MS,
+                                               concurrency=3, window_limit=300,
+                                               on_gap=lambda a, b: gaps.append((a, b))))
+        client.close()
+
+        data = np.concatenate(chunks)
+        timestamps = data[:, 0].astype(np.int64)
+        print(f"共{len(chunks)}块，{len(data)}条K线，缺口: {gaps}")
+        assert len(chunks) == 7
+        assert all(chunk.shape[1] == 6 for chunk in chunks)
+        assert (np.diff(timestamps) > 0).all()
+        assert len(timestamps) == COUNT - len(MISSING)
+        assert gaps == [(START + 500 * TF_MS, START + 502 * TF_MS)]
+        windows = [r for r in server.requests if r["path"] == "/capi/v2/market/candles"]
+        assert len(windows) == 7
+
+
+def test_range_as_dataframe():
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/candles", _candles_route)
+        client = _make_client(server)
+        # 开始时间不在周期边界上时，从下一根K线开始
+        chunks = list(client.fetch_ohlcv_range("cmt_btcusdt", "15m", START + 1, START + 99 * TF_MS,
+                                               window_limit=40, as_frame=True))
+        client.close()
+
+        assert [len(chunk) for chunk in chunks] == [39, 40, 20]
+        assert list(chunks[0].columns) == ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+        assert chunks[0]['timestamp'].iloc[0] == START + TF_MS
+        assert str(chunks[0]['timestamp'].dtype) == 'int64'
+
+
+if __name__ == "__main__":
+    test_range_is_ordered_deduped_and_reports_gaps()
+    test_range_as_dataframe()
+    print("分页K线测试通过")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+测试增量指标引擎与pandas版calculate_technical_indicators_pandas逐值一致
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATOR_COLUMNS, IncrementalIndicators, calculate_technical_indicators_pandas
+
+TF_MS = 15 * 60 * 1000
+
+
+def _make_ohlcv(n=400, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 50, n))
+    # 横盘和成交量不变的区间（标准差为0、窗口内全是相同值）
+    close[100:125] = close[100]
+    high = close + rng.random(n) * 30
+    low = close - rng.random(n) * 30
+    volume = rng.random(n) * 100
+    volume[200:230] = 5.0
+    return [[1700000000000 + i * TF_MS, close[i], high[i], low[i], close[i], volume[i]] for i in range(n)]
+
+
+def _pandas_raw(ohlcv):
+    """pandas版本的原始指标（不做bfill/ffill），用于比较窗口未满时的NaN位置"""
+    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    bfill, ffill = pd.DataFrame.bfill, pd.DataFrame.ffill
+    pd.DataFrame.bfill = pd.DataFrame.ffill = lambda self, *args, **kwargs: self
+    try:
+        return calculate_technical_indicators_pandas(df)
+    finally:
+        pd.DataFrame.bfill, pd.DataFrame.ffill = bfill, ffill
+
+
+def test_matches_pandas_bit_for_bit():
+    ohlcv = _make_ohlcv()
+    expected = _pandas_raw(ohlcv)
+    engine = IncrementalIndicators()
+    rows = [engine.update(candle) for candle in ohlcv]
+    for column in INDICATOR_COLUMNS:
+        actual = np.array([row[column] for row in rows])
+        np.testing.assert_array_equal(actual, expected[column].to_numpy(), err_msg=column)
+
+
+def test_latest_matches_filled_last_row():
+    ohlcv = _make_ohlcv()[:120]
+    expected = calculate_technical_indicators_pandas(pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']))
+    latest = IncrementalIndicators.from_ohlcv(ohlcv).latest()
+    for column in INDICATOR_COLUMNS:
+        assert latest[column] == expected[column].iloc[-1], column
+
+
+def test_open_candle_updates_replace_last():
+    """同一时间戳的K线再次传入时替换最新K线，结果与直接用最终值计算一致"""
+    ohlcv = _make_ohlcv()[:80]
+    engine = IncrementalIndicators.from_ohlcv(ohlcv[:-1])
+    last = list(ohlcv[-1])
+    for price in (last[4] + 300, last[4] - 500, last[4]):
+        engine.update([last[0], last[1], max(last[2], price), min(last[3], price), price, last[5]])
+    engine.update(last)
+    fresh = IncrementalIndicators.from_ohlcv(ohlcv)
+    assert engine.count == fresh.count == len(ohlcv)
+    np.testing.assert_array_equal([engine.values[c] for c in INDICATOR_COLUMNS],
+                                  [fresh.values[c] for c in INDICATOR_COLUMNS])
+
+
+def test_rsi_wilder():
+    ohlcv = _make_ohlcv()[:100]
+    closes = pd.Series([c[4] for c in ohlcv])
+    delta = closes.diff().dropna()
+    avg_gain = delta.clip(lower=0).iloc[:14].mean()
+    avg_loss = (-delta.clip(upper=0)).iloc[:14].mean()
+    for g, l in zip(delta.clip(lower=0).iloc[14:], (-delta.clip(upper=0)).iloc[14:]):
+        avg_gain = (avg_gain * 13 + g) / 14
+        avg_loss = (avg_loss * 13 + l) / 14
+    expected = 100 - 100 / (1 + avg_gain / avg_loss)
+    assert abs(IncrementalIndicators.from_ohlcv(ohlcv).values['rsi_wilder'] - expected) < 1e-9
+
+
+if __name__ == "__main__":
+    test_matches_pandas_bit_for_bit()
+    test_latest_matches_filled_last_row()
+    test_open_candle_updates_replace_last()
+    test_rsi_wilder()
+    print("增量指标测试通过")
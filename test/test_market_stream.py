@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+测试行情推送订阅：通过本地回放服务器验证推送接收、序号缺口检测与重新订阅、断线重连
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_replay_server import ReplayServer, candle_ticks
+from weex_sdk import RetryPolicy
+from weex_stream import MarketStream, StreamTransport
+
+SYMBOL = "cmt_btcusdt"
+FAST_RECONNECT = RetryPolicy(base_delay=0.05, max_delay=0.1)
+
+
+def _make_ohlcv(n=50):
+    ohlcv = []
+    price = 60000.0
+    for i in range(n):
+        close = price + (15 if i % 3 else -10)
+        ohlcv.append([1700000000000 + i * 60000, price, max(price, close) + 5, min(price, close) - 5, close, 1.0 + i])
+        price = close
+    return ohlcv
+
+
+def _collect(server, **kwargs):
+    """订阅ticker和K线，等待回放结束，返回(stream, 收到的价格, 收到的K线)"""
+    prices, candles = [], []
+    done = threading.Event()
+
+    def on_candle(channel, symbol, data):
+        candles.append(data)
+        if data[0] == server.ohlcv[-1][0]:
+            done.set()
+
+    stream = MarketStream(server.url, reconnect_policy=FAST_RECONNECT, **kwargs)
+    stream.subscribe("ticker", SYMBOL, lambda channel, symbol, data: prices.append(data["last"]))
+    stream.subscribe("candle1m", SYMBOL, on_candle)
+    stream.start()
+    assert done.wait(10), "回放未在10秒内完成"
+    stream.stop()
+    return stream, prices, candles
+
+
+def test_receives_ticks_and_candles():
+    ohlcv = _make_ohlcv()
+    with ReplayServer(ohlcv, symbol=SYMBOL) as server:
+        stream, prices, candles = _collect(server)
+    assert candles == ohlcv
+    assert prices == [price for candle in ohlcv for price in candle_ticks(candle)]
+    assert stream.latest_price(SYMBOL) == ohlcv[-1][4]
+    assert stream.latest_candle("candle1m", SYMBOL) == ohlcv[-1]
+    assert stream.stats()["gaps"] == 0
+
+
+def test_sequence_gap_triggers_resubscribe():
+    ohlcv = _make_ohlcv()
+    gaps = []
+    with ReplayServer(ohlcv, symbol=SYMBOL, drop={10}) as server:
+        stream, prices, candles = _collect(server, on_gap=lambda *gap: gaps.append(gap))
+        subscribes = [m for m in server.received if m.get("event") == "subscribe"]
+    assert candles == ohlcv[:10] + ohlcv[11:]
+    # ticker每根K线4条，K线频道每根1条
+    assert ("ticker", SYMBOL, 41, 45) in gaps
+    assert ("candle1m", SYMBOL, 11, 12) in gaps
+    assert stream.stats()["gaps"] == 2
+    # 初次订阅2个频道，缺口后各重新订阅一次
+    assert len(subscribes) == 4
+
+
+def test_reconnect_resumes_stream():
+    ohlcv = _make_ohlcv()
+    with ReplayServer(ohlcv, symbol=SYMBOL, disconnect_after=20) as server:
+        stream, prices, candles = _collect(server)
+        connections = server.connections
+    assert connections == 2
+    assert candles == ohlcv
+    stats = stream.stats()
+    assert stats["connects"] == 2 and stats["disconnects"] == 2 and stats["gaps"] == 0
+
+
+def test_wait_for_update_and_staleness():
+    ohlcv = _make_ohlcv(5)
+    with ReplayServer(ohlcv, symbol=SYMBOL, interval=0.05) as server:
+        with MarketStream(server.url, reconnect_policy=FAST_RECONNECT) as stream:
+            stream.subscribe("ticker", SYMBOL)
+            assert stream.wait_for_update(SYMBOL, timeout=5)
+            assert stream.latest_price(SYMBOL) is not None
+            server.finished.wait(5)
+            time.sleep(0.1)
+            assert stream.latest_price(SYMBOL) == ohlcv[-1][4]
+            assert stream.latest_price(SYMBOL, max_age=0.05) is None
+            assert not stream.wait_for_update(SYMBOL, timeout=0.1)
+
+
+class _ScriptedTransport(StreamTransport):
+    """按脚本返回消息的传输层，脚本用完后一直超时（模拟连接假死）"""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    def connect(self):
+        pass
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def recv(self, timeout):
+        if self.messages:
+            return self.messages.pop(0)
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+
+def test_pluggable_transport_idle_reconnect():
+    """自定义传输层：长时间没有消息时重连并重新订阅"""
+    transports = []
+
+    def factory():
+        transport = _ScriptedTransport([
+            {"event": "subscribed", "channel": "ticker", "symbol": SYMBOL, "seq": 7},
+            {"event": "push", "channel": "ticker", "symbol": SYMBOL, "seq": 8, "data": {"ts": 1, "last": 65000.5}},
+        ])
+        transports.append(transport)
+        return transport
+
+    stream = MarketStream(transport_factory=factory, reconnect_policy=FAST_RECONNECT, idle_timeout=0.2,
+                          ping_interval=0.05)
+    stream.subscribe("ticker", SYMBOL)
+    stream.start()
+    deadline = time.time() + 5
+    while len(transports) < 2 and time.time() < deadline:
+        time.sleep(0.05)
+    stream.stop()
+    assert len(transports) >= 2
+    assert stream.latest_price(SYMBOL) == 65000.5
+    assert {"event": "subscribe", "channel": "ticker", "symbol": SYMBOL} in transports[1].sent
+    assert {"event": "ping"} in transports[0].sent
+    assert stream.stats()["gaps"] == 0
+
+
+if __name__ == "__main__":
+    test_receives_ticks_and_candles()
+    test_sequence_gap_triggers_resubscribe()
+    test_reconnect_resumes_stream()
+    test_wait_for_update_and_staleness()
+    test_pluggable_transport_idle_reconnect()
+    print("行情推送测试通过")
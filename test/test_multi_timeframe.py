@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+测试多周期流水线：由1分钟K线聚合的各周期K线和指标与直接按周期计算的结果一致
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATOR_COLUMNS, IncrementalIndicators
+from multi_timeframe import BarResampler, MultiTimeframePipeline, generate_multi_timeframe_text
+
+MINUTE_MS = 60 * 1000
+# 从非整点开始，第一根4h/1h K线不完整
+START = 1700000000000 + 7 * MINUTE_MS
+
+
+def _make_minutes(n=3 * 24 * 60, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 10, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) + rng.random(n) * 5
+    low = np.minimum(open_, close) - rng.random(n) * 5
+    volume = rng.random(n) * 3
+    return [[START + i * MINUTE_MS, open_[i], high[i], low[i], close[i], volume[i]] for i in range(n)]
+
+
+def _resample(ohlcv, timeframe):
+    """用pandas按周期聚合，作为对照"""
+    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df.index = pd.to_datetime(df['timestamp'], unit='ms')
+    bars = df.resample(pd.Timedelta(timeframe.replace('m', 'min'))).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+    timestamps = bars.index.as_unit('ms').asi8
+    return [[int(ts), *row] for ts, row in zip(timestamps, bars.to_numpy().tolist())]
+
+
+def test_bars_and_indicators_match_direct_computation():
+    minutes = _make_minutes()
+    pipeline = MultiTimeframePipeline.from_ohlcv(minutes, history=1000)
+    for tf in pipeline.timeframes:
+        expected_bars = _resample(minutes, tf)
+        actual_bars = pipeline.bars(tf)
+        assert [b[0] for b in actual_bars] == [b[0] for b in expected_bars], tf
+        np.testing.assert_allclose(np.array(actual_bars)[:, 1:], np.array(expected_bars)[:, 1:], rtol=1e-12,
+                                   err_msg=tf)
+        direct = IncrementalIndicators.from_ohlcv(actual_bars)
+        assert pipeline.bar_count(tf) == len(expected_bars)
+        np.testing.assert_array_equal([pipeline.latest(tf)[c] for c in INDICATOR_COLUMNS],
+                                      [direct.latest()[c] for c in INDICATOR_COLUMNS], err_msg=tf)
+
+
+def test_open_minute_revisions():
+    """未收盘的1分钟K线重复更新后，结果与只传最终值一致"""
+    minutes = _make_minutes(600)
+    pipeline = MultiTimeframePipeline.from_ohlcv(minutes[:-1])
+    last = minutes[-1]
+    for price in (last[4] + 80, last[4] - 120):
+        pipeline.update([last[0], last[1], max(last[2], price), min(last[3], price), price, last[5] / 2])
+    pipeline.update(last)
+    fresh = MultiTimeframePipeline.from_ohlcv(minutes)
+    assert pipeline.count == fresh.count == len(minutes)
+    for tf in pipeline.timeframes:
+        assert pipeline.bars(tf) == fresh.bars(tf), tf
+        np.testing.assert_array_equal([pipeline.latest(tf)[c] for c in INDICATOR_COLUMNS],
+                                      [fresh.latest(tf)[c] for c in INDICATOR_COLUMNS], err_msg=tf)
+
+
+def test_update_many_skips_overlap():
+    minutes = _make_minutes(300)
+    pipeline = MultiTimeframePipeline.from_ohlcv(minutes[:200])
+    # 与已处理部分重叠的K线被跳过，最后一根已处理的K线按更新处理
+    assert pipeline.update_many(minutes[150:]) == 101
+    assert pipeline.bars('5m') == MultiTimeframePipeline.from_ohlcv(minutes).bars('5m')
+
+
+def test_invalid_input():
+    try:
+        BarResampler('7m', '5m')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("7m不是5m的整数倍，应该报错")
+
+    pipeline = MultiTimeframePipeline.from_ohlcv(_make_minutes(10))
+    try:
+        pipeline.update(_make_minutes(10)[3])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("早于最新K线的数据应该报错")
+
+
+def test_prompt_text():
+    pipeline = MultiTimeframePipeline(['15m', '4h'])
+    assert "暂不可用" in generate_multi_timeframe_text(pipeline)
+    pipeline.update_many(_make_minutes(24 * 60))
+    text = generate_multi_timeframe_text(pipeline)
+    print(text)
+    assert "15m" in text and "4h" in text and "RSI" in text
+
+
+if __name__ == "__main__":
+    test_bars_and_indicators_match_direct_computation()
+    test_open_minute_revisions()
+    test_update_many_skips_overlap()
+    test_invalid_input()
+    test_prompt_text()
+    print("多周期流水线测试通过")
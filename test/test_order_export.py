@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+测试订单流式导出：各格式内容与原始记录一致、按块写入时内存不随记录数增长、可以直接导出分页迭代器（使用本地替身服务器）
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import order_export
+from fetch_order_history import save_orders_to_file
+from order_export import export_format, export_records
+from weex_sdk import WeexClient
+from weex_stub_server import WeexStubServer
+
+BASE_TIME = 1716595200000
+
+
+def _raw_orders(count):
+    for i in range(count):
+        yield {"symbol": "cmt_btcusdt", "order_id": str(1000 + i), "client_oid": f"ai_{i}",
+               "createTime": BASE_TIME + i * 1000, "price": "65000.5", "size": "0.01", "filled_qty": "0.01",
+               "fee": "0.5", "status": "filled", "type": "open_long", "order_type": "normal",
+               "totalProfits": str(i % 7 - 3)}
+
+
+def _history_orders(count):
+    client = WeexClient("key", "secret", "pass", rate_limits={})
+    return client._format_history_orders(list(_raw_orders(count)))["orders"]
+
+
+def test_formats_round_trip():
+    orders = _history_orders(23)
+    expected = [{key: value for key, value in order.items() if key != "info"} for order in orders]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in ("orders.jsonl", "orders.json", "orders.csv"):
+            path = os.path.join(tmpdir, name)
+            assert export_records(iter(orders), path, chunk_size=5) == 23
+            with open(path, encoding="utf-8") as f:
+                if name.endswith(".jsonl"):
+                    rows = [json.loads(line) for line in f]
+                elif name.endswith(".json"):
+                    rows = json.load(f)
+                else:
+                    rows = list(csv.DictReader(f))
+                    # CSV的列为历史订单的全部字段，接口没有返回的字段留空
+                    expected_rows = [{key: "" if row.get(key) is None else str(row[key])
+                                      for key in orders[0].field_names()} for row in expected]
+                    assert rows == expected_rows
+                    continue
+            assert rows == expected, name
+
+        # 指定列和空输入
+        path = os.path.join(tmpdir, "subset.csv")
+        export_records(orders, path, columns=["order_id", "status"])
+        with open(path, encoding="utf-8") as f:
+            assert f.readline().strip() == "order_id,status"
+        assert export_records([], os.path.join(tmpdir, "empty.json")) == 0
+        with open(os.path.join(tmpdir, "empty.json"), encoding="utf-8") as f:
+            assert json.load(f) == []
+
+
+def test_columnar_formats():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "orders.parquet")
+        if order_export.pa is None:
+            try:
+                export_records(_history_orders(3), path)
+                raise AssertionError("expected ImportError")
+            except ImportError:
+                return
+        import pyarrow.parquet as pq
+        orders = _history_orders(50)
+        assert export_records(orders, path, chunk_size=16) == 50
+        assert pq.read_table(path).column("order_id").to_pylist() == [order["order_id"] for order in orders]
+        import pyarrow as pa
+        path = os.path.join(tmpdir, "orders.arrow")
+        export_records(orders, path, chunk_size=16)
+        with pa.ipc.open_file(path) as reader:
+            assert reader.read_all().num_rows == 50
+
+
+def test_format_detection():
+    assert export_format("a/b.CSV") == "csv" and export_format("x.ndjson") == "jsonl"
+    assert export_format("x.feather") == "arrow"
+    try:
+        export_format("orders.xlsx")
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+def test_memory_is_bounded():
+    """导出的峰值内存由块大小决定，和记录总数无关"""
+    client = WeexClient("key", "secret", "pass", rate_limits={})
+
+    def records(count):
+        for i in range(0, count, 1000):
+            yield from client._format_history_orders(list(_raw_orders(1000)))["orders"]
+
+    peaks = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for count in (10000, 50000):
+            tracemalloc.start()
+            export_records(records(count), os.path.join(tmpdir, "orders.jsonl"), chunk_size=2000)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    print(f"导出1万/5万条订单的峰值内存: {peaks[0] / 1e6:.1f}MB / {peaks[1] / 1e6:.1f}MB")
+    assert peaks[1] < peaks[0] * 1.5
+
+
+def test_missing_keys_in_first_record():
+    """第一条记录缺少的字段不会从整个CSV中丢失"""
+    raw = list(_raw_orders(3))
+    del raw[0]["totalProfits"], raw[0]["client_oid"]
+    raw[2]["price_avg"] = "65001"
+    client = WeexClient("key", "secret", "pass", rate_limits={})
+    orders = client._format_history_orders(raw)["orders"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "orders.csv")
+        assert export_records(orders, path, chunk_size=2) == 3
+        with open(path, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    assert rows[0]["totalProfits"] == "" and rows[0]["client_oid"] == ""
+    assert rows[1]["totalProfits"] == "-2" and rows[1]["client_oid"] == "ai_1"
+    assert rows[2]["price_avg"] == "65001"
+
+
+def test_stream_from_iterator():
+    plan_orders = [{"orderId": str(2000 + i), "symbol": "cmt_btcusdt", "delegateType": 3, "price": "60000",
+                    "volume": "0.01", "status": 3, "createTime": BASE_TIME + i * 1000, "triggerPrice": "60000"}
+                   for i in range(120)]
+
+    def plan_history(method, path, query, body):
+        # 按结束时间过滤，从新到旧返回一页
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        end, size = int(params.get("endTime", 2 ** 62)), int(params.get("pageSize", 100))
+        matched = [order for order in reversed(plan_orders) if order["createTime"] <= end]
+        return 200, {"list": matched[:size], "nextPage": len(matched) > size}
+
+    with WeexStubServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+        server.add_route("GET", "/capi/v2/order/historyPlan", plan_history)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        path = os.path.join(tmpdir, "plan.csv")
+        assert save_orders_to_file(client.iter_order_history("cmt_btcusdt", page_size=50), path) == 120
+        client.close()
+        with open(path, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    assert [row["order_id"] for row in rows] == [order["orderId"] for order in reversed(plan_orders)]
+    assert rows[0]["status"] == "已撤销" and float(rows[0]["order_value"]) == 600.0
+
+
+if __name__ == "__main__":
+    test_formats_round_trip()
+    test_columnar_formats()
+    test_format_detection()
+    test_memory_is_bounded()
+    test_missing_keys_in_first_record()
+    test_stream_from_iterator()
+    print("订单导出测试通过")
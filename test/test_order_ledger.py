@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+测试本地订单账本：首次全量同步，之后按高水位只拉取增量；未终结订单的状态变化会被同步；报表在本地查询（使用本地替身服务器）
+"""
+
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_ledger import OrderLedger, signal_from_client_oid
+from weex_sdk import WeexClient
+from weex_stub_server import WeexStubServer
+
+DAY = 86400 * 1000
+BASE_TIME = 1716595200000 - 1716595200000 % DAY
+
+
+def _query(query):
+    return {key: values[0] for key, values in parse_qs(query).items()}
+
+
+class FakeAccount:
+    """
+    模拟交易所的历史订单、历史计划订单和成交明细接口
+    """
+
+    def __init__(self):
+        self.orders = []
+        self.plan_orders = []
+        self.fills = []
+
+    def add_order(self, i, day, type_, pnl, status="filled", prefix="ai"):
+        self.orders.append({"symbol": "cmt_btcusdt", "order_id": str(1000 + i), "client_oid": f"{prefix}_{i}",
+                            "createTime": BASE_TIME + day * DAY + i * 1000, "price": "65000", "size": "0.01",
+                            "filled_qty": "0.01" if status != "pending" else "0", "fee": "0.5",
+                            "status": status, "type": type_, "order_type": "normal", "totalProfits": str(pnl)})
+
+    def install(self, server):
+        server.add_route("GET", "/capi/v2/order/history", self.history)
+        server.add_route("GET", "/capi/v2/order/historyPlan", self.plan_history)
+        server.add_route("GET", "/capi/v2/order/fills", self.fills_page)
+
+    def history(self, method, path, query, body):
+        params = _query(query)
+        since, size = int(params.get("createDate", 0)), int(params.get("pageSize", 100))
+        return 200, [order for order in self.orders if order["createTime"] >= since][:size]
+
+    def _backward(self, records, params, size_key):
+        start, end = int(params.get("startTime", 0)), int(params.get("endTime", 2 ** 62))
+        size = int(params.get(size_key, 100))
+        matched = [r for r in reversed(records) if start <= int(r.get("createTime", r.get("createdTime"))) <= end]
+        return matched[:size], len(matched) > size
+
+    def plan_history(self, method, path, query, body):
+        page, more = self._backward(self.plan_orders, _query(query), "pageSize")
+        return 200, {"list": page, "nextPage": more}
+
+    def fills_page(self, method, path, query, body):
+        page, more = self._backward(self.fills, _query(query), "limit")
+        return 200, {"list": page, "nextFlag": more, "totals": len(page)}
+
+
+def _make_account():
+    account = FakeAccount()
+    # 第0天: 两笔开仓、两笔平仓（ai一盈一亏）；第1天: tiersl止损平仓一笔亏损、ai平仓一笔盈利
+    account.add_order(0, 0, "open_long", 0)
+    account.add_order(1, 0, "close_long", 12.5)
+    account.add_order(2, 0, "open_short", 0)
+    account.add_order(3, 0, "close_short", -4.0)
+    account.add_order(4, 1, "close_long", -3.0, prefix="tiersl")
+    account.add_order(5, 1, "close_long", 8.0)
+    for i in range(120):
+        account.plan_orders.append({"orderId": str(5000 + i), "symbol": "cmt_btcusdt", "delegateType": 3,
+                                    "price": "60000", "volume": "0.01", "status": 3,
+                                    "createTime": BASE_TIME + i * 60000, "triggerPrice": "60000"})
+        account.fills.append({"tradeId": str(9000 + i), "orderId": str(1000 + i % 6), "symbol": "cmt_btcusdt",
+                              "positionSide": "LONG", "orderSide": "SELL", "direction": "CLOSE_LONG",
+                              "fillSize": "0.001", "fillValue": "65", "fillFee": "0.05", "realizePnl": "1",
+                              "createdTime": BASE_TIME + (i // 2) * 60000})
+    return account
+
+
+def _calls(server, path):
+    return sum(1 for request in server.requests if request["path"] == path)
+
+
+def test_incremental_sync():
+    account = _make_account()
+    with WeexStubServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+        account.install(server)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        ledger = OrderLedger(os.path.join(tmpdir, "orders.db"))
+
+        result = ledger.sync(client, symbols=["cmt_btcusdt"])
+        assert result == {"orders": 6, "fills": 120, "plan_orders": 120}
+        assert ledger.high_water("orders:*") == account.orders[-1]["createTime"]
+        assert ledger.orders()[1]["signal"] == "ai" and ledger.orders()[4]["signal"] == "tiersl"
+
+        # 没有新数据：每类只请求一页，只重写高水位时间上的记录
+        before = {path: _calls(server, path) for path in ("/capi/v2/order/history", "/capi/v2/order/fills")}
+        result = ledger.sync(client, symbols=["cmt_btcusdt"])
+        assert result["orders"] == 1 and result["fills"] <= 2 and result["plan_orders"] == 1
+        assert all(_calls(server, path) - count == 1 for path, count in before.items())
+        assert len(ledger.orders()) == 6
+
+        # 新订单和一个未终结订单：从未终结订单开始重新拉取，状态更新被写入
+        account.add_order(6, 2, "close_long", 0, status="pending")
+        ledger.sync_orders(client)
+        assert ledger.orders(status="pending")[0]["order_id"] == "1006"
+        account.orders[-1].update(status="filled", filled_qty="0.01", totalProfits="2")
+        account.add_order(7, 2, "close_short", 1.0)
+        assert ledger.sync_orders(client) == 2
+        assert [order["status"] for order in ledger.orders(since=BASE_TIME + 2 * DAY)] == ["filled", "filled"]
+
+        # 重新打开账本后高水位仍在
+        ledger.close()
+        ledger = OrderLedger(os.path.join(tmpdir, "orders.db"))
+        assert ledger.high_water("plan_orders:cmt_btcusdt") == account.plan_orders[-1]["createTime"]
+        ledger.close()
+        client.close()
+
+
+def test_incomplete_walk_keeps_high_water():
+    """翻页没有取完时保留已写入的记录，但不推进高水位，下次同步从原位置重新拉取"""
+    account = _make_account()
+    with WeexStubServer() as server, OrderLedger(":memory:") as ledger:
+        account.install(server)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        ledger.sync_plan_orders(client, "cmt_btcusdt", page_size=50)
+        high_water = ledger.high_water("plan_orders:cmt_btcusdt")
+        for i in range(120, 125):
+            account.plan_orders.append(dict(account.plan_orders[-1], orderId=str(5000 + i),
+                                            createTime=BASE_TIME + i * 60000))
+
+        # 计划订单接口改为从旧到新返回，反向翻页无法继续
+        def oldest_first(method, path, query, body):
+            status, page = account.plan_history(method, path, query, body)
+            return status, dict(page, list=page["list"][::-1], nextPage=True)
+
+        server.add_route("GET", "/capi/v2/order/historyPlan", oldest_first)
+        try:
+            ledger.sync_plan_orders(client, "cmt_btcusdt", page_size=2)
+            raise AssertionError("expected RuntimeError")
+        except RuntimeError:
+            pass
+        assert ledger.high_water("plan_orders:cmt_btcusdt") == high_water
+        client.close()
+
+
+def test_newest_first_history_still_syncs():
+    """历史订单接口从新到旧返回时每次同步取最新的一页，高水位照常推进，不会卡在第一页"""
+    account = _make_account()
+
+    def newest_first(method, path, query, body):
+        params = _query(query)
+        since, size = int(params.get("createDate", 0)), int(params.get("pageSize", 100))
+        orders = [order for order in account.orders if order["createTime"] >= since]
+        return 200, sorted(orders, key=lambda order: order["createTime"], reverse=True)[:size]
+
+    with WeexStubServer() as server, OrderLedger(":memory:") as ledger:
+        account.install(server)
+        server.add_route("GET", "/capi/v2/order/history", newest_first)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        assert ledger.sync_orders(client) == 6
+        assert ledger.high_water("orders:*") == account.orders[-1]["createTime"]
+
+        account.add_order(6, 2, "close_long", 1.0)
+        account.add_order(7, 2, "close_short", 2.0)
+        ledger.sync_orders(client, page_size=3)
+        assert ledger.high_water("orders:*") == account.orders[-1]["createTime"]
+        assert len(ledger.orders()) == 8
+        client.close()
+
+
+def test_reports():
+    account = _make_account()
+    with OrderLedger(":memory:") as ledger:
+        ledger.upsert_orders(account.orders)
+        daily = ledger.daily_pnl()
+        assert [row["day"] for row in daily] == ["2024-05-25", "2024-05-26"]
+        assert daily[0]["pnl"] == 8.5 and daily[0]["trades"] == 4 and daily[0]["net"] == 8.5 - 2.0
+        assert daily[1]["pnl"] == 5.0
+
+        stats = ledger.win_rate_by_signal()
+        assert stats["ai"] == {"trades": 3, "wins": 2, "win_rate": 2 / 3, "pnl": 16.5}
+        assert stats["tiersl"]["wins"] == 0
+
+        # 手动标记的信号在重新同步后保留
+        ledger.tag_signal(["1005"], "breakout")
+        ledger.upsert_orders(account.orders)
+        assert ledger.win_rate_by_signal()["breakout"]["pnl"] == 8.0
+        assert ledger.daily_pnl(symbol="cmt_ethusdt") == []
+
+
+def test_signal_from_client_oid():
+    assert signal_from_client_oid("tiersl_ab12") == "tiersl"
+    assert signal_from_client_oid("1716595200000") is None
+    assert signal_from_client_oid(None) is None
+
+
+def test_reports_are_fast():
+    with OrderLedger(":memory:") as ledger:
+        orders = [{"symbol": "cmt_%s" % ("btcusdt", "ethusdt", "solusdt")[i % 3], "order_id": str(i),
+                   "client_oid": "%s_%d" % (("ai", "tiersl", "grid")[i % 5 % 3], i),
+                   "createTime": BASE_TIME + i * 60000, "filled_qty": "0.01", "fee": "0.1",
+                   "status": "filled", "type": "close_long" if i % 2 else "open_long",
+                   "totalProfits": str((i % 7) - 3)} for i in range(100000)]
+        ledger.upsert_orders(orders)
+        start = time.perf_counter()
+        daily = ledger.daily_pnl(since=BASE_TIME + 30 * DAY)
+        stats = ledger.win_rate_by_signal(symbol="cmt_btcusdt")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"10万条订单: 每日盈亏+按信号胜率查询耗时{elapsed_ms:.1f}毫秒")
+    assert len(daily) > 30 and set(stats) == {"ai", "tiersl", "grid"}
+    assert elapsed_ms < 500
+
+
+if __name__ == "__main__":
+    test_incremental_sync()
+    test_incomplete_walk_keeps_high_water()
+    test_newest_first_history_still_syncs()
+    test_reports()
+    test_signal_from_client_oid()
+    test_reports_are_fast()
+    print("订单账本测试通过")
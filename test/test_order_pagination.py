@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+测试订单分页迭代器：自动翻完全部页、边界上重复返回的订单只输出一次、处理当前页时预取下一页（使用本地替身服务器）
+"""
+
+import asyncio
+import os
+import sys
+import time
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_async_sdk import AsyncWeexClient
+from weex_sdk import WeexClient
+from weex_stub_server import WeexStubServer
+
+HISTORY_PATH = "/capi/v2/order/history"
+PLAN_HISTORY_PATH = "/capi/v2/order/historyPlan"
+CURRENT_PLAN_PATH = "/capi/v2/order/currentPlan"
+BASE_TIME = 1716595200000
+
+# 每3个订单共用一个创建时间，翻页边界上会有同一时间的订单
+ORDERS = [{"symbol": "cmt_btcusdt", "order_id": str(1000 + i), "createTime": BASE_TIME + (i // 3) * 1000,
+           "price": "65000", "size": "0.01", "status": "filled", "type": "open_long"} for i in range(250)]
+PLAN_ORDERS = [{"orderId": str(2000 + i), "symbol": "cmt_btcusdt", "delegateType": 3, "price": "60000",
+                "volume": "0.01", "status": 3, "createTime": BASE_TIME + (i // 3) * 1000, "triggerPrice": "60000"}
+               for i in range(230)]
+CURRENT_PLAN = [{"symbol": "cmt_btcusdt", "size": "0.01", "order_id": str(3000 + i), "price": "0",
+                 "status": "UNTRIGGERED", "type": "CLOSE_LONG", "triggerPrice": str(60000 + i)} for i in range(230)]
+
+
+def _query(query):
+    return {key: values[0] for key, values in parse_qs(query).items()}
+
+
+def _history(method, path, query, body):
+    # 按创建时间下限过滤，从旧到新返回一页
+    params = _query(query)
+    since = int(params.get("createDate", 0))
+    size = int(params.get("pageSize", 100))
+    return 200, [order for order in ORDERS if order["createTime"] >= since][:size]
+
+
+def _plan_history(method, path, query, body):
+    # 按时间范围过滤，从新到旧返回一页
+    params = _query(query)
+    start, end = int(params.get("startTime", 0)), int(params.get("endTime", 2 ** 62))
+    size = int(params.get("pageSize", 100))
+    matched = [order for order in reversed(PLAN_ORDERS) if start <= order["createTime"] <= end]
+    return 200, {"list": matched[:size], "nextPage": len(matched) > size}
+
+
+def _current_plan(method, path, query, body):
+    params = _query(query)
+    page, limit = int(params.get("page", 0)), int(params.get("limit", 100))
+    return 200, CURRENT_PLAN[page * limit:(page + 1) * limit]
+
+
+def _second_page_fails(method, path, query, body):
+    if _query(query)["page"] == "1":
+        return 400, {"code": "40001", "msg": "busy"}
+    return _current_plan(method, path, query, body)
+
+
+def _history_newest_first(method, path, query, body):
+    # 接口忽略翻页方向，从新到旧返回
+    params = _query(query)
+    since = int(params.get("createDate", 0))
+    size = int(params.get("pageSize", 100))
+    return 200, [order for order in reversed(ORDERS) if order["createTime"] >= since][:size]
+
+
+def _make_server(delay=0.0):
+    server = WeexStubServer(delay=delay)
+    server.add_route("GET", HISTORY_PATH, _history)
+    server.add_route("GET", PLAN_HISTORY_PATH, _plan_history)
+    server.add_route("GET", CURRENT_PLAN_PATH, _current_plan)
+    return server
+
+
+def _make_client(server):
+    client = WeexClient("key", "secret", "pass", rate_limits={})
+    client.base_url = server.base_url
+    return client
+
+
+def _calls(server, path):
+    return sum(1 for request in server.requests if request["path"] == path)
+
+
+def test_iterators_walk_every_page():
+    with _make_server() as server:
+        client = _make_client(server)
+        history = list(client.iter_history_orders(page_size=40))
+        plan_history = list(client.iter_order_history("cmt_btcusdt", page_size=50))
+        current = list(client.iter_current_plan_orders(limit=100))
+        client.close()
+
+    assert [order["order_id"] for order in history] == [order["order_id"] for order in ORDERS]
+    assert [order["order_id"] for order in plan_history] == [order["orderId"] for order in reversed(PLAN_ORDERS)]
+    assert [order.triggerPrice for order in current] == [60000.0 + i for i in range(230)]
+    # 边界时间上的订单会在下一页再次返回，请求数略多于总数/每页数量
+    assert 7 <= _calls(server, HISTORY_PATH) <= 9
+    assert 5 <= _calls(server, PLAN_HISTORY_PATH) <= 6
+    assert _calls(server, CURRENT_PLAN_PATH) == 3
+
+
+def test_time_window_and_single_page():
+    with _make_server() as server:
+        client = _make_client(server)
+        start, end = BASE_TIME + 10 * 1000, BASE_TIME + 40 * 1000
+        orders = list(client.iter_order_history("cmt_btcusdt", start_time=start, end_time=end, page_size=20))
+        # 最后一页不满时不再请求
+        before = _calls(server, CURRENT_PLAN_PATH)
+        assert len(list(client.iter_current_plan_orders(limit=500))) == 230
+        assert _calls(server, CURRENT_PLAN_PATH) - before == 3
+        client.close()
+
+    expected = [order["orderId"] for order in reversed(PLAN_ORDERS) if start <= order["createTime"] <= end]
+    assert [order["order_id"] for order in orders] == expected
+
+
+def test_failed_page_raises():
+    """翻页途中失败时抛出异常，而不是当作已经翻完"""
+    with _make_server() as server:
+        client = _make_client(server)
+        server.add_route("GET", CURRENT_PLAN_PATH, _second_page_fails)
+        received = []
+        try:
+            for order in client.iter_current_plan_orders(limit=100):
+                received.append(order)
+            raise AssertionError("expected RuntimeError")
+        except RuntimeError:
+            pass
+        client.close()
+    assert len(received) == 100
+
+
+def _plan_history_oldest_first(method, path, query, body):
+    # 接口忽略翻页方向，从旧到新返回
+    status, page = _plan_history(method, path, query, body)
+    return status, dict(page, list=page["list"][::-1])
+
+
+def test_wrong_order_raises():
+    """返回顺序与翻页方向不一致、无法取完全部订单时抛出异常，而不是当作已经翻完"""
+    with _make_server() as server:
+        server.add_route("GET", PLAN_HISTORY_PATH, _plan_history_oldest_first)
+        client = _make_client(server)
+        received = []
+        try:
+            for order in client.iter_order_history("cmt_btcusdt", page_size=50):
+                received.append(order)
+            raise AssertionError("expected RuntimeError")
+        except RuntimeError:
+            pass
+        client.close()
+
+        async def walk():
+            async with AsyncWeexClient("key", "secret", "pass", rate_limits={}) as async_client:
+                async_client.base_url = server.base_url
+                async for _ in async_client.iter_order_history("cmt_btcusdt", page_size=50):
+                    pass
+
+        try:
+            asyncio.run(walk())
+            raise AssertionError("expected RuntimeError")
+        except RuntimeError:
+            pass
+    assert len(received) == 50
+
+
+def test_newest_first_history_returns_latest_page():
+    """历史订单接口从新到旧返回时无法向旧翻页：只取最新的一页，不抛出异常"""
+    with _make_server() as server:
+        server.add_route("GET", HISTORY_PATH, _history_newest_first)
+        client = _make_client(server)
+        history = list(client.iter_history_orders(page_size=40))
+        client.close()
+
+        async def walk():
+            async with AsyncWeexClient("key", "secret", "pass", rate_limits={}) as async_client:
+                async_client.base_url = server.base_url
+                return [order async for order in async_client.iter_history_orders(page_size=40)]
+
+        async_history = asyncio.run(walk())
+    expected = [order["order_id"] for order in reversed(ORDERS)][:40]
+    assert [order["order_id"] for order in history] == expected
+    assert [order["order_id"] for order in async_history] == expected
+    assert _calls(server, HISTORY_PATH) == 2
+
+
+def test_next_page_is_prefetched():
+    delay, work, pages = 0.15, 0.3, 3
+    with _make_server(delay) as server:
+        client = _make_client(server)
+        client.sync_time()
+        start = time.perf_counter()
+        count = 0
+        for i, order in enumerate(client.iter_current_plan_orders(limit=100)):
+            if i % 100 == 0:
+                # 模拟调用方处理一页的耗时
+                time.sleep(work)
+            count += 1
+        elapsed = time.perf_counter() - start
+
+        # 提前停止时不会挂起
+        for order in client.iter_history_orders(page_size=10):
+            break
+        client.close()
+
+    assert count == 230
+    print(f"3页计划订单+处理耗时{elapsed:.2f}秒（顺序执行至少{(delay + work) * pages:.2f}秒）")
+    # 只有第一页的请求时间没有和处理重叠
+    assert elapsed < (delay + work) * pages - delay
+
+
+def test_async_iterators_match_sync():
+    with _make_server() as server:
+        client = _make_client(server)
+        expected = (list(client.iter_history_orders(page_size=40)),
+                    list(client.iter_order_history("cmt_btcusdt", page_size=50)),
+                    list(client.iter_current_plan_orders()))
+        client.close()
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass") as async_client:
+                async_client.base_url = server.base_url
+                return ([order async for order in async_client.iter_history_orders(page_size=40)],
+                        [order async for order in async_client.iter_order_history("cmt_btcusdt", page_size=50)],
+                        [order async for order in async_client.iter_current_plan_orders()])
+
+        assert asyncio.run(run()) == expected
+
+
+if __name__ == "__main__":
+    test_iterators_walk_every_page()
+    test_time_window_and_single_page()
+    test_failed_page_raises()
+    test_wrong_order_raises()
+    test_newest_first_history_returns_latest_page()
+    test_next_page_is_prefetched()
+    test_async_iterators_match_sync()
+    print("订单分页迭代器测试通过")
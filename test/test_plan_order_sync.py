@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+测试交易所计划委托止损同步：只在止损价变化时修改委托，对比现有委托不反复撤单重下（使用本地替身服务器）
+"""
+
+import json
+import os
+import sys
+import threading
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plan_order_sync import PlanOrderSync
+from tier_engine import TierEngine
+from weex_sdk import WeexClient
+from weex_stub_server import WeexStubServer
+
+CONFIG = {
+    'fixed_stop_loss': 0.05,
+    'tiers': {
+        0: {'trigger_profit': 0.03, 'stop_loss_ratio': -0.01, 'description': '保本止盈'},
+        1: {'trigger_profit': 0.06, 'stop_loss_ratio': -0.03, 'description': '第一档移动止盈'},
+    },
+}
+
+_TYPE_NAMES = {"1": "OPEN_LONG", "2": "OPEN_SHORT", "3": "CLOSE_LONG", "4": "CLOSE_SHORT"}
+
+
+class PlanOrderBook:
+    """
+    模拟交易所的计划委托接口
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self._next_id = 1000
+        self._lock = threading.Lock()
+
+    def install(self, server):
+        server.add_route("GET", "/capi/v2/order/currentPlan", self.current)
+        server.add_route("POST", "/capi/v2/order/plan_order", self.place)
+        server.add_route("POST", "/capi/v2/order/cancel_plan", self.cancel)
+
+    def current(self, method, path, query, body):
+        symbol = parse_qs(query).get("symbol", [None])[0]
+        with self._lock:
+            return 200, [order for order in self.orders.values() if symbol is None or order["symbol"] == symbol]
+
+    def place(self, method, path, query, body):
+        data = json.loads(body)
+        with self._lock:
+            self._next_id += 1
+            order_id = str(self._next_id)
+            self.orders[order_id] = {
+                "symbol": data["symbol"], "size": data["size"], "client_oid": data["client_oid"],
+                "createTime": "0", "filled_qty": "0", "fee": "0", "order_id": order_id, "price": "0",
+                "status": "UNTRIGGERED", "type": _TYPE_NAMES[data["type"]], "order_type": "NORMAL",
+                "totalProfits": "0", "triggerPrice": data["trigger_price"],
+            }
+        return 200, {"client_oid": data["client_oid"], "order_id": order_id}
+
+    def cancel(self, method, path, query, body):
+        order_id = json.loads(body)["orderId"]
+        with self._lock:
+            found = self.orders.pop(order_id, None) is not None
+        return 200, {"order_id": order_id, "result": found, "err_msg": None if found else "order not found"}
+
+    def triggers(self, symbol=None):
+        return sorted(float(order["triggerPrice"]) for order in self.orders.values()
+                      if symbol is None or order["symbol"] == symbol)
+
+
+def _calls(server, path):
+    return sum(1 for request in server.requests if request["path"] == path)
+
+
+def test_sync_only_on_stop_change():
+    with WeexStubServer() as server:
+        book = PlanOrderBook()
+        book.install(server)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        engine = TierEngine.from_config(CONFIG)
+        plan_sync = PlanOrderSync(client, verify_interval=None)
+
+        engine.sync_positions([{'symbol': 'cmt_btcusdt', 'side': 'long', 'size': 0.01, 'entry_price': 100.0},
+                               {'symbol': 'cmt_ethusdt', 'side': 'short', 'size': 0.02, 'entry_price': 120.0}])
+        assert plan_sync.sync(engine.positions()) == {'placed': 2, 'cancelled': 0, 'failures': 0}
+        assert book.triggers() == [95.0, 126.0]
+        position = engine.get(('cmt_btcusdt', 'long'))
+        assert plan_sync.is_protected(position)
+
+        # 止损价没有变化：不发送任何请求
+        before = len(server.requests)
+        for price in (100.5, 101.0, 99.5, 102.0):
+            engine.on_tick('cmt_btcusdt', price)
+            plan_sync.sync(engine.positions())
+        assert len(server.requests) == before
+
+        # 升档后止损价上移：新建一个委托、撤销旧委托，另一个交易对的委托保持不变
+        engine.on_tick('cmt_btcusdt', 103.5)
+        assert not plan_sync.is_protected(position)
+        assert plan_sync.sync(engine.positions()) == {'placed': 1, 'cancelled': 1, 'failures': 0}
+        assert book.triggers() == [101.0, 126.0]
+        assert plan_sync.is_protected(position)
+
+        # 跨两档
+        engine.on_tick('cmt_btcusdt', 107.0)
+        plan_sync.sync(engine.positions())
+        assert book.triggers() == [103.0, 126.0]
+
+        # 持仓已平仓：撤销其委托
+        engine.sync_positions([{'symbol': 'cmt_ethusdt', 'side': 'short', 'size': 0.02, 'entry_price': 120.0}])
+        assert plan_sync.sync(engine.positions()) == {'placed': 0, 'cancelled': 1, 'failures': 0}
+        assert book.triggers() == [126.0]
+        assert _calls(server, "/capi/v2/order/plan_order") == 4
+        client.close()
+
+
+def test_reconcile_keeps_matching_orders():
+    """重启后已有的委托与期望一致时直接沿用，被手动撤销的委托在定期核对时补上，手动下的委托不受影响"""
+    with WeexStubServer() as server:
+        book = PlanOrderBook()
+        book.install(server)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        engine = TierEngine.from_config(CONFIG)
+        engine.add_position('cmt_ethusdt', 'long', 0.5, 2000.0)
+
+        PlanOrderSync(client).sync(engine.positions())
+        client.place_plan_order('cmt_ethusdt', 0.5, "3", 1500.0, client_oid="manual_1")
+        assert len(book.orders) == 2
+
+        # 新进程（状态丢失）：沿用已有委托，不撤单重下
+        plan_sync = PlanOrderSync(client)
+        assert plan_sync.sync(engine.positions()) == {'placed': 0, 'cancelled': 0, 'failures': 0}
+        assert plan_sync.is_protected(engine.get(('cmt_ethusdt', 'long')))
+
+        # 委托被手动撤销后，强制核对时补上
+        ours = next(order_id for order_id, order in book.orders.items() if order["client_oid"].startswith("tiersl_"))
+        assert client.cancel_plan_order(ours)
+        assert not client.cancel_plan_order(ours)
+        assert plan_sync.sync(engine.positions(), force=True) == {'placed': 1, 'cancelled': 0, 'failures': 0}
+        assert book.triggers('cmt_ethusdt') == [1500.0, 1900.0]
+        client.close()
+
+
+def test_failed_place_is_retried():
+    with WeexStubServer() as server:
+        book = PlanOrderBook()
+        book.install(server)
+        server.add_route("POST", "/capi/v2/order/plan_order", {"code": "40001", "msg": "busy"}, status=400)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        engine = TierEngine.from_config(CONFIG)
+        engine.add_position('cmt_btcusdt', 'short', 0.01, 100.0)
+        plan_sync = PlanOrderSync(client, verify_interval=None)
+
+        assert plan_sync.sync(engine.positions())['failures'] == 1
+        assert not plan_sync.is_protected(engine.get(('cmt_btcusdt', 'short')))
+        book.install(server)
+        assert plan_sync.sync(engine.positions())['placed'] == 1
+        assert book.triggers() == [105.0]
+        client.close()
+
+
+if __name__ == "__main__":
+    test_sync_only_on_stop_change()
+    test_reconcile_keeps_matching_orders()
+    test_failed_place_is_retried()
+    print("计划委托止损同步测试通过")
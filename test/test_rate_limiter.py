@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试客户端令牌桶限速：超出额度的请求排队而不是失败，多个进程可通过状态文件共享额度
+"""
+
+import asyncio
+import fcntl
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_async_sdk import AsyncWeexClient
+from weex_sdk import TokenBucketLimiter, WeexClient, endpoint_family
+from weex_stub_server import WeexStubServer
+
+CANDLES = [["1716707460000", "69174.3", "69174.4", "69174.1", "69174.3", "0", "0.011"]]
+
+
+def test_endpoint_family():
+    assert endpoint_family("/capi/v2/market/candles") == "market"
+    assert endpoint_family("/capi/v2/order/placeOrder") == "order"
+    assert endpoint_family("/capi/v2/account/position/allPosition") == "account"
+
+
+def test_requests_queue_instead_of_failing():
+    """突发请求超出桶容量后按补充速率排队"""
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/candles", CANDLES)
+        client = WeexClient("key", "secret", "pass", rate_limits={"market": {"capacity": 2, "refill_rate": 20}})
+        client.base_url = server.base_url
+
+        start = time.perf_counter()
+        results = [client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1) for _ in range(6)]
+        elapsed = time.perf_counter() - start
+        client.close()
+
+        stats = client.rate_limit_stats()["market"]
+        print(f"耗时: {elapsed:.3f}秒, 限速统计: {stats}")
+        assert all(results)
+        assert stats["requests"] == 6
+        assert stats["throttled"] >= 3
+        # 2个突发额度之后，剩余4个请求至少需要 4 / 20 = 0.2 秒
+        assert elapsed >= 0.15
+        assert stats["total_wait"] > 0
+
+
+def test_weights():
+    """高权重接口消耗更多令牌"""
+    limiter = TokenBucketLimiter(limits={"order": {"capacity": 5, "refill_rate": 1}},
+                                 weights={"/capi/v2/order/history": 5})
+    assert limiter.reserve("/capi/v2/order/history") == 0
+    assert limiter.reserve("/capi/v2/order/placeOrder") > 0.9
+
+
+def test_shared_state_file():
+    """两个限速器（模拟两个进程）通过状态文件共享同一份额度"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        state_file = os.path.join(tmpdir, "weex_rate_limit.json")
+        limits = {"market": {"capacity": 2, "refill_rate": 1}}
+        first = TokenBucketLimiter(limits=limits, state_file=state_file)
+        second = TokenBucketLimiter(limits=limits, state_file=state_file)
+
+        assert first.reserve("/capi/v2/market/candles") == 0
+        assert second.reserve("/capi/v2/market/candles") == 0
+        # 额度已被两个实例用完，第三个请求需要排队
+        assert first.reserve("/capi/v2/market/candles") > 0.5
+
+
+def test_async_file_lock_does_not_block_loop():
+    """其他进程持有状态文件锁时，异步客户端在线程池中等待，事件循环上的其他任务照常运行"""
+    with WeexStubServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+        server.add_route("GET", "/capi/v2/market/candles", CANDLES)
+        state_file = os.path.join(tmpdir, "weex_rate_limit.json")
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with open(state_file, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                locked.set()
+                release.wait(5)
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait(5)
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass", rate_limit_file=state_file,
+                                       rate_limits={"market": {"capacity": 10, "refill_rate": 10}}) as client:
+                client.base_url = server.base_url
+                request = asyncio.ensure_future(client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1))
+                # 锁被持有的0.3秒内事件循环仍然能调度其他任务
+                ticks = 0
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + 0.3
+                while loop.time() < deadline:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+                assert not request.done()
+                release.set()
+                return ticks, await request
+
+        ticks, result = asyncio.run(run())
+        holder.join()
+    assert ticks >= 10
+    assert result
+
+
+if __name__ == "__main__":
+    test_endpoint_family()
+    test_requests_queue_instead_of_failing()
+    test_weights()
+    test_shared_state_file()
+    test_async_file_lock_does_not_block_loop()
+    print("限速测试通过")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+测试请求签名：请求体只序列化一次，服务器收到的字节与签名的字节完全一致（orjson和标准库两种后端）
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import weex_sdk
+from weex_sdk import WeexClient, dumps_json, loads_json
+from weex_stub_server import WeexStubServer
+
+SECRET = "secret"
+
+
+def _expected_signature(request):
+    headers = request["headers"]
+    path = request["path"] + (f"?{request['query']}" if request["query"] else "")
+    message = (headers["ACCESS-TIMESTAMP"] + request["method"] + path).encode("utf-8") + request["body"]
+    return base64.b64encode(hmac.new(SECRET.encode("utf-8"), message, hashlib.sha256).digest()).decode("utf-8")
+
+
+def _place_order_and_check():
+    with WeexStubServer() as server:
+        server.add_route("POST", "/capi/v2/order/placeOrder", {"order_id": "1", "client_oid": "abc"})
+        server.add_route("GET", "/capi/v2/order/history", [])
+        client = WeexClient("key", SECRET, "pass")
+        client.base_url = server.base_url
+
+        assert client.open_long("cmt_btcusdt", 0.01, presetStopLossPrice=65000.5) is not None
+        client.get_history_orders("cmt_btcusdt", page_size=10)
+        client.close()
+
+        signed = [r for r in server.requests if r["path"] != "/capi/v2/market/time"]
+        assert len(signed) == 2
+        for request in signed:
+            assert request["headers"]["ACCESS-SIGN"] == _expected_signature(request)
+        order = [r for r in server.requests if r["path"] == "/capi/v2/order/placeOrder"][0]
+        assert json.loads(order["body"])["presetStopLossPrice"] == 65000.5
+
+
+def test_signed_bytes_match_sent_bytes():
+    print(f"JSON后端: {weex_sdk.JSON_BACKEND}")
+    _place_order_and_check()
+
+
+def test_stdlib_fallback():
+    """未安装orjson时使用标准库，签名同样与发送的字节一致"""
+    saved = weex_sdk.orjson
+    weex_sdk.orjson = None
+    try:
+        assert dumps_json({"a": 1, "b": "x"}) == b'{"a":1,"b":"x"}'
+        assert loads_json(b'{"a": 1}') == {"a": 1}
+        _place_order_and_check()
+    finally:
+        weex_sdk.orjson = saved
+
+
+if __name__ == "__main__":
+    test_signed_bytes_match_sent_bytes()
+    test_stdlib_fallback()
+    print("请求签名测试通过")
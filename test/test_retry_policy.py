@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+测试重试引擎：错误分类、退避与时长预算；下单请求只重试确定没有发出的失败，client_oid重复视为已下单
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+import aiohttp
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from weex_async_sdk import AsyncWeexClient
+from weex_sdk import FATAL, RETRYABLE, RetryPolicy, WeexClient, classify_error, new_client_oid
+from weex_stub_server import WeexStubServer
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status}", response=response)
+
+
+def test_classify_error():
+    assert classify_error(requests.ConnectionError("reset")) == RETRYABLE
+    assert classify_error(requests.Timeout("timeout")) == RETRYABLE
+    assert classify_error(_http_error(502)) == RETRYABLE
+    assert classify_error(_http_error(429)) == RETRYABLE
+    assert classify_error(_http_error(400)) == FATAL
+    assert classify_error(ValueError("bad")) == FATAL
+
+
+def test_backoff_and_deadline():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.1, max_delay=0.4, deadline=1.0)
+    for attempt in range(1, 6):
+        assert 0 <= policy.backoff(attempt) <= 0.4
+    started = time.monotonic()
+    assert policy.next_delay(_http_error(503), 1, started) is not None
+    assert policy.next_delay(_http_error(400), 1, started) is None
+    assert policy.next_delay(_http_error(503), 5, started) is None
+    # 时长预算已用完时不再重试
+    assert policy.next_delay(_http_error(503), 1, started - 2.0) is None
+
+
+def test_client_oid_unique():
+    oids = {new_client_oid() for _ in range(1000)}
+    assert len(oids) == 1000
+
+
+def _flaky_route(failures):
+    state = {"calls": 0}
+
+    def route(method, path, query, body):
+        state["calls"] += 1
+        if state["calls"] <= failures:
+            return 503, {"code": "503", "msg": "service unavailable"}
+        return 200, {"order_id": "1001", "client_oid": json.loads(body).get("client_oid"), "result": True}
+    return route
+
+
+def test_order_not_retried_after_ambiguous_failure():
+    """503时订单可能已被受理，下单请求不重发；查询请求照常重试"""
+    with WeexStubServer() as server:
+        server.add_route("POST", "/capi/v2/order/placeOrder", _flaky_route(2))
+        server.add_route("POST", "/capi/v2/order/cancel_order", _flaky_route(2))
+        client = WeexClient("key", "secret", "pass",
+                            retry_policy=RetryPolicy(max_attempts=4, base_delay=0.01, max_delay=0.05))
+        client.base_url = server.base_url
+
+        assert client.open_long("cmt_btcusdt", 0.01) is None
+        assert client.cancel_order("1001")
+        client.close()
+
+    assert len([r for r in server.requests if r["path"] == "/capi/v2/order/placeOrder"]) == 1
+    assert len([r for r in server.requests if r["path"] == "/capi/v2/order/cancel_order"]) == 3
+
+
+def test_order_retried_when_not_sent():
+    """连接没有建立时请求确定没有发出，下单请求也可以重试"""
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01)
+    started = time.monotonic()
+    refused = requests.ConnectionError(MaxRetryError(None, "/capi/v2/order/placeOrder",
+                                                     NewConnectionError(None, "Connection refused")))
+    assert policy.next_delay(refused, 1, started, idempotent=False) is not None
+    assert policy.next_delay(requests.exceptions.ConnectTimeout("connect"), 1, started, idempotent=False) is not None
+    assert policy.next_delay(requests.ConnectionError("reset by peer"), 1, started, idempotent=False) is None
+    assert policy.next_delay(requests.exceptions.ReadTimeout("read"), 1, started, idempotent=False) is None
+    assert policy.next_delay(_http_error(503), 1, started, idempotent=False) is None
+
+
+def _duplicate_route(method, path, query, body):
+    return 400, {"code": "40020", "msg": "Duplicate client_oid", "data": {"order_id": "1001"}}
+
+
+def test_duplicate_client_oid_is_success():
+    """用同一client_oid重发被交易所以重复拒绝时，说明订单已经下成功"""
+    with WeexStubServer() as server:
+        server.add_route("POST", "/capi/v2/order/placeOrder", _duplicate_route)
+        server.add_route("POST", "/capi/v2/order/plan_order", _duplicate_route)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        order = client.open_long("cmt_btcusdt", 0.01, client_oid="oid1")
+        market = client.create_market_order("cmt_btcusdt", "buy", 0.01, client_oid="oid2")
+        plan = client.place_plan_order("cmt_btcusdt", 0.01, "3", 60000, client_oid="oid3")
+        client.close()
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass", rate_limits={}) as async_client:
+                async_client.base_url = server.base_url
+                return await async_client.open_long("cmt_btcusdt", 0.01, client_oid="oid4")
+
+        async_order = asyncio.run(run())
+
+    assert order["id"] == "1001" and order["clientOrderId"] == "oid1" and order["info"]["duplicate"]
+    assert market["clientOrderId"] == "oid2" and plan["id"] == "1001"
+    assert async_order["id"] == "1001" and async_order["clientOrderId"] == "oid4"
+
+
+def test_async_retry_after_is_respected():
+    """aiohttp的限速错误按Retry-After等待，而不是只按指数退避"""
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.02)
+    exc = aiohttp.ClientResponseError(None, (), status=429, message="too many requests",
+                                      headers={"Retry-After": "0.5"})
+    assert policy.next_delay(exc, 1, time.monotonic()) == 0.5
+
+    state = {"calls": 0}
+
+    def limited(method, path, query, body):
+        state["calls"] += 1
+        if state["calls"] == 1:
+            return 429, {"code": "429", "msg": "too many requests"}, {"Retry-After": "0.5"}
+        return 200, {"symbol": "cmt_btcusdt", "last": "65000"}
+
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/ticker", limited)
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass", rate_limits={}, retry_policy=policy) as client:
+                client.base_url = server.base_url
+                start = time.monotonic()
+                await client._request("GET", "/capi/v2/market/ticker", params={"symbol": "cmt_btcusdt"})
+                return time.monotonic() - start
+
+        elapsed = asyncio.run(run())
+    assert state["calls"] == 2
+    assert elapsed >= 0.5
+
+
+def test_fatal_error_not_retried():
+    """4xx错误立即返回，不重试"""
+    with WeexStubServer() as server:
+        server.add_route("POST", "/capi/v2/order/placeOrder", {"code": "40017", "msg": "bad param"}, status=400)
+        client = WeexClient("key", "secret", "pass", retry_policy=RetryPolicy(max_attempts=4, base_delay=0.01))
+        client.base_url = server.base_url
+        assert client.open_long("cmt_btcusdt", 0.01) is None
+        client.close()
+        assert len([r for r in server.requests if r["path"] == "/capi/v2/order/placeOrder"]) == 1
+
+
+if __name__ == "__main__":
+    test_classify_error()
+    test_backoff_and_deadline()
+    test_client_oid_unique()
+    test_order_not_retried_after_ambiguous_failure()
+    test_order_retried_when_not_sent()
+    test_duplicate_client_oid_is_success()
+    test_async_retry_after_is_respected()
+    test_fatal_error_not_retried()
+    print("重试引擎测试通过")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+测试SDK日志：默认级别下请求不输出到stdout、不格式化请求体，JSON Lines请求日志记录方法/路径/耗时/状态码/大小
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import weex_sdk
+from weex_sdk import WeexClient, enable_request_log, request_logger
+from weex_stub_server import WeexStubServer
+
+CANDLES = [["1716707460000", "69174.3", "69174.4", "69174.1", "69174.3", "0", "0.011"]]
+
+
+class _Body(dict):
+    """格式化时计数的请求体，用于确认非DEBUG级别下请求体不会被格式化"""
+    formatted = 0
+
+    def __repr__(self):
+        _Body.formatted += 1
+        return dict.__repr__(self)
+
+    __str__ = __repr__
+
+
+def _make_server():
+    server = WeexStubServer()
+    server.add_route("GET", "/capi/v2/market/candles", CANDLES)
+    server.add_route("POST", "/capi/v2/order/placeOrder", {"order_id": "1", "client_oid": "abc"})
+    return server
+
+
+def test_quiet_by_default():
+    """未开启DEBUG时，请求不打印到stdout，请求体不被格式化"""
+    with _make_server() as server:
+        client = WeexClient("key", "secret", "pass")
+        client.base_url = server.base_url
+        stdout = io.StringIO()
+        _Body.formatted = 0
+        with contextlib.redirect_stdout(stdout):
+            assert client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1)
+            client._request("POST", "/capi/v2/order/placeOrder", data=_Body(symbol="cmt_btcusdt", size="0.01"))
+        client.close()
+        assert stdout.getvalue() == ""
+        # 签名需要序列化请求体，但日志不应再格式化一次
+        assert _Body.formatted == 0
+
+
+def test_debug_logs_request_details():
+    """DEBUG级别下输出请求详情"""
+    with _make_server() as server:
+        client = WeexClient("key", "secret", "pass")
+        client.base_url = server.base_url
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        weex_sdk.logger.addHandler(handler)
+        weex_sdk.logger.setLevel(logging.DEBUG)
+        try:
+            client._request("POST", "/capi/v2/order/placeOrder", data={"symbol": "cmt_btcusdt"})
+        finally:
+            weex_sdk.logger.removeHandler(handler)
+            weex_sdk.logger.setLevel(logging.NOTSET)
+            client.close()
+        output = stream.getvalue()
+        assert "/capi/v2/order/placeOrder" in output
+        assert "cmt_btcusdt" in output
+
+
+def test_request_log_json_lines():
+    """请求日志每行一个JSON，包含方法、路径、耗时、状态码和大小，不包含请求体"""
+    with _make_server() as server, tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "requests.jsonl")
+        handler = enable_request_log(path)
+        try:
+            client = WeexClient("key", "secret", "pass")
+            client.base_url = server.base_url
+            client.fetch_ohlcv("cmt_btcusdt", "1m", limit=1)
+            client.open_long("cmt_btcusdt", 0.01)
+            client.close()
+        finally:
+            request_logger.removeHandler(handler)
+            request_logger.setLevel(logging.WARNING)
+            handler.close()
+            weex_sdk._request_log_files.discard(os.path.abspath(path))
+
+        with open(path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        print(f"请求日志: {entries}")
+        paths = [entry["path"] for entry in entries]
+        assert "/capi/v2/market/candles" in paths
+        order = entries[paths.index("/capi/v2/order/placeOrder")]
+        assert order["method"] == "POST" and order["status"] == 200
+        assert order["size"] > 0 and order["latency_ms"] >= 0
+        assert "body" not in order and "client_oid" not in json.dumps(order)
+
+
+if __name__ == "__main__":
+    test_quiet_by_default()
+    test_debug_logs_request_details()
+    test_request_log_json_lines()
+    print("SDK日志测试通过")
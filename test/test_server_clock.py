@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+测试服务器时钟同步：签名时间戳按服务器时间校正，偏差和RTT估计可查询
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_sdk import ServerClock, WeexClient, parse_server_time
+from weex_stub_server import WeexStubServer
+
+ASSETS = [{"coinName": "USDT", "available": "100", "equity": "100", "frozen": "0", "unrealizePnl": "0"}]
+CLOCK_OFFSET_MS = 5000
+
+
+def test_parse_server_time():
+    assert parse_server_time({"epoch": "1716710918.113", "timestamp": 1716710918113}) == 1716710918113
+    assert parse_server_time({"epoch": "1716710918.113"}) == 1716710918113
+    assert parse_server_time({"code": "404"}) is None
+
+
+def test_offset_smoothing():
+    """偏差按RTT/2校正并平滑，高RTT样本权重更低"""
+    clock = ServerClock(alpha=0.5)
+    clock.add_sample(1000, 1600, 1200)
+    assert clock.offset_ms == 500 and clock.rtt_ms == 200
+    clock.add_sample(2000, 2700, 2200)
+    assert clock.offset_ms == 550
+    # RTT远大于平均值的样本只轻微影响偏差估计
+    clock.add_sample(3000, 5000, 5000)
+    assert 550 < clock.offset_ms < 600
+    assert clock.stats()["samples"] == 3
+
+
+def test_signature_uses_server_clock():
+    """本地时钟落后服务器5秒时，签名时间戳仍与服务器时间一致"""
+    with WeexStubServer(clock_offset_ms=CLOCK_OFFSET_MS) as server:
+        server.add_route("GET", "/capi/v2/account/assets", ASSETS)
+        client = WeexClient("key", "secret", "pass")
+        client.base_url = server.base_url
+
+        assert client.get_account_assets() is not None
+        assert client.get_account_assets() is not None
+        client.close()
+
+        print(f"时钟偏差: {client.time_offset:.1f}ms, RTT: {client.time_rtt:.1f}ms")
+        assert abs(client.time_offset - CLOCK_OFFSET_MS) < 100
+        assert client.time_rtt is not None
+        # 只在首次签名前同步，不是每个请求都同步
+        time_requests = [r for r in server.requests if r["path"] == "/capi/v2/market/time"]
+        assert len(time_requests) == 3
+        signed = [r for r in server.requests if r["path"] == "/capi/v2/account/assets"]
+        for request in signed:
+            server_now = time.time() * 1000 + CLOCK_OFFSET_MS
+            assert abs(int(request["headers"]["ACCESS-TIMESTAMP"]) - server_now) < 1000
+
+
+def test_periodic_resync():
+    """超过resync_interval后重新同步"""
+    with WeexStubServer(clock_offset_ms=CLOCK_OFFSET_MS) as server:
+        server.add_route("GET", "/capi/v2/account/assets", ASSETS)
+        client = WeexClient("key", "secret", "pass", server_clock=ServerClock(resync_interval=0.1))
+        client.base_url = server.base_url
+
+        client.get_account_assets()
+        time.sleep(0.15)
+        client.get_account_assets()
+        client.close()
+
+        assert client.server_clock.stats()["samples"] == 2
+
+
+def test_sync_failure_does_not_block_requests():
+    """服务器时间接口不可用时按本地时钟签名，且不会每个请求都重试同步"""
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/time", {"code": "500"}, status=500)
+        server.add_route("GET", "/capi/v2/account/assets", ASSETS)
+        client = WeexClient("key", "secret", "pass")
+        client.base_url = server.base_url
+
+        assert client.get_account_assets() is not None
+        assert client.get_account_assets() is not None
+        client.close()
+
+        assert client.time_offset == 0
+        assert len([r for r in server.requests if r["path"] == "/capi/v2/market/time"]) == 3
+
+
+if __name__ == "__main__":
+    test_parse_server_time()
+    test_offset_smoothing()
+    test_signature_uses_server_clock()
+    test_periodic_resync()
+    test_sync_failure_does_not_block_requests()
+    print("服务器时钟同步测试通过")
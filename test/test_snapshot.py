@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+测试持仓快照：一次allPosition请求加一次tickers请求返回全部持仓和持仓交易对的最新价（使用本地替身服务器）
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weex_async_sdk import AsyncWeexClient
+from weex_sdk import TICKERS_PATH, WeexClient
+from weex_stub_server import WeexStubServer
+
+POSITIONS_PATH = "/capi/v2/account/position/allPosition"
+POSITIONS = [
+    {"id": 1, "symbol": "cmt_btcusdt", "side": "LONG", "size": "0.01", "open_value": "690", "leverage": "10",
+     "unrealizePnl": "1.5", "margin_mode": "SHARED"},
+    {"id": 2, "symbol": "cmt_ethusdt", "side": "SHORT", "size": "0.5", "open_value": "1750", "leverage": "5",
+     "unrealizePnl": "-3", "margin_mode": "ISOLATED"},
+    {"id": 3, "symbol": "cmt_solusdt", "side": "LONG", "size": "0", "open_value": "0", "leverage": "5",
+     "unrealizePnl": "0", "margin_mode": "SHARED"},
+]
+TICKERS = [
+    {"symbol": symbol, "last": last, "best_bid": str(float(last) - 0.1), "best_ask": str(float(last) + 0.1),
+     "markPrice": last, "high_24h": last, "low_24h": last, "volume_24h": "100", "timestamp": "1716707460000"}
+    for symbol, last in (("cmt_btcusdt", "69174.3"), ("cmt_ethusdt", "3501.2"), ("cmt_solusdt", "150.25"),
+                         ("cmt_dogeusdt", "0.16"))
+]
+DELAY = 0.2
+
+
+def _make_server(delay=0.0):
+    server = WeexStubServer(delay=delay)
+    server.add_route("GET", POSITIONS_PATH, POSITIONS)
+    server.add_route("GET", TICKERS_PATH, TICKERS)
+    return server
+
+
+def _data_requests(server):
+    return [r["path"] for r in server.requests if r["path"] != "/capi/v2/market/time"]
+
+
+def test_snapshot_two_requests():
+    with _make_server(DELAY) as server:
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        client.sync_time()
+        start = time.perf_counter()
+        snapshot = client.fetch_snapshot()
+        elapsed = time.perf_counter() - start
+        client.close()
+
+    assert snapshot["error"] is None
+    assert sorted(_data_requests(server)) == [POSITIONS_PATH, TICKERS_PATH]
+    # 两个请求并发发送
+    assert elapsed < DELAY * 1.8
+    # 数量为0的持仓被过滤，价格只包含持仓交易对
+    assert [p["symbol"] for p in snapshot["positions"]] == ["cmt_btcusdt", "cmt_ethusdt"]
+    assert snapshot["prices"] == {"cmt_btcusdt": 69174.3, "cmt_ethusdt": 3501.2}
+    assert snapshot["tickers"]["cmt_ethusdt"]["bid"] == 3501.1
+    assert snapshot["positions"][1]["side"] == "short" and snapshot["positions"][1]["entryPrice"] == 3500.0
+
+
+def test_snapshot_symbol_filter():
+    with _make_server() as server:
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        snapshot = client.fetch_snapshot(symbols=["cmt_btcusdt", "cmt_dogeusdt"])
+        tickers = client.fetch_tickers(["cmt_solusdt"])
+        client.close()
+
+    assert [p["symbol"] for p in snapshot["positions"]] == ["cmt_btcusdt"]
+    # 监控的交易对即使没有持仓也返回价格
+    assert snapshot["prices"] == {"cmt_btcusdt": 69174.3, "cmt_dogeusdt": 0.16}
+    assert list(tickers) == ["cmt_solusdt"] and tickers["cmt_solusdt"]["last"] == 150.25
+
+
+def test_snapshot_error():
+    """持仓请求失败时返回error，而不是当作没有持仓"""
+    with _make_server() as server:
+        server.add_route("GET", POSITIONS_PATH, {"code": "40001", "msg": "invalid"}, status=400)
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        snapshot = client.fetch_snapshot()
+        client.close()
+    assert snapshot["error"] and snapshot["positions"] == []
+
+
+def test_async_snapshot_matches_sync():
+    with _make_server() as server:
+        client = WeexClient("key", "secret", "pass", rate_limits={})
+        client.base_url = server.base_url
+        expected = client.fetch_snapshot()
+        client.close()
+
+        async def run():
+            async with AsyncWeexClient("key", "secret", "pass") as async_client:
+                async_client.base_url = server.base_url
+                return await async_client.fetch_snapshot(), await async_client.fetch_tickers()
+
+        snapshot, tickers = asyncio.run(run())
+    for key in ("positions", "prices", "tickers", "error"):
+        assert snapshot[key] == expected[key], key
+    assert len(tickers) == len(TICKERS)
+
+
+if __name__ == "__main__":
+    test_snapshot_two_requests()
+    test_snapshot_symbol_filter()
+    test_snapshot_error()
+    test_async_snapshot_matches_sync()
+    print("持仓快照测试通过")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+测试档位状态日志：重启后恢复档位和最有利价格、容忍写了一半的记录、压缩后不回放旧记录
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state_journal import StateJournal
+from tier_engine import TierEngine
+
+CONFIG = {
+    'fixed_stop_loss': 0.05,
+    'tiers': {
+        0: {'trigger_profit': 0.03, 'stop_loss_ratio': 0.20, 'description': '低档保护止盈'},
+        1: {'trigger_profit': 0.05, 'stop_loss_ratio': 0.30, 'description': '第一档移动止盈'},
+        2: {'trigger_profit': 0.10, 'stop_loss_ratio': 0.50, 'description': '第二档移动止盈'},
+    },
+}
+POSITIONS = [{'symbol': 'cmt_btcusdt', 'side': 'long', 'size': 0.01, 'entry_price': 100.0},
+             {'symbol': 'cmt_ethusdt', 'side': 'short', 'size': 0.5, 'entry_price': 50.0}]
+
+
+def _restart(path):
+    engine = TierEngine.from_config(CONFIG)
+    journal = StateJournal(path)
+    engine.restore(journal.load())
+    return engine, journal
+
+
+def test_restart_restores_tiers():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "state.jsonl")
+        engine, journal = _restart(path)
+        engine.sync_positions(POSITIONS)
+        for price in (101.0, 104.0, 106.0, 105.5):
+            engine.on_tick('cmt_btcusdt', price)
+        engine.on_tick('cmt_ethusdt', 48.0)
+        journal.update(engine.state(), force=True)
+        expected = engine.state()
+        assert engine.get(('cmt_btcusdt', 'long')).tier == 1
+        journal.close()
+
+        # 重启：同步到持仓前状态保留，同步后恢复档位和最高盈利
+        engine, journal = _restart(path)
+        assert engine.state() == expected
+        engine.sync_positions(POSITIONS)
+        assert engine.state() == expected
+        position = engine.get(('cmt_btcusdt', 'long'))
+        assert position.tier == 1 and abs(engine.highest_profit(position) - 0.06) < 1e-12
+        assert abs(position.stop_price - 100.0 * 0.95) < 1e-9
+        assert engine.get(('cmt_ethusdt', 'short')).tier == 0
+
+        # 入场价变化说明是新开的持仓，不沿用旧状态；已不存在的持仓被移除
+        journal.update(engine.state(), force=True)
+        journal.close()
+        engine, journal = _restart(path)
+        engine.sync_positions([dict(POSITIONS[0], entry_price=103.0)])
+        assert engine.get(('cmt_btcusdt', 'long')).tier == -1
+        journal.update(engine.state(), force=True)
+        journal.close()
+        assert list(StateJournal(path).load()) == [('cmt_btcusdt', 'long')]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_restored_best_price_raises_tier():
+    """保存了最有利价格但还没保存升档时，恢复后按最有利价格确定档位"""
+    engine = TierEngine.from_config(CONFIG)
+    engine.restore({('cmt_btcusdt', 'long'): {'symbol': 'cmt_btcusdt', 'side': 'long', 'entry_price': 100.0,
+                                              'tier': 0, 'best_price': 111.0}})
+    engine.sync_positions(POSITIONS[:1])
+    assert engine.get(('cmt_btcusdt', 'long')).tier == 2
+
+
+def test_torn_tail_is_ignored():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "state.jsonl")
+        journal = StateJournal(path)
+        journal.load()
+        journal.update({'a': {'tier': 0}}, force=True)
+        journal.update({'a': {'tier': 1}}, force=True)
+        journal.close()
+        with open(path, "ab") as f:
+            f.write(b'{"k":"a","v":{"tier":2},"n":')
+        journal = StateJournal(path)
+        assert journal.load() == {'a': {'tier': 1}}
+        # 截掉不完整的行后可以继续追加
+        journal.update({'a': {'tier': 2}}, force=True)
+        journal.close()
+        assert StateJournal(path).load() == {'a': {'tier': 2}}
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_compaction_and_batching():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "state.jsonl")
+        journal = StateJournal(path, flush_interval=3600, compact_every=50)
+        journal.load()
+        for i in range(500):
+            journal.update({'a': {'tier': 0, 'best_price': 100.0 + i}, 'b': {'tier': 1, 'best_price': 50.0}})
+        # 未到写盘间隔：除第一次外没有写盘
+        assert journal.stats["flushes"] + journal.stats["compactions"] <= 1
+        for i in range(500):
+            journal.update({'a': {'tier': 0, 'best_price': 600.0 + i}}, force=True)
+        journal.close()
+        assert journal.stats["compactions"] >= 10
+        with open(path, "rb") as f:
+            assert f.read().count(b"\n") <= 50
+        assert StateJournal(path).load() == {'a': {'tier': 0, 'best_price': 1099.0}}
+
+        # 快照替换后、清空日志前崩溃：日志中的旧记录序号不大于快照序号，不会覆盖快照
+        with open(path, "rb") as f:
+            old_journal = f.read()
+        journal = StateJournal(path)
+        journal.load()
+        journal.update({'a': {'tier': 2, 'best_price': 2000.0}}, force=True)
+        journal.compact()
+        journal.close()
+        with open(path, "wb") as f:
+            f.write(old_journal)
+        assert StateJournal(path).load() == {'a': {'tier': 2, 'best_price': 2000.0}}
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_load_is_fast():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "state.jsonl")
+        journal = StateJournal(path, compact_every=100000)
+        journal.load()
+        states = {('cmt_%dusdt' % i, 'long'): {'symbol': 'cmt_%dusdt' % i, 'side': 'long', 'entry_price': 100.0,
+                                               'tier': i % 3, 'best_price': 100.0 + i} for i in range(1000)}
+        for _ in range(5):
+            states = {key: dict(state, best_price=state['best_price'] + 1) for key, state in states.items()}
+            journal.update(states, force=True)
+        journal.close()
+        journal = StateJournal(path)
+        assert journal.load() == states
+        print(f"回放5000条记录（1000个持仓）耗时{journal.stats['load_ms']:.2f}毫秒")
+        assert journal.stats["load_ms"] < 500
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_restart_restores_tiers()
+    test_restored_best_price_raises_tier()
+    test_torn_tail_is_ignored()
+    test_compaction_and_batching()
+    test_load_is_fast()
+    print("档位状态日志测试通过")
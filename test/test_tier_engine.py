@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+测试多档位止盈引擎：与原轮询版本的平仓判断一致，每个价格只检查最近的触发价
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tier_engine import TierEngine, next_check_interval, tier_stop_price
+
+CONFIG = {
+    'fixed_stop_loss': 0.05,
+    'tiers': {
+        0: {'trigger_profit': 0.03, 'stop_loss_ratio': 0.20, 'description': '低档保护止盈'},
+        1: {'trigger_profit': 0.05, 'stop_loss_ratio': 0.30, 'description': '第一档移动止盈'},
+        2: {'trigger_profit': 0.10, 'stop_loss_ratio': 0.50, 'description': '第二档移动止盈'},
+    },
+}
+
+
+def _reference_should_close(position, price, state, config=CONFIG):
+    """原multi_tier_tp_sl_bot.should_close_position的逻辑"""
+    if position['side'] == 'long':
+        profit_pct = (price - position['entry_price']) / position['entry_price']
+    else:
+        profit_pct = (position['entry_price'] - price) / position['entry_price']
+    if profit_pct <= -config['fixed_stop_loss']:
+        return True, f"固定止损触发: {profit_pct:.2%}"
+    state['highest'] = max(state['highest'], profit_pct)
+    current_tier = state['tier']
+    for tier_level in range(len(config['tiers']) - 1, -1, -1):
+        tier_config = config['tiers'][tier_level]
+        if state['highest'] >= tier_config['trigger_profit']:
+            if tier_level > current_tier or current_tier == -1:
+                state['tier'] = tier_level
+                stop_loss_price = tier_stop_price(position['side'], position['entry_price'],
+                                                  tier_config['stop_loss_ratio'])
+                if position['side'] == 'long' and price <= stop_loss_price:
+                    return True, f"{tier_config['description']}止损触发: {stop_loss_price:.2f}"
+                elif position['side'] == 'short' and price >= stop_loss_price:
+                    return True, f"{tier_config['description']}止损触发: {stop_loss_price:.2f}"
+                break
+    return False, ""
+
+
+def _price_path(seed, n=2000, start=60000.0):
+    rng = random.Random(seed)
+    price, path = start, []
+    for _ in range(n):
+        price *= 1 + rng.gauss(0.0002 if seed % 2 else -0.0002, 0.004)
+        path.append(price)
+    return path
+
+
+def test_matches_polling_logic():
+    """随机价格路径上，平仓时机、原因、档位和最高盈利与原逻辑一致"""
+    for seed in range(40):
+        side = 'long' if seed % 4 < 2 else 'short'
+        position = {'symbol': 'cmt_btcusdt', 'side': side, 'size': 0.01, 'entry_price': 60000.0}
+        engine = TierEngine.from_config(CONFIG)
+        engine.sync_positions([position])
+        state = {'highest': 0.0, 'tier': -1}
+        for i, price in enumerate(_price_path(seed)):
+            expected, expected_reason = _reference_should_close(position, price, state)
+            closes = engine.on_tick('cmt_btcusdt', price)
+            assert bool(closes) == expected, (seed, i)
+            if expected:
+                assert closes[0][1] == expected_reason
+                break
+            tracked = engine.get(('cmt_btcusdt', side))
+            assert tracked.tier == state['tier'], (seed, i)
+            assert abs(engine.highest_profit(tracked) - state['highest']) < 1e-12
+
+
+def test_tier_stop_is_active_after_upgrade():
+    """档位止损价高于固定止损时（锁定利润），升档后的每个价格都会检查该止损价"""
+    config = {'fixed_stop_loss': 0.05, 'tiers': {
+        0: {'trigger_profit': 0.03, 'stop_loss_ratio': -0.01, 'description': '保本止盈'}}}
+    engine = TierEngine.from_config(config)
+    engine.add_position('cmt_btcusdt', 'long', 0.01, 100.0)
+    assert engine.on_tick('cmt_btcusdt', 103.5) == []
+    position = engine.get(('cmt_btcusdt', 'long'))
+    assert position.tier == 0 and abs(position.stop_price - 101.0) < 1e-9
+    assert engine.on_tick('cmt_btcusdt', 102.0) == []
+    closes = engine.on_tick('cmt_btcusdt', 100.9)
+    assert closes and closes[0][1] == "保本止盈止损触发: 101.00"
+
+
+def test_failed_close_is_restored_by_sync():
+    engine = TierEngine.from_config(CONFIG)
+    position = {'symbol': 'cmt_btcusdt', 'side': 'long', 'size': 0.01, 'entry_price': 100.0}
+    engine.sync_positions([position])
+    engine.on_tick('cmt_btcusdt', 104.0)
+    assert engine.get(('cmt_btcusdt', 'long')).tier == 0
+    assert engine.on_tick('cmt_btcusdt', 94.0)
+    # 已触发的持仓暂停检查，平仓失败后下次同步恢复跟踪，档位状态保留
+    assert engine.on_tick('cmt_btcusdt', 93.0) == []
+    engine.sync_positions([position])
+    assert engine.get(('cmt_btcusdt', 'long')).tier == 0
+    assert engine.on_tick('cmt_btcusdt', 93.0)
+    # 交易所已没有该持仓时不再跟踪
+    engine.sync_positions([])
+    assert len(engine) == 0 and engine.symbols() == []
+
+
+def test_new_position_ignores_earlier_extremes():
+    engine = TierEngine.from_config(CONFIG)
+    engine.add_position('cmt_btcusdt', 'long', 0.01, 100.0, key='a')
+    engine.on_tick('cmt_btcusdt', 102.0)
+    engine.add_position('cmt_btcusdt', 'long', 0.01, 101.0, key='b')
+    engine.on_tick('cmt_btcusdt', 101.5)
+    assert abs(engine.highest_profit(engine.get('a')) - 0.02) < 1e-12
+    assert abs(engine.highest_profit(engine.get('b')) - 0.5 / 101.0) < 1e-12
+
+
+def test_many_positions_tick_cost():
+    """数百个持仓时，没有触发的价格只比较堆顶"""
+    engine = TierEngine.from_config(CONFIG)
+    rng = random.Random(1)
+    symbols = [f"cmt_{i}usdt" for i in range(10)]
+    for i in range(500):
+        side = 'long' if i % 2 else 'short'
+        engine.add_position(rng.choice(symbols), side, 0.01, 100.0 * (1 + rng.uniform(-0.002, 0.002)), key=i)
+    ticks = 0
+    start = time.perf_counter()
+    for _ in range(2000):
+        for symbol in symbols:
+            assert engine.on_tick(symbol, 100.0 * (1 + rng.uniform(-0.001, 0.001))) == []
+            ticks += 1
+    elapsed = time.perf_counter() - start
+    print(f"500个持仓，{ticks}个价格: 每个价格{elapsed / ticks * 1e6:.2f}微秒")
+    assert engine.stats["triggers"] == 0
+
+
+def test_trigger_distance():
+    engine = TierEngine.from_config(CONFIG)
+    assert engine.trigger_distance('cmt_btcusdt', 100.0) is None
+    engine.add_position('cmt_btcusdt', 'long', 0.01, 100.0)
+    engine.add_position('cmt_ethusdt', 'short', 0.01, 110.0)
+    # 多仓升档价103、止损价95；空仓升档价106.7、止损价115.5
+    assert abs(engine.trigger_distance('cmt_btcusdt', 100.0) - 0.03) < 1e-12
+    assert abs(engine.trigger_distance('cmt_ethusdt', 112.0) - 3.5 / 112) < 1e-12
+    assert abs(engine.trigger_distance('cmt_ethusdt', 112.0, include_stops=False) - 5.3 / 112) < 1e-12
+    assert abs(engine.trigger_distance('cmt_btcusdt', 96.0) - 1 / 96) < 1e-12
+    assert abs(engine.trigger_distance('cmt_btcusdt', 96.0, include_stops=False) - 7 / 96) < 1e-12
+    # 已越过触发价
+    assert engine.trigger_distance('cmt_btcusdt', 94.0) == 0.0
+
+
+def test_next_check_interval():
+    assert next_check_interval(None, 0.001, 1, 30) == 30
+    assert next_check_interval(0.0, 0.001, 1, 30) == 1
+    assert next_check_interval(0.01, None, 1, 30) == 1
+    # 距离为3倍波动时间隔为一根K线，距离减半间隔变为四分之一
+    assert abs(next_check_interval(0.003, 0.001, 1, 120) - 60) < 1e-9
+    assert abs(next_check_interval(0.0015, 0.001, 1, 120) - 15) < 1e-9
+    assert next_check_interval(0.5, 0.001, 1, 30) == 30
+
+
+def test_adaptive_polling_reduces_requests():
+    """平静行情下远离触发价时大幅减少轮询，接近止损价时检查间隔不超过固定4秒"""
+    rng = random.Random(7)
+    engine = TierEngine.from_config(CONFIG)
+    engine.add_position('cmt_btcusdt', 'long', 0.01, 100.0)
+    volatility = 0.0008  # 每分钟ATR约0.08%
+    sigma = volatility / 60 ** 0.5
+    price, t, next_check, polls, near_gaps = 100.0, 0, 0.0, 0, []
+    last_poll = 0.0
+    while t < 4 * 3600:
+        price *= 1 + rng.gauss(0, sigma)
+        if t >= next_check:
+            polls += 1
+            distance = engine.trigger_distance('cmt_btcusdt', price)
+            if distance < 0.005:
+                near_gaps.append(t - last_poll)
+            engine.on_tick('cmt_btcusdt', price)
+            last_poll = t
+            next_check = t + next_check_interval(distance, volatility, 1, 30)
+        t += 1
+    fixed_polls = 4 * 3600 // 4
+    print(f"自适应轮询{polls}次，固定4秒轮询{fixed_polls}次")
+    assert polls < fixed_polls / 3
+    assert all(gap <= 4 for gap in near_gaps[1:])
+
+
+if __name__ == "__main__":
+    test_matches_polling_logic()
+    test_tier_stop_is_active_after_upgrade()
+    test_failed_close_is_restored_by_sync()
+    test_new_position_ignores_earlier_extremes()
+    test_many_positions_tick_cost()
+    test_trigger_distance()
+    test_next_check_interval()
+    test_adaptive_polling_reduces_requests()
+    print("多档位止盈引擎测试通过")
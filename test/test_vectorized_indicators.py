@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+测试numpy批量指标计算与pandas rolling/ewm版本一致，以及共用的趋势和支撑阻力分析
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from indicators import (INDICATOR_COLUMNS, average_true_range, calculate_technical_indicators, calculate_technical_indicators_pandas,
+                        compute_indicators, ewm_mean, fill_nan, generate_technical_analysis_text, get_market_trend,
+                        get_support_resistance_levels, rolling_mean)
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def _make_df(size=3000, seed=3, n=3000):
+    """生成size根K线（取n根模拟K线的前缀）"""
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 50, n))
+    # 横盘区间：标准差为0，布林带位置为0/0
+    close[500:530] = close[500]
+    high = close + rng.random(n) * 30
+    low = close - rng.random(n) * 30
+    volume = rng.random(n) * 100
+    volume[1000:1040] = 0.0
+    timestamp = 1700000000000 + np.arange(n) * 900000
+    df = pd.DataFrame({'timestamp': timestamp, 'open': close, 'high': high, 'low': low,
+                       'close': close, 'volume': volume}, columns=COLUMNS)
+    return df.iloc[:size].reset_index(drop=True)
+
+
+def _pandas_raw(df):
+    bfill, ffill = pd.DataFrame.bfill, pd.DataFrame.ffill
+    pd.DataFrame.bfill = pd.DataFrame.ffill = lambda self, *args, **kwargs: self
+    try:
+        return calculate_technical_indicators_pandas(df.copy())
+    finally:
+        pd.DataFrame.bfill, pd.DataFrame.ffill = bfill, ffill
+
+
+def test_matches_pandas():
+    df = _make_df()
+    expected = _pandas_raw(df)
+    actual = compute_indicators(df['high'], df['low'], df['close'], df['volume'])
+    for column in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(actual[column], expected[column].to_numpy(), rtol=1e-9, atol=1e-6,
+                                   err_msg=column)
+
+
+def test_short_inputs():
+    """K线少于窗口长度时不报错，窗口未满处为NaN"""
+    for n in (0, 1, 3, 19):
+        df = _make_df(n)
+        actual = compute_indicators(df['high'], df['low'], df['close'], df['volume'])
+        expected = _pandas_raw(df)
+        for column in INDICATOR_COLUMNS:
+            np.testing.assert_allclose(actual[column], expected[column].to_numpy(), rtol=1e-9, atol=1e-6,
+                                       err_msg=column)
+
+
+def test_primitives():
+    x = np.random.default_rng(5).normal(100, 10, 5000)
+    series = pd.Series(x)
+    np.testing.assert_allclose(rolling_mean(x, 7, min_periods=3), series.rolling(7, min_periods=3).mean(), rtol=1e-12)
+    np.testing.assert_allclose(ewm_mean(x, 9), series.ewm(span=9).mean(), rtol=1e-12)
+    np.testing.assert_allclose(ewm_mean(x, 200), series.ewm(span=200).mean(), rtol=1e-12)
+    gaps = np.array([np.nan, 1.0, np.nan, np.nan, 2.0, np.nan])
+    np.testing.assert_array_equal(fill_nan(gaps), pd.Series(gaps).bfill().ffill().to_numpy())
+
+
+def test_average_true_range():
+    df = _make_df(500)
+    prev_close = df['close'].shift()
+    true_range = pd.concat([df['high'] - df['low'], (df['high'] - prev_close).abs(), (df['low'] - prev_close).abs()],
+                           axis=1).max(axis=1)
+    expected = true_range.rolling(14, min_periods=1).mean()
+    np.testing.assert_allclose(average_true_range(df['high'], df['low'], df['close']), expected, rtol=1e-9)
+    assert len(average_true_range([], [], [])) == 0
+
+
+def test_dataframe_adapter():
+    df = _make_df(200)
+    actual = calculate_technical_indicators(df.copy())
+    expected = calculate_technical_indicators_pandas(df.copy())
+    assert list(actual.columns) == list(expected.columns)
+    assert not actual[INDICATOR_COLUMNS].isna().any().any()
+    np.testing.assert_allclose(actual[INDICATOR_COLUMNS].to_numpy(), expected[INDICATOR_COLUMNS].to_numpy(),
+                               rtol=1e-9, atol=1e-6)
+
+    trend = get_market_trend(actual)
+    levels = get_support_resistance_levels(actual)
+    assert trend['overall'] in ("强势上涨", "强势下跌", "震荡整理")
+    assert levels['static_resistance'] == actual['high'].tail(20).max()
+    last = actual.iloc[-1]
+    text = generate_technical_analysis_text({
+        'price': last['close'],
+        'technical_data': {name: last[name] for name in INDICATOR_COLUMNS},
+        'trend_analysis': trend,
+        'levels_analysis': levels,
+    })
+    assert "RSI" in text and trend['overall'] in text
+
+
+if __name__ == "__main__":
+    test_matches_pandas()
+    test_short_inputs()
+    test_primitives()
+    test_average_true_range()
+    test_dataframe_adapter()
+    print("numpy批量指标测试通过")
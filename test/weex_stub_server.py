@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+本地WEEX API替身服务器，供测试使用（不访问真实交易所）
+
+用法:
+    with WeexStubServer() as server:
+        server.add_route("GET", "/capi/v2/market/candles", [[...]])
+        client = WeexClient("key", "secret", "pass")
+        client.base_url = server.base_url
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # 使用HTTP/1.1以支持keep-alive
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        stub = self.server.stub
+        path, _, query = self.path.partition("?")
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        stub.record(self.command, path, query, dict(self.headers), body)
+
+        if stub.delay:
+            time.sleep(stub.delay)
+
+        route = stub.routes.get((self.command, path))
+        if route is None:
+            result = 404, {"code": "404", "msg": f"no stub route for {self.command} {path}"}
+        elif callable(route):
+            result = route(self.command, path, query, body)
+        else:
+            result = route
+        # 路由函数可以额外返回响应头: (status, payload, headers)
+        status, payload = result[:2]
+        headers = result[2] if len(result) > 2 else {}
+
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_DELETE = _handle
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    # 默认backlog只有5，并发测试时会触发SYN重传
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class WeexStubServer:
+    """
+    在后台线程运行的本地HTTP服务器，按(method, path)返回预设的JSON响应
+    """
+
+    def __init__(self, delay=0.0, clock_offset_ms=0):
+        """
+        Args:
+            delay (float): 每个请求的人为延迟（秒），用于模拟网络往返
+            clock_offset_ms (int): 服务器时钟相对本地时钟的偏差（毫秒），用于服务器时间接口
+        """
+        self.delay = delay
+        self.clock_offset_ms = clock_offset_ms
+        self.routes = {("GET", "/capi/v2/market/time"): self._server_time}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._httpd = _StubHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_route(self, method, path, payload, status=200):
+        """
+        注册路由
+
+        Args:
+            method (str): HTTP方法
+            path (str): 请求路径
+            payload: 返回的JSON数据，或签名为(method, path, query, body) -> (status, payload[, headers])的函数
+            status (int): HTTP状态码（payload为函数时忽略）
+        """
+        self.routes[(method.upper(), path)] = payload if callable(payload) else (status, payload)
+
+    def _server_time(self, method, path, query, body):
+        now_ms = int(time.time() * 1000) + self.clock_offset_ms
+        return 200, {"epoch": f"{now_ms / 1000:.3f}", "timestamp": now_ms}
+
+    def record(self, method, path, query, headers, body):
+        with self._lock:
+            self.requests.append({
+                "method": method,
+                "path": path,
+                "query": query,
+                "headers": headers,
+                "body": body
+            })
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
@@ -0,0 +1,469 @@
+"""
+多档位移动止盈引擎
+由价格推送驱动：为每个持仓预先计算下一个触发价（升档价和止损价），按交易对放入两个堆中，
+每个价格只需要和最近的触发价比较，持仓数量再多也不需要逐个计算或逐个请求价格
+
+档位规则与multi_tier_tp_sl_bot原来的should_close_position一致：
+- 亏损达到固定止损比例时平仓
+- 最高盈利达到某档的触发盈利时升到该档（只升不降，一次可以跨多档），该档的止损价为 入场价 * (1 ∓ 止损比例)
+- 生效的止损价取固定止损价和档位止损价中更接近当前价的一个
+
+用法:
+    engine = TierEngine.from_config(STRATEGY_CONFIG)
+    engine.sync_positions(positions)
+    for position, reason in engine.on_tick('cmt_btcusdt', 65000.0):
+        close(position, reason)
+"""
+
+import heapq
+import itertools
+
+# 触发类型
+STOP = "stop"
+TIER_UP = "tier_up"
+
+
+def tier_stop_price(side, entry_price, stop_loss_ratio):
+    """
+    计算档位止损价格
+
+    Args:
+        side (str): 'long' 或 'short'
+        entry_price (float): 入场价格
+        stop_loss_ratio (float): 档位止损比例
+
+    Returns:
+        float: 止损价格
+    """
+    if side == 'long':
+        # 多仓：止损价格 = 入场价格 * (1 - 止损比例)
+        return entry_price * (1 - stop_loss_ratio)
+    # 空仓：止损价格 = 入场价格 * (1 + 止损比例)
+    return entry_price * (1 + stop_loss_ratio)
+
+
+def profit_percentage(side, entry_price, price):
+    """
+    计算盈利比例（多仓价格上涨为正，空仓价格下跌为正）
+    """
+    if side == 'long':
+        return (price - entry_price) / entry_price
+    return (entry_price - price) / entry_price
+
+
+def next_check_interval(distance, volatility, min_interval, max_interval, bar_seconds=60, safety=3.0):
+    """
+    按到最近触发价的距离和近期波动计算下一次检查的间隔
+
+    价格按随机游走估计：每根K线的波动为volatility（ATR/价格），t秒内的波动约为volatility * sqrt(t / bar_seconds)，
+    取波动的safety倍刚好达到distance的时间作为间隔，离触发价越近、波动越大，检查越频繁
+
+    Args:
+        distance (float): 到最近触发价的相对距离，如0.01表示1%，None表示没有触发价
+        volatility (float): 每根K线的相对波动（ATR / 价格），None或0表示未知
+        min_interval (float): 最短间隔（秒）
+        max_interval (float): 最长间隔（秒）
+        bar_seconds (float): volatility对应的K线周期（秒）
+        safety (float): 安全系数
+
+    Returns:
+        float: 间隔秒数，在[min_interval, max_interval]内
+    """
+    if distance is None:
+        return max_interval
+    if distance <= 0 or not volatility:
+        return min_interval
+    interval = bar_seconds * (distance / (safety * volatility)) ** 2
+    return min(max(interval, min_interval), max_interval)
+
+
+class TrackedPosition:
+    """
+    引擎跟踪的持仓及其档位状态
+    """
+
+    def __init__(self, key, symbol, side, size, entry_price):
+        self.key = key
+        self.symbol = symbol
+        self.side = side
+        self.size = size
+        self.entry_price = entry_price
+        # 当前档位，-1表示尚未达到任何档位
+        self.tier = -1
+        # 上次合并行情高低点时的最有利价格（多仓为最高价，空仓为最低价）
+        self.best_price = None
+        # 当前生效的止损价及其触发原因模板
+        self.stop_price = None
+        self.stop_tier = None
+        # 升到下一档需要达到的价格，已是最高档时为None
+        self.tier_up_price = None
+        # 每次重新计算触发价后递增，堆中旧版本的触发项被忽略
+        self.version = 0
+
+    def as_dict(self):
+        """
+        转换为策略使用的持仓字典格式
+        """
+        return {
+            'symbol': self.symbol,
+            'side': self.side,
+            'size': self.size,
+            'entry_price': self.entry_price,
+        }
+
+
+class _SymbolBook:
+    """
+    单个交易对的触发价索引
+
+    upper为价格上涨方向的触发（多仓升档、空仓止损）小顶堆，lower为价格下跌方向的触发（多仓止损、空仓升档），
+    以负价格存入小顶堆；high/low为上次合并以来的行情最高/最低价，用于计算各持仓的最高盈利
+    """
+
+    def __init__(self):
+        self.positions = {}
+        self.upper = []
+        self.lower = []
+        self.high = None
+        self.low = None
+
+
+class TierEngine:
+    """
+    价格推送驱动的多档位移动止盈引擎
+    """
+
+    def __init__(self, fixed_stop_loss, tiers):
+        """
+        Args:
+            fixed_stop_loss (float): 固定止损比例，如0.05
+            tiers (dict): 档位 -> {'trigger_profit', 'stop_loss_ratio', 'description'}
+        """
+        self.fixed_stop_loss = fixed_stop_loss
+        self.tiers = tiers
+        # 按触发盈利从低到高排列的档位
+        self._tier_order = sorted(tiers, key=lambda level: tiers[level]['trigger_profit'])
+        self._books = {}
+        self._positions = {}
+        # 已触发平仓、等待确认的持仓：确认平仓前再次同步到时恢复原有档位状态
+        self._closing = {}
+        # 重启前保存的持仓状态，持仓同步到时恢复
+        self._restored = {}
+        self._counter = itertools.count()
+        self.stats = {"ticks": 0, "triggers": 0, "tier_ups": 0, "closes": 0}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        从策略配置（含fixed_stop_loss和tiers）创建引擎
+        """
+        return cls(config['fixed_stop_loss'], config['tiers'])
+
+    def __len__(self):
+        return len(self._positions)
+
+    def symbols(self):
+        """
+        有持仓的交易对
+        """
+        return [symbol for symbol, book in self._books.items() if book.positions]
+
+    def positions(self, symbol=None):
+        """
+        引擎跟踪的持仓
+        """
+        if symbol is None:
+            return list(self._positions.values())
+        book = self._books.get(symbol)
+        return list(book.positions.values()) if book else []
+
+    def get(self, key):
+        return self._positions.get(key)
+
+    def closing(self):
+        """
+        已触发平仓、等待确认的持仓
+        """
+        return list(self._closing.values())
+
+    def add_position(self, symbol, side, size, entry_price, key=None):
+        """
+        跟踪一个持仓；同一key已存在时更新数量和入场价，保留档位状态
+
+        Args:
+            symbol (str): 交易对
+            side (str): 'long' 或 'short'
+            size (float): 持仓数量
+            entry_price (float): 入场价格
+            key (hashable, optional): 持仓标识，默认(交易对, 方向)
+
+        Returns:
+            TrackedPosition: 跟踪的持仓
+        """
+        key = key if key is not None else (symbol, side)
+        book = self._books.setdefault(symbol, _SymbolBook())
+        position = self._positions.get(key) or self._closing.pop(key, None)
+        if position is None:
+            self._merge_extremes(book)
+            position = TrackedPosition(key, symbol, side, size, entry_price)
+            self._apply_restored(position)
+        elif position.size == size and position.entry_price == entry_price and key in book.positions:
+            return position
+        position.size = size
+        position.entry_price = entry_price
+        self._positions[key] = position
+        book.positions[key] = position
+        self._schedule(book, position)
+        return position
+
+    def remove_position(self, key):
+        """
+        停止跟踪持仓（已平仓）
+        """
+        self._closing.pop(key, None)
+        position = self._positions.pop(key, None)
+        if position is None:
+            return None
+        book = self._books[position.symbol]
+        book.positions.pop(key, None)
+        # 堆中残留的触发项因版本不匹配而被忽略，残留过多时重建堆
+        position.version += 1
+        if len(book.upper) + len(book.lower) > 4 * len(book.positions) + 64:
+            self._compact(book)
+        return position
+
+    def _compact(self, book):
+        """
+        丢弃堆中已失效的触发项
+        """
+        for heap in (book.upper, book.lower):
+            live = [entry for entry in heap
+                    if entry[2] in book.positions and book.positions[entry[2]].version == entry[3]]
+            heapq.heapify(live)
+            heap[:] = live
+
+    def sync_positions(self, positions):
+        """
+        用交易所返回的持仓同步引擎：新增或更新持仓，移除已不存在的持仓
+
+        Args:
+            positions (list): [{'symbol', 'side', 'size', 'entry_price'}, ...]
+
+        Returns:
+            list: 同步后跟踪的持仓
+        """
+        keys = set()
+        for pos in positions:
+            position = self.add_position(pos['symbol'], pos['side'], pos['size'], pos['entry_price'],
+                                         key=pos.get('key'))
+            keys.add(position.key)
+        for key in [key for key in self._positions if key not in keys]:
+            self.remove_position(key)
+        for key in [key for key in self._closing if key not in keys]:
+            self._closing.pop(key)
+        # 重启前保存、但交易所已没有的持仓
+        self._restored.clear()
+        return self.positions()
+
+    def state(self):
+        """
+        全部持仓（含等待平仓确认的持仓）的可持久化状态
+
+        Returns:
+            dict: 持仓key -> {'symbol', 'side', 'entry_price', 'tier', 'best_price'}，
+                包括已载入但还没有同步到的持仓状态
+        """
+        states = dict(self._restored)
+        for position in itertools.chain(self._positions.values(), self._closing.values()):
+            states[position.key] = {
+                'symbol': position.symbol,
+                'side': position.side,
+                'entry_price': position.entry_price,
+                'tier': position.tier,
+                'best_price': self._best_price(self._books[position.symbol], position),
+            }
+        return states
+
+    def restore(self, states):
+        """
+        载入重启前保存的持仓状态；之后同步到入场价相同的持仓时恢复其档位和最有利价格
+
+        Args:
+            states (dict): state()的返回值
+        """
+        self._restored = dict(states)
+        for position in self.positions():
+            if self._apply_restored(position):
+                self._schedule(self._books[position.symbol], position)
+
+    def _apply_restored(self, position):
+        saved = self._restored.pop(position.key, None)
+        if saved is None or saved['side'] != position.side or saved['entry_price'] != position.entry_price:
+            return False
+        position.best_price = saved['best_price']
+        # 最有利价格对应的档位可能高于保存时的档位（升档后还没来得及保存）
+        highest = self.highest_profit(position)
+        tier = saved['tier']
+        for level in reversed(self._tier_order):
+            if highest >= self.tiers[level]['trigger_profit']:
+                tier = max(tier, level)
+                break
+        position.tier = tier
+        return True
+
+    def on_tick(self, symbol, price):
+        """
+        处理一个价格推送
+
+        Args:
+            symbol (str): 交易对
+            price (float): 最新价
+
+        Returns:
+            list: [(TrackedPosition, 平仓原因), ...]，需要平仓的持仓；这些持仓暂停跟踪，
+                平仓失败时下次sync_positions会恢复跟踪（保留档位状态）
+        """
+        self.stats["ticks"] += 1
+        book = self._books.get(symbol)
+        if book is None:
+            return []
+        if book.high is None or price > book.high:
+            book.high = price
+        if book.low is None or price < book.low:
+            book.low = price
+
+        closes = []
+        upper, lower = book.upper, book.lower
+        while (upper and upper[0][0] <= price) or (lower and -lower[0][0] >= price):
+            if upper and upper[0][0] <= price:
+                _, _, key, version, kind = heapq.heappop(upper)
+            else:
+                _, _, key, version, kind = heapq.heappop(lower)
+            position = book.positions.get(key)
+            if position is None or position.version != version:
+                continue
+            self.stats["triggers"] += 1
+            if kind == TIER_UP:
+                self._tier_up(book, position, price)
+                continue
+            reason = self._stop_reason(position, price)
+            book.positions.pop(key)
+            self._positions.pop(key)
+            position.version += 1
+            self._closing[key] = position
+            self.stats["closes"] += 1
+            closes.append((position, reason))
+        return closes
+
+    def trigger_distance(self, symbol, price, include_stops=True):
+        """
+        当前价到该交易对最近触发价（止损价或升档价）的相对距离，用于安排下一次检查
+
+        Args:
+            symbol (str): 交易对
+            price (float): 当前价
+            include_stops (bool): 是否计入止损价，止损已由交易所委托执行时只需关注升档价
+
+        Returns:
+            float: 相对距离（已越过触发价时为0），没有触发价时返回None
+        """
+        book = self._books.get(symbol)
+        if book is None:
+            return None
+        nearest = None
+        for position in book.positions.values():
+            stop = position.stop_price if include_stops else None
+            # 价格上涨方向和下跌方向的触发价
+            if position.side == 'long':
+                upper, lower = position.tier_up_price, stop
+            else:
+                upper, lower = stop, position.tier_up_price
+            for distance in ((upper - price) / price if upper is not None else None,
+                             (price - lower) / price if lower is not None else None):
+                if distance is not None:
+                    distance = max(0.0, distance)
+                    nearest = distance if nearest is None else min(nearest, distance)
+        return nearest
+
+    def highest_profit(self, position):
+        """
+        持仓的最高盈利比例（至少为0，与原策略的初始值一致）
+        """
+        best = self._best_price(self._books[position.symbol], position)
+        if best is None:
+            return 0.0
+        return max(0.0, profit_percentage(position.side, position.entry_price, best))
+
+    def _best_price(self, book, position):
+        extreme = book.high if position.side == 'long' else book.low
+        if position.best_price is None:
+            return extreme
+        if extreme is None:
+            return position.best_price
+        return max(position.best_price, extreme) if position.side == 'long' else min(position.best_price, extreme)
+
+    def _merge_extremes(self, book):
+        """
+        把行情高低点合并到该交易对已有持仓的最有利价格中，然后重新开始记录，
+        之后加入的持仓只受加入后的行情影响
+        """
+        if book.high is None:
+            return
+        for position in book.positions.values():
+            position.best_price = self._best_price(book, position)
+        book.high = book.low = None
+
+    def _stop_reason(self, position, price):
+        if position.stop_tier is None:
+            return f"固定止损触发: {profit_percentage(position.side, position.entry_price, price):.2%}"
+        return f"{self.tiers[position.stop_tier]['description']}止损触发: {position.stop_price:.2f}"
+
+    def _tier_up(self, book, position, price):
+        """
+        价格达到升档价：按最高盈利找到达到的最高档位并重新计算触发价
+        """
+        highest = max(self.highest_profit(position), profit_percentage(position.side, position.entry_price, price))
+        for level in reversed(self._tier_order):
+            if highest >= self.tiers[level]['trigger_profit']:
+                if level != position.tier:
+                    position.tier = level
+                    self.stats["tier_ups"] += 1
+                break
+        self._schedule(book, position)
+
+    def _schedule(self, book, position):
+        """
+        重新计算持仓的止损价和升档价并放入堆中
+        """
+        position.version += 1
+        side, entry = position.side, position.entry_price
+        long = side == 'long'
+
+        # 固定止损价：亏损比例达到fixed_stop_loss
+        stop_price = entry * (1 - self.fixed_stop_loss) if long else entry * (1 + self.fixed_stop_loss)
+        stop_tier = None
+        if position.tier >= 0:
+            tier_stop = tier_stop_price(side, entry, self.tiers[position.tier]['stop_loss_ratio'])
+            if (long and tier_stop > stop_price) or (not long and tier_stop < stop_price):
+                stop_price, stop_tier = tier_stop, position.tier
+        position.stop_price = stop_price
+        position.stop_tier = stop_tier
+
+        # 下一档的升档价
+        position.tier_up_price = None
+        current_trigger = self.tiers[position.tier]['trigger_profit'] if position.tier >= 0 else None
+        for level in self._tier_order:
+            trigger = self.tiers[level]['trigger_profit']
+            if current_trigger is None or trigger > current_trigger:
+                position.tier_up_price = entry * (1 + trigger) if long else entry * (1 - trigger)
+                break
+
+        seq = next(self._counter)
+        if long:
+            heapq.heappush(book.lower, (-stop_price, seq, position.key, position.version, STOP))
+            if position.tier_up_price is not None:
+                heapq.heappush(book.upper, (position.tier_up_price, seq, position.key, position.version, TIER_UP))
+        else:
+            heapq.heappush(book.upper, (stop_price, seq, position.key, position.version, STOP))
+            if position.tier_up_price is not None:
+                heapq.heappush(book.lower, (-position.tier_up_price, seq, position.key, position.version, TIER_UP))
@@ -0,0 +1,733 @@
+"""
+WEEX异步API客户端
+基于aiohttp实现，方法与weex_sdk.WeexClient一致但均为协程，签名、参数构建和响应格式化与同步客户端共用
+一个事件循环即可同时驱动多个交易对、多个账户的请求
+
+用法:
+    async with AsyncWeexClient(api_key, api_secret, api_passphrase) as client:
+        ohlcv, positions = await asyncio.gather(
+            client.fetch_ohlcv("cmt_btcusdt", "15m", limit=96),
+            client.fetch_positions("cmt_btcusdt")
+        )
+"""
+
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from weex_sdk import (BATCH_ORDERS_PATH, CANCEL_ALL_PATH, CANCEL_BATCH_LIMIT, CANCEL_BATCH_PATH, CANCEL_ORDER_PATH, CANCEL_WORKERS,
+                      OPEN_ORDERS_PATH, SERVER_TIME_PATH, TICKERS_PATH, WeexClientBase, loads_json, log_request, logger,
+                      parse_server_time, request_logger)
+
+# 异步客户端视为网络错误（可重试）的异常类型
+NETWORK_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+# 一定发生在发送请求之前的异常类型（建立连接失败），下单请求只重试这类失败
+UNSENT_ERRORS = (aiohttp.ClientConnectorError,) + ((aiohttp.ConnectionTimeoutError,)
+                                                   if hasattr(aiohttp, "ConnectionTimeoutError") else ())
+
+
+class AsyncWeexClient(WeexClientBase):
+    """
+    WEEX异步API客户端
+    """
+
+    def __init__(self, api_key, api_secret, api_passphrase, testnet=False,
+                 pool_maxsize=100, pool_maxsize_per_host=10, pool_idle_timeout=60, keep_alive=True,
+                 rate_limiter=None, rate_limits=None, rate_limit_file=None, retry_policy=None,
+                 server_clock=None, request_log=None, keep_raw=False):
+        """
+        初始化WEEX异步API客户端
+
+        Args:
+            api_key (str): API密钥
+            api_secret (str): API密钥密码
+            api_passphrase (str): API密码短语
+            testnet (bool): 是否使用测试网络
+            pool_maxsize (int): 连接池总连接数上限
+            pool_maxsize_per_host (int): 每个主机的并发连接数上限，同时也是单个主机的最大并发请求数
+            pool_idle_timeout (float): 空闲连接保持的秒数
+            keep_alive (bool): 是否复用TCP/TLS连接
+            rate_limiter (TokenBucketLimiter, optional): 共享的限速器
+            rate_limits (dict, optional): 接口族限速配置，传入{}表示不限速
+            rate_limit_file (str, optional): 跨进程共享限速额度的状态文件
+            retry_policy (RetryPolicy, optional): 请求重试策略
+            server_clock (ServerClock, optional): 服务器时钟偏差估计
+            request_log (str, optional): JSON Lines请求日志文件
+            keep_raw (bool): 持仓和订单记录是否在info中保留API原始数据
+        """
+        super().__init__(api_key, api_secret, api_passphrase, testnet=testnet, keep_alive=keep_alive,
+                         rate_limiter=rate_limiter, rate_limits=rate_limits, rate_limit_file=rate_limit_file,
+                         retry_policy=retry_policy, server_clock=server_clock,
+                         request_log=request_log, keep_raw=keep_raw)
+        self.pool_maxsize = pool_maxsize
+        self.pool_maxsize_per_host = pool_maxsize_per_host
+        self.pool_idle_timeout = pool_idle_timeout
+        self._time_sync_lock = asyncio.Lock()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+    async def close(self):
+        """
+        关闭客户端持有的连接池
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        """
+        获取当前ClientSession，必须在事件循环中调用
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                limit_per_host=self.pool_maxsize_per_host,
+                keepalive_timeout=self.pool_idle_timeout if self.keep_alive else None,
+                force_close=not self.keep_alive
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def _request(self, method, request_path, params=None, data=None, need_sign=True, headers=None):
+        """
+        发送异步HTTP请求到WEEX API
+
+        Args:
+            method (str): HTTP方法，如 'GET', 'POST'
+            request_path (str): 请求路径
+            params (dict, optional): URL查询参数
+            data (dict, optional): 请求体数据
+            need_sign (bool): 是否需要签名
+            headers (dict, optional): 额外的请求头
+
+        Returns:
+            dict: API响应的JSON数据
+
+        Raises:
+            aiohttp.ClientError: 请求失败时抛出异常
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await self._send(method, request_path, params, data, need_sign, headers)
+            except NETWORK_ERRORS + (aiohttp.ClientResponseError,) as e:
+                delay = self.retry_policy.next_delay(e, attempt, started, NETWORK_ERRORS,
+                                                     idempotent=self._is_idempotent(method, request_path),
+                                                     unsent_errors=UNSENT_ERRORS)
+                if delay is None:
+                    raise
+                logger.warning("请求失败（第%s次），%.2f秒后重试: %r", attempt, delay, e)
+                await asyncio.sleep(delay)
+
+    async def sync_time(self, samples=3):
+        """
+        采样服务器时间，更新时钟偏差和RTT估计
+
+        Args:
+            samples (int): 采样次数，取其中往返时间最短（误差最小）的一次
+
+        Returns:
+            dict: 同步后的时钟状态，参见ServerClock.stats；全部采样失败时返回None
+        """
+        best = None
+        for _ in range(samples):
+            wait = await self._reserve(SERVER_TIME_PATH)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                sent_ms = time.time() * 1000
+                async with self._get_session().get(f"{self.base_url}{SERVER_TIME_PATH}") as response:
+                    received_ms = time.time() * 1000
+                    response.raise_for_status()
+                    server_ms = parse_server_time(await response.json(content_type=None))
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logger.warning("获取服务器时间失败: %r", e)
+                continue
+            if server_ms is not None and (best is None or received_ms - sent_ms < best[2] - best[0]):
+                best = (sent_ms, server_ms, received_ms)
+
+        if best is None:
+            self.server_clock.mark_attempt()
+            return None
+        self.server_clock.add_sample(*best)
+        return self.server_clock.stats()
+
+    async def _reserve(self, request_path):
+        """
+        预留限速令牌，返回需要等待的秒数
+
+        共享状态文件的限速器要获取文件锁（可能被其他进程持有），放到线程池中执行，不阻塞事件循环；
+        内存中的限速器直接在事件循环中预留
+        """
+        if self.rate_limiter.state_file:
+            return await asyncio.get_running_loop().run_in_executor(None, self.rate_limiter.reserve, request_path)
+        return self.rate_limiter.reserve(request_path)
+
+    async def _send(self, method, request_path, params=None, data=None, need_sign=True, headers=None):
+        """
+        发送一次HTTP请求（不重试），每次发送都重新排队限速并重新签名
+        """
+        # 首次签名前以及每隔resync_interval秒同步一次服务器时间
+        if need_sign and self.api_key and self.server_clock.needs_sync():
+            async with self._time_sync_lock:
+                # 并发请求只需要其中一个去同步
+                if self.server_clock.needs_sync():
+                    await self.sync_time()
+
+        # 限速排队在签名之前，避免等待后时间戳过期；文件锁只在预留令牌时短暂持有
+        wait = await self._reserve(request_path)
+        if wait > 0:
+            logger.info("触发客户端限速，%s 排队等待 %.3f 秒", request_path, wait)
+            await asyncio.sleep(wait)
+        url, headers, params, body = self._prepare_request(method, request_path, params, data, need_sign, headers)
+
+        # 请求体直接使用签名时的字节串
+        kwargs = {"headers": headers}
+        if method.upper() != 'GET':
+            kwargs["data"] = body
+            kwargs["params"] = params
+
+        started = time.perf_counter()
+        status, size = None, 0
+        try:
+            session = self._get_session()
+            async with session.request(method.upper(), url, **kwargs) as response:
+                content = await response.read()
+                status, size = response.status, len(content)
+
+                # 调试信息只在DEBUG级别下格式化，生产环境不产生额外开销
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("发送%s请求到: %s", method, url)
+                    if params:
+                        logger.debug("查询参数: %s", params)
+                    if body:
+                        logger.debug("请求体: %s", body.decode('utf-8'))
+                    logger.debug("响应状态码: %s", response.status)
+
+                if response.status >= 400:
+                    text = content.decode("utf-8", errors="replace")
+                    logger.warning("错误响应: %s", text)
+                    # 错误信息使用响应内容，便于识别client_oid重复等业务错误
+                    raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status,
+                                                      message=text, headers=response.headers)
+
+                return loads_json(content) if content else None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("请求错误: %r", e)
+            raise
+        finally:
+            if request_logger.isEnabledFor(logging.INFO):
+                log_request(method, request_path, started, status, size)
+
+    async def get_account_assets(self):
+        """
+        获取账户资产信息，参见WeexClient.get_account_assets
+        """
+        request_path = "/capi/v2/account/assets"
+        try:
+            logger.debug("尝试访问合约账户资产路径: %s", request_path)
+            response = await self._request("GET", request_path, params={}, need_sign=True)
+            return self._format_account_assets(response)
+        except Exception as e:
+            logger.error("获取账户资产信息时出错: %s", e)
+            return []
+
+    async def get_account_balance(self):
+        """
+        获取账户资产信息，参见WeexClient.get_account_balance
+        """
+        request_path = "/capi/v2/account/accounts"
+        try:
+            logger.debug("尝试访问合约账户路径: %s", request_path)
+            response = await self._request("GET", request_path, params={}, need_sign=True)
+            return self._format_account_balance(response)
+        except Exception as e:
+            logger.error("获取账户资产信息时出错: %s", e)
+            return None
+
+    async def set_leverage(self, symbol, margin_mode, long_leverage=None, short_leverage=None):
+        """
+        调整合约杠杆倍数，参见WeexClient.set_leverage
+        """
+        data = self._leverage_data(symbol, margin_mode, long_leverage, short_leverage)
+        try:
+            logger.debug("尝试设置%s的杠杆倍数，保证金模式: %s", symbol, margin_mode)
+            response = await self._request("POST", "/capi/v2/account/leverage", data=data, need_sign=True)
+            logger.debug("杠杆设置响应: %s", response)
+            return response
+        except Exception as e:
+            logger.error("设置杠杆倍数时出错: %s", e)
+            return None
+
+    async def get_coin_balance(self, coin_symbol="USDT"):
+        """
+        获取指定币种的余额，参见WeexClient.get_coin_balance
+        """
+        try:
+            assets = await self.get_account_balance()
+            return self._extract_coin_balance(assets, coin_symbol)
+        except Exception as e:
+            logger.error("获取%s余额时出错: %s", coin_symbol, e)
+            return 0.0
+
+    async def get_history_orders(self, symbol=None, page_size=None, create_date=None):
+        """
+        获取历史订单列表，参见WeexClient.get_history_orders
+        """
+        params, error = self._history_orders_params(symbol, page_size, create_date)
+        if error is not None:
+            return error
+        try:
+            logger.debug("尝试获取历史订单，交易对: %s", symbol if symbol else '所有')
+            try:
+                response = await self._request("GET", "/capi/v2/order/history", params=params, need_sign=True)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as req_error:
+                logger.error("网络请求错误: %r", req_error)
+                return {
+                    "orders": [],
+                    "error": f"网络请求失败: {req_error!r}",
+                    "error_code": "NETWORK_ERROR"
+                }
+            return self._format_history_orders(response, params.get("pageSize"))
+        except Exception as e:
+            logger.error("获取历史订单时出错: %s", e)
+            return {
+                "orders": [],
+                "error": f"获取历史订单失败: {str(e)}",
+                "error_code": "UNKNOWN_ERROR"
+            }
+
+    async def get_order_history(self, symbol, start_time=None, end_time=None, delegate_type=None, page_size=None):
+        """
+        获取历史计划订单列表，参见WeexClient.get_order_history
+        """
+        params, error = self._plan_history_params(symbol, start_time, end_time, delegate_type, page_size)
+        if error is not None:
+            return error
+        try:
+            logger.debug("尝试获取历史计划订单，交易对: %s", symbol)
+            try:
+                response = await self._request("GET", "/capi/v2/order/historyPlan", params=params, need_sign=True)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as req_error:
+                logger.error("网络请求错误: %r", req_error)
+                return {
+                    "orders": [],
+                    "has_more": False,
+                    "error": f"网络请求失败: {req_error!r}",
+                    "error_code": "NETWORK_ERROR"
+                }
+            return self._format_plan_history(response)
+        except Exception as e:
+            logger.error("获取历史订单时发生未知错误: %s", e)
+            return {
+                "orders": [],
+                "has_more": False,
+                "error": f"未知错误: {str(e)}",
+                "error_code": "UNKNOWN_ERROR"
+            }
+
+    async def getCurrentPlanOrders(self, symbol=None, orderId=None, startTime=None, endTime=None, limit=None, page=None):
+        """
+        获取当前计划订单列表，参见WeexClient.getCurrentPlanOrders
+        """
+        params, error = self._current_plan_params(symbol, orderId, startTime, endTime, limit, page)
+        if error is not None:
+            return error
+        try:
+            logger.debug("尝试获取当前计划订单")
+            try:
+                response = await self._request("GET", "/capi/v2/order/currentPlan", params=params, need_sign=True)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as req_error:
+                logger.error("网络请求错误: %r", req_error)
+                return {
+                    "orders": [],
+                    "has_more": False,
+                    "error": f"网络请求失败: {req_error!r}",
+                    "error_code": "NETWORK_ERROR"
+                }
+            return self._format_current_plan_orders(response)
+        except Exception as e:
+            logger.error("获取当前计划订单时发生未知错误: %s", e)
+            return {
+                "orders": [],
+                "has_more": False,
+                "error": f"未知错误: {str(e)}",
+                "error_code": "UNKNOWN_ERROR"
+            }
+
+    async def _iter_pages(self, fetch, cursor, use_has_more=True, key="orders"):
+        """
+        按游标逐页请求并逐条返回订单，调用方处理当前页时下一页已经在后台请求，参见WeexClient._iter_pages
+        """
+        task = asyncio.ensure_future(fetch(**cursor.params))
+        try:
+            while task is not None:
+                orders, has_more = self._page_orders(await task, key)
+                orders = cursor.advance(orders, has_more if use_has_more else None)
+                task = asyncio.ensure_future(fetch(**cursor.params)) if cursor.params is not None else None
+                for order in orders:
+                    yield order
+            if not cursor.complete:
+                raise RuntimeError(f"翻页提前停止: 接口返回的订单顺序与翻页方向不一致，只取到前{cursor.pages}页")
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def iter_history_orders(self, symbol=None, page_size=100, create_date=None):
+        """
+        逐条返回全部历史订单，参见WeexClient.iter_history_orders
+        """
+        cursor = self._history_orders_cursor(symbol, page_size, create_date)
+        async for order in self._iter_pages(self.get_history_orders, cursor):
+            yield order
+
+    async def iter_order_history(self, symbol, start_time=None, end_time=None, delegate_type=None, page_size=100):
+        """
+        逐条返回全部历史计划订单，参见WeexClient.iter_order_history
+        """
+        cursor = self._plan_history_cursor(symbol, start_time, end_time, delegate_type, page_size)
+        async for order in self._iter_pages(self.get_order_history, cursor):
+            yield order
+
+    async def iter_current_plan_orders(self, symbol=None, start_time=None, end_time=None, limit=100):
+        """
+        逐条返回全部当前计划订单，参见WeexClient.iter_current_plan_orders
+        """
+        cursor = self._current_plan_cursor(symbol, start_time, end_time, limit)
+        async for order in self._iter_pages(self.getCurrentPlanOrders, cursor, use_has_more=False):
+            yield order
+
+    async def get_fills(self, symbol=None, order_id=None, start_time=None, end_time=None, limit=None):
+        """
+        获取成交明细，参见WeexClient.get_fills
+        """
+        params, error = self._fills_params(symbol, order_id, start_time, end_time, limit)
+        if error is not None:
+            return error
+        try:
+            logger.debug("尝试获取成交明细，交易对: %s", symbol or '所有')
+            response = await self._request("GET", "/capi/v2/order/fills", params=params, need_sign=True)
+            return self._format_fills(response)
+        except Exception as e:
+            logger.error("获取成交明细时出错: %r", e)
+            return {
+                "fills": [],
+                "has_more": False,
+                "error": f"获取成交明细失败: {e!r}",
+                "error_code": "NETWORK_ERROR" if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)) else "UNKNOWN_ERROR"
+            }
+
+    async def iter_fills(self, symbol=None, start_time=None, end_time=None, limit=100):
+        """
+        逐条返回全部成交明细，参见WeexClient.iter_fills
+        """
+        cursor = self._fills_cursor(symbol, start_time, end_time, limit)
+        async for fill in self._iter_pages(self.get_fills, cursor, key="fills"):
+            yield fill
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100):
+        """
+        获取K线数据，参见WeexClient.fetch_ohlcv
+        """
+        try:
+            params = self._ohlcv_params(symbol, timeframe, since, limit)
+            logger.debug("尝试获取%s的%s K线数据，限制%s条", symbol, timeframe, limit)
+            response = await self._request("GET", "/capi/v2/market/candles", params=params, need_sign=False)
+            ohlcv_data = self._format_ohlcv(response)
+            logger.debug("成功获取%s条K线数据", len(ohlcv_data))
+            return ohlcv_data
+        except Exception as e:
+            logger.error("获取K线数据时出错: %r", e)
+            return []
+
+    async def fetch_positions(self, symbol=None):
+        """
+        获取持仓情况，参见WeexClient.fetch_positions
+        """
+        try:
+            params = {}
+            if symbol is not None:
+                params["symbol"] = symbol
+            logger.debug("尝试获取持仓情况，交易对: %s", symbol or '所有')
+            response = await self._request("GET", "/capi/v2/account/position/allPosition", params=params, need_sign=True)
+            positions = self._format_positions(response)
+            logger.debug("成功获取%s个持仓信息", len(positions))
+            return positions
+        except Exception as e:
+            logger.error("获取持仓情况时出错: %r", e)
+            return []
+
+    async def fetch_open_positions(self, symbol=None):
+        """
+        获取数量大于0的持仓，查询失败时抛出异常，参见WeexClient.fetch_open_positions
+        """
+        params = {"symbol": symbol} if symbol is not None else {}
+        response = await self._request("GET", "/capi/v2/account/position/allPosition", params=params, need_sign=True)
+        return self._open_positions(response, symbol)
+
+    async def fetch_open_order_ids(self, symbol=None):
+        """
+        获取未完成普通委托的订单ID，查询失败时抛出异常，参见WeexClient.fetch_open_order_ids
+        """
+        params = {"symbol": symbol} if symbol is not None else None
+        return self._open_order_ids(await self._request("GET", OPEN_ORDERS_PATH, params=params, need_sign=True), symbol)
+
+    async def fetch_tickers(self, symbols=None):
+        """
+        一次请求获取全部交易对的最新行情，参见WeexClient.fetch_tickers
+        """
+        try:
+            response = await self._request("GET", TICKERS_PATH, need_sign=False)
+            tickers = self._format_tickers(response)
+            if symbols is not None:
+                symbols = set(symbols)
+                tickers = {symbol: ticker for symbol, ticker in tickers.items() if symbol in symbols}
+            return tickers
+        except Exception as e:
+            logger.error("获取行情时出错: %r", e)
+            return {}
+
+    async def fetch_snapshot(self, symbols=None):
+        """
+        持仓快照：并发发送一次allPosition请求和一次tickers请求，参见WeexClient.fetch_snapshot
+        """
+        try:
+            positions_response, tickers_response = await asyncio.gather(
+                self._request("GET", "/capi/v2/account/position/allPosition", params={}, need_sign=True),
+                self._request("GET", TICKERS_PATH, need_sign=False))
+            snapshot = self._build_snapshot(positions_response, tickers_response, symbols)
+            snapshot["error"] = None
+        except Exception as e:
+            logger.error("获取持仓快照时出错: %r", e)
+            snapshot = {"positions": [], "prices": {}, "tickers": {}, "error": str(e)}
+        snapshot["timestamp"] = int(time.time() * 1000)
+        return snapshot
+
+    async def create_market_order(self, symbol, side, amount, **kwargs):
+        """
+        创建市价单，参见WeexClient.create_market_order
+        """
+        try:
+            data, client_oid = self._market_order_data(symbol, side, amount, **kwargs)
+            logger.debug("尝试创建市价%s单，交易对: %s，数量: %s", side, symbol, amount)
+            try:
+                response = await self._request("POST", "/capi/v2/order/placeOrder", data=data, need_sign=True)
+            except Exception as e:
+                response = self._duplicate_order_response(e, client_oid)
+                if response is None:
+                    raise
+            order = self._format_order(response, client_oid, symbol, side, amount, with_price=False)
+            logger.info("市价单创建成功，订单ID: %s", order['id'])
+            return order
+        except Exception as e:
+            logger.error("创建市价单时出错: %r", e)
+            return None
+
+    async def _place_order(self, action, type_value, side, symbol, amount, price=None, order_type="0", match_price="1", allow_preset=True, **kwargs):
+        """
+        开平仓下单的公共实现，参见WeexClient._place_order
+        """
+        try:
+            data, client_oid = self._order_data(symbol, amount, type_value, price, order_type, match_price, allow_preset, **kwargs)
+            logger.debug("尝试%s，交易对: %s，数量: %s", action, symbol, amount)
+            try:
+                response = await self._request("POST", "/capi/v2/order/placeOrder", data=data, need_sign=True)
+            except Exception as e:
+                response = self._duplicate_order_response(e, client_oid)
+                if response is None:
+                    raise
+            order = self._format_order(response, client_oid, symbol, side, amount, match_price, price)
+            logger.info("%s订单创建成功，订单ID: %s", action, order['id'])
+            return order
+        except Exception as e:
+            logger.error("%s时出错: %r", action, e)
+            return None
+
+    async def open_long(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
+        """
+        开多（建立多头仓位），参见WeexClient.open_long
+        """
+        return await self._place_order("开多", "1", "buy", symbol, amount, price, order_type, match_price, True, **kwargs)
+
+    async def open_short(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
+        """
+        开空（建立空头仓位），参见WeexClient.open_short
+        """
+        return await self._place_order("开空", "2", "sell", symbol, amount, price, order_type, match_price, True, **kwargs)
+
+    async def close_long(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
+        """
+        平多（平仓多头仓位），参见WeexClient.close_long
+        """
+        return await self._place_order("平多", "3", "sell", symbol, amount, price, order_type, match_price, False, **kwargs)
+
+    async def close_short(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
+        """
+        平空（平仓空头仓位），参见WeexClient.close_short
+        """
+        return await self._place_order("平空", "4", "buy", symbol, amount, price, order_type, match_price, False, **kwargs)
+
+    async def place_plan_order(self, symbol, amount, type_value, trigger_price, execute_price=None, match_price="1", **kwargs):
+        """
+        下计划委托（条件单），参见WeexClient.place_plan_order
+        """
+        try:
+            data, client_oid = self._plan_order_data(symbol, amount, type_value, trigger_price, execute_price,
+                                                     match_price, **kwargs)
+            logger.debug("尝试下计划委托，交易对: %s，类型: %s，触发价: %s", symbol, type_value, trigger_price)
+            try:
+                response = await self._request("POST", "/capi/v2/order/plan_order", data=data, need_sign=True)
+            except Exception as e:
+                response = self._duplicate_order_response(e, client_oid)
+                if response is None:
+                    raise
+            order = {
+                "id": response.get("order_id", ""),
+                "clientOrderId": response.get("client_oid", client_oid),
+                "symbol": symbol,
+                "type": type_value,
+                "amount": amount,
+                "triggerPrice": trigger_price,
+                "info": response
+            }
+            logger.info("计划委托创建成功，订单ID: %s", order['id'])
+            return order
+        except Exception as e:
+            logger.error("下计划委托时出错: %r", e)
+            return None
+
+    async def cancel_plan_order(self, order_id):
+        """
+        撤销计划委托，参见WeexClient.cancel_plan_order
+        """
+        try:
+            response = await self._request("POST", "/capi/v2/order/cancel_plan", data={"orderId": str(order_id)},
+                                           need_sign=True)
+            if isinstance(response, dict) and response.get("result") is False:
+                logger.error("撤销计划委托失败，订单ID: %s，原因: %s", order_id, response.get("err_msg"))
+                return False
+            logger.info("计划委托已撤销，订单ID: %s", order_id)
+            return True
+        except Exception as e:
+            logger.error("撤销计划委托时出错: %r", e)
+            return False
+
+    async def _send_batch_orders(self, semaphore, symbol, datas):
+        async with semaphore:
+            response = await self._request("POST", BATCH_ORDERS_PATH, data=self._batch_orders_body(symbol, datas),
+                                           need_sign=True)
+        return self._format_batch_orders(response, datas)
+
+    async def place_orders(self, orders, max_workers=CANCEL_WORKERS):
+        """
+        批量下单，参见WeexClient.place_orders
+        """
+        entries, chunks, invalid = self._batch_order_data(orders)
+        semaphore = asyncio.Semaphore(max(max_workers, 1))
+        outcomes = await asyncio.gather(*(self._send_batch_orders(semaphore, symbol, datas) for symbol, datas in chunks),
+                                        return_exceptions=True)
+        return self._collect_batch_orders(entries, invalid, [(datas, outcome)
+                                                             for (_, datas), outcome in zip(chunks, outcomes)])
+
+    async def cancel_order(self, order_id):
+        """
+        撤销一个普通委托，参见WeexClient.cancel_order
+        """
+        return (await self._cancel_one(order_id))["ok"]
+
+    async def _cancel_one(self, order_id):
+        order_id = str(order_id)
+        try:
+            response = await self._request("POST", CANCEL_ORDER_PATH, data={"orderId": order_id}, need_sign=True)
+            result = self._format_cancel_order(response, order_id)
+        except Exception as e:
+            logger.error("撤销订单时出错，订单ID: %s，原因: %r", order_id, e)
+            return self._cancel_result(failed=[{"order_id": order_id, "error": str(e)}])
+        if result["ok"]:
+            logger.info("订单已撤销，订单ID: %s", order_id)
+        return result
+
+    async def _cancel_plan_one(self, order_id):
+        if await self.cancel_plan_order(order_id):
+            return self._cancel_result(cancelled=[str(order_id)])
+        return self._cancel_result(failed=[{"order_id": str(order_id), "error": "撤销计划委托失败"}])
+
+    async def _bounded(self, semaphore, coro):
+        async with semaphore:
+            return await coro
+
+    async def _cancel_batch(self, semaphore, order_ids):
+        async with semaphore:
+            response = await self._request("POST", CANCEL_BATCH_PATH, data={"ids": order_ids}, need_sign=True)
+        return self._format_cancel_batch(response, order_ids)
+
+    async def cancel_orders(self, order_ids, max_workers=CANCEL_WORKERS):
+        """
+        批量撤销普通委托，参见WeexClient.cancel_orders
+        """
+        order_ids = [str(order_id) for order_id in order_ids]
+        if not order_ids:
+            return self._cancel_result()
+        semaphore = asyncio.Semaphore(max(max_workers, 1))
+        batches = [order_ids[i:i + CANCEL_BATCH_LIMIT] for i in range(0, len(order_ids), CANCEL_BATCH_LIMIT)]
+        outcomes = await asyncio.gather(*(self._cancel_batch(semaphore, batch) for batch in batches),
+                                        return_exceptions=True)
+        results, fallback = [], []
+        for batch, outcome in zip(batches, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning("批量撤单失败，回退为逐个撤单（%s个订单）: %r", len(batch), outcome)
+                fallback.extend(batch)
+            else:
+                results.append(outcome)
+        results.extend(await asyncio.gather(*(self._bounded(semaphore, self._cancel_one(order_id))
+                                              for order_id in fallback)))
+        return self._merge_cancel_results(results)
+
+    async def cancel_plan_orders(self, order_ids, max_workers=CANCEL_WORKERS):
+        """
+        并发撤销多个计划委托，参见WeexClient.cancel_plan_orders
+        """
+        semaphore = asyncio.Semaphore(max(max_workers, 1))
+        return self._merge_cancel_results(await asyncio.gather(
+            *(self._bounded(semaphore, self._cancel_plan_one(order_id)) for order_id in order_ids)))
+
+    async def _cancel_all_kind(self, kind, symbol, max_workers):
+        try:
+            response = await self._request("POST", CANCEL_ALL_PATH, data=self._cancel_all_data(kind, symbol),
+                                           need_sign=True)
+            return self._format_cancel_all(response)
+        except Exception as e:
+            logger.warning("全部撤单接口失败（%s），改为查询后撤销: %r", kind, e)
+        try:
+            if kind == "plan":
+                order_ids = [order["order_id"] async for order in self.iter_current_plan_orders(symbol=symbol)]
+                return await self.cancel_plan_orders(order_ids, max_workers)
+            return await self.cancel_orders(await self.fetch_open_order_ids(symbol), max_workers)
+        except Exception as e:
+            logger.error("查询待撤销的%s委托失败: %r", kind, e)
+            return self._cancel_result(errors=[f"{kind}: {e}"])
+
+    async def cancel_all_orders(self, symbol=None, include_plan=True, max_workers=CANCEL_WORKERS):
+        """
+        撤销全部（或某个交易对的）未完成委托，参见WeexClient.cancel_all_orders
+        """
+        kinds = ["normal", "plan"] if include_plan else ["normal"]
+        result = self._merge_cancel_results(
+            await asyncio.gather(*(self._cancel_all_kind(kind, symbol, max_workers) for kind in kinds)))
+        logger.info("全部撤单完成，交易对: %s，已撤销%s个，失败%s个", symbol or "所有", len(result["cancelled"]),
+                    len(result["failed"]))
+        return result
@@ -0,0 +1,355 @@
+"""
+WEEX API返回的持仓和订单的紧凑记录
+
+每条记录只用__slots__保存API返回的原始字段值（JSON解析出的字符串，不复制），不为每一行创建字典和float对象，
+数值字段在读取时才解析。原始响应默认不保留，keep_raw=True时保存在info中。
+
+记录实现了Mapping接口，record["size"]、record.get("size")、dict(record)、与字典比较相等等用法与原来的字典一致，
+也可以用属性读取：record.size
+"""
+
+import sys
+from collections.abc import Mapping
+
+# 原始字段缺失的标记，区分"缺失"和"值为None"
+_MISSING = object()
+
+
+def _text(name, default=""):
+    """原样返回原始字段，缺失时返回default"""
+    def get(record):
+        value = getattr(record, name)
+        return default if value is _MISSING else value
+    return get
+
+
+def _to_float(value, default=0.0):
+    """把原始值解析为float，缺失、None或空字符串时返回default"""
+    if value is _MISSING or value is None or value == "":
+        return default
+    return float(value)
+
+
+def _number(name, default=0.0):
+    """把原始字段解析为float"""
+    def get(record):
+        return _to_float(getattr(record, name), default)
+    return get
+
+
+def _optional_number(name):
+    """原始字段为真值时解析为float，否则返回None"""
+    def get(record):
+        value = getattr(record, name)
+        return float(value) if value is not _MISSING and value else None
+    return get
+
+
+def _mapped(name, mapping, default):
+    """把原始字段的英文代码映射为中文名称"""
+    def get(record):
+        return mapping.get(getattr(record, name), default)
+    return get
+
+
+def _slot(key):
+    return "_" + key
+
+
+class _Record(Mapping):
+    """
+    紧凑记录基类
+
+    子类通过_make_record生成：_RAW_KEYS是保存的原始字段，_FIELDS是输出字段 -> 取值函数
+    """
+
+    __slots__ = ("info",)
+    _RAW_KEYS = ()
+    # 取值种类很少的字段（交易对、状态、类型），各行共用同一个字符串对象
+    _CODES = ()
+    _FIELDS = {}
+
+    def __init__(self, raw, keep_raw=False):
+        """
+        Args:
+            raw (dict): API返回的一行数据
+            keep_raw (bool): 是否在info中保留原始数据
+        """
+        get = raw.get
+        for key in self._RAW_KEYS:
+            setattr(self, "_" + key, get(key, _MISSING))
+        for key in self._CODES:
+            value = get(key)
+            if type(value) is str:
+                setattr(self, "_" + key, sys.intern(value))
+        self.info = raw if keep_raw else None
+
+    def __getitem__(self, key):
+        field = self._FIELDS.get(key)
+        if field is not None:
+            return field(self)
+        if key == "info" and self.info is not None:
+            return self.info
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._FIELDS
+        if self.info is not None:
+            yield "info"
+
+    def __len__(self):
+        return len(self._FIELDS) + (self.info is not None)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    @classmethod
+    def field_names(cls):
+        """
+        该记录类型的全部输出字段（固定顺序，与单条记录是否缺少字段无关），用作导出时的列
+
+        Returns:
+            list: 字段名
+        """
+        return list(cls._FIELDS)
+
+    def to_dict(self):
+        """
+        转换为普通字典（JSON序列化、pandas等需要字典的场景）
+
+        Returns:
+            dict: 与旧版格式化结果相同的字典
+        """
+        return dict(self.items())
+
+
+class HistoryOrder(_Record):
+    """
+    /capi/v2/order/history返回的一条历史订单
+
+    按键读取返回API原始值（与原来直接返回的原始字典一致，缺失的字段不存在，不含info），
+    按属性读取时数值字段解析为float，例如order["price"] == "65000"，order.price == 65000.0
+    """
+
+    __slots__ = tuple(_slot(key) for key in (
+        "symbol", "size", "client_oid", "createTime", "filled_qty", "fee", "order_id", "price", "price_avg",
+        "status", "type", "order_type", "totalProfits", "contracts")) + ("_extra",)
+    _RAW_KEYS = tuple(slot[1:] for slot in __slots__[:-1])
+    _NUMBERS = frozenset(("size", "filled_qty", "fee", "price", "price_avg", "totalProfits", "contracts"))
+    _CODES = ("symbol", "status", "type", "order_type")
+
+    _KEY_SET = frozenset(_RAW_KEYS)
+
+    def __init__(self, raw, keep_raw=False):
+        super().__init__(raw, keep_raw)
+        # 文档之外的字段单独保存，通常为None
+        self._extra = None if raw.keys() <= self._KEY_SET else \
+            {key: value for key, value in raw.items() if key not in self._KEY_SET}
+
+    def __getitem__(self, key):
+        if key in self._RAW_KEYS:
+            value = getattr(self, "_" + key)
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in self._RAW_KEYS:
+            if getattr(self, "_" + key) is not _MISSING:
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    @classmethod
+    def field_names(cls):
+        return list(cls._RAW_KEYS)
+
+    def __getattr__(self, name):
+        # 只在没有同名槽位和属性时调用
+        if name in self._RAW_KEYS:
+            value = getattr(self, "_" + name)
+            if name in self._NUMBERS:
+                return _to_float(value, None)
+            return None if value is _MISSING else value
+        raise AttributeError(name)
+
+
+def _make_record(name, doc, raw_keys, fields, codes=()):
+    """
+    生成紧凑记录类：原始字段保存在"_"前缀的槽位中，每个输出字段对应一个只读属性
+
+    Args:
+        name (str): 类名
+        doc (str): 类文档
+        raw_keys (tuple): 需要保存的原始字段
+        fields (dict): 输出字段 -> 取值函数(record)，顺序即迭代顺序
+        codes (tuple): 取值种类很少、需要共用字符串对象的原始字段
+
+    Returns:
+        type: _Record的子类
+    """
+    namespace = {
+        "__doc__": doc,
+        "__slots__": tuple(_slot(key) for key in raw_keys),
+        "_RAW_KEYS": tuple(raw_keys),
+        "_CODES": tuple(codes),
+        "_FIELDS": dict(fields),
+    }
+    for key, field in fields.items():
+        namespace[key] = property(field)
+    return type(name, (_Record,), namespace)
+
+
+def _entry_price(record):
+    size = _to_float(record._size)
+    return _to_float(record._open_value) / size if size > 0 else 0
+
+
+Position = _make_record(
+    "Position",
+    "/capi/v2/account/position/allPosition返回的一个持仓（CCXT兼容字段）",
+    ("id", "symbol", "side", "size", "open_value", "leverage", "unrealizePnl", "liquidatePrice",
+     "margin_mode", "updated_time"),
+    {
+        "id": _text("_id"),
+        "symbol": _text("_symbol"),
+        "side": lambda record: "long" if record._side == "LONG" else "short",
+        "size": _number("_size"),
+        "entryPrice": _entry_price,
+        "leverage": _number("_leverage", 1.0),
+        "unrealizedPnl": _number("_unrealizePnl"),
+        "liquidationPrice": _number("_liquidatePrice"),
+        "marginMode": lambda record: "isolated" if record._margin_mode == "ISOLATED" else "cross",
+        "timestamp": _text("_updated_time", 0),
+    },
+    codes=("symbol", "side", "margin_mode"),
+)
+
+
+# 订单类型映射 (API返回英文字符串)
+PLAN_ORDER_TYPE_NAMES = {
+    "OPEN_LONG": "开多",
+    "OPEN_SHORT": "开空",
+    "CLOSE_LONG": "平多",
+    "CLOSE_SHORT": "平空",
+    "PARTIAL_CLOSE_LONG": "部分平多",
+    "PARTIAL_CLOSE_SHORT": "部分平空",
+    "AUTO_DELEVERAGING_CLOSE_LONG": "自动减仓(平多)",
+    "AUTO_DELEVERAGING_CLOSE_SHORT": "自动减仓(平空)",
+    "LIQUIDATION_CLOSE_LONG": "强平(平多)",
+    "LIQUIDATION_CLOSE_SHORT": "强平(平空)"
+}
+
+# 计划委托类型的数字代码（接口文档）-> 英文代码，交易所可能返回其中任意一种
+PLAN_ORDER_TYPE_CODES = {
+    "1": "OPEN_LONG",
+    "2": "OPEN_SHORT",
+    "3": "CLOSE_LONG",
+    "4": "CLOSE_SHORT",
+    "5": "PARTIAL_CLOSE_LONG",
+    "6": "PARTIAL_CLOSE_SHORT",
+    "7": "AUTO_DELEVERAGING_CLOSE_LONG",
+    "8": "AUTO_DELEVERAGING_CLOSE_SHORT",
+    "9": "LIQUIDATION_CLOSE_LONG",
+    "10": "LIQUIDATION_CLOSE_SHORT"
+}
+
+
+def plan_order_type(code):
+    """
+    把数字或英文的计划委托类型代码统一为英文代码（如"3"和"CLOSE_LONG"都返回"CLOSE_LONG"）
+
+    Returns:
+        str: 英文类型代码，缺失或未知时返回None
+    """
+    if code is None or code is _MISSING:
+        return None
+    code = str(code).upper()
+    code = PLAN_ORDER_TYPE_CODES.get(code, code)
+    return code if code in PLAN_ORDER_TYPE_NAMES else None
+
+# 订单状态映射 (API返回英文字符串)
+PLAN_ORDER_STATUS_NAMES = {
+    "CANCELED": "已取消",
+    "UNTRIGGERED": "未触发",
+    "PENDING": "待成交",
+    "PARTIALLY_FILLED": "部分成交",
+    "FILLED": "已成交"
+}
+
+# 订单类型映射 (order_type字段，API返回英文字符串)
+PLAN_ORDER_DETAIL_TYPE_NAMES = {
+    "NORMAL": "普通订单",
+    "POST_ONLY": "只做 maker",
+    "FILL_OR_KILL": "Fill-Or-Kill",
+    "IMMEDIATE_OR_CANCEL": "Immediate-Or-Cancel"
+}
+
+
+def _order_value(record):
+    # 订单金额（用于展示）
+    try:
+        return round(_to_float(record._price) * _to_float(record._size), 8)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+CurrentPlanOrder = _make_record(
+    "CurrentPlanOrder",
+    "/capi/v2/order/currentPlan返回的一个当前计划订单",
+    ("symbol", "size", "client_oid", "createTime", "filled_qty", "fee", "order_id", "price", "price_avg",
+     "status", "type", "order_type", "totalProfits", "triggerPrice", "triggerPriceType", "triggerTime",
+     "presetTakeProfitPrice", "presetStopLossPrice"),
+    {
+        "symbol": _text("_symbol"),
+        "size": _number("_size"),
+        "client_oid": _text("_client_oid"),
+        "create_time": _text("_createTime"),
+        "filled_qty": _number("_filled_qty"),
+        "fee": _number("_fee"),
+        "order_id": _text("_order_id"),
+        "price": _number("_price"),
+        "price_avg": _optional_number("_price_avg"),
+        "status": _mapped("_status", PLAN_ORDER_STATUS_NAMES, "未知"),
+        "status_code": _text("_status", None),
+        "type": lambda record: PLAN_ORDER_TYPE_NAMES.get(plan_order_type(record._type), "未知"),
+        "type_code": _text("_type", None),
+        "order_type": _mapped("_order_type", PLAN_ORDER_DETAIL_TYPE_NAMES, "未知"),
+        "order_type_code": _text("_order_type", None),
+        "totalProfits": _number("_totalProfits"),
+        "triggerPrice": _optional_number("_triggerPrice"),
+        "triggerPriceType": _text("_triggerPriceType"),
+        "triggerTime": _text("_triggerTime"),
+        "presetTakeProfitPrice": _optional_number("_presetTakeProfitPrice"),
+        "presetStopLossPrice": _optional_number("_presetStopLossPrice"),
+        "order_value": _order_value,
+    },
+    codes=("symbol", "status", "type", "order_type", "triggerPriceType"),
+)
+
+
+Fill = _make_record(
+    "Fill",
+    "/capi/v2/order/fills返回的一条成交明细",
+    ("tradeId", "orderId", "symbol", "positionSide", "orderSide", "direction", "fillSize", "fillValue",
+     "fillFee", "realizePnl", "createdTime"),
+    {
+        "trade_id": _text("_tradeId"),
+        "order_id": _text("_orderId"),
+        "symbol": _text("_symbol"),
+        "side": lambda record: "long" if record._positionSide == "LONG" else "short",
+        "order_side": _text("_orderSide", None),
+        "direction": _text("_direction", None),
+        "size": _number("_fillSize"),
+        "value": _number("_fillValue"),
+        "fee": _number("_fillFee"),
+        "realized_pnl": _number("_realizePnl"),
+        "create_time": _text("_createdTime", 0),
+    },
+    codes=("symbol", "positionSide", "orderSide", "direction"),
+)
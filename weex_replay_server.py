@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+本地行情回放服务器
+把已记录的K线按weex_stream的推送格式通过WebSocket回放，用于离线测试推送订阅和价格驱动的策略逻辑（不访问真实交易所）
+
+每根K线依次推送开盘价、最高/最低价、收盘价四个ticker，再推送一条K线；
+可以模拟丢包（序号缺口）和断线，检验客户端的缺口检测、重新订阅和重连
+
+用法:
+    with ReplayServer(ohlcv, symbol="cmt_btcusdt", interval=0.01) as server:
+        stream = MarketStream(server.url)
+
+    # 从本地K线库回放
+    python weex_replay_server.py --symbol cmt_btcusdt --timeframe 1m --limit 500 --interval 0.5
+"""
+
+import argparse
+import asyncio
+import logging
+import threading
+
+from aiohttp import WSMsgType, web
+
+from weex_sdk import dumps_json, loads_json
+
+logger = logging.getLogger("weex_replay_server")
+
+
+def candle_ticks(candle):
+    """
+    按K线模拟价格路径：阳线 开->低->高->收，阴线 开->高->低->收
+
+    Returns:
+        list: 四个价格
+    """
+    _, open_, high, low, close = candle[:5]
+    if close >= open_:
+        return [open_, low, high, close]
+    return [open_, high, low, close]
+
+
+class ReplayServer:
+    """
+    在后台线程中运行的WebSocket回放服务器
+
+    回放进度在所有连接间共享：客户端断线重连后从断开处继续，序号按频道全局递增
+    """
+
+    def __init__(self, ohlcv, symbol="cmt_btcusdt", channel="candle1m", interval=0.0, host="127.0.0.1", port=0,
+                 drop=(), disconnect_after=None, loop_forever=False):
+        """
+        Args:
+            ohlcv (list): 要回放的K线 [[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量], ...]
+            symbol (str): 推送使用的交易对
+            channel (str): K线频道名
+            interval (float): 相邻两条推送之间的间隔秒数
+            host (str): 监听地址
+            port (int): 监听端口，0表示自动分配
+            drop (iterable): 不发送的K线下标（其ticker和K线推送都会被跳过，序号照常递增，形成缺口）
+            disconnect_after (int, optional): 推送完该下标的K线后主动断开一次连接
+            loop_forever (bool): 回放完后是否从头开始
+        """
+        self.ohlcv = [list(c) for c in ohlcv]
+        self.symbol = symbol
+        self.channel = channel
+        self.interval = interval
+        self.host = host
+        self.port = port
+        self.drop = set(drop)
+        self.disconnect_after = disconnect_after
+        self.loop_forever = loop_forever
+
+        self.position = 0
+        self.seq = {"ticker": 0, channel: 0}
+        # 收到的客户端消息，便于测试检查订阅行为
+        self.received = []
+        self.connections = 0
+        self.finished = threading.Event()
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+        self._stopping = None
+
+    @classmethod
+    def from_store(cls, store, symbol, timeframe="1m", limit=None, **kwargs):
+        """
+        从CandleStore读取K线创建回放服务器
+        """
+        return cls(store.load(symbol, timeframe, limit=limit), symbol=symbol, channel=f"candle{timeframe}", **kwargs)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/ws"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        """
+        启动服务器，返回时已开始监听
+        """
+        self._thread = threading.Thread(target=self._serve, name="weex-replay-server", daemon=True)
+        self._thread.start()
+        self._started.wait(10)
+
+    def stop(self):
+        """
+        停止服务器
+        """
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread is not None:
+            self._thread.join(10)
+            self._thread = None
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._main())
+        self._loop.close()
+
+    async def _main(self):
+        self._stopping = asyncio.Event()
+        app = web.Application()
+        app.router.add_get("/ws", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info("行情回放服务器已启动: %s", self.url)
+        self._started.set()
+        await self._stopping.wait()
+        await self._runner.cleanup()
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        subscriptions = set()
+        feeder = asyncio.ensure_future(self._feed(ws, subscriptions))
+        try:
+            async for msg in ws:
+                if msg.type not in (WSMsgType.TEXT, WSMsgType.BINARY):
+                    continue
+                message = loads_json(msg.data)
+                self.received.append(message)
+                event = message.get("event")
+                key = (message.get("channel"), message.get("symbol"))
+                if event == "ping":
+                    await ws.send_bytes(dumps_json({"event": "pong"}))
+                elif event == "subscribe":
+                    subscriptions.add(key)
+                    await ws.send_bytes(dumps_json({"event": "subscribed", "channel": key[0], "symbol": key[1],
+                                                    "seq": self.seq.get(key[0], 0)}))
+                elif event == "unsubscribe":
+                    subscriptions.discard(key)
+        finally:
+            feeder.cancel()
+        return ws
+
+    async def _send(self, ws, subscriptions, channel, data, skip):
+        self.seq[channel] += 1
+        if skip or (channel, self.symbol) not in subscriptions:
+            return
+        await ws.send_bytes(dumps_json({"event": "push", "channel": channel, "symbol": self.symbol,
+                                        "seq": self.seq[channel], "data": data}))
+        if self.interval:
+            await asyncio.sleep(self.interval)
+
+    async def _feed(self, ws, subscriptions):
+        # 等待客户端订阅后再开始回放
+        while not subscriptions:
+            await asyncio.sleep(0.01)
+        while True:
+            if self.position >= len(self.ohlcv):
+                if not self.loop_forever:
+                    self.finished.set()
+                    return
+                self.position = 0
+            index = self.position
+            candle = self.ohlcv[index]
+            skip = index in self.drop
+            for price in candle_ticks(candle):
+                await self._send(ws, subscriptions, "ticker", {"ts": candle[0], "last": price}, skip)
+            await self._send(ws, subscriptions, self.channel, candle, skip)
+            self.position += 1
+            if self.disconnect_after is not None and index == self.disconnect_after:
+                self.disconnect_after = None
+                await ws.close()
+                return
+            # 没有间隔时也让出事件循环，及时处理订阅消息
+            await asyncio.sleep(0)
+
+
+def main():
+    from candle_store import CandleStore
+
+    parser = argparse.ArgumentParser(description="本地行情回放服务器")
+    parser.add_argument("--db", help="K线数据库文件，默认WEEX_CANDLE_DB")
+    parser.add_argument("--symbol", default="cmt_btcusdt")
+    parser.add_argument("--timeframe", default="1m")
+    parser.add_argument("--limit", type=int, default=None, help="只回放最新的N根K线")
+    parser.add_argument("--interval", type=float, default=0.5, help="推送间隔（秒）")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = CandleStore(args.db)
+    server = ReplayServer.from_store(store, args.symbol, args.timeframe, limit=args.limit, interval=args.interval,
+                                     port=args.port, loop_forever=True)
+    print(f"回放{len(server.ohlcv)}根K线，测试模式下设置 WEEX_REPLAY_URL={server.url} 即可让策略使用回放行情")
+    server.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,2062 @@
+import base64
 import hashlib
 import hmac
+import itertools
+import logging
+import random
 import time
+import threading
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 import json
 import os
 # 尝试从.env文件加载环境变量
 from dotenv import load_dotenv
+
+from weex_records import CurrentPlanOrder, Fill, HistoryOrder, Position
 load_dotenv()
 
 
-# 环境变量配置
-WEEX_API_KEY = os.getenv('WEEX_API_KEY')
-# 优先使用WEEX_API_SECRET，如果不存在则使用WEEX_SECRET作为备选
-WEEX_SECRET = os.getenv('WEEX_API_SECRET') or os.getenv('WEEX_SECRET')
-WEEX_ACCESS_PASSPHRASE = os.getenv('WEEX_ACCESS_PASSPHRASE')
+# 环境变量配置
+WEEX_API_KEY = os.getenv('WEEX_API_KEY')
+# 优先使用WEEX_API_SECRET，如果不存在则使用WEEX_SECRET作为备选
+WEEX_SECRET = os.getenv('WEEX_API_SECRET') or os.getenv('WEEX_SECRET')
+WEEX_ACCESS_PASSPHRASE = os.getenv('WEEX_ACCESS_PASSPHRASE')
+# 多个进程共享限速额度时使用的状态文件（可选）
+WEEX_RATE_LIMIT_FILE = os.getenv('WEEX_RATE_LIMIT_FILE')
+# JSON Lines格式的请求日志文件（可选）
+WEEX_REQUEST_LOG = os.getenv('WEEX_REQUEST_LOG')
+
+# SDK日志，级别和输出由调用方通过logging配置，未配置时只输出WARNING及以上
+logger = logging.getLogger("weex_sdk")
+# 请求日志：每个请求一行JSON，记录方法、路径、耗时、状态码和响应大小，默认关闭
+request_logger = logging.getLogger("weex_sdk.requests")
+request_logger.propagate = False
+request_logger.setLevel(logging.WARNING)
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，只能使用进程内限速
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时使用标准库json
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _json_default(obj):
+    # 持仓和订单记录（Mapping）按字典序列化
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(obj):
+    """
+    把请求体序列化为紧凑的UTF-8字节串，签名和发送使用同一份字节
+    安装了orjson时优先使用，orjson不支持的类型（如Decimal）退回标准库
+
+    Args:
+        obj: 可JSON序列化的对象
+
+    Returns:
+        bytes: JSON字节串
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def loads_json(data):
+    """
+    解析响应体，安装了orjson时优先使用
+
+    Args:
+        data (bytes | str): JSON文本
+
+    Returns:
+        解析后的对象
+
+    Raises:
+        ValueError: 不是合法的JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    把请求日志记录格式化为一行紧凑的JSON
+    """
+
+    def format(self, record):
+        entry = {"ts": round(record.created, 3)}
+        entry.update(getattr(record, "request", {}))
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+_request_log_files = set()
+
+
+def enable_request_log(path=None, stream=None):
+    """
+    开启JSON Lines请求日志，同一个文件重复开启时只添加一次
+
+    Args:
+        path (str, optional): 日志文件路径
+        stream (file, optional): 输出流，未提供path时使用，默认sys.stderr
+
+    Returns:
+        logging.Handler: 添加的日志处理器，已开启过时返回None
+    """
+    if path is not None:
+        path = os.path.abspath(path)
+        if path in _request_log_files:
+            return None
+        _request_log_files.add(path)
+        handler = logging.FileHandler(path, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonLinesFormatter())
+    request_logger.addHandler(handler)
+    request_logger.setLevel(logging.INFO)
+    return handler
+
+
+def log_request(method, request_path, started, status, size):
+    """
+    写入一条请求日志，调用方应先检查request_logger.isEnabledFor(logging.INFO)
+
+    Args:
+        method (str): HTTP方法
+        request_path (str): 请求路径（不含查询参数和请求体）
+        started (float): 发送前的time.perf_counter()
+        status (int): HTTP状态码，没有收到响应时为None
+        size (int): 响应体字节数
+    """
+    request_logger.info("request", extra={"request": {
+        "method": method.upper(),
+        "path": request_path,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "status": status,
+        "size": size
+    }})
+
+
+# K线接口单次请求最多返回的条数
+MAX_CANDLES_PER_REQUEST = 1000
+
+# fetch_ohlcv_range按块返回DataFrame时的列名
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+_TIMEFRAME_UNITS = {
+    "m": 60 * 1000,
+    "h": 60 * 60 * 1000,
+    "d": 24 * 60 * 60 * 1000,
+    "w": 7 * 24 * 60 * 60 * 1000
+}
+
+
+def timeframe_to_ms(timeframe):
+    """
+    把K线周期转换为毫秒
+
+    Args:
+        timeframe (str): K线周期，如 "1m", "15m", "4h", "1d", "1w"
+
+    Returns:
+        int: 周期长度（毫秒）
+
+    Raises:
+        ValueError: 不支持的周期格式
+    """
+    unit = _TIMEFRAME_UNITS.get(timeframe[-1:])
+    if unit is None or not timeframe[:-1].isdigit():
+        raise ValueError(f"不支持的K线周期: {timeframe}")
+    return int(timeframe[:-1]) * unit
+
+
+# 按接口族划分的默认限速：capacity为桶容量（允许的突发请求权重），refill_rate为每秒补充的令牌数
+# 默认值比交易所公布的上限保守，多个机器人共用一个API Key时建议配合WEEX_RATE_LIMIT_FILE使用
+DEFAULT_RATE_LIMITS = {
+    "market": {"capacity": 20, "refill_rate": 10},
+    "account": {"capacity": 10, "refill_rate": 5},
+    "order": {"capacity": 10, "refill_rate": 5}
+}
+
+# 单次请求消耗的令牌数，未列出的接口权重为1
+DEFAULT_ENDPOINT_WEIGHTS = {
+    "/capi/v2/order/history": 5,
+    "/capi/v2/order/historyPlan": 5,
+    "/capi/v2/order/fills": 5,
+    "/capi/v2/order/cancel_batch_orders": 5,
+    "/capi/v2/order/cancelAllOrders": 5,
+    "/capi/v2/order/batchOrders": 5,
+    "/capi/v2/account/position/allPosition": 2
+}
+
+# 批量撤单接口
+CANCEL_ORDER_PATH = "/capi/v2/order/cancel_order"
+CANCEL_BATCH_PATH = "/capi/v2/order/cancel_batch_orders"
+CANCEL_ALL_PATH = "/capi/v2/order/cancelAllOrders"
+OPEN_ORDERS_PATH = "/capi/v2/order/openOrders"
+
+# 单次批量撤单的订单数上限
+CANCEL_BATCH_LIMIT = 10
+
+# 批量撤单回退为逐个撤单时的默认并发数
+CANCEL_WORKERS = 4
+
+# 批量下单接口及单次请求的订单数上限（同一请求内的订单必须是同一交易对）
+BATCH_ORDERS_PATH = "/capi/v2/order/batchOrders"
+BATCH_ORDER_LIMIT = 20
+
+# 下单接口：请求可能已经到达交易所的失败不能直接重发，否则可能重复下单
+ORDER_PLACING_PATHS = frozenset({"/capi/v2/order/placeOrder", "/capi/v2/order/plan_order", BATCH_ORDERS_PATH})
+
+# 交易所以client_oid重复拒绝下单时错误信息中的关键字
+DUPLICATE_ORDER_MARKERS = ("duplicate", "repeat", "already exist")
+
+# 批量下单时订单类型的别名 -> type取值（1: 开多，2: 开空，3: 平多，4: 平空）
+ORDER_TYPE_VALUES = {"open_long": "1", "open_short": "2", "close_long": "3", "close_short": "4"}
+
+
+def endpoint_family(request_path):
+    """
+    根据请求路径判断接口族
+
+    Args:
+        request_path (str): 请求路径，如 "/capi/v2/market/candles"
+
+    Returns:
+        str: "market"、"order" 或 "account"
+    """
+    if "/market/" in request_path:
+        return "market"
+    if "/order/" in request_path:
+        return "order"
+    return "account"
+
+
+class TokenBucketLimiter:
+    """
+    按接口族划分的令牌桶限速器
+
+    令牌不足时不会报错，而是预留令牌（余额可以为负）并返回需要等待的秒数，
+    请求按预留顺序排队。指定state_file时桶状态保存在文件中并用文件锁保护，
+    同一台机器上的多个进程共享同一份额度。
+    """
+
+    def __init__(self, limits=None, weights=None, state_file=None):
+        """
+        Args:
+            limits (dict, optional): 接口族 -> {"capacity": 容量, "refill_rate": 每秒补充速率}，默认DEFAULT_RATE_LIMITS
+            weights (dict, optional): 请求路径 -> 权重，默认DEFAULT_ENDPOINT_WEIGHTS
+            state_file (str, optional): 跨进程共享的状态文件路径
+        """
+        self.limits = DEFAULT_RATE_LIMITS if limits is None else limits
+        self.weights = DEFAULT_ENDPOINT_WEIGHTS if weights is None else weights
+        self.state_file = state_file if fcntl is not None else None
+        if state_file and fcntl is None:
+            logger.warning("当前平台不支持文件锁，限速仅在进程内生效")
+        self._lock = threading.Lock()
+        self._buckets = {}  # 接口族 -> [令牌余额, 上次更新时间]
+        self._stats = {}
+
+    def _take(self, buckets, family, weight, now):
+        """
+        从桶中预留令牌，返回需要等待的秒数
+        """
+        limit = self.limits[family]
+        capacity = limit["capacity"]
+        rate = limit["refill_rate"]
+        tokens, updated = buckets.get(family, (capacity, now))
+        tokens = min(capacity, tokens + max(now - updated, 0) * rate) - weight
+        buckets[family] = [tokens, now]
+        return -tokens / rate if tokens < 0 else 0.0
+
+    def _take_shared(self, family, weight, now):
+        """
+        在文件锁保护下读写共享的桶状态
+        """
+        with open(self.state_file, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                try:
+                    buckets = json.loads(content) if content else {}
+                except ValueError:
+                    buckets = {}
+                wait = self._take(buckets, family, weight, now)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(buckets))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return wait
+
+    def reserve(self, request_path):
+        """
+        为一次请求预留令牌
+
+        Args:
+            request_path (str): 请求路径
+
+        Returns:
+            float: 发送请求前需要等待的秒数，0表示可以立即发送
+        """
+        family = endpoint_family(request_path)
+        if family not in self.limits:
+            return 0.0
+        weight = self.weights.get(request_path, 1)
+        with self._lock:
+            if self.state_file:
+                wait = self._take_shared(family, weight, time.time())
+            else:
+                wait = self._take(self._buckets, family, weight, time.time())
+            stats = self._stats.setdefault(family, {"requests": 0, "throttled": 0, "total_wait": 0.0, "max_wait": 0.0})
+            stats["requests"] += 1
+            if wait > 0:
+                stats["throttled"] += 1
+                stats["total_wait"] += wait
+                stats["max_wait"] = max(stats["max_wait"], wait)
+        return wait
+
+    def acquire(self, request_path):
+        """
+        预留令牌并阻塞等待到可以发送请求
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self.reserve(request_path)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        """
+        获取限速统计
+
+        Returns:
+            dict: 接口族 -> {"requests": 请求数, "throttled": 需要排队的请求数,
+                  "total_wait": 累计等待秒数, "max_wait": 最长等待秒数}
+        """
+        with self._lock:
+            return {family: dict(stats) for family, stats in self._stats.items()}
+
+
+# 可重试错误与致命错误的分类结果
+RETRYABLE = "retryable"
+FATAL = "fatal"
+
+_client_oid_counter = itertools.count()
+
+
+def new_client_oid(prefix=""):
+    """
+    生成客户端订单ID
+    毫秒时间戳加进程内自增序号，同一毫秒内连续下单也不会重复
+
+    Args:
+        prefix (str): ID前缀，如 "close_"
+
+    Returns:
+        str: 客户端订单ID
+    """
+    return f"{prefix}{int(time.time() * 1000)}{next(_client_oid_counter) % 10000:04d}"
+
+
+def error_status(exc):
+    """
+    提取异常对应的HTTP状态码（兼容requests和aiohttp），没有响应时返回None
+    """
+    response = getattr(exc, "response", None)
+    if response is not None and getattr(response, "status_code", None) is not None:
+        return response.status_code
+    status = getattr(exc, "status", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(exc, network_errors=(requests.ConnectionError, requests.Timeout)):
+    """
+    判断请求异常是否可以重试
+
+    - 网络错误、超时、HTTP 5xx和429（限速）可以重试
+    - 其他4xx（参数错误、签名错误、余额不足等）重试也不会成功，属于致命错误
+
+    Args:
+        exc (Exception): 请求抛出的异常
+        network_errors (tuple): 视为网络错误的异常类型
+
+    Returns:
+        str: RETRYABLE 或 FATAL
+    """
+    status = error_status(exc)
+    if status is not None:
+        return RETRYABLE if status == 429 or status >= 500 else FATAL
+    if isinstance(exc, network_errors):
+        return RETRYABLE
+    return FATAL
+
+
+def request_not_sent(exc, unsent_errors=(requests.exceptions.ConnectTimeout,)):
+    """
+    判断请求是否在发出之前就失败（建立连接失败），这类失败重发不会造成重复下单
+
+    Args:
+        exc (Exception): 请求抛出的异常
+        unsent_errors (tuple): 一定发生在发送请求之前的异常类型
+
+    Returns:
+        bool: 请求确定没有发出
+    """
+    if isinstance(exc, unsent_errors):
+        return True
+    # requests把连接失败包装为ConnectionError(MaxRetryError(reason=NewConnectionError))
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def error_payload(exc):
+    """
+    提取HTTP错误响应的内容（兼容requests和aiohttp）
+
+    Returns:
+        dict: 解析后的JSON响应，不是JSON时为{"msg": 原始文本}，没有响应时为{}
+    """
+    response = getattr(exc, "response", None)
+    text = getattr(response, "text", None) if response is not None else getattr(exc, "message", None)
+    if not text:
+        return {}
+    try:
+        payload = loads_json(text)
+    except ValueError:
+        return {"msg": str(text)}
+    return payload if isinstance(payload, dict) else {"msg": str(text)}
+
+
+def is_duplicate_order_message(message):
+    """
+    判断错误信息是否表示client_oid重复
+    """
+    message = str(message or "").lower()
+    return any(marker in message for marker in DUPLICATE_ORDER_MARKERS)
+
+
+def is_duplicate_order_error(exc):
+    """
+    判断下单异常是否是交易所以client_oid重复为由拒绝（说明同一订单已经提交过）
+    """
+    status = error_status(exc)
+    if status is None or not 400 <= status < 500:
+        return False
+    payload = error_payload(exc)
+    return is_duplicate_order_message(payload.get("msg") or payload.get("message") or payload.get("err_msg"))
+
+
+class RetryPolicy:
+    """
+    带抖动的指数退避重试策略，受总时长预算（deadline）约束
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.25, max_delay=2.0, deadline=15.0):
+        """
+        Args:
+            max_attempts (int): 最多尝试次数（包含第一次），1表示不重试
+            base_delay (float): 第一次重试的退避上限（秒），之后每次翻倍
+            max_delay (float): 单次退避的最大秒数
+            deadline (float): 从第一次尝试开始的总时长预算（秒），下次重试会超出预算时放弃
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt):
+        """
+        计算第attempt次失败后的等待时间（full jitter）
+
+        Args:
+            attempt (int): 已失败的次数，从1开始
+
+        Returns:
+            float: 等待秒数
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def next_delay(self, exc, attempt, started, network_errors=(requests.ConnectionError, requests.Timeout),
+                   idempotent=True, unsent_errors=(requests.exceptions.ConnectTimeout,)):
+        """
+        判断是否重试并给出等待时间
+
+        Args:
+            exc (Exception): 本次失败的异常
+            attempt (int): 已失败的次数，从1开始
+            started (float): 第一次尝试开始时的time.monotonic()
+            network_errors (tuple): 视为网络错误的异常类型
+            idempotent (bool): 请求重发是否安全；下单请求为False，只重试确定没有发出的请求
+            unsent_errors (tuple): 一定发生在发送请求之前的异常类型，参见request_not_sent
+
+        Returns:
+            float: 等待秒数，None表示不再重试
+        """
+        if attempt >= self.max_attempts or classify_error(exc, network_errors) == FATAL:
+            return None
+        if not idempotent and not request_not_sent(exc, unsent_errors):
+            return None
+        delay = self.backoff(attempt)
+        # 交易所限速时优先遵循Retry-After（requests的响应头在exc.response上，aiohttp的ClientResponseError直接带headers）
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) if response is not None else getattr(exc, "headers", None)
+        retry_after = headers.get("Retry-After") if headers else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if self.deadline is not None and time.monotonic() - started + delay > self.deadline:
+            return None
+        return delay
+
+
+# 服务器时间接口，无需签名
+SERVER_TIME_PATH = "/capi/v2/market/time"
+
+# 全部交易对最新行情
+TICKERS_PATH = "/capi/v2/market/tickers"
+
+
+def parse_server_time(response):
+    """
+    解析/capi/v2/market/time的响应
+
+    Args:
+        response (dict): 形如 {"epoch": "1716710918.113", "iso": "...", "timestamp": 1716710918113}
+
+    Returns:
+        int: 服务器时间（毫秒），无法解析时返回None
+    """
+    if not isinstance(response, dict):
+        return None
+    if isinstance(response.get("data"), dict):
+        response = response["data"]
+    try:
+        if response.get("timestamp") is not None:
+            return int(response["timestamp"])
+        if response.get("epoch") is not None:
+            return int(float(response["epoch"]) * 1000)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class ServerClock:
+    """
+    估计本地时钟与交易所服务器时钟的偏差，签名时间戳使用校正后的时间
+
+    每次采样记录发送时刻t0、服务器时间ts和接收时刻t1，假设往返对称，
+    偏差样本为 ts - (t0 + t1) / 2（即扣除RTT/2）。偏差和RTT都用指数加权平均平滑，
+    RTT明显高于平均值的样本误差较大，降低权重
+    """
+
+    def __init__(self, resync_interval=300.0, alpha=0.3):
+        """
+        Args:
+            resync_interval (float): 重新同步的间隔（秒），None或0表示只在首次签名前同步一次
+            alpha (float): 指数加权平均的平滑系数，越大越偏向最新样本
+        """
+        self.resync_interval = resync_interval
+        self.alpha = alpha
+        self.offset_ms = 0.0
+        self.rtt_ms = None
+        self.samples = 0
+        self.last_sync = None
+        self._lock = threading.Lock()
+
+    def add_sample(self, sent_ms, server_ms, received_ms):
+        """
+        加入一次采样
+
+        Args:
+            sent_ms (float): 请求发出时的本地时间（毫秒）
+            server_ms (float): 服务器返回的时间（毫秒）
+            received_ms (float): 收到响应时的本地时间（毫秒）
+        """
+        rtt = max(received_ms - sent_ms, 0.0)
+        offset = server_ms - (sent_ms + received_ms) / 2
+        with self._lock:
+            if self.samples == 0:
+                self.offset_ms = offset
+                self.rtt_ms = rtt
+            else:
+                alpha = self.alpha
+                # 往返时间越长，RTT/2校正的误差越大，样本权重相应降低
+                if rtt > 2 * self.rtt_ms:
+                    alpha = alpha * self.rtt_ms / rtt
+                self.offset_ms += alpha * (offset - self.offset_ms)
+                self.rtt_ms += self.alpha * (rtt - self.rtt_ms)
+            self.samples += 1
+            self.last_sync = time.monotonic()
+
+    def needs_sync(self):
+        """
+        是否需要（重新）同步服务器时间
+        """
+        if self.last_sync is None:
+            return True
+        return bool(self.resync_interval) and time.monotonic() - self.last_sync > self.resync_interval
+
+    def mark_attempt(self):
+        """
+        同步失败时调用，推迟下次同步，避免服务器时间接口不可用时每个请求都去尝试
+        """
+        with self._lock:
+            self.last_sync = time.monotonic()
+
+    def now_ms(self):
+        """
+        校正后的当前时间（毫秒）
+        """
+        return int(time.time() * 1000 + self.offset_ms)
+
+    def stats(self):
+        """
+        获取时钟同步状态
+
+        Returns:
+            dict: offset_ms（服务器时间减本地时间）、rtt_ms（平滑后的往返时间）、samples（采样次数）
+        """
+        with self._lock:
+            return {"offset_ms": self.offset_ms, "rtt_ms": self.rtt_ms, "samples": self.samples}
+
+
+def _order_key(order, field="order_id"):
+    # 没有ID的记录不参与去重
+    return order.get(field) or None
+
+
+def _order_time(order, field):
+    try:
+        return int(order.get(field))
+    except (TypeError, ValueError):
+        return None
+
+
+class PageCursor:
+    """
+    按页码翻页（/capi/v2/order/currentPlan）
+
+    params是下一页的请求参数，结束后为None。返回不足一页、或整页都是上一页已返回过的订单（接口忽略了页码）时结束
+    """
+
+    def __init__(self, params, page_key="page", limit_key="limit", limit=100, first_page=0):
+        """
+        Args:
+            params (dict): 除页码和每页数量外的请求参数
+            page_key (str): 页码参数名
+            limit_key (str): 每页数量参数名
+            limit (int): 每页数量
+            first_page (int): 第一页的页码
+        """
+        self.page_key = page_key
+        self.limit = limit
+        self.params = dict(params, **{page_key: first_page, limit_key: limit})
+        self.pages = 0
+        self.complete = True
+        self._previous = set()
+
+    def advance(self, orders, has_more=None):
+        """
+        记录一页结果并计算下一页的参数
+
+        Args:
+            orders (list): 本页订单
+            has_more (bool, optional): 接口返回的是否还有更多，None表示按本页数量判断
+
+        Returns:
+            list: 本页中没有返回过的订单
+        """
+        self.pages += 1
+        fresh = [order for order in orders if _order_key(order) is None or _order_key(order) not in self._previous]
+        if has_more is None:
+            has_more = len(orders) >= self.limit
+        if not has_more or not fresh:
+            self.params = None
+        else:
+            self.params = dict(self.params, **{self.page_key: self.params[self.page_key] + 1})
+        self._previous = {_order_key(order) for order in orders} - {None}
+        return fresh
+
+
+class TimeCursor:
+    """
+    按创建时间翻页（/capi/v2/order/historyPlan、/capi/v2/order/history）
+
+    接口没有页码，下一页把时间边界移到本页最旧（backward）或最新（forward）订单的创建时间，
+    边界上的订单可能在下一页再次返回，只记住边界时间上的订单ID去重，内存占用与总订单数无关。
+    接口返回顺序与翻页方向不一致时无法继续翻页：strict时停止并把complete置为False，
+    否则只返回已取到的一页并把truncated置为True（接口只有一个方向的时间边界时，只能取到最新的一页）
+    """
+
+    def __init__(self, params, time_key, limit, direction="backward", time_field="create_time", key_field="order_id",
+                 strict=True):
+        """
+        Args:
+            params (dict): 第一页的请求参数
+            time_key (str): 作为时间边界的请求参数名，如endTime、createDate
+            limit (int): 每页数量
+            direction (str): backward表示从新到旧（移动结束时间），forward表示从旧到新（移动开始时间）
+            time_field (str): 记录中的创建时间字段
+            key_field (str): 记录中用于去重的ID字段
+            strict (bool): 返回顺序与翻页方向不一致时是否视为没有取完（迭代器抛出异常）
+        """
+        self.time_key = time_key
+        self.limit = limit
+        self.direction = direction
+        self.time_field = time_field
+        self.key_field = key_field
+        self.strict = strict
+        self.params = dict(params)
+        self.pages = 0
+        self.complete = True
+        self.truncated = False
+        self._boundary = None
+        self._seen = set()
+
+    def advance(self, orders, has_more=None):
+        """
+        记录一页结果并计算下一页的参数
+
+        Args:
+            orders (list): 本页订单
+            has_more (bool, optional): 接口返回的是否还有更多，None表示按本页数量判断
+
+        Returns:
+            list: 本页中没有返回过的订单
+        """
+        self.pages += 1
+        key_field = self.key_field
+        fresh = [order for order in orders
+                 if _order_key(order, key_field) is None or _order_key(order, key_field) not in self._seen]
+        if has_more is None:
+            has_more = len(orders) >= self.limit
+        times = [t for t in (_order_time(order, self.time_field) for order in orders) if t is not None]
+        if not has_more or not fresh or not times:
+            self.params = None
+            return fresh
+
+        backward = self.direction == "backward"
+        if (times[0] < times[-1]) if backward else (times[0] > times[-1]):
+            # 返回顺序与翻页方向相反，移动边界会跳过中间的订单
+            self.params = None
+            if self.strict:
+                logger.error("%s翻页: 接口返回的订单顺序与翻页方向不一致，无法继续翻页", self.time_key)
+                self.complete = False
+            else:
+                logger.warning("%s翻页: 接口从%s返回订单，无法继续翻页，只取到最新的%s条", self.time_key,
+                               "旧到新" if backward else "新到旧", len(orders))
+                self.truncated = True
+            return fresh
+
+        boundary = min(times) if backward else max(times)
+        on_boundary = {_order_key(order, key_field) for order in orders
+                       if _order_time(order, self.time_field) == boundary} - {None}
+        self._seen = (self._seen | on_boundary) if boundary == self._boundary else on_boundary
+        self._boundary = boundary
+        self.params = dict(self.params, **{self.time_key: boundary})
+        return fresh
+
+
+class WeexClientBase:
+    """
+    WEEX API客户端的公共部分：签名、请求构建和响应格式化
+    同步客户端WeexClient和异步客户端AsyncWeexClient共用这些逻辑，只各自实现网络传输
+    """
+    
+    def __init__(self, api_key, api_secret, api_passphrase, testnet=False, keep_alive=True,
+                 rate_limiter=None, rate_limits=None, rate_limit_file=None, retry_policy=None,
+                 server_clock=None, request_log=None, keep_raw=False):
+        """
+        初始化客户端公共配置
+        
+        Args:
+            api_key (str): API密钥
+            api_secret (str): API密钥密码
+            api_passphrase (str): API密码短语
+            testnet (bool): 是否使用测试网络
+            keep_alive (bool): 是否复用TCP/TLS连接
+            rate_limiter (TokenBucketLimiter, optional): 共享的限速器，提供时忽略rate_limits和rate_limit_file
+            rate_limits (dict, optional): 接口族限速配置，默认DEFAULT_RATE_LIMITS，传入{}表示不限速
+            rate_limit_file (str, optional): 跨进程共享限速额度的状态文件，默认读取WEEX_RATE_LIMIT_FILE环境变量
+            retry_policy (RetryPolicy, optional): 请求重试策略，默认RetryPolicy()，传入RetryPolicy(max_attempts=1)表示不重试
+            server_clock (ServerClock, optional): 服务器时钟偏差估计，默认ServerClock()，多个客户端可共享同一个实例
+            request_log (str, optional): JSON Lines请求日志文件，默认读取WEEX_REQUEST_LOG环境变量
+            keep_raw (bool): 持仓和订单记录是否在info中保留API原始数据，默认不保留以节省内存
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.api_passphrase = api_passphrase
+        
+        # 使用合约API专用域名
+        self.base_url = "https://api-contract.weex.com" if not testnet else "https://api-contract.weex.com"
+            
+        self.timeout = 10  # 请求超时时间（秒）
+        self.keep_alive = keep_alive
+        
+        # 客户端限速，超出额度的请求排队等待而不是被交易所拒绝
+        if rate_limiter is None:
+            rate_limiter = TokenBucketLimiter(limits=rate_limits, state_file=rate_limit_file or WEEX_RATE_LIMIT_FILE)
+        self.rate_limiter = rate_limiter
+        
+        # 可重试错误（网络、5xx、429）按策略退避重试；下单请求可能已被交易所受理，只重试连接建立失败的情况
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        
+        # 本地时钟漂移会导致签名时间戳被拒绝，签名使用按服务器时间校正后的时钟
+        self.server_clock = server_clock if server_clock is not None else ServerClock()
+        
+        # 持仓和订单记录默认只保存用到的字段，需要原始数据时开启
+        self.keep_raw = keep_raw
+        
+        request_log = request_log or WEEX_REQUEST_LOG
+        if request_log:
+            enable_request_log(request_log)
+    
+    def rate_limit_stats(self):
+        """
+        获取限速排队统计，参见TokenBucketLimiter.stats
+        """
+        return self.rate_limiter.stats()
+    
+    @property
+    def time_offset(self):
+        """
+        当前估计的服务器时钟偏差（毫秒，服务器时间减本地时间）
+        """
+        return self.server_clock.offset_ms
+    
+    @property
+    def time_rtt(self):
+        """
+        当前估计的往返时间（毫秒），尚未同步时为None
+        """
+        return self.server_clock.rtt_ms
+    
+    def _timestamp(self):
+        """
+        生成签名用的时间戳（毫秒字符串），已按服务器时钟偏差校正
+        """
+        return str(self.server_clock.now_ms())
+    
+    def _sign(self, timestamp, method, request_path, body=None, query_string=''):
+        """
+        生成API签名
+        根据官方示例代码实现 - 与office_demo.py保持一致
+        
+        Args:
+            timestamp (str): 时间戳
+            method (str): HTTP方法
+            request_path (str): 请求路径
+            body (bytes, optional): 已序列化的请求体，必须与实际发送的字节完全一致
+            query_string (str): 查询字符串，含前导'?'，没有查询参数时为空字符串
+            
+        Returns:
+            str: 生成的签名（经过BASE64编码）
+        """
+        # 签名消息: 时间戳 + HTTP方法 + 请求路径 + 查询字符串 + 请求体（GET请求没有请求体）
+        message = (timestamp + method.upper() + request_path + query_string).encode('utf-8')
+        if body and method.upper() != 'GET':
+            message += body
+        
+        # 使用HMAC-SHA256算法生成签名
+        signature = hmac.new(
+            self.api_secret.encode('utf-8'),
+            message,
+            hashlib.sha256
+        ).digest()
+        
+        # 按照官方文档要求进行BASE64编码
+        return base64.b64encode(signature).decode('utf-8')
+    
+    def _prepare_request(self, method, request_path, params=None, data=None, need_sign=True, headers=None):
+        """
+        构建请求的URL、请求头、参数和请求体（含签名），同步和异步客户端共用
+        请求体只序列化一次，签名的字节就是发送的字节
+        
+        Args:
+            method (str): HTTP方法，如 'GET', 'POST'
+            request_path (str): 请求路径
+            params (dict, optional): URL查询参数
+            data (dict, optional): 请求体数据
+            need_sign (bool): 是否需要签名
+            headers (dict, optional): 额外的请求头
+        
+        Returns:
+            tuple: (url, headers, params, body)，GET请求的查询参数已按官方demo方式拼接到url中，此时params为None；
+                body为序列化后的请求体字节串，GET请求或没有请求体时为None
+        
+        Raises:
+            ValueError: 不支持的HTTP方法
+        """
+        method = method.upper()
+        if method not in ('GET', 'POST', 'DELETE'):
+            raise ValueError(f"不支持的HTTP方法: {method}")
+        
+        # 构建URL
+        url = f"{self.base_url}{request_path}"
+        
+        # 设置基础请求头
+        base_headers = {
+            'Content-Type': 'application/json',
+            'locale': 'zh-CN'
+        }
+        if not self.keep_alive:
+            base_headers['Connection'] = 'close'
+        # 合并基础请求头和额外请求头
+        if headers:
+            base_headers.update(headers)
+        headers = base_headers
+        
+        # 确保params中的值都是字符串类型，签名和URL使用同一个查询字符串
+        query_string = ''
+        if params:
+            params = {k: str(v) for k, v in params.items()}
+            query_string = '?' + '&'.join(f"{key}={value}" for key, value in params.items())
+        
+        body = dumps_json(data) if data and method != 'GET' else None
+        
+        # 如果需要签名
+        if need_sign and self.api_key:
+            # 生成时间戳
+            timestamp = self._timestamp()
+            
+            # 生成签名（包含查询参数）
+            signature = self._sign(timestamp, method, request_path, body, query_string)
+            
+            # 添加认证相关的请求头，使用官方推荐的头名称
+            headers['ACCESS-KEY'] = self.api_key
+            headers['ACCESS-SIGN'] = signature
+            headers['ACCESS-PASSPHRASE'] = self.api_passphrase
+            headers['ACCESS-TIMESTAMP'] = timestamp
+        
+        # 对于GET请求，严格按照官方demo的URL拼接方式，直接将查询参数拼接到URL中
+        if method == 'GET':
+            return url + query_string, headers, None, None
+        
+        return url, headers, params or None, body
+    
+    def _format_account_assets(self, response):
+        """
+        解析/capi/v2/account/assets的响应
+
+        Args:
+            response: API响应
+
+        Returns:
+            list: 账户资产列表
+        """
+        logger.debug("API响应: %s", response)
+        # 检查响应是否为列表类型
+        if isinstance(response, list):
+            # API直接返回资产列表
+            return response
+        logger.warning("响应格式不是列表，收到 %s", type(response).__name__)
+        # 如果是字典类型并且包含data字段，尝试获取data
+        if isinstance(response, dict) and 'data' in response:
+            return response['data']
+        # 返回空列表作为默认值
+        return []
+
+    def _format_account_balance(self, response):
+        """
+        解析/capi/v2/account/accounts的响应
+
+        Args:
+            response: API响应
+
+        Returns:
+            list: 账户信息和抵押品信息合并后的列表
+
+        Raises:
+            TypeError: 响应不是dict类型
+        """
+        logger.debug("API响应: %s", response)
+        # 检查响应是否为dict类型
+        if not isinstance(response, dict):
+            raise TypeError(f"响应格式不正确，期望dict类型，收到 {type(response).__name__}")
+        # 合约API直接返回账户信息字典，不需要data字段
+        # 为了兼容原有代码，将账户信息转换为列表格式
+        account_info = response.get('account', {})
+        collateral_info = response.get('collateral', [])
+        # 返回合并后的账户信息列表
+        return [account_info] + collateral_info
+
+    def _leverage_data(self, symbol, margin_mode, long_leverage=None, short_leverage=None):
+        """
+        构建调整杠杆的请求数据
+
+        API要求：
+        - marginMode必须是Integer类型，1表示全仓，3表示逐仓
+        - 必须同时提供longLeverage和shortLeverage参数
+        - 全仓模式下，多头和空头杠杆必须相同
+        """
+        return {
+            "symbol": symbol,
+            "marginMode": int(margin_mode),  # 必须是整数类型
+            "longLeverage": str(long_leverage) if long_leverage is not None else "1",
+            "shortLeverage": str(short_leverage) if short_leverage is not None else str(long_leverage if long_leverage is not None else "1")
+        }
+
+    def _extract_coin_balance(self, assets, coin_symbol="USDT"):
+        """
+        从账户资产列表中提取币种余额
+        针对合约API，collateral字段中的资产包含legacy_amount字段
+
+        Args:
+            assets (list): get_account_balance返回的资产列表
+            coin_symbol (str): 币种符号
+
+        Returns:
+            float: 币种余额，未找到时为0.0
+        """
+        logger.debug("获取到的资产列表: %s", assets)
+
+        # 遍历资产列表，查找USDT资产
+        for asset in assets:
+            if isinstance(asset, dict):
+                # 检查是否为抵押品信息（包含legacy_amount字段）
+                if 'legacy_amount' in asset:
+                    # 假设第一个抵押品就是USDT（根据API响应）
+                    # 如果需要精确匹配，可以添加币种判断逻辑
+                    balance = asset.get('legacy_amount', '0')
+                    logger.debug("找到USDT资产，legacy_amount=%s", balance)
+                    return float(balance)
+
+        logger.warning("未找到%s资产或获取失败", coin_symbol)
+        return 0.0
+
+    def _history_orders_params(self, symbol=None, page_size=None, create_date=None):
+        """
+        校验并构建/capi/v2/order/history的查询参数
+
+        Returns:
+            tuple: (params, error)，参数无效时params为None，error为可直接返回给调用方的错误结果
+        """
+        if symbol is not None:
+            if not isinstance(symbol, str) or not symbol.strip():
+                logger.error("symbol参数必须是非空字符串")
+                return None, {
+                    "orders": [],
+                    "error": "symbol参数无效",
+                    "error_code": "INVALID_PARAMETER"
+                }
+
+        if page_size is not None:
+            if not isinstance(page_size, int) or page_size <= 0:
+                logger.error("page_size参数必须是正整数，当前值: %s", page_size)
+                return None, {
+                    "orders": [],
+                    "error": "page_size参数无效，必须是正整数",
+                    "error_code": "INVALID_PARAMETER"
+                }
+            # 限制page_size最大值，避免请求过多数据
+            if page_size > 500:
+                logger.warning("page_size(%s)超过最大限制，将调整为500", page_size)
+                page_size = 500
+
+        if create_date is not None:
+            if not isinstance(create_date, int):
+                logger.error("create_date参数必须是整数类型（时间戳），当前值: %s", create_date)
+                return None, {
+                    "orders": [],
+                    "error": "create_date参数必须是整数类型（时间戳）",
+                    "error_code": "INVALID_PARAMETER"
+                }
+            if create_date <= 0:
+                logger.error("create_date参数必须是正整数时间戳，当前值: %s", create_date)
+                return None, {
+                    "orders": [],
+                    "error": "create_date参数必须是正整数时间戳",
+                    "error_code": "INVALID_PARAMETER"
+                }
+
+        params = {}
+        if symbol is not None:
+            params["symbol"] = symbol
+        if page_size is not None:
+            params["pageSize"] = page_size
+        if create_date is not None:
+            params["createDate"] = create_date
+        return params, None
+
+    def _format_history_orders(self, response, page_size=None):
+        """
+        格式化/capi/v2/order/history的响应
+
+        Args:
+            response: 接口响应
+            page_size (int, optional): 请求的每页数量，接口不返回是否还有更多，返回满一页时认为还有更多
+
+        Returns:
+            dict: 包含orders字段（订单列表）的结果
+        """
+        # 根据API文档，响应可能是一个订单数组
+        if isinstance(response, list):
+            # 格式化响应，确保返回格式一致
+            keep_raw = self.keep_raw
+            return {
+                "orders": [HistoryOrder(order, keep_raw) if isinstance(order, dict) else order for order in response],
+                "has_more": page_size is not None and len(response) >= page_size
+            }
+        elif isinstance(response, dict):
+            # 如果返回的是字典，可能是错误响应或其他格式
+            if "code" in response and response["code"] != 0:
+                error_msg = response.get("msg", "未知API错误")
+                error_code = response.get("code", "UNKNOWN_ERROR")
+                logger.error("API错误 - 代码: %s, 消息: %s", error_code, error_msg)
+                return {
+                    "orders": [],
+                    "error": error_msg,
+                    "error_code": str(error_code)
+                }
+            # 如果有orders字段，则返回该字段的值
+            if "orders" in response:
+                return response
+            # 否则将整个响应作为orders返回
+            return {"orders": [response], "has_more": False}
+        else:
+            logger.error("无效的响应格式: %s", type(response))
+            return {
+                "orders": [],
+                "error": "API返回的响应格式无效",
+                "error_code": "INVALID_RESPONSE"
+            }
+
+    def _plan_history_params(self, symbol, start_time=None, end_time=None, delegate_type=None, page_size=None):
+        """
+        校验并构建/capi/v2/order/historyPlan的查询参数
+
+        Returns:
+            tuple: (params, error)，参数无效时params为None，error为可直接返回给调用方的错误结果
+        """
+        if not symbol or not isinstance(symbol, str):
+            logger.error("symbol参数必须是非空字符串")
+            return None, {
+                "orders": [],
+                "has_more": False,
+                "error": "symbol参数无效",
+                "error_code": "INVALID_PARAMETER"
+            }
+
+        # 验证可选参数类型
+        if start_time is not None and not isinstance(start_time, int):
+            logger.error("start_time参数必须是整数类型")
+            return None, {
+                "orders": [],
+                "has_more": False,
+                "error": "start_time参数类型无效",
+                "error_code": "INVALID_PARAMETER"
+            }
+
+        if end_time is not None and not isinstance(end_time, int):
+            logger.error("end_time参数必须是整数类型")
+            return None, {
+                "orders": [],
+                "has_more": False,
+                "error": "end_time参数类型无效",
+                "error_code": "INVALID_PARAMETER"
+            }
+
+        if delegate_type is not None:
+            if not isinstance(delegate_type, int) or delegate_type not in [1, 2, 3, 4]:
+                logger.error("delegate_type参数必须是1-4之间的整数，当前值: %s", delegate_type)
+                return None, {
+                    "orders": [],
+                    "has_more": False,
+                    "error": "delegate_type参数无效，必须是1-4之间的整数",
+                    "error_code": "INVALID_PARAMETER"
+                }
+
+        if page_size is not None:
+            if not isinstance(page_size, int) or page_size <= 0:
+                logger.error("page_size参数必须是正整数，当前值: %s", page_size)
+                return None, {
+                    "orders": [],
+                    "has_more": False,
+                    "error": "page_size参数无效，必须是正整数",
+                    "error_code": "INVALID_PARAMETER"
+                }
+            # 限制page_size最大值，避免请求过多数据
+            if page_size > 500:
+                logger.warning("page_size(%s)超过最大限制，将调整为500", page_size)
+                page_size = 500
+
+        params = {
+            "symbol": symbol  # 必需参数
+        }
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        if delegate_type is not None:
+            params["delegateType"] = delegate_type
+        if page_size is not None:
+            params["pageSize"] = page_size
+        return params, None
+
+    def _format_plan_history(self, response):
+        """
+        格式化/capi/v2/order/historyPlan的响应
+
+        Returns:
+            dict: 包含orders、has_more、total_count以及error信息的结果
+        """
+        # 检查响应是否有效
+        if not isinstance(response, dict):
+            logger.error("无效的响应格式: %s", type(response))
+            return {
+                "orders": [],
+                "has_more": False,
+                "error": "API返回的响应格式无效",
+                "error_code": "INVALID_RESPONSE"
+            }
+
+        # 检查API是否返回错误
+        if "code" in response and response["code"] != 0:
+            error_msg = response.get("msg", "未知API错误")
+            error_code = response.get("code", "UNKNOWN_ERROR")
+            logger.error("API错误 - 代码: %s, 消息: %s", error_code, error_msg)
+            return {
+                "orders": [],
+                "has_more": False,
+                "error": error_msg,
+                "error_code": str(error_code)
+            }
+
+        # 解析和格式化订单列表
+        formatted_orders = []
+        order_list = response.get("list", [])
+
+        # 订单类型映射
+        order_type_map = {
+            1: "开多",
+            2: "开空",
+            3: "平多",
+            4: "平空"
+        }
+
+        # 订单状态映射
+        status_map = {
+            0: "初始",
+            1: "触发成功",
+            2: "触发失败",
+            3: "已撤销",
+            4: "暂停",
+            5: "未触发"
+        }
+
+        # 格式化每个订单
+        try:
+            for order in order_list:
+                if isinstance(order, dict):
+                    formatted_order = {
+                        "order_id": order.get("orderId", ""),
+                        "symbol": order.get("symbol", ""),
+                        "order_type": order_type_map.get(order.get("delegateType"), "未知"),
+                        "order_type_code": order.get("delegateType"),
+                        "price": float(order.get("price", 0.0)),
+                        "volume": float(order.get("volume", 0.0)),
+                        "status": status_map.get(order.get("status"), "未知"),
+                        "status_code": order.get("status"),
+                        "create_time": order.get("createTime"),
+                        "update_time": order.get("updateTime"),
+                        "trigger_price": float(order.get("triggerPrice", 0.0)),
+                        "trigger_type": order.get("triggerType"),
+                        "order_source": order.get("source"),
+                        "reduce_only": bool(order.get("reduceOnly", False))
+                    }
+
+                    # 计算订单金额（用于展示）
+                    try:
+                        formatted_order["order_value"] = round(formatted_order["price"] * formatted_order["volume"], 8)
+                    except (TypeError, ValueError):
+                        formatted_order["order_value"] = 0.0
+
+                    formatted_orders.append(formatted_order)
+        except Exception as parse_error:
+            logger.error("订单数据解析错误: %s", parse_error)
+            # 即使部分数据解析失败，也返回已成功解析的订单
+            logger.debug("已成功解析 %s 条订单数据", len(formatted_orders))
+
+        # 构建返回结果
+        result = {
+            "orders": formatted_orders,
+            "has_more": bool(response.get("nextPage", False)),
+            "total_count": len(formatted_orders),
+            "error": None,
+            "error_code": None
+        }
+
+        logger.debug("成功获取并格式化 %s 条历史订单记录", len(formatted_orders))
+        return result
+
+    def _current_plan_params(self, symbol=None, orderId=None, startTime=None, endTime=None, limit=None, page=None):
+        """
+        校验并构建/capi/v2/order/currentPlan的查询参数
+
+        Returns:
+            tuple: (params, error)，参数无效时params为None，error为可直接返回给调用方的错误结果
+        """
+        if orderId is not None and not isinstance(orderId, int):
+            logger.error("orderId参数必须是整数类型")
+            return None, {
+                "orders": [],
+                "has_more": False,
+                "error": "orderId参数类型无效",
+                "error_code": "INVALID_PARAMETER"
+            }
+
+        if startTime is not None and not isinstance(startTime, int):
+            logger.error("startTime参数必须是整数类型")
+            return None, {
+                "orders": [],
+                "has_more": False,
+                "error": "startTime参数类型无效",
+                "error_code": "INVALID_PARAMETER"
+            }
+
+        if endTime is not None and not isinstance(endTime, int):
+            logger.error("endTime参数必须是整数类型")
+            return None, {
+                "orders": [],
+                "has_more": False,
+                "error": "endTime参数类型无效",
+                "error_code": "INVALID_PARAMETER"
+            }
+
+        if limit is not None:
+            if not isinstance(limit, int) or limit <= 0:
+                logger.error("limit参数必须是正整数，当前值: %s", limit)
+                return None, {
+                    "orders": [],
+                    "has_more": False,
+                    "error": "limit参数无效，必须是正整数",
+                    "error_code": "INVALID_PARAMETER"
+                }
+            # 限制limit最大值，避免请求过多数据
+            if limit > 100:
+                logger.warning("limit(%s)超过最大限制，将调整为100", limit)
+                limit = 100
+
+        if page is not None:
+            if not isinstance(page, int) or page < 0:
+                logger.error("page参数必须是非负整数，当前值: %s", page)
+                return None, {
+                    "orders": [],
+                    "has_more": False,
+                    "error": "page参数无效，必须是非负整数",
+                    "error_code": "INVALID_PARAMETER"
+                }
+
+        params = {}
+        if symbol is not None:
+            params["symbol"] = symbol
+        if orderId is not None:
+            params["orderId"] = orderId
+        if startTime is not None:
+            params["startTime"] = startTime
+        if endTime is not None:
+            params["endTime"] = endTime
+        if limit is not None:
+            params["limit"] = limit
+        if page is not None:
+            params["page"] = page
+        return params, None
+
+    def _format_current_plan_orders(self, response):
+        """
+        格式化/capi/v2/order/currentPlan的响应
+
+        Returns:
+            dict: 包含orders、has_more、total_count以及error信息的结果
+        """
+        # 检查响应是否有效
+        if not isinstance(response, list):
+            logger.error("无效的响应格式: %s", type(response))
+            return {
+                "orders": [],
+                "has_more": False,
+                "error": "API返回的响应格式无效",
+                "error_code": "INVALID_RESPONSE"
+            }
+
+        # 解析和格式化订单列表，数值字段在读取时才解析
+        keep_raw = self.keep_raw
+        formatted_orders = [CurrentPlanOrder(order, keep_raw) for order in response if isinstance(order, dict)]
+
+        # 构建返回结果
+        result = {
+            "orders": formatted_orders,
+            "has_more": False,  # currentPlan API无has_more字段
+            "total_count": len(formatted_orders),
+            "error": None,
+            "error_code": None
+        }
+
+        logger.debug("成功获取并格式化 %s 条当前计划订单记录", len(formatted_orders))
+        return result
+
+    def _history_orders_cursor(self, symbol=None, page_size=100, create_date=None):
+        """
+        /capi/v2/order/history的翻页游标：接口只能指定创建时间下限，从旧到新移动createDate
+
+        接口文档没有说明返回顺序。从旧到新返回时逐页翻完；从新到旧返回时没有时间上限可以向旧翻页，
+        只取第一页（createDate之后最新的page_size条）并记录警告，不抛出异常
+        """
+        params = {"symbol": symbol, "page_size": page_size, "create_date": create_date}
+        return TimeCursor(params, "create_date", page_size, direction="forward", time_field="createTime", strict=False)
+
+    def _plan_history_cursor(self, symbol, start_time=None, end_time=None, delegate_type=None, page_size=100):
+        """
+        /capi/v2/order/historyPlan的翻页游标：从新到旧移动endTime
+        """
+        params = {"symbol": symbol, "start_time": start_time, "end_time": end_time,
+                  "delegate_type": delegate_type, "page_size": page_size}
+        return TimeCursor(params, "end_time", page_size, direction="backward", time_field="create_time")
+
+    def _current_plan_cursor(self, symbol=None, start_time=None, end_time=None, limit=100):
+        """
+        /capi/v2/order/currentPlan的翻页游标：按页码翻页，每页最多100条
+        """
+        params = {"symbol": symbol, "startTime": start_time, "endTime": end_time}
+        return PageCursor(params, page_key="page", limit_key="limit", limit=min(limit, 100))
+
+    def _fills_params(self, symbol=None, order_id=None, start_time=None, end_time=None, limit=None):
+        """
+        校验并构建/capi/v2/order/fills的查询参数
+
+        Returns:
+            tuple: (params, error)，参数无效时params为None，error为可直接返回给调用方的错误结果
+        """
+        for name, value in (("start_time", start_time), ("end_time", end_time)):
+            if value is not None and not isinstance(value, int):
+                logger.error("%s参数必须是整数类型", name)
+                return None, {
+                    "fills": [],
+                    "has_more": False,
+                    "error": f"{name}参数类型无效",
+                    "error_code": "INVALID_PARAMETER"
+                }
+        if limit is not None and (not isinstance(limit, int) or limit <= 0):
+            logger.error("limit参数必须是正整数，当前值: %s", limit)
+            return None, {
+                "fills": [],
+                "has_more": False,
+                "error": "limit参数无效，必须是正整数",
+                "error_code": "INVALID_PARAMETER"
+            }
+
+        params = {}
+        if symbol is not None:
+            params["symbol"] = symbol
+        if order_id is not None:
+            params["orderId"] = order_id
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        if limit is not None:
+            params["limit"] = min(limit, 100)
+        return params, None
+
+    def _format_fills(self, response):
+        """
+        格式化/capi/v2/order/fills的响应
+
+        Returns:
+            dict: 包含fills（Fill记录列表）、has_more以及error信息的结果
+        """
+        if isinstance(response, dict) and isinstance(response.get("list"), list):
+            keep_raw = self.keep_raw
+            return {
+                "fills": [Fill(fill, keep_raw) for fill in response["list"] if isinstance(fill, dict)],
+                "has_more": bool(response.get("nextFlag", False)),
+                "error": None,
+                "error_code": None
+            }
+        logger.error("无效的响应格式: %s", type(response))
+        return {
+            "fills": [],
+            "has_more": False,
+            "error": "API返回的响应格式无效",
+            "error_code": "INVALID_RESPONSE"
+        }
+
+    def _fills_cursor(self, symbol=None, start_time=None, end_time=None, limit=100):
+        """
+        /capi/v2/order/fills的翻页游标：从新到旧移动endTime，按成交ID去重
+        """
+        params = {"symbol": symbol, "start_time": start_time, "end_time": end_time, "limit": limit}
+        return TimeCursor(params, "end_time", min(limit, 100), direction="backward", key_field="trade_id")
+
+    def _is_idempotent(self, method, request_path):
+        """
+        请求是否可以安全重发：下单请求在交易所已受理时重发可能重复下单
+        """
+        return method.upper() == "GET" or request_path not in ORDER_PLACING_PATHS
+
+    def _duplicate_order_response(self, exc, client_oid):
+        """
+        把交易所以client_oid重复为由的拒绝转换为下单成功的响应（同一订单此前已经提交成功，例如调用方用同一client_oid重发）
+
+        Returns:
+            dict: 形如下单响应的字典（order_id可能为空），不是重复client_oid错误时返回None
+        """
+        if not client_oid or not is_duplicate_order_error(exc):
+            return None
+        payload = error_payload(exc)
+        data = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+        logger.warning("交易所提示client_oid重复，订单此前已提交: %s", client_oid)
+        return {"order_id": str(data.get("order_id") or data.get("orderId") or ""), "client_oid": client_oid,
+                "duplicate": True}
+
+    def _batch_order_data(self, orders):
+        """
+        构建批量下单的订单数据并按交易对分块
+
+        Args:
+            orders (list): 订单字典，包含symbol、type（1-4或open_long等别名）、amount，
+                可选price、order_type、match_price、client_oid、presetTakeProfitPrice、presetStopLossPrice、marginMode
+
+        Returns:
+            tuple: (entries, chunks, invalid)，entries为按输入顺序的[(结果键, 订单数据)]，结果键一般为client_oid，
+                chunks为[(symbol, [data, ...])]，每块不超过BATCH_ORDER_LIMIT个订单，invalid为结果键 -> 错误信息。
+                client_oid重复时只发送第一个，之后的订单不发送并标记为无效，结果键为"client_oid#序号"（序号从2开始）
+        """
+        entries, by_symbol, invalid, occurrences = [], {}, {}, {}
+        for order in orders:
+            order = dict(order)
+            symbol = order.pop("symbol", None)
+            type_value = str(order.pop("type", ""))
+            type_value = ORDER_TYPE_VALUES.get(type_value, type_value)
+            amount = order.pop("amount", order.pop("size", None))
+            data, client_oid = self._order_data(symbol, amount, type_value, order.pop("price", None),
+                                                order.pop("order_type", "0"), order.pop("match_price", "1"),
+                                                type_value in ("1", "2"), **order)
+            occurrences[client_oid] = occurrences.get(client_oid, 0) + 1
+            key = client_oid if occurrences[client_oid] == 1 else f"{client_oid}#{occurrences[client_oid]}"
+            entries.append((key, data))
+            if key != client_oid:
+                # 交易所按client_oid去重，重复的订单发送出去也只会被拒绝，而且无法和第一个订单的结果区分
+                invalid[key] = f"client_oid重复，未发送: {client_oid}"
+                continue
+            if not symbol or amount is None or type_value not in ORDER_TYPE_VALUES.values():
+                invalid[key] = f"订单参数无效: symbol={symbol}, type={type_value}, amount={amount}"
+                continue
+            by_symbol.setdefault(symbol, []).append(data)
+        chunks = [(symbol, datas[i:i + BATCH_ORDER_LIMIT])
+                  for symbol, datas in by_symbol.items() for i in range(0, len(datas), BATCH_ORDER_LIMIT)]
+        return entries, chunks, invalid
+
+    def _batch_orders_body(self, symbol, datas):
+        """
+        构建/capi/v2/order/batchOrders的请求体，交易对放在外层
+        """
+        return {"symbol": symbol,
+                "orderDataList": [{key: value for key, value in data.items() if key != "symbol"} for data in datas]}
+
+    def _format_batch_orders(self, response, datas):
+        """
+        格式化/capi/v2/order/batchOrders的响应
+
+        Args:
+            response (dict): 包含order_info（[{order_id, client_oid, result, error_message}]）的响应
+            datas (list): 本块的订单数据
+
+        Returns:
+            dict: client_oid -> 下单结果
+
+        Raises:
+            RuntimeError: 响应格式不正确（整块视为失败）
+        """
+        if not isinstance(response, dict) or not isinstance(response.get("order_info"), list):
+            raise RuntimeError(f"批量下单响应格式不正确: {response}")
+        items = {str(item.get("client_oid")): item for item in response["order_info"]}
+        results = {}
+        for data in datas:
+            item = items.get(data["client_oid"])
+            if item is None:
+                results[data["client_oid"]] = self._batch_order_result(data, error="批量下单响应中没有该订单")
+            elif is_duplicate_order_message(item.get("error_message")):
+                # 同一client_oid此前已经下单成功
+                results[data["client_oid"]] = self._batch_order_result(data, item)
+            elif item.get("result") is False or not item.get("order_id"):
+                results[data["client_oid"]] = self._batch_order_result(
+                    data, error=item.get("error_message") or item.get("error_code") or "下单失败", info=item)
+            else:
+                results[data["client_oid"]] = self._batch_order_result(data, item)
+        return results
+
+    def _batch_order_result(self, data, item=None, error=None, info=None):
+        """
+        单个订单的批量下单结果（成功时字段与单个下单方法的返回值一致，另有ok和error）
+        """
+        return {
+            "id": str(item.get("order_id", "")) if item else "",
+            "clientOrderId": data["client_oid"],
+            "symbol": data["symbol"],
+            "type": "market" if data["match_price"] == "1" else "limit",
+            "orderType": data["type"],
+            "amount": data["size"],
+            "price": data.get("price"),
+            "ok": error is None,
+            "error": error,
+            "info": item if item is not None else info
+        }
+
+    def _collect_batch_orders(self, entries, invalid, outcomes):
+        """
+        把各块结果按输入顺序汇总为client_oid -> 下单结果
+
+        Args:
+            entries (list): [(结果键, 订单数据)]，参见_batch_order_data
+            invalid (dict): 结果键 -> 错误信息
+            outcomes (list): [(datas, 块结果或异常)]
+        """
+        results = {}
+        for datas, outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logger.error("批量下单失败（%s个订单）: %s", len(datas), outcome)
+                for data in datas:
+                    results[data["client_oid"]] = self._batch_order_result(data, error=str(outcome))
+            else:
+                results.update(outcome)
+        for key, data in entries:
+            if key in invalid:
+                results[key] = self._batch_order_result(data, error=invalid[key])
+        ordered = {key: results[key] for key, _ in entries}
+        logger.info("批量下单完成: 成功%s个，失败%s个", sum(1 for r in ordered.values() if r["ok"]),
+                    sum(1 for r in ordered.values() if not r["ok"]))
+        return ordered
+
+    def _cancel_result(self, cancelled=(), failed=(), errors=()):
+        """
+        批量撤单的汇总结果
+
+        Returns:
+            dict: cancelled（已撤销的订单ID）、failed（[{order_id, error}]）、errors（无法归到单个订单的错误）和ok
+        """
+        return {"cancelled": list(cancelled), "failed": list(failed), "errors": list(errors),
+                "ok": not failed and not errors}
+
+    def _merge_cancel_results(self, results):
+        """
+        合并多个批量撤单结果
+        """
+        cancelled, failed, errors = [], [], []
+        for result in results:
+            cancelled.extend(result["cancelled"])
+            failed.extend(result["failed"])
+            errors.extend(result["errors"])
+        return self._cancel_result(cancelled, failed, errors)
+
+    def _cancel_all_data(self, kind, symbol=None):
+        """
+        构建/capi/v2/order/cancelAllOrders的请求数据
+
+        Args:
+            kind (str): "normal"（普通委托）或 "plan"（计划委托）
+        """
+        data = {"cancelOrderType": kind}
+        if symbol is not None:
+            data["symbol"] = symbol
+        return data
+
+    def _format_cancel_all(self, response):
+        """
+        格式化/capi/v2/order/cancelAllOrders的响应（[{orderId, success}]）
+
+        Raises:
+            RuntimeError: 响应格式不正确（调用方回退为逐个撤单）
+        """
+        if not isinstance(response, list):
+            raise RuntimeError(f"全部撤单响应格式不正确: {response}")
+        cancelled, failed = [], []
+        for item in response:
+            order_id = str(item.get("orderId", ""))
+            if item.get("success"):
+                cancelled.append(order_id)
+            else:
+                failed.append({"order_id": order_id, "error": item.get("err_msg") or "撤单失败"})
+        return self._cancel_result(cancelled, failed)
+
+    def _format_cancel_batch(self, response, order_ids):
+        """
+        格式化/capi/v2/order/cancel_batch_orders的响应
+
+        Args:
+            response (dict): 包含cancelOrderResultList（[{order_id, result, err_msg}]）的响应
+            order_ids (list): 本批请求撤销的订单ID
+
+        Raises:
+            RuntimeError: 响应格式不正确（调用方回退为逐个撤单）
+        """
+        if not isinstance(response, dict) or "cancelOrderResultList" not in response:
+            raise RuntimeError(f"批量撤单响应格式不正确: {response}")
+        cancelled, failed = [], []
+        for item in response["cancelOrderResultList"]:
+            order_id = str(item.get("order_id", ""))
+            if item.get("result"):
+                cancelled.append(order_id)
+            else:
+                failed.append({"order_id": order_id, "error": item.get("err_msg") or "撤单失败"})
+        # 响应中没有出现的订单视为失败，避免调用方误以为已撤销
+        answered = set(cancelled).union(item["order_id"] for item in failed)
+        failed.extend({"order_id": order_id, "error": "批量撤单响应中没有该订单"}
+                      for order_id in order_ids if order_id not in answered)
+        return self._cancel_result(cancelled, failed)
+
+    def _format_cancel_order(self, response, order_id):
+        """
+        格式化/capi/v2/order/cancel_order的响应为批量撤单结果
+        """
+        if isinstance(response, dict) and response.get("result") is False:
+            return self._cancel_result(failed=[{"order_id": order_id, "error": response.get("err_msg") or "撤单失败"}])
+        return self._cancel_result(cancelled=[order_id])
+
+    def _open_order_ids(self, response, symbol=None):
+        """
+        从/capi/v2/order/openOrders的响应中取出订单ID
+
+        Raises:
+            RuntimeError: 响应格式不正确
+        """
+        if not isinstance(response, list):
+            raise RuntimeError(f"未完成订单响应格式不正确: {response}")
+        order_ids = []
+        for order in response:
+            order_id = order.get("order_id") or order.get("id")
+            if order_id and (symbol is None or order.get("symbol") == symbol):
+                order_ids.append(str(order_id))
+        return order_ids
+
+    def _page_orders(self, result, key="orders"):
+        """
+        检查一页查询结果
+
+        Args:
+            result (dict): 单页查询方法的返回值
+            key (str): 记录列表所在的字段
+
+        Returns:
+            tuple: (records, has_more)
+
+        Raises:
+            RuntimeError: 查询失败（翻页途中失败时抛出，而不是当作已经没有更多订单）
+        """
+        if result.get("error"):
+            raise RuntimeError(f"获取订单失败: {result['error']} ({result.get('error_code')})")
+        return result.get(key, []), result.get("has_more")
+
+    def _ohlcv_params(self, symbol, timeframe, since=None, limit=100, until=None):
+        """
+        构建/capi/v2/market/candles的查询参数
+        """
+        params = {
+            "symbol": symbol,
+            "granularity": timeframe,
+            "limit": limit
+        }
+
+        # 添加可选参数
+        if since is not None:
+            params["startTime"] = since
+            # 未指定结束时间时取到当前时间
+            params["endTime"] = until if until is not None else int(time.time() * 1000)
+        return params
+
+    def _ohlcv_windows(self, timeframe, start, end, window_limit=MAX_CANDLES_PER_REQUEST):
+        """
+        把[start, end]时间范围按单次请求的最大条数切分为多个窗口
+
+        Args:
+            timeframe (str): K线周期
+            start (int): 开始时间戳（毫秒），向下对齐到周期边界
+            end (int): 结束时间戳（毫秒，包含）
+            window_limit (int): 每个窗口的K线条数
+
+        Returns:
+            list: [(窗口开始时间, 窗口结束时间, 条数), ...]
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        windows = []
+        window_start = start - start % tf_ms
+        while window_start <= end:
+            window_end = min(window_start + window_limit * tf_ms - 1, end)
+            windows.append((window_start, window_end, (window_end - window_start) // tf_ms + 1))
+            window_start += window_limit * tf_ms
+        return windows
+
+    def _merge_ohlcv_window(self, ohlcv, tf_ms, expected, end):
+        """
+        整理一个窗口的K线：按时间排序、去掉重叠和超出范围的K线，并检测缺口
+
+        Args:
+            ohlcv (list): 窗口内的K线，顺序不限
+            tf_ms (int): 周期长度（毫秒）
+            expected (int): 期望的下一根K线时间戳
+            end (int): 结束时间戳（毫秒，包含）
+
+        Returns:
+            tuple: (rows, gaps, expected)，rows为去重后的K线，gaps为[(缺口开始, 缺口结束), ...]，
+                expected为处理完后期望的下一根K线时间戳
+        """
+        rows = []
+        gaps = []
+        for candle in sorted(ohlcv, key=lambda c: c[0]):
+            ts = candle[0]
+            if ts < expected or ts > end:
+                continue
+            if ts > expected:
+                gaps.append((expected, ts - tf_ms))
+            rows.append(candle)
+            expected = ts + tf_ms
+        return rows, gaps, expected
+
+    def _format_ohlcv(self, response):
+        """
+        格式化K线响应
+        响应格式: [[时间戳, 开盘价, 最高价, 最低价, 收盘价, 交易量, 成交额], ...]
+        转换为CCXT兼容格式: [时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
+        """
+        ohlcv_data = []
+        if isinstance(response, list):
+            for candle in response:
+                if len(candle) >= 7:
+                    # 转换为float类型并重新排列
+                    ohlcv_data.append([
+                        int(candle[0]),  # 时间戳
+                        float(candle[1]),  # 开盘价
+                        float(candle[2]),  # 最高价
+                        float(candle[3]),  # 最低价
+                        float(candle[4]),  # 收盘价
+                        float(candle[6])  # 成交量（使用成交额）
+                    ])
+        return ohlcv_data
+
+    def _format_tickers(self, response):
+        """
+        把/capi/v2/market/tickers响应转换为 交易对 -> 行情 的字典
+
+        Returns:
+            dict: 交易对 -> {'symbol', 'last', 'bid', 'ask', 'mark', 'high', 'low', 'volume', 'timestamp', 'info'}
+        """
+        def number(value):
+            return float(value) if value not in (None, "") else None
+
+        tickers = {}
+        if isinstance(response, dict):
+            response = [response]
+        if isinstance(response, list):
+            for item in response:
+                if not isinstance(item, dict) or not item.get("symbol"):
+                    continue
+                tickers[item["symbol"]] = {
+                    "symbol": item["symbol"],
+                    "last": number(item.get("last")),
+                    "bid": number(item.get("best_bid")),
+                    "ask": number(item.get("best_ask")),
+                    "mark": number(item.get("markPrice")),
+                    "high": number(item.get("high_24h")),
+                    "low": number(item.get("low_24h")),
+                    "volume": number(item.get("volume_24h")),
+                    "timestamp": int(item.get("timestamp") or 0),
+                    "info": item
+                }
+        return tickers
+
+    def _build_snapshot(self, positions_response, tickers_response, symbols=None):
+        """
+        由allPosition和tickers两个响应组成持仓快照
+
+        Args:
+            symbols (iterable, optional): 只保留这些交易对的持仓；这些交易对即使没有持仓也会返回价格
+
+        Returns:
+            dict: {'positions': 持仓列表, 'prices': 交易对 -> 最新价, 'tickers': 交易对 -> 行情}
+        """
+        positions = [p for p in self._format_positions(positions_response) if p["size"] > 0]
+        if symbols is not None:
+            symbols = set(symbols)
+            positions = [p for p in positions if p["symbol"] in symbols]
+        wanted = {p["symbol"] for p in positions} | (symbols or set())
+        tickers = {symbol: ticker for symbol, ticker in self._format_tickers(tickers_response).items()
+                   if symbol in wanted}
+        prices = {symbol: ticker["last"] for symbol, ticker in tickers.items() if ticker["last"] is not None}
+        return {"positions": positions, "prices": prices, "tickers": tickers}
+
+    def _format_positions(self, response):
+        """
+        把allPosition响应转换为CCXT兼容的持仓列表（Position记录，可按字典方式读取）
+        """
+        if not isinstance(response, list):
+            return []
+        keep_raw = self.keep_raw
+        return [Position(pos, keep_raw) for pos in response]
+
+    def _open_positions(self, response, symbol=None):
+        """
+        从allPosition响应中取出数量大于0的持仓
+
+        Raises:
+            RuntimeError: 响应格式不正确
+        """
+        if not isinstance(response, list):
+            raise RuntimeError(f"持仓响应格式不正确: {response}")
+        return [position for position in self._format_positions(response)
+                if position["size"] > 0 and (symbol is None or position["symbol"] == symbol)]
+
+    def _market_order_data(self, symbol, side, amount, **kwargs):
+        """
+        构建市价单请求数据
+
+        Returns:
+            tuple: (data, client_oid)
+        """
+        # 生成客户端订单ID
+        client_oid = kwargs.get("client_oid") or new_client_oid()
+
+        # 映射交易方向
+        # 1: Open long, 2: Open short, 3: Close long, 4: Close short
+        if kwargs.get("reduce_only", False):
+            # 平仓订单
+            order_type = 4 if side.lower() == "sell" else 3
+        else:
+            # 开仓订单
+            order_type = 1 if side.lower() == "buy" else 2
+
+        # 构建请求数据
+        data = {
+            "symbol": symbol,
+            "client_oid": client_oid,
+            "size": str(amount),
+            "type": str(order_type),
+            "order_type": "0",  # 0: Normal
+            "match_price": "1"  # 1: Market price
+        }
+
+        # 添加可选参数
+        if "price" in kwargs and float(kwargs["price"]) > 0:
+            data["price"] = str(kwargs["price"])
+        for key in ("presetTakeProfitPrice", "presetStopLossPrice", "marginMode", "separatedMode"):
+            if key in kwargs:
+                data[key] = kwargs[key]
+        return data, client_oid
+
+    def _order_data(self, symbol, amount, type_value, price=None, order_type="0", match_price="1", allow_preset=True, **kwargs):
+        """
+        构建开平仓请求数据
+
+        Args:
+            type_value (str): 1: Open long, 2: Open short, 3: Close long, 4: Close short
+            allow_preset (bool): 是否允许附带预设止盈止损（仅开仓）
+
+        Returns:
+            tuple: (data, client_oid)
+        """
+        # 生成客户端订单ID
+        client_oid = kwargs.get("client_oid") or new_client_oid()
+
+        # 构建请求数据
+        data = {
+            "symbol": symbol,
+            "client_oid": client_oid,
+            "size": str(amount),
+            "type": type_value,
+            "order_type": order_type,
+            "match_price": match_price
+        }
+
+        # 限价单必须提供价格，市价单也可以提供价格作为参考
+        if match_price in ("0", "1") and price is not None:
+            data["price"] = str(price)
+
+        # 添加可选参数
+        optional_keys = ("marginMode", "separatedMode")
+        if allow_preset:
+            optional_keys = ("presetTakeProfitPrice", "presetStopLossPrice") + optional_keys
+        for key in optional_keys:
+            if key in kwargs:
+                data[key] = kwargs[key]
+        return data, client_oid
+
+    def _plan_order_data(self, symbol, amount, type_value, trigger_price, execute_price=None, match_price="1", **kwargs):
+        """
+        构建计划委托（条件单）请求数据
+
+        Args:
+            type_value (str): 1: Open long, 2: Open short, 3: Close long, 4: Close short
+            trigger_price (float): 触发价格
+            execute_price (float, optional): 触发后的委托价格，市价（match_price="1"）时可不传
+
+        Returns:
+            tuple: (data, client_oid)
+        """
+        client_oid = kwargs.get("client_oid") or new_client_oid("plan_")
+        data = {
+            "symbol": symbol,
+            "client_oid": client_oid,
+            "size": str(amount),
+            "type": type_value,
+            "match_price": match_price,
+            "trigger_price": str(trigger_price),
+            "execute_price": str(execute_price if execute_price is not None else 0)
+        }
+        if "marginMode" in kwargs:
+            data["marginMode"] = kwargs["marginMode"]
+        return data, client_oid
+
+    def _format_order(self, response, client_oid, symbol, side, amount, match_price="1", price=None, with_price=True):
+        """
+        把下单响应转换为CCXT兼容的订单信息
+        """
+        order = {
+            "id": response.get("order_id", ""),
+            "clientOrderId": response.get("client_oid", client_oid),
+            "symbol": symbol,
+            "side": side,
+            "type": "market" if match_price == "1" else "limit",
+            "amount": amount
+        }
+        if with_price:
+            order["price"] = price
+        order["info"] = response  # 保留原始数据
+        return order
+
 
-class WeexClient:
+class WeexClient(WeexClientBase):
     """
     WEEX API客户端，用于访问WEEX交易所API
     参考文档: https://www.weex.com/api-doc/
     """
     
-    def __init__(self, api_key, api_secret, api_passphrase, testnet=False):
+    def __init__(self, api_key, api_secret, api_passphrase, testnet=False,
+                 pool_connections=4, pool_maxsize=10, pool_idle_timeout=60, keep_alive=True,
+                 rate_limiter=None, rate_limits=None, rate_limit_file=None, retry_policy=None,
+                 server_clock=None, request_log=None, keep_raw=False):
         """
         初始化WEEX API客户端
         
@@ -30,69 +2065,137 @@ class WeexClient:
             api_secret (str): API密钥密码
             api_passphrase (str): API密码短语
             testnet (bool): 是否使用测试网络
+            pool_connections (int): 缓存的主机连接池数量
+            pool_maxsize (int): 每个主机连接池保留的最大连接数
+            pool_idle_timeout (float): 连接池空闲超过该秒数后整体回收，None或0表示不回收
+            keep_alive (bool): 是否复用TCP/TLS连接
+            rate_limiter (TokenBucketLimiter, optional): 共享的限速器
+            rate_limits (dict, optional): 接口族限速配置，传入{}表示不限速
+            rate_limit_file (str, optional): 跨进程共享限速额度的状态文件
+            retry_policy (RetryPolicy, optional): 请求重试策略
+            server_clock (ServerClock, optional): 服务器时钟偏差估计
+            request_log (str, optional): JSON Lines请求日志文件
+            keep_raw (bool): 持仓和订单记录是否在info中保留API原始数据
         """
-        self.api_key = api_key
-        self.api_secret = api_secret
-        self.api_passphrase = api_passphrase
+        super().__init__(api_key, api_secret, api_passphrase, testnet=testnet, keep_alive=keep_alive,
+                         rate_limiter=rate_limiter, rate_limits=rate_limits, rate_limit_file=rate_limit_file,
+                         retry_policy=retry_policy, server_clock=server_clock,
+                         request_log=request_log, keep_raw=keep_raw)
         
-        # 使用合约API专用域名
-        self.base_url = "https://api-contract.weex.com" if not testnet else "https://api-contract.weex.com"
-            
-        self.timeout = 10  # 请求超时时间（秒）
+        # 连接池配置，所有请求共用一个Session，避免每次请求都重新握手
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._time_sync_lock = threading.Lock()
+        self._last_used = 0.0
+        # 已回收连接池的累计统计
+        self._retired_requests = 0
+        self._retired_connections = 0
+        self._idle_evictions = 0
     
-    def _sign(self, timestamp, method, request_path, data=None, params=None):
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def close(self):
         """
-        生成API签名
-        根据官方示例代码实现 - 与office_demo.py保持一致
+        关闭客户端持有的连接池，释放所有保持的连接
+        """
+        with self._session_lock:
+            self._retire_session()
+    
+    def _create_session(self):
+        """
+        创建带连接池的Session
         
-        Args:
-            timestamp (str): 时间戳
-            method (str): HTTP方法
-            request_path (str): 请求路径
-            data (dict, optional): 请求体数据
-            params (dict, optional): 查询参数
-            
         Returns:
-            str: 生成的签名（经过BASE64编码）
+            requests.Session: 挂载了连接池适配器的Session
         """
-        import base64
-        
-        # 构建查询字符串，严格按照官方demo的方式
-        query_string = ''
-        if params:
-            # 构建查询字符串，保持原始格式
-            query_items = []
-            for key, value in params.items():
-                # 转换值为字符串
-                str_value = str(value)
-                query_items.append(f"{key}={str_value}")
-            
-            if query_items:
-                query_string = '?' + '&'.join(query_items)
-        
-        # 根据HTTP方法选择不同的签名方式 - 与官方demo保持一致
-        if method.upper() == 'GET':
-            # GET请求的签名方式 - 直接按照官方demo格式
-            message = timestamp + method.upper() + request_path + query_string
-        else:
-            # POST/DELETE请求的签名方式
-            body = json.dumps(data) if data else ''
-            message = timestamp + method.upper() + request_path + query_string + body
-        
-        # print(f"签名消息: {message}")  # 调试信息
-        
-        # 使用HMAC-SHA256算法生成签名
-        signature = hmac.new(
-            self.api_secret.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        ).digest()
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _get_session(self):
+        """
+        获取当前Session，空闲超时的连接池会先被回收再重建
         
-        # 按照官方文档要求进行BASE64编码
-        signature_b64 = base64.b64encode(signature).decode('utf-8')
-        # print(f"生成的签名: {signature_b64}")  # 调试信息
+        Returns:
+            requests.Session: 可用的Session
+        """
+        with self._session_lock:
+            now = time.time()
+            if (self._session is not None and self.pool_idle_timeout
+                    and now - self._last_used > self.pool_idle_timeout):
+                logger.info("连接池空闲超过%s秒，回收连接", self.pool_idle_timeout)
+                self._retire_session()
+                self._idle_evictions += 1
+            if self._session is None:
+                self._session = self._create_session()
+            self._last_used = now
+            return self._session
+    
+    def _iter_pools(self):
+        """
+        遍历当前Session中所有主机的urllib3连接池
+        """
+        if self._session is None:
+            return
+        seen = set()
+        for adapter in self._session.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    yield pool
+    
+    def _retire_session(self):
+        """
+        关闭当前Session并把它的统计累加到历史计数中（调用方需持有_session_lock）
+        """
+        if self._session is None:
+            return
+        for pool in self._iter_pools():
+            self._retired_requests += pool.num_requests
+            self._retired_connections += pool.num_connections
+        self._session.close()
+        self._session = None
+    
+    def pool_stats(self):
+        """
+        获取连接池命中统计
         
-        return signature_b64
+        Returns:
+            dict: 包含以下字段:
+                - requests: 通过连接池发送的请求总数
+                - misses: 新建连接（TCP/TLS握手）的次数
+                - hits: 复用已有连接的次数
+                - hit_rate: 命中率
+                - idle_evictions: 因空闲超时回收连接池的次数
+        """
+        with self._session_lock:
+            total_requests = self._retired_requests
+            total_connections = self._retired_connections
+            for pool in self._iter_pools():
+                total_requests += pool.num_requests
+                total_connections += pool.num_connections
+        hits = max(total_requests - total_connections, 0)
+        return {
+            "requests": total_requests,
+            "misses": total_connections,
+            "hits": hits,
+            "hit_rate": hits / total_requests if total_requests else 0.0,
+            "idle_evictions": self._idle_evictions
+        }
     
     def _request(self, method, request_path, params=None, data=None, need_sign=True, headers=None):
         """
@@ -112,96 +2215,112 @@ class WeexClient:
         Raises:
             Exception: 请求失败时抛出异常
         """
-        if params is None:
-            params = {}
-        if data is None:
-            data = {}
-        if headers is None:
-            headers = {}
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._send(method, request_path, params, data, need_sign, headers)
+            except requests.exceptions.RequestException as e:
+                delay = self.retry_policy.next_delay(e, attempt, started,
+                                                     idempotent=self._is_idempotent(method, request_path))
+                if delay is None:
+                    raise
+                logger.warning("请求失败（第%s次），%.2f秒后重试: %s", attempt, delay, e)
+                time.sleep(delay)
+    
+    def sync_time(self, samples=3):
+        """
+        采样服务器时间，更新时钟偏差和RTT估计
         
-        # 构建URL
-        url = f"{self.base_url}{request_path}"
+        Args:
+            samples (int): 采样次数，取其中往返时间最短（误差最小）的一次
         
-        # 设置基础请求头
-        base_headers = {
-            'Content-Type': 'application/json',
-            'locale': 'zh-CN'
-        }
-        # 合并基础请求头和额外请求头
-        base_headers.update(headers)
-        headers = base_headers
+        Returns:
+            dict: 同步后的时钟状态，参见ServerClock.stats；全部采样失败时返回None
+        """
+        best = None
+        for _ in range(samples):
+            self.rate_limiter.acquire(SERVER_TIME_PATH)
+            try:
+                sent_ms = time.time() * 1000
+                response = self._get_session().get(f"{self.base_url}{SERVER_TIME_PATH}", timeout=self.timeout)
+                received_ms = time.time() * 1000
+                response.raise_for_status()
+                server_ms = parse_server_time(response.json())
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning("获取服务器时间失败: %s", e)
+                continue
+            if server_ms is not None and (best is None or received_ms - sent_ms < best[2] - best[0]):
+                best = (sent_ms, server_ms, received_ms)
         
-        # 如果需要签名
-        if need_sign and self.api_key:
-            # 生成时间戳
-            timestamp = str(int(time.time() * 1000))
-            
-            # 生成签名（包含查询参数）
-            signature = self._sign(timestamp, method, request_path, data, params)
-            
-            # 添加认证相关的请求头，使用官方推荐的头名称
-            headers['ACCESS-KEY'] = self.api_key
-            headers['ACCESS-SIGN'] = signature
-            headers['ACCESS-PASSPHRASE'] = self.api_passphrase
-            headers['ACCESS-TIMESTAMP'] = timestamp
+        if best is None:
+            self.server_clock.mark_attempt()
+            return None
+        self.server_clock.add_sample(*best)
+        return self.server_clock.stats()
+    
+    def _send(self, method, request_path, params=None, data=None, need_sign=True, headers=None):
+        """
+        发送一次HTTP请求（不重试），每次发送都重新排队限速并重新签名
+        """
+        # 首次签名前以及每隔resync_interval秒同步一次服务器时间
+        if need_sign and self.api_key and self.server_clock.needs_sync():
+            with self._time_sync_lock:
+                # 多线程并发请求只需要其中一个去同步
+                if self.server_clock.needs_sync():
+                    self.sync_time()
         
+        # 限速排队在签名之前，避免等待后时间戳过期
+        wait = self.rate_limiter.acquire(request_path)
+        if wait > 0:
+            logger.info("触发客户端限速，%s 排队等待 %.3f 秒", request_path, wait)
+        url, headers, params, body = self._prepare_request(method, request_path, params, data, need_sign, headers)
+        
+        started = time.perf_counter()
+        response = None
         try:
-            # 确保params中的值都是字符串类型
-            if params:
-                string_params = {k: str(v) for k, v in params.items()}
-                params = string_params
+            session = self._get_session()
             
-            # 发送请求 - 对于GET请求，严格按照官方demo的URL拼接方式
+            # 发送请求，请求体直接使用签名时的字节串
             if method.upper() == 'GET':
-                # 直接将查询参数拼接到URL中，而不是通过params参数
-                if params:
-                    # 构建查询字符串
-                    query_items = []
-                    for key, value in params.items():
-                        query_items.append(f"{key}={value}")
-                    
-                    if query_items:
-                        full_url = url + '?' + '&'.join(query_items)
-                        response = requests.get(full_url, headers=headers, timeout=self.timeout)
-                    else:
-                        response = requests.get(url, headers=headers, timeout=self.timeout)
-                else:
-                    response = requests.get(url, headers=headers, timeout=self.timeout)
+                response = session.get(url, headers=headers, timeout=self.timeout)
             elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, json=data, params=params, timeout=self.timeout)
-            elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=headers, json=data, params=params, timeout=self.timeout)
+                response = session.post(url, headers=headers, data=body, params=params, timeout=self.timeout)
             else:
-                raise ValueError(f"不支持的HTTP方法: {method}")
+                response = session.delete(url, headers=headers, data=body, params=params, timeout=self.timeout)
             
-            # 打印调试信息
-            print(f"发送{method}请求到: {url}")
-            if params:
-                print(f"查询参数: {params}")
-            if data and method.upper() != 'GET':
-                print(f"请求体: {data}")
-            print(f"响应状态码: {response.status_code}")
+            # 调试信息只在DEBUG级别下格式化，生产环境不产生额外开销
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("发送%s请求到: %s", method, url)
+                if params:
+                    logger.debug("查询参数: %s", params)
+                if body:
+                    logger.debug("请求体: %s", body.decode('utf-8'))
+                logger.debug("响应状态码: %s", response.status_code)
             
             # 检查响应状态
             response.raise_for_status()
             
             # 解析响应
-            return response.json()
+            return loads_json(response.content)
         
         except requests.exceptions.RequestException as e:
-            print(f"请求错误: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    print(f"错误响应: {e.response.json()}")
-                except:
-                    print(f"错误响应: {e.response.text}")
+            logger.warning("请求错误: %s", e)
+            if getattr(e, 'response', None) is not None:
+                logger.warning("错误响应: %s", e.response.text)
             raise
+        finally:
+            if request_logger.isEnabledFor(logging.INFO):
+                log_request(method, request_path, started,
+                            response.status_code if response is not None else None,
+                            len(response.content) if response is not None else 0)
     
     def get_account_assets(self):
         """
         获取账户资产信息
         参考文档: https://api-contract.weex.com/capi/v2/account/assets
-        
+
         Returns:
             list: 账户资产列表，每个资产包含以下字段:
                 - coinId: 币种ID
@@ -213,10 +2332,10 @@ class WeexClient:
         """
         # 使用合约账户API路径，根据curl命令示例
         request_path = "/capi/v2/account/assets"
-        
+
         try:
             # 尝试获取合约账户信息，使用正确的签名方式
-            print(f"尝试访问合约账户资产路径: {request_path}")
+            logger.debug("尝试访问合约账户资产路径: %s", request_path)
             # 添加必要的请求头
             custom_headers = {
                 "locale": "zh-CN",
@@ -224,31 +2343,16 @@ class WeexClient:
             }
             # 需要签名验证
             response = self._request("GET", request_path, params={}, need_sign=True, headers=custom_headers)
-            
-            print(f"API响应: {response}")
-            # 检查响应是否为列表类型
-            if isinstance(response, list):
-                # API直接返回资产列表
-                return response
-            else:
-                print(f"警告: 响应格式不是列表，收到 {type(response).__name__}")
-                # 如果是字典类型并且包含data字段，尝试获取data
-                if isinstance(response, dict) and 'data' in response:
-                    return response['data']
-                # 返回空列表作为默认值
-                return []
+            return self._format_account_assets(response)
         except Exception as e:
-            print(f"获取账户资产信息时出错: {str(e)}")
-            # 打印更详细的错误信息
-            import traceback
-            print(f"错误堆栈: {traceback.format_exc()}")
+            logger.exception("获取账户资产信息时出错: %s", e)
             return []
-    
+
     def get_account_balance(self):
         """
         获取账户资产信息
         参考文档: https://www.weex.com/api-doc/contract/Account_API/GetAccountBalance
-        
+
         Returns:
             list: 账户资产列表，每个资产包含以下字段:
                 - coinId: 币种ID
@@ -260,10 +2364,10 @@ class WeexClient:
         """
         # 使用合约账户API路径，根据curl命令示例
         request_path = "/capi/v2/account/accounts"
-        
+
         try:
             # 尝试获取合约账户信息，使用正确的签名方式
-            print(f"尝试访问合约账户路径: {request_path}")
+            logger.debug("尝试访问合约账户路径: %s", request_path)
             # 添加必要的请求头
             custom_headers = {
                 "locale": "zh-CN",
@@ -271,425 +2375,161 @@ class WeexClient:
             }
             # 重新启用签名验证
             response = self._request("GET", request_path, params={}, need_sign=True, headers=custom_headers)
-            
-            print(f"API响应: {response}")
-            # 检查响应是否为dict类型
-            if isinstance(response, dict):
-                # 合约API直接返回账户信息字典，不需要data字段
-                # 为了兼容原有代码，将账户信息转换为列表格式
-                account_info = response.get('account', {})
-                collateral_info = response.get('collateral', [])
-                # 返回合并后的账户信息列表
-                return [account_info] + collateral_info
-            else:
-                raise TypeError(f"响应格式不正确，期望dict类型，收到 {type(response).__name__}")
+            return self._format_account_balance(response)
         except Exception as e:
-            print(f"获取账户资产信息时出错: {str(e)}")
-            # 打印更详细的错误信息
-            import traceback
-            print(f"错误堆栈: {traceback.format_exc()}")
+            logger.exception("获取账户资产信息时出错: %s", e)
             return None
-    
+
     def set_leverage(self, symbol, margin_mode, long_leverage=None, short_leverage=None):
         """
         调整合约杠杆倍数
         参考文档: https://api-contract.weex.com/capi/v2/account/leverage
-        
+
         Args:
             symbol (str): 合约交易对，例如 "cmt_bchusdt"
             margin_mode (int): 保证金模式，1表示Cross Mode(全仓)，3表示Isolated Mode(逐仓)
             long_leverage (str, optional): 多头杠杆倍数，例如 "2"
             short_leverage (str, optional): 空头杠杆倍数，例如 "2"
-            
+
         Returns:
             dict: API响应数据
         """
         # 设置API路径
         request_path = "/capi/v2/account/leverage"
-        
+
         # 构建请求数据，确保参数格式正确
-        # API要求：
-        # - marginMode必须是Integer类型，1表示全仓，3表示逐仓
-        # - 必须同时提供longLeverage和shortLeverage参数
-        # - 全仓模式下，多头和空头杠杆必须相同
-        data = {
-            "symbol": symbol,
-            "marginMode": int(margin_mode),  # 必须是整数类型
-            "longLeverage": str(long_leverage) if long_leverage is not None else "1",
-            "shortLeverage": str(short_leverage) if short_leverage is not None else str(long_leverage if long_leverage is not None else "1")
-        }
-        
+        data = self._leverage_data(symbol, margin_mode, long_leverage, short_leverage)
+
         try:
             # 发送POST请求，需要签名
-            print(f"尝试设置{symbol}的杠杆倍数，保证金模式: {margin_mode}")
+            logger.debug("尝试设置%s的杠杆倍数，保证金模式: %s", symbol, margin_mode)
             custom_headers = {
                 "locale": "zh-CN",
                 "Content-Type": "application/json"
             }
             # 确保正确传递参数到_request方法
             response = self._request(method="POST", request_path=request_path, data=data, need_sign=True, headers=custom_headers)
-            print(f"杠杆设置响应: {response}")
+            logger.debug("杠杆设置响应: %s", response)
             return response
         except Exception as e:
-            print(f"设置杠杆倍数时出错: {str(e)}")
+            logger.error("设置杠杆倍数时出错: %s", e)
             return None
-    
+
     def get_coin_balance(self, coin_symbol="USDT"):
         """
         获取指定币种的余额
         针对合约API，从collateral字段中提取USDT资产的amount值
-        
+
         Args:
             coin_symbol (str): 币种符号，默认为USDT
-            
+
         Returns:
             float: 币种余额
         """
         try:
             # 获取账户资产信息
             assets = self.get_account_balance()
-            print(f"获取到的资产列表: {assets}")
-            
-            # 遍历资产列表，查找USDT资产
-            # 针对合约API，collateral字段中的资产包含legacy_amount字段
-            for asset in assets:
-                if isinstance(asset, dict):
-                    # 检查是否为抵押品信息（包含legacy_amount字段）
-                    if 'legacy_amount' in asset:
-                        # 假设第一个抵押品就是USDT（根据API响应）
-                        # 如果需要精确匹配，可以添加币种判断逻辑
-                        balance = asset.get('legacy_amount', '0')
-                        print(f"找到USDT资产，legacy_amount={balance}")
-                        return float(balance)
-            
-            print(f"未找到{coin_symbol}资产或获取失败")
-            return 0.0
+            return self._extract_coin_balance(assets, coin_symbol)
         except Exception as e:
-            print(f"获取{coin_symbol}余额时出错: {str(e)}")
+            logger.error("获取%s余额时出错: %s", coin_symbol, e)
             return 0.0
-    
+
     def get_history_orders(self, symbol=None, page_size=None, create_date=None):
         """
         获取历史订单列表
         参考文档: GET /capi/v2/order/history
-        
+
         Args:
             symbol (str, optional): 交易对，例如 "cmt_btcusdt"
             page_size (int, optional): 每页数量
             create_date (int, optional): 时间戳（毫秒）
-        
+
         Returns:
             dict: 包含orders字段（订单列表）的响应数据
         """
         # 参数验证
-        if symbol is not None:
-            if not isinstance(symbol, str) or not symbol.strip():
-                print("错误: symbol参数必须是非空字符串")
-                return {
-                    "orders": [],
-                    "error": "symbol参数无效",
-                    "error_code": "INVALID_PARAMETER"
-                }
-        
-        if page_size is not None:
-            if not isinstance(page_size, int) or page_size <= 0:
-                print(f"错误: page_size参数必须是正整数，当前值: {page_size}")
-                return {
-                    "orders": [],
-                    "error": "page_size参数无效，必须是正整数",
-                    "error_code": "INVALID_PARAMETER"
-                }
-            # 限制page_size最大值，避免请求过多数据
-            if page_size > 500:
-                print(f"警告: page_size({page_size})超过最大限制，将调整为500")
-                page_size = 500
-        
-        if create_date is not None:
-            if not isinstance(create_date, int):
-                print(f"错误: create_date参数必须是整数类型（时间戳），当前值: {create_date}")
-                return {
-                    "orders": [],
-                    "error": "create_date参数必须是整数类型（时间戳）",
-                    "error_code": "INVALID_PARAMETER"
-                }
-            if create_date <= 0:
-                print(f"错误: create_date参数必须是正整数时间戳，当前值: {create_date}")
-                return {
-                    "orders": [],
-                    "error": "create_date参数必须是正整数时间戳",
-                    "error_code": "INVALID_PARAMETER"
-                }
-        
+        params, error = self._history_orders_params(symbol, page_size, create_date)
+        if error is not None:
+            return error
+
         try:
             # 设置API路径
             request_path = "/capi/v2/order/history"
-            
-            # 构建查询参数
-            params = {}
-            
-            # 添加可选参数
-            if symbol is not None:
-                params["symbol"] = symbol 
-            if page_size is not None:
-                params["pageSize"] = page_size
-            if create_date is not None:
-                params["createDate"] = create_date
-            
+
             # 发送GET请求，需要签名
-            print(f"尝试获取历史订单，交易对: {symbol if symbol else '所有'}")
+            logger.debug("尝试获取历史订单，交易对: %s", symbol if symbol else '所有')
             custom_headers = {
                 "locale": "zh-CN",
                 "Content-Type": "application/json"
             }
-            
+
             # 发送请求并处理网络错误
             try:
                 response = self._request("GET", request_path, params=params, need_sign=True, headers=custom_headers)
             except requests.RequestException as req_error:
-                print(f"网络请求错误: {str(req_error)}")
+                logger.error("网络请求错误: %s", req_error)
                 return {
                     "orders": [],
                     "error": f"网络请求失败: {str(req_error)}",
                     "error_code": "NETWORK_ERROR"
                 }
-            
-            # 根据API文档，响应可能是一个订单数组
-            if isinstance(response, list):
-                # 格式化响应，确保返回格式一致
-                return {
-                    "orders": response,
-                    "has_more": False  # 无法从响应中判断是否有更多数据
-                }
-            elif isinstance(response, dict):
-                # 如果返回的是字典，可能是错误响应或其他格式
-                if "code" in response and response["code"] != 0:
-                    error_msg = response.get("msg", "未知API错误")
-                    error_code = response.get("code", "UNKNOWN_ERROR")
-                    print(f"API错误 - 代码: {error_code}, 消息: {error_msg}")
-                    return {
-                        "orders": [],
-                        "error": error_msg,
-                        "error_code": str(error_code)
-                    }
-                # 如果有orders字段，则返回该字段的值
-                if "orders" in response:
-                    return response
-                # 否则将整个响应作为orders返回
-                return {"orders": [response], "has_more": False}
-            else:
-                print(f"无效的响应格式: {type(response)}")
-                return {
-                    "orders": [],
-                    "error": "API返回的响应格式无效",
-                    "error_code": "INVALID_RESPONSE"
-                }
+
+            return self._format_history_orders(response, params.get("pageSize"))
         except Exception as e:
-            print(f"获取历史订单时出错: {str(e)}")
+            logger.error("获取历史订单时出错: %s", e)
             return {
                 "orders": [],
                 "error": f"获取历史订单失败: {str(e)}",
                 "error_code": "UNKNOWN_ERROR"
-            }
-            
-    def get_order_history(self, symbol, start_time=None, end_time=None, delegate_type=None, page_size=None):
-        """
-        获取历史计划订单列表
-        参考文档: GET /capi/v2/order/historyPlan
-        
-        Args:
-            symbol (str): 交易对，例如 "cmt_bchusdt"（必需）
-            start_time (int, optional): 开始时间戳
-            end_time (int, optional): 结束时间戳
-            delegate_type (int, optional): 订单类型: 1: 开多. 2: 开空. 3: 平多. 4: 平空.
-            page_size (int, optional): 每页数量
-        
-        Returns:
-            dict: 格式化后的订单历史信息，包含orders字段（处理后的订单列表）和has_more字段，以及error信息
-        """
-        # 参数验证
-        if not symbol or not isinstance(symbol, str):
-            print("错误: symbol参数必须是非空字符串")
-            return {
-                "orders": [], 
-                "has_more": False,
-                "error": "symbol参数无效",
-                "error_code": "INVALID_PARAMETER"
-            }
-        
-        # 验证可选参数类型
-        if start_time is not None and not isinstance(start_time, int):
-            print("错误: start_time参数必须是整数类型")
-            return {
-                "orders": [], 
-                "has_more": False,
-                "error": "start_time参数类型无效",
-                "error_code": "INVALID_PARAMETER"
-            }
-        
-        if end_time is not None and not isinstance(end_time, int):
-            print("错误: end_time参数必须是整数类型")
-            return {
-                "orders": [], 
-                "has_more": False,
-                "error": "end_time参数类型无效",
-                "error_code": "INVALID_PARAMETER"
-            }
-        
-        if delegate_type is not None:
-            if not isinstance(delegate_type, int) or delegate_type not in [1, 2, 3, 4]:
-                print(f"错误: delegate_type参数必须是1-4之间的整数，当前值: {delegate_type}")
-                return {
-                    "orders": [], 
-                    "has_more": False,
-                    "error": "delegate_type参数无效，必须是1-4之间的整数",
-                    "error_code": "INVALID_PARAMETER"
-                }
-        
-        if page_size is not None:
-            if not isinstance(page_size, int) or page_size <= 0:
-                print(f"错误: page_size参数必须是正整数，当前值: {page_size}")
-                return {
-                    "orders": [], 
-                    "has_more": False,
-                    "error": "page_size参数无效，必须是正整数",
-                    "error_code": "INVALID_PARAMETER"
-                }
-            # 限制page_size最大值，避免请求过多数据
-            if page_size > 500:
-                print(f"警告: page_size({page_size})超过最大限制，将调整为500")
-                page_size = 500
-        
+            }
+
+    def get_order_history(self, symbol, start_time=None, end_time=None, delegate_type=None, page_size=None):
+        """
+        获取历史计划订单列表
+        参考文档: GET /capi/v2/order/historyPlan
+
+        Args:
+            symbol (str): 交易对，例如 "cmt_bchusdt"（必需）
+            start_time (int, optional): 开始时间戳
+            end_time (int, optional): 结束时间戳
+            delegate_type (int, optional): 订单类型: 1: 开多. 2: 开空. 3: 平多. 4: 平空.
+            page_size (int, optional): 每页数量
+
+        Returns:
+            dict: 格式化后的订单历史信息，包含orders字段（处理后的订单列表）和has_more字段，以及error信息
+        """
+        # 参数验证
+        params, error = self._plan_history_params(symbol, start_time, end_time, delegate_type, page_size)
+        if error is not None:
+            return error
+
         try:
             # 设置API路径
             request_path = "/capi/v2/order/historyPlan"
-            
-            # 构建查询参数
-            params = {
-                "symbol": symbol  # 必需参数
-            }
-            
-            # 添加可选参数
-            if start_time is not None:
-                params["startTime"] = start_time
-            if end_time is not None:
-                params["endTime"] = end_time
-            if delegate_type is not None:
-                params["delegateType"] = delegate_type
-            if page_size is not None:
-                params["pageSize"] = page_size
-            
+
             # 发送GET请求，需要签名
-            print(f"尝试获取历史计划订单，交易对: {symbol}")
+            logger.debug("尝试获取历史计划订单，交易对: %s", symbol)
             custom_headers = {
                 "locale": "zh-CN",
                 "Content-Type": "application/json"
             }
-            
+
             # 发送请求并处理网络错误
             try:
                 response = self._request("GET", request_path, params=params, need_sign=True, headers=custom_headers)
             except requests.RequestException as req_error:
-                print(f"网络请求错误: {str(req_error)}")
+                logger.error("网络请求错误: %s", req_error)
                 return {
-                    "orders": [], 
+                    "orders": [],
                     "has_more": False,
                     "error": f"网络请求失败: {str(req_error)}",
                     "error_code": "NETWORK_ERROR"
                 }
-            
-            # 检查响应是否有效
-            if not isinstance(response, dict):
-                print(f"无效的响应格式: {type(response)}")
-                return {
-                    "orders": [], 
-                    "has_more": False,
-                    "error": "API返回的响应格式无效",
-                    "error_code": "INVALID_RESPONSE"
-                }
-            
-            # 检查API是否返回错误
-            if "code" in response and response["code"] != 0:
-                error_msg = response.get("msg", "未知API错误")
-                error_code = response.get("code", "UNKNOWN_ERROR")
-                print(f"API错误 - 代码: {error_code}, 消息: {error_msg}")
-                return {
-                    "orders": [], 
-                    "has_more": False,
-                    "error": error_msg,
-                    "error_code": str(error_code)
-                }
-            
-            # 解析和格式化订单列表
-            formatted_orders = []
-            order_list = response.get("list", [])
-            
-            # 订单类型映射
-            order_type_map = {
-                1: "开多",
-                2: "开空",
-                3: "平多",
-                4: "平空"
-            }
-            
-            # 订单状态映射
-            status_map = {
-                0: "初始",
-                1: "触发成功",
-                2: "触发失败",
-                3: "已撤销",
-                4: "暂停",
-                5: "未触发"
-            }
-            
-            # 格式化每个订单
-            try:
-                for order in order_list:
-                    if isinstance(order, dict):
-                        formatted_order = {
-                            "order_id": order.get("orderId", ""),
-                            "symbol": order.get("symbol", ""),
-                            "order_type": order_type_map.get(order.get("delegateType"), "未知"),
-                            "order_type_code": order.get("delegateType"),
-                            "price": float(order.get("price", 0.0)),
-                            "volume": float(order.get("volume", 0.0)),
-                            "status": status_map.get(order.get("status"), "未知"),
-                            "status_code": order.get("status"),
-                            "create_time": order.get("createTime"),
-                            "update_time": order.get("updateTime"),
-                            "trigger_price": float(order.get("triggerPrice", 0.0)),
-                            "trigger_type": order.get("triggerType"),
-                            "order_source": order.get("source"),
-                            "reduce_only": bool(order.get("reduceOnly", False))
-                        }
-                        
-                        # 计算订单金额（用于展示）
-                        try:
-                            formatted_order["order_value"] = round(formatted_order["price"] * formatted_order["volume"], 8)
-                        except (TypeError, ValueError):
-                            formatted_order["order_value"] = 0.0
-                        
-                        formatted_orders.append(formatted_order)
-            except Exception as parse_error:
-                print(f"订单数据解析错误: {str(parse_error)}")
-                # 即使部分数据解析失败，也返回已成功解析的订单
-                print(f"已成功解析 {len(formatted_orders)} 条订单数据")
-            
-            # 构建返回结果
-            result = {
-                "orders": formatted_orders,
-                "has_more": bool(response.get("nextPage", False)),
-                "total_count": len(formatted_orders),
-                "error": None,
-                "error_code": None
-            }
-            
-            print(f"成功获取并格式化 {len(formatted_orders)} 条历史订单记录")
-            return result
-            
+
+            return self._format_plan_history(response)
+
         except Exception as e:
-            print(f"获取历史订单时发生未知错误: {str(e)}")
-            import traceback
-            print(f"错误堆栈: {traceback.format_exc()}")
+            logger.exception("获取历史订单时发生未知错误: %s", e)
             # 返回空的订单列表和错误信息
             return {
                 "orders": [],
@@ -715,80 +2555,16 @@ class WeexClient:
             dict: 格式化后的当前计划订单信息，包含orders字段（处理后的订单列表）和has_more字段，以及error信息
         """
         # 验证可选参数类型
-        if orderId is not None and not isinstance(orderId, int):
-            print("错误: orderId参数必须是整数类型")
-            return {
-                "orders": [],
-                "has_more": False,
-                "error": "orderId参数类型无效",
-                "error_code": "INVALID_PARAMETER"
-            }
-
-        if startTime is not None and not isinstance(startTime, int):
-            print("错误: startTime参数必须是整数类型")
-            return {
-                "orders": [],
-                "has_more": False,
-                "error": "startTime参数类型无效",
-                "error_code": "INVALID_PARAMETER"
-            }
-
-        if endTime is not None and not isinstance(endTime, int):
-            print("错误: endTime参数必须是整数类型")
-            return {
-                "orders": [],
-                "has_more": False,
-                "error": "endTime参数类型无效",
-                "error_code": "INVALID_PARAMETER"
-            }
-
-        if limit is not None:
-            if not isinstance(limit, int) or limit <= 0:
-                print(f"错误: limit参数必须是正整数，当前值: {limit}")
-                return {
-                    "orders": [],
-                    "has_more": False,
-                    "error": "limit参数无效，必须是正整数",
-                    "error_code": "INVALID_PARAMETER"
-                }
-            # 限制limit最大值，避免请求过多数据
-            if limit > 100:
-                print(f"警告: limit({limit})超过最大限制，将调整为100")
-                limit = 100
-
-        if page is not None:
-            if not isinstance(page, int) or page < 0:
-                print(f"错误: page参数必须是非负整数，当前值: {page}")
-                return {
-                    "orders": [],
-                    "has_more": False,
-                    "error": "page参数无效，必须是非负整数",
-                    "error_code": "INVALID_PARAMETER"
-                }
+        params, error = self._current_plan_params(symbol, orderId, startTime, endTime, limit, page)
+        if error is not None:
+            return error
 
         try:
             # 设置API路径
             request_path = "/capi/v2/order/currentPlan"
 
-            # 构建查询参数
-            params = {}
-
-            # 添加可选参数
-            if symbol is not None:
-                params["symbol"] = symbol
-            if orderId is not None:
-                params["orderId"] = orderId
-            if startTime is not None:
-                params["startTime"] = startTime
-            if endTime is not None:
-                params["endTime"] = endTime
-            if limit is not None:
-                params["limit"] = limit
-            if page is not None:
-                params["page"] = page
-
             # 发送GET请求，需要签名
-            print(f"尝试获取当前计划订单")
+            logger.debug("尝试获取当前计划订单")
             custom_headers = {
                 "locale": "zh-CN",
                 "Content-Type": "application/json"
@@ -798,7 +2574,7 @@ class WeexClient:
             try:
                 response = self._request("GET", request_path, params=params, need_sign=True, headers=custom_headers)
             except requests.RequestException as req_error:
-                print(f"网络请求错误: {str(req_error)}")
+                logger.error("网络请求错误: %s", req_error)
                 return {
                     "orders": [],
                     "has_more": False,
@@ -806,388 +2582,495 @@ class WeexClient:
                     "error_code": "NETWORK_ERROR"
                 }
 
-            # 检查响应是否有效
-            if not isinstance(response, list):
-                print(f"无效的响应格式: {type(response)}")
-                return {
-                    "orders": [],
-                    "has_more": False,
-                    "error": "API返回的响应格式无效",
-                    "error_code": "INVALID_RESPONSE"
-                }
+            return self._format_current_plan_orders(response)
 
-            # 解析和格式化订单列表
-            formatted_orders = []
-
-            # 订单类型映射 (API返回英文字符串)
-            order_type_map = {
-                "OPEN_LONG": "开多",
-                "OPEN_SHORT": "开空",
-                "CLOSE_LONG": "平多",
-                "CLOSE_SHORT": "平空",
-                "PARTIAL_CLOSE_LONG": "部分平多",
-                "PARTIAL_CLOSE_SHORT": "部分平空",
-                "AUTO_DELEVERAGING_CLOSE_LONG": "自动减仓(平多)",
-                "AUTO_DELEVERAGING_CLOSE_SHORT": "自动减仓(平空)",
-                "LIQUIDATION_CLOSE_LONG": "强平(平多)",
-                "LIQUIDATION_CLOSE_SHORT": "强平(平空)"
+        except Exception as e:
+            logger.exception("获取当前计划订单时发生未知错误: %s", e)
+            # 返回空的订单列表和错误信息
+            return {
+                "orders": [],
+                "has_more": False,
+                "error": f"未知错误: {str(e)}",
+                "error_code": "UNKNOWN_ERROR"
             }
 
-            # 订单状态映射 (API返回英文字符串)
-            status_map = {
-                "CANCELED": "已取消",
-                "UNTRIGGERED": "未触发",
-                "PENDING": "待成交",
-                "PARTIALLY_FILLED": "部分成交",
-                "FILLED": "已成交"
-            }
+    def _iter_pages(self, fetch, cursor, use_has_more=True, key="orders"):
+        """
+        按游标逐页请求并逐条返回订单，调用方处理当前页时下一页已经在后台请求
 
-            # 订单类型映射 (order_type字段，API返回英文字符串)
-            order_type_detail_map = {
-                "NORMAL": "普通订单",
-                "POST_ONLY": "只做 maker",
-                "FILL_OR_KILL": "Fill-Or-Kill",
-                "IMMEDIATE_OR_CANCEL": "Immediate-Or-Cancel"
-            }
+        Args:
+            fetch (callable): 单页查询方法，fetch(**cursor.params)返回get_*的结果字典
+            cursor (PageCursor | TimeCursor): 翻页游标
+            use_has_more (bool): 是否使用接口返回的has_more判断结束，False时按每页数量判断
+            key (str): 结果中记录列表所在的字段
 
-            # 格式化每个订单
-            try:
-                for order in response:
-                    if isinstance(order, dict):
-                        formatted_order = {
-                            "symbol": order.get("symbol", ""),
-                            "size": float(order.get("size", 0.0)),
-                            "client_oid": order.get("client_oid", ""),
-                            "create_time": order.get("createTime", ""),
-                            "filled_qty": float(order.get("filled_qty", 0.0)),
-                            "fee": float(order.get("fee", 0.0)),
-                            "order_id": order.get("order_id", ""),
-                            "price": float(order.get("price", 0.0)),
-                            "price_avg": float(order.get("price_avg", 0.0)) if order.get("price_avg") else None,
-                            "status": status_map.get(order.get("status"), "未知"),
-                            "status_code": order.get("status"),
-                            "type": order_type_map.get(order.get("type"), "未知"),
-                            "type_code": order.get("type"),
-                            "order_type": order_type_detail_map.get(order.get("order_type"), "未知"),
-                            "order_type_code": order.get("order_type"),
-                            "totalProfits": float(order.get("totalProfits", 0.0)),
-                            "triggerPrice": float(order.get("triggerPrice", 0.0)) if order.get("triggerPrice") else None,
-                            "triggerPriceType": order.get("triggerPriceType", ""),
-                            "triggerTime": order.get("triggerTime", ""),
-                            "presetTakeProfitPrice": float(order.get("presetTakeProfitPrice", 0.0)) if order.get("presetTakeProfitPrice") else None,
-                            "presetStopLossPrice": float(order.get("presetStopLossPrice", 0.0)) if order.get("presetStopLossPrice") else None
-                        }
-
-                        # 计算订单金额（用于展示）
-                        try:
-                            formatted_order["order_value"] = round(formatted_order["price"] * formatted_order["size"], 8)
-                        except (TypeError, ValueError):
-                            formatted_order["order_value"] = 0.0
-
-                        formatted_orders.append(formatted_order)
-            except Exception as parse_error:
-                print(f"订单数据解析错误: {str(parse_error)}")
-                # 即使部分数据解析失败，也返回已成功解析的订单
-                print(f"已成功解析 {len(formatted_orders)} 条订单数据")
-
-            # 构建返回结果
-            result = {
-                "orders": formatted_orders,
-                "has_more": False,  # currentPlan API无has_more字段
-                "total_count": len(formatted_orders),
-                "error": None,
-                "error_code": None
-            }
+        Raises:
+            RuntimeError: 游标没有取完全部记录就停止（已取到的记录先返回）
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(fetch, **cursor.params)
+        try:
+            while future is not None:
+                orders, has_more = self._page_orders(future.result(), key)
+                orders = cursor.advance(orders, has_more if use_has_more else None)
+                future = executor.submit(fetch, **cursor.params) if cursor.params is not None else None
+                yield from orders
+            if not cursor.complete:
+                raise RuntimeError(f"翻页提前停止: 接口返回的订单顺序与翻页方向不一致，只取到前{cursor.pages}页")
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
 
-            print(f"成功获取并格式化 {len(formatted_orders)} 条当前计划订单记录")
-            return result
+    def iter_history_orders(self, symbol=None, page_size=100, create_date=None):
+        """
+        逐条返回全部历史订单（/capi/v2/order/history），自动翻页并预取下一页，内存中只保留一页
+        接口从新到旧返回时无法翻页，只返回create_date之后最新的page_size条，参见_history_orders_cursor
+
+        Args:
+            symbol (str, optional): 交易对
+            page_size (int): 每页数量，最大500
+            create_date (int, optional): 创建时间下限（毫秒时间戳）
+
+        Yields:
+            HistoryOrder: 历史订单，格式同get_history_orders
+
+        Raises:
+            RuntimeError: 某一页查询失败（已取到的订单先返回）
+        """
+        cursor = self._history_orders_cursor(symbol, page_size, create_date)
+        yield from self._iter_pages(self.get_history_orders, cursor)
+
+    def iter_order_history(self, symbol, start_time=None, end_time=None, delegate_type=None, page_size=100):
+        """
+        逐条返回时间范围内的全部历史计划订单（/capi/v2/order/historyPlan），从新到旧自动翻页并预取下一页
+
+        Args:
+            symbol (str): 交易对（必需）
+            start_time (int, optional): 开始时间戳
+            end_time (int, optional): 结束时间戳
+            delegate_type (int, optional): 订单类型: 1: 开多. 2: 开空. 3: 平多. 4: 平空.
+            page_size (int): 每页数量，最大500
+
+        Yields:
+            dict: 历史计划订单，格式同get_order_history
+
+        Raises:
+            RuntimeError: 某一页查询失败
+        """
+        cursor = self._plan_history_cursor(symbol, start_time, end_time, delegate_type, page_size)
+        yield from self._iter_pages(self.get_order_history, cursor)
+
+    def iter_current_plan_orders(self, symbol=None, start_time=None, end_time=None, limit=100):
+        """
+        逐条返回全部当前计划订单（/capi/v2/order/currentPlan），按页码自动翻页并预取下一页
+
+        Args:
+            symbol (str, optional): 交易对
+            start_time (int, optional): 开始时间戳
+            end_time (int, optional): 结束时间戳
+            limit (int): 每页数量，最大100
+
+        Yields:
+            CurrentPlanOrder: 当前计划订单，格式同getCurrentPlanOrders
+
+        Raises:
+            RuntimeError: 某一页查询失败
+        """
+        cursor = self._current_plan_cursor(symbol, start_time, end_time, limit)
+        yield from self._iter_pages(self.getCurrentPlanOrders, cursor, use_has_more=False)
+
+    def get_fills(self, symbol=None, order_id=None, start_time=None, end_time=None, limit=None):
+        """
+        获取成交明细
+        参考文档: GET /capi/v2/order/fills
+
+        Args:
+            symbol (str, optional): 交易对
+            order_id (str, optional): 订单ID
+            start_time (int, optional): 开始时间戳（毫秒）
+            end_time (int, optional): 结束时间戳（毫秒）
+            limit (int, optional): 每页数量，最大100
 
+        Returns:
+            dict: 包含fills字段（Fill记录列表）和has_more字段，以及error信息
+        """
+        params, error = self._fills_params(symbol, order_id, start_time, end_time, limit)
+        if error is not None:
+            return error
+        try:
+            logger.debug("尝试获取成交明细，交易对: %s", symbol or '所有')
+            response = self._request("GET", "/capi/v2/order/fills", params=params, need_sign=True)
+            return self._format_fills(response)
         except Exception as e:
-            print(f"获取当前计划订单时发生未知错误: {str(e)}")
-            import traceback
-            print(f"错误堆栈: {traceback.format_exc()}")
-            # 返回空的订单列表和错误信息
+            logger.error("获取成交明细时出错: %s", e)
             return {
-                "orders": [],
+                "fills": [],
                 "has_more": False,
-                "error": f"未知错误: {str(e)}",
-                "error_code": "UNKNOWN_ERROR"
+                "error": f"获取成交明细失败: {str(e)}",
+                "error_code": "NETWORK_ERROR" if isinstance(e, requests.RequestException) else "UNKNOWN_ERROR"
             }
 
+    def iter_fills(self, symbol=None, start_time=None, end_time=None, limit=100):
+        """
+        逐条返回时间范围内的全部成交明细，从新到旧自动翻页并预取下一页
+
+        Args:
+            symbol (str, optional): 交易对
+            start_time (int, optional): 开始时间戳（毫秒）
+            end_time (int, optional): 结束时间戳（毫秒）
+            limit (int): 每页数量，最大100
+
+        Yields:
+            Fill: 成交明细，格式同get_fills
+
+        Raises:
+            RuntimeError: 某一页查询失败
+        """
+        cursor = self._fills_cursor(symbol, start_time, end_time, limit)
+        yield from self._iter_pages(self.get_fills, cursor, key="fills")
+
     def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100):
         """
         获取K线数据
         对应OKX SDK的exchange.fetch_ohlcv方法
-        
+
         Args:
             symbol (str): 交易对，如 "cmt_bchusdt"
             timeframe (str): K线周期，如 "1m", "5m", "1h", "1d"
             since (int, optional): 开始时间戳（毫秒）
             limit (int, optional): 数据条数，默认100
-            
+
         Returns:
             list: K线数据列表，每条数据格式为[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
         """
         try:
             # 设置API路径
             request_path = "/capi/v2/market/candles"
-            
+
             # 构建查询参数
-            params = {
-                "symbol": symbol,
-                "granularity": timeframe,
-                "limit": limit
-            }
-            
-            # 添加可选参数
-            if since is not None:
-                params["startTime"] = since
-                # 如果提供了开始时间，可以设置一个合理的结束时间
-                # 例如当前时间加上一段时间
-                params["endTime"] = int(time.time() * 1000)
-            
+            params = self._ohlcv_params(symbol, timeframe, since, limit)
+
             # 发送GET请求，不需要签名（公开API）
-            print(f"尝试获取{symbol}的{timeframe} K线数据，限制{limit}条")
+            logger.debug("尝试获取%s的%s K线数据，限制%s条", symbol, timeframe, limit)
             response = self._request("GET", request_path, params=params, need_sign=False)
-            
+
             # 处理响应数据
-            # 响应格式: [[时间戳, 开盘价, 最高价, 最低价, 收盘价, 交易量, 成交额], ...]
-            # 转换为CCXT兼容格式: [时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
-            ohlcv_data = []
-            if isinstance(response, list):
-                for candle in response:
-                    if len(candle) >= 7:
-                        # 转换为float类型并重新排列
-                        ohlcv_data.append([
-                            int(candle[0]),  # 时间戳
-                            float(candle[1]),  # 开盘价
-                            float(candle[2]),  # 最高价
-                            float(candle[3]),  # 最低价
-                            float(candle[4]),  # 收盘价
-                            float(candle[6])  # 成交量（使用成交额）
-                        ])
-            
-            print(f"成功获取{len(ohlcv_data)}条K线数据")
+            ohlcv_data = self._format_ohlcv(response)
+
+            logger.debug("成功获取%s条K线数据", len(ohlcv_data))
             return ohlcv_data
         except Exception as e:
-            print(f"获取K线数据时出错: {str(e)}")
+            logger.error("获取K线数据时出错: %s", e)
             return []
-    
+
+    def _fetch_ohlcv_window(self, symbol, timeframe, start, end, limit):
+        """
+        获取一个时间窗口内的K线，失败时抛出异常（不像fetch_ohlcv那样返回空列表，避免把请求失败当成数据缺口）
+        """
+        params = self._ohlcv_params(symbol, timeframe, since=start, limit=limit, until=end)
+        response = self._request("GET", "/capi/v2/market/candles", params=params, need_sign=False)
+        return self._format_ohlcv(response)
+
+    def fetch_ohlcv_range(self, symbol, timeframe, start, end=None, concurrency=4,
+                          window_limit=MAX_CANDLES_PER_REQUEST, as_frame=False, on_gap=None):
+        """
+        分页获取一段时间范围内的历史K线，按时间顺序逐块返回，内存占用与范围长短无关
+
+        多个窗口并发请求（受客户端限速约束），重叠的K线只保留一次，缺失的K线区间通过on_gap回调报告
+
+        Args:
+            symbol (str): 交易对，如 "cmt_btcusdt"
+            timeframe (str): K线周期，如 "15m"
+            start (int): 开始时间戳（毫秒）
+            end (int, optional): 结束时间戳（毫秒，包含），默认当前时间
+            concurrency (int): 同时进行的窗口请求数
+            window_limit (int): 每个窗口请求的K线条数
+            as_frame (bool): True时每块返回pandas.DataFrame，否则返回形状为(n, 6)的numpy数组
+            on_gap (callable, optional): 发现缺口时调用on_gap(缺口开始时间戳, 缺口结束时间戳)，默认记录警告日志
+
+        Yields:
+            numpy.ndarray 或 pandas.DataFrame: 每个窗口的K线，列为[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
+
+        Raises:
+            requests.exceptions.RequestException: 某个窗口重试后仍然失败
+        """
+        import numpy as np
+        if as_frame:
+            import pandas as pd
+
+        if end is None:
+            end = int(time.time() * 1000)
+        if on_gap is None:
+            on_gap = lambda gap_start, gap_end: logger.warning("%s %s K线缺口: %s - %s", symbol, timeframe, gap_start, gap_end)
+        tf_ms = timeframe_to_ms(timeframe)
+        windows = iter(self._ohlcv_windows(timeframe, start, end, window_limit))
+        expected = start - start % tf_ms + (tf_ms if start % tf_ms else 0)
+
+        executor = ThreadPoolExecutor(max_workers=max(concurrency, 1))
+        pending = deque()
+        try:
+            # 预先提交concurrency个窗口，按提交顺序取结果，保证输出有序
+            for window in itertools.islice(windows, concurrency):
+                pending.append(executor.submit(self._fetch_ohlcv_window, symbol, timeframe, *window))
+            while pending:
+                ohlcv = pending.popleft().result()
+                for window in itertools.islice(windows, 1):
+                    pending.append(executor.submit(self._fetch_ohlcv_window, symbol, timeframe, *window))
+
+                rows, gaps, expected = self._merge_ohlcv_window(ohlcv, tf_ms, expected, end)
+                for gap in gaps:
+                    on_gap(*gap)
+                if not rows:
+                    continue
+                if as_frame:
+                    chunk = pd.DataFrame(rows, columns=OHLCV_COLUMNS)
+                    chunk['timestamp'] = chunk['timestamp'].astype('int64')
+                    yield chunk
+                else:
+                    yield np.asarray(rows, dtype=np.float64)
+
+            # 范围末尾已经收盘的K线缺失
+            last_closed = min(end, int(time.time() * 1000) - tf_ms)
+            last_closed -= last_closed % tf_ms
+            if expected <= last_closed:
+                on_gap(expected, last_closed)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     def fetch_positions(self, symbol=None):
         """
         获取持仓情况
         对应OKX SDK的exchange.fetch_positions方法
-        
+
         Args:
             symbol (str, optional): 交易对，如 "cmt_bchusdt"，不提供则获取所有持仓
-            
+
         Returns:
             list: 持仓列表，每个持仓包含详细信息
         """
         try:
             # 设置API路径
             request_path = "/capi/v2/account/position/allPosition"
-            
+
             # 构建查询参数
             params = {}
             if symbol is not None:
                 params["symbol"] = symbol
-            
+
             # 发送GET请求，需要签名
-            print(f"尝试获取持仓情况{'' if symbol is None else f'，交易对: {symbol}'}")
+            logger.debug("尝试获取持仓情况，交易对: %s", symbol or '所有')
             custom_headers = {
                 "locale": "zh-CN",
                 "Content-Type": "application/json"
             }
             response = self._request("GET", request_path, params=params, need_sign=True, headers=custom_headers)
-            
+
             # 处理响应数据
-            positions = []
-            if isinstance(response, list):
-                for pos in response:
-                    # 转换为CCXT兼容的格式
-                    position = {
-                        "id": pos.get("id", ""),
-                        "symbol": pos.get("symbol", ""),
-                        "side": "long" if pos.get("side") == "LONG" else "short",
-                        "size": float(pos.get("size", 0)),
-                        "entryPrice": float(pos.get("open_value", 0)) / float(pos.get("size", 1)) if float(pos.get("size", 0)) > 0 else 0,
-                        "leverage": float(pos.get("leverage", 1)),
-                        "unrealizedPnl": float(pos.get("unrealizePnl", 0)),
-                        "liquidationPrice": float(pos.get("liquidatePrice", 0)),
-                        "marginMode": "isolated" if pos.get("margin_mode") == "ISOLATED" else "cross",
-                        "timestamp": pos.get("updated_time", 0),
-                        "info": pos  # 保留原始数据
-                    }
-                    positions.append(position)
-            
-            print(f"成功获取{len(positions)}个持仓信息")
+            positions = self._format_positions(response)
+
+            logger.debug("成功获取%s个持仓信息", len(positions))
             return positions
         except Exception as e:
-            print(f"获取持仓情况时出错: {str(e)}")
-            return []
-    
+            logger.error("获取持仓情况时出错: %s", e)
+            return []
+
+    def fetch_open_positions(self, symbol=None):
+        """
+        获取数量大于0的持仓，查询失败时抛出异常而不是返回空列表，
+        用于必须区分"没有持仓"和"查询失败"的场景（如一键平仓确认持仓已归零）
+
+        Args:
+            symbol (str, optional): 交易对，不提供则获取所有持仓
+
+        Returns:
+            list: 持仓列表，格式同fetch_positions
+
+        Raises:
+            Exception: 请求失败或响应格式不正确
+        """
+        params = {"symbol": symbol} if symbol is not None else {}
+        return self._open_positions(self._request("GET", "/capi/v2/account/position/allPosition", params=params,
+                                                  need_sign=True), symbol)
+
+    def fetch_open_order_ids(self, symbol=None):
+        """
+        获取未完成普通委托的订单ID
+        参考文档: GET /capi/v2/order/openOrders
+
+        Args:
+            symbol (str, optional): 交易对，不提供则获取所有交易对
+
+        Returns:
+            list: 订单ID
+
+        Raises:
+            Exception: 请求失败或响应格式不正确
+        """
+        params = {"symbol": symbol} if symbol is not None else None
+        return self._open_order_ids(self._request("GET", OPEN_ORDERS_PATH, params=params, need_sign=True), symbol)
+
+    def fetch_tickers(self, symbols=None):
+        """
+        一次请求获取全部交易对的最新行情
+        参考文档: GET /capi/v2/market/tickers
+
+        Args:
+            symbols (iterable, optional): 只返回这些交易对
+
+        Returns:
+            dict: 交易对 -> 行情，出错时返回空字典
+        """
+        try:
+            response = self._request("GET", TICKERS_PATH, need_sign=False)
+            tickers = self._format_tickers(response)
+            if symbols is not None:
+                symbols = set(symbols)
+                tickers = {symbol: ticker for symbol, ticker in tickers.items() if symbol in symbols}
+            return tickers
+        except Exception as e:
+            logger.error("获取行情时出错: %s", e)
+            return {}
+
+    def fetch_snapshot(self, symbols=None):
+        """
+        持仓快照：全部持仓以及每个持仓交易对的最新价
+        只发送一次allPosition请求和一次tickers请求（并发发送），不需要按持仓逐个查询价格
+
+        Args:
+            symbols (iterable, optional): 只保留这些交易对的持仓；这些交易对即使没有持仓也会返回价格
+
+        Returns:
+            dict: {'positions': 持仓列表（格式同fetch_positions，只含数量大于0的持仓）,
+                   'prices': 交易对 -> 最新价, 'tickers': 交易对 -> 行情, 'timestamp': 本地毫秒时间戳,
+                   'error': 出错时的错误信息，否则为None}
+        """
+        custom_headers = {
+            "locale": "zh-CN",
+            "Content-Type": "application/json"
+        }
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            positions_future = executor.submit(self._request, "GET", "/capi/v2/account/position/allPosition",
+                                               params={}, need_sign=True, headers=custom_headers)
+            tickers_future = executor.submit(self._request, "GET", TICKERS_PATH, need_sign=False)
+        try:
+            snapshot = self._build_snapshot(positions_future.result(), tickers_future.result(), symbols)
+            snapshot["error"] = None
+        except Exception as e:
+            logger.error("获取持仓快照时出错: %s", e)
+            snapshot = {"positions": [], "prices": {}, "tickers": {}, "error": str(e)}
+        snapshot["timestamp"] = int(time.time() * 1000)
+        return snapshot
+
     def create_market_order(self, symbol, side, amount, **kwargs):
         """
         创建市价单
         对应OKX SDK的exchange.create_market_order方法
-        
+
         Args:
             symbol (str): 交易对，如 "cmt_bchusdt"
             side (str): 交易方向，"buy" 或 "sell"
             amount (float): 订单数量
             **kwargs: 其他可选参数
-            
+
         Returns:
             dict: 订单信息
         """
         try:
             # 设置API路径
             request_path = "/capi/v2/order/placeOrder"
-            
-            # 生成客户端订单ID
-            client_oid = kwargs.get("client_oid", f"{int(time.time() * 1000)}")
-            
-            # 映射交易方向
-            # 1: Open long, 2: Open short, 3: Close long, 4: Close short
-            if kwargs.get("reduce_only", False):
-                # 平仓订单
-                order_type = 4 if side.lower() == "sell" else 3
-            else:
-                # 开仓订单
-                order_type = 1 if side.lower() == "buy" else 2
-            
+
             # 构建请求数据
-            data = {
-                "symbol": symbol,
-                "client_oid": client_oid,
-                "size": str(amount),
-                "type": str(order_type),
-                "order_type": "0",  # 0: Normal
-                "match_price": "1"  # 1: Market price
-            }
-            
-            # 添加可选参数
-            if "price" in kwargs and float(kwargs["price"]) > 0:
-                data["price"] = str(kwargs["price"])
-            if "presetTakeProfitPrice" in kwargs:
-                data["presetTakeProfitPrice"] = kwargs["presetTakeProfitPrice"]
-            if "presetStopLossPrice" in kwargs:
-                data["presetStopLossPrice"] = kwargs["presetStopLossPrice"]
-            if "marginMode" in kwargs:
-                data["marginMode"] = kwargs["marginMode"]
-            if "separatedMode" in kwargs:
-                data["separatedMode"] = kwargs["separatedMode"]
-            
+            data, client_oid = self._market_order_data(symbol, side, amount, **kwargs)
+
             # 发送POST请求，需要签名
-            print(f"尝试创建市价{side}单，交易对: {symbol}，数量: {amount}")
+            logger.debug("尝试创建市价%s单，交易对: %s，数量: %s", side, symbol, amount)
             custom_headers = {
                 "locale": "zh-CN",
                 "Content-Type": "application/json"
             }
-            response = self._request("POST", request_path, data=data, need_sign=True, headers=custom_headers)
-            
+            try:
+                response = self._request("POST", request_path, data=data, need_sign=True, headers=custom_headers)
+            except Exception as e:
+                response = self._duplicate_order_response(e, client_oid)
+                if response is None:
+                    raise
+
             # 处理响应数据
-            order = {
-                "id": response.get("order_id", ""),
-                "clientOrderId": response.get("client_oid", client_oid),
-                "symbol": symbol,
-                "side": side,
-                "type": "market",
-                "amount": amount,
-                "info": response  # 保留原始数据
-            }
-            
-            print(f"市价单创建成功，订单ID: {order['id']}")
+            order = self._format_order(response, client_oid, symbol, side, amount, with_price=False)
+
+            logger.info("市价单创建成功，订单ID: %s", order['id'])
             return order
         except Exception as e:
-            print(f"创建市价单时出错: {str(e)}")
+            logger.error("创建市价单时出错: %s", e)
             return None
-    
-    def open_long(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
+
+    def _place_order(self, action, type_value, side, symbol, amount, price=None, order_type="0", match_price="1", allow_preset=True, **kwargs):
         """
-        开多（建立多头仓位）
-        
+        开平仓下单的公共实现
+
         Args:
-            symbol (str): 交易对，如 "cmt_bchusdt"
-            amount (float): 订单数量
-            price (float, optional): 订单价格，限价单时必填
-            order_type (str, optional): 订单类型，默认0: Normal
-            match_price (str, optional): 价格类型，默认1: Market price, 0: Limit price
-            **kwargs: 其他可选参数，如presetTakeProfitPrice, presetStopLossPrice, marginMode等
-            
+            action (str): 操作名称，用于日志，如 "开多"
+            type_value (str): 1: Open long, 2: Open short, 3: Close long, 4: Close short
+            side (str): 订单方向，"buy" 或 "sell"
+
         Returns:
-            dict: 订单信息
+            dict: 订单信息，失败时返回None
         """
         try:
             # 设置API路径
             request_path = "/capi/v2/order/placeOrder"
-            
-            # 生成客户端订单ID
-            client_oid = kwargs.get("client_oid", f"{int(time.time() * 1000)}")
-            
-            # 开多对应的type为1
-            order_type_value = "1"  # 1: Open long
-            
+
             # 构建请求数据
-            data = {
-                "symbol": symbol,
-                "client_oid": client_oid,
-                "size": str(amount),
-                "type": order_type_value,
-                "order_type": order_type,
-                "match_price": match_price
-            }
-            
-            # 如果是限价单且提供了价格，添加价格参数
-            if match_price == "0" and price is not None:
-                data["price"] = str(price)
-            elif match_price == "1" and price is not None:
-                # 市价单也可以提供价格作为参考
-                data["price"] = str(price)
-            
-            # 添加可选参数
-            if "presetTakeProfitPrice" in kwargs:
-                data["presetTakeProfitPrice"] = kwargs["presetTakeProfitPrice"]
-            if "presetStopLossPrice" in kwargs:
-                data["presetStopLossPrice"] = kwargs["presetStopLossPrice"]
-            if "marginMode" in kwargs:
-                data["marginMode"] = kwargs["marginMode"]
-            if "separatedMode" in kwargs:
-                data["separatedMode"] = kwargs["separatedMode"]
-            
+            data, client_oid = self._order_data(symbol, amount, type_value, price, order_type, match_price, allow_preset, **kwargs)
+
             # 发送POST请求，需要签名
-            print(f"尝试开多，交易对: {symbol}，数量: {amount}")
+            logger.debug("尝试%s，交易对: %s，数量: %s", action, symbol, amount)
             if match_price == "0" and price is not None:
-                print(f"限价: {price}")
+                logger.debug("限价: %s", price)
             custom_headers = {
                 "locale": "zh-CN",
                 "Content-Type": "application/json"
             }
-            response = self._request("POST", request_path, data=data, need_sign=True, headers=custom_headers)
-            
+            try:
+                response = self._request("POST", request_path, data=data, need_sign=True, headers=custom_headers)
+            except Exception as e:
+                response = self._duplicate_order_response(e, client_oid)
+                if response is None:
+                    raise
+
             # 处理响应数据
-            order = {
-                "id": response.get("order_id", ""),
-                "clientOrderId": response.get("client_oid", client_oid),
-                "symbol": symbol,
-                "side": "buy",
-                "type": "market" if match_price == "1" else "limit",
-                "amount": amount,
-                "price": price,
-                "info": response  # 保留原始数据
-            }
-            
-            print(f"开多订单创建成功，订单ID: {order['id']}")
+            order = self._format_order(response, client_oid, symbol, side, amount, match_price, price)
+
+            logger.info("%s订单创建成功，订单ID: %s", action, order['id'])
             return order
         except Exception as e:
-            print(f"开多时出错: {str(e)}")
+            logger.error("%s时出错: %s", action, e)
             return None
-    
+
+    def open_long(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
+        """
+        开多（建立多头仓位）
+
+        Args:
+            symbol (str): 交易对，如 "cmt_bchusdt"
+            amount (float): 订单数量
+            price (float, optional): 订单价格，限价单时必填
+            order_type (str, optional): 订单类型，默认0: Normal
+            match_price (str, optional): 价格类型，默认1: Market price, 0: Limit price
+            **kwargs: 其他可选参数，如presetTakeProfitPrice, presetStopLossPrice, marginMode等
+
+        Returns:
+            dict: 订单信息
+        """
+        return self._place_order("开多", "1", "buy", symbol, amount, price, order_type, match_price, True, **kwargs)
+
     def open_short(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
         """
         开空（建立空头仓位）
-        
+
         Args:
             symbol (str): 交易对，如 "cmt_bchusdt"
             amount (float): 订单数量
@@ -1195,79 +3078,16 @@ class WeexClient:
             order_type (str, optional): 订单类型，默认0: Normal
             match_price (str, optional): 价格类型，默认1: Market price, 0: Limit price
             **kwargs: 其他可选参数，如presetTakeProfitPrice, presetStopLossPrice, marginMode等
-            
+
         Returns:
             dict: 订单信息
         """
-        try:
-            # 设置API路径
-            request_path = "/capi/v2/order/placeOrder"
-            
-            # 生成客户端订单ID
-            client_oid = kwargs.get("client_oid", f"{int(time.time() * 1000)}")
-            
-            # 开空对应的type为2
-            order_type_value = "2"  # 2: Open short
-            
-            # 构建请求数据
-            data = {
-                "symbol": symbol,
-                "client_oid": client_oid,
-                "size": str(amount),
-                "type": order_type_value,
-                "order_type": order_type,
-                "match_price": match_price
-            }
-            
-            # 如果是限价单且提供了价格，添加价格参数
-            if match_price == "0" and price is not None:
-                data["price"] = str(price)
-            elif match_price == "1" and price is not None:
-                # 市价单也可以提供价格作为参考
-                data["price"] = str(price)
-            
-            # 添加可选参数
-            if "presetTakeProfitPrice" in kwargs:
-                data["presetTakeProfitPrice"] = kwargs["presetTakeProfitPrice"]
-            if "presetStopLossPrice" in kwargs:
-                data["presetStopLossPrice"] = kwargs["presetStopLossPrice"]
-            if "marginMode" in kwargs:
-                data["marginMode"] = kwargs["marginMode"]
-            if "separatedMode" in kwargs:
-                data["separatedMode"] = kwargs["separatedMode"]
-            
-            # 发送POST请求，需要签名
-            print(f"尝试开空，交易对: {symbol}，数量: {amount}")
-            if match_price == "0" and price is not None:
-                print(f"限价: {price}")
-            custom_headers = {
-                "locale": "zh-CN",
-                "Content-Type": "application/json"
-            }
-            response = self._request("POST", request_path, data=data, need_sign=True, headers=custom_headers)
-            
-            # 处理响应数据
-            order = {
-                "id": response.get("order_id", ""),
-                "clientOrderId": response.get("client_oid", client_oid),
-                "symbol": symbol,
-                "side": "sell",
-                "type": "market" if match_price == "1" else "limit",
-                "amount": amount,
-                "price": price,
-                "info": response  # 保留原始数据
-            }
-            
-            print(f"开空订单创建成功，订单ID: {order['id']}")
-            return order
-        except Exception as e:
-            print(f"开空时出错: {str(e)}")
-            return None
-    
+        return self._place_order("开空", "2", "sell", symbol, amount, price, order_type, match_price, True, **kwargs)
+
     def close_long(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
         """
         平多（平仓多头仓位）
-        
+
         Args:
             symbol (str): 交易对，如 "cmt_bchusdt"
             amount (float): 订单数量
@@ -1275,75 +3095,16 @@ class WeexClient:
             order_type (str, optional): 订单类型，默认0: Normal
             match_price (str, optional): 价格类型，默认1: Market price, 0: Limit price
             **kwargs: 其他可选参数，如marginMode, separatedMode等
-            
+
         Returns:
             dict: 订单信息
         """
-        try:
-            # 设置API路径
-            request_path = "/capi/v2/order/placeOrder"
-            
-            # 生成客户端订单ID
-            client_oid = kwargs.get("client_oid", f"{int(time.time() * 1000)}")
-            
-            # 平多对应的type为3
-            order_type_value = "3"  # 3: Close long
-            
-            # 构建请求数据
-            data = {
-                "symbol": symbol,
-                "client_oid": client_oid,
-                "size": str(amount),
-                "type": order_type_value,
-                "order_type": order_type,
-                "match_price": match_price
-            }
-            
-            # 如果是限价单且提供了价格，添加价格参数
-            if match_price == "0" and price is not None:
-                data["price"] = str(price)
-            elif match_price == "1" and price is not None:
-                # 市价单也可以提供价格作为参考
-                data["price"] = str(price)
-            
-            # 添加可选参数
-            if "marginMode" in kwargs:
-                data["marginMode"] = kwargs["marginMode"]
-            if "separatedMode" in kwargs:
-                data["separatedMode"] = kwargs["separatedMode"]
-            
-            # 发送POST请求，需要签名
-            print(f"尝试平多，交易对: {symbol}，数量: {amount}")
-            if match_price == "0" and price is not None:
-                print(f"限价: {price}")
-            custom_headers = {
-                "locale": "zh-CN",
-                "Content-Type": "application/json"
-            }
-            response = self._request("POST", request_path, data=data, need_sign=True, headers=custom_headers)
-            
-            # 处理响应数据
-            order = {
-                "id": response.get("order_id", ""),
-                "clientOrderId": response.get("client_oid", client_oid),
-                "symbol": symbol,
-                "side": "sell",
-                "type": "market" if match_price == "1" else "limit",
-                "amount": amount,
-                "price": price,
-                "info": response  # 保留原始数据
-            }
-            
-            print(f"平多订单创建成功，订单ID: {order['id']}")
-            return order
-        except Exception as e:
-            print(f"平多时出错: {str(e)}")
-            return None
-    
+        return self._place_order("平多", "3", "sell", symbol, amount, price, order_type, match_price, False, **kwargs)
+
     def close_short(self, symbol, amount, price=None, order_type="0", match_price="1", **kwargs):
         """
         平空（平仓空头仓位）
-        
+
         Args:
             symbol (str): 交易对，如 "cmt_bchusdt"
             amount (float): 订单数量
@@ -1351,71 +3112,237 @@ class WeexClient:
             order_type (str, optional): 订单类型，默认0: Normal
             match_price (str, optional): 价格类型，默认1: Market price, 0: Limit price
             **kwargs: 其他可选参数，如marginMode, separatedMode等
-            
+
         Returns:
             dict: 订单信息
         """
+        return self._place_order("平空", "4", "buy", symbol, amount, price, order_type, match_price, False, **kwargs)
+
+
+    def place_plan_order(self, symbol, amount, type_value, trigger_price, execute_price=None, match_price="1", **kwargs):
+        """
+        下计划委托（条件单），价格达到trigger_price时由交易所下单，机器人离线时同样生效
+        参考文档: POST /capi/v2/order/plan_order
+
+        Args:
+            symbol (str): 交易对，如 "cmt_bchusdt"
+            amount (float): 委托数量
+            type_value (str): 1: Open long, 2: Open short, 3: Close long, 4: Close short
+            trigger_price (float): 触发价格
+            execute_price (float, optional): 触发后的委托价格，默认市价
+            match_price (str, optional): 1: Market price, 0: Limit price
+            **kwargs: 其他可选参数，如client_oid, marginMode
+
+        Returns:
+            dict: {'id', 'clientOrderId', 'symbol', 'type', 'amount', 'triggerPrice', 'info'}，失败时返回None
+        """
         try:
-            # 设置API路径
-            request_path = "/capi/v2/order/placeOrder"
-            
-            # 生成客户端订单ID
-            client_oid = kwargs.get("client_oid", f"{int(time.time() * 1000)}")
-            
-            # 平空对应的type为4
-            order_type_value = "4"  # 4: Close short
-            
-            # 构建请求数据
-            data = {
-                "symbol": symbol,
-                "client_oid": client_oid,
-                "size": str(amount),
-                "type": order_type_value,
-                "order_type": order_type,
-                "match_price": match_price
-            }
-            
-            # 如果是限价单且提供了价格，添加价格参数
-            if match_price == "0" and price is not None:
-                data["price"] = str(price)
-            elif match_price == "1" and price is not None:
-                # 市价单也可以提供价格作为参考
-                data["price"] = str(price)
-            
-            # 添加可选参数
-            if "marginMode" in kwargs:
-                data["marginMode"] = kwargs["marginMode"]
-            if "separatedMode" in kwargs:
-                data["separatedMode"] = kwargs["separatedMode"]
-            
-            # 发送POST请求，需要签名
-            print(f"尝试平空，交易对: {symbol}，数量: {amount}")
-            if match_price == "0" and price is not None:
-                print(f"限价: {price}")
+            request_path = "/capi/v2/order/plan_order"
+            data, client_oid = self._plan_order_data(symbol, amount, type_value, trigger_price, execute_price,
+                                                     match_price, **kwargs)
+            logger.debug("尝试下计划委托，交易对: %s，类型: %s，触发价: %s", symbol, type_value, trigger_price)
             custom_headers = {
                 "locale": "zh-CN",
                 "Content-Type": "application/json"
             }
-            response = self._request("POST", request_path, data=data, need_sign=True, headers=custom_headers)
-            
-            # 处理响应数据
+            try:
+                response = self._request("POST", request_path, data=data, need_sign=True, headers=custom_headers)
+            except Exception as e:
+                response = self._duplicate_order_response(e, client_oid)
+                if response is None:
+                    raise
             order = {
                 "id": response.get("order_id", ""),
                 "clientOrderId": response.get("client_oid", client_oid),
                 "symbol": symbol,
-                "side": "buy",
-                "type": "market" if match_price == "1" else "limit",
+                "type": type_value,
                 "amount": amount,
-                "price": price,
-                "info": response  # 保留原始数据
+                "triggerPrice": trigger_price,
+                "info": response
             }
-            
-            print(f"平空订单创建成功，订单ID: {order['id']}")
+            logger.info("计划委托创建成功，订单ID: %s", order['id'])
             return order
         except Exception as e:
-            print(f"平空时出错: {str(e)}")
+            logger.error("下计划委托时出错: %s", e)
             return None
 
+    def cancel_plan_order(self, order_id):
+        """
+        撤销计划委托
+        参考文档: POST /capi/v2/order/cancel_plan
+
+        Args:
+            order_id (str): 计划委托订单ID
+
+        Returns:
+            bool: 是否撤销成功
+        """
+        try:
+            request_path = "/capi/v2/order/cancel_plan"
+            custom_headers = {
+                "locale": "zh-CN",
+                "Content-Type": "application/json"
+            }
+            response = self._request("POST", request_path, data={"orderId": str(order_id)}, need_sign=True,
+                                     headers=custom_headers)
+            if isinstance(response, dict) and response.get("result") is False:
+                logger.error("撤销计划委托失败，订单ID: %s，原因: %s", order_id, response.get("err_msg"))
+                return False
+            logger.info("计划委托已撤销，订单ID: %s", order_id)
+            return True
+        except Exception as e:
+            logger.error("撤销计划委托时出错: %s", e)
+            return False
+
+    def _send_batch_orders(self, symbol, datas):
+        response = self._request("POST", BATCH_ORDERS_PATH, data=self._batch_orders_body(symbol, datas), need_sign=True)
+        return self._format_batch_orders(response, datas)
+
+    def place_orders(self, orders, max_workers=CANCEL_WORKERS):
+        """
+        批量下单：同一交易对的订单每BATCH_ORDER_LIMIT个打包为一个请求，多个请求并发发送，
+        结果按client_oid对应回每个订单
+        参考文档: POST /capi/v2/order/batchOrders
+
+        Args:
+            orders (list): 订单字典，例如
+                {"symbol": "cmt_btcusdt", "type": "open_long", "amount": 0.01, "price": 65000, "match_price": "0"}，
+                type为1-4或open_long/open_short/close_long/close_short，未提供client_oid时自动生成
+            max_workers (int): 最大并发请求数
+
+        Returns:
+            dict: client_oid -> 下单结果（按输入顺序），包含id、clientOrderId、symbol、amount、price、ok、error和info；
+                重复的client_oid只发送第一个订单，之后的以"client_oid#序号"为键返回失败结果
+        """
+        entries, chunks, invalid = self._batch_order_data(orders)
+        outcomes = []
+        if chunks:
+            with ThreadPoolExecutor(max_workers=max(min(max_workers, len(chunks)), 1)) as executor:
+                futures = [(datas, executor.submit(self._send_batch_orders, symbol, datas)) for symbol, datas in chunks]
+                for datas, future in futures:
+                    try:
+                        outcomes.append((datas, future.result()))
+                    except Exception as e:
+                        outcomes.append((datas, e))
+        return self._collect_batch_orders(entries, invalid, outcomes)
+
+    def cancel_order(self, order_id):
+        """
+        撤销一个普通委托
+        参考文档: POST /capi/v2/order/cancel_order
+
+        Args:
+            order_id (str): 订单ID
+
+        Returns:
+            bool: 是否撤销成功
+        """
+        return self._cancel_one(order_id)["ok"]
+
+    def _cancel_one(self, order_id):
+        order_id = str(order_id)
+        try:
+            response = self._request("POST", CANCEL_ORDER_PATH, data={"orderId": order_id}, need_sign=True)
+            result = self._format_cancel_order(response, order_id)
+        except Exception as e:
+            logger.error("撤销订单时出错，订单ID: %s，原因: %s", order_id, e)
+            return self._cancel_result(failed=[{"order_id": order_id, "error": str(e)}])
+        if result["ok"]:
+            logger.info("订单已撤销，订单ID: %s", order_id)
+        return result
+
+    def _cancel_plan_one(self, order_id):
+        if self.cancel_plan_order(order_id):
+            return self._cancel_result(cancelled=[str(order_id)])
+        return self._cancel_result(failed=[{"order_id": str(order_id), "error": "撤销计划委托失败"}])
+
+    def _cancel_batch(self, order_ids):
+        response = self._request("POST", CANCEL_BATCH_PATH, data={"ids": order_ids}, need_sign=True)
+        return self._format_cancel_batch(response, order_ids)
+
+    def cancel_orders(self, order_ids, max_workers=CANCEL_WORKERS):
+        """
+        批量撤销普通委托：按交易所上限分批并发调用批量撤单接口，
+        某一批失败时该批回退为有并发上限的逐个撤单
+
+        Args:
+            order_ids (list): 订单ID
+            max_workers (int): 最大并发请求数
+
+        Returns:
+            dict: 汇总结果，包含cancelled、failed、errors和ok
+        """
+        order_ids = [str(order_id) for order_id in order_ids]
+        if not order_ids:
+            return self._cancel_result()
+        batches = [order_ids[i:i + CANCEL_BATCH_LIMIT] for i in range(0, len(order_ids), CANCEL_BATCH_LIMIT)]
+        results, fallback = [], []
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(order_ids)), 1)) as executor:
+            futures = [(batch, executor.submit(self._cancel_batch, batch)) for batch in batches]
+            for batch, future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.warning("批量撤单失败，回退为逐个撤单（%s个订单）: %s", len(batch), e)
+                    fallback.extend(batch)
+            results.extend(executor.map(self._cancel_one, fallback))
+        return self._merge_cancel_results(results)
+
+    def cancel_plan_orders(self, order_ids, max_workers=CANCEL_WORKERS):
+        """
+        并发撤销多个计划委托（计划委托没有批量撤单接口）
+
+        Args:
+            order_ids (list): 计划委托订单ID
+            max_workers (int): 最大并发请求数
+
+        Returns:
+            dict: 汇总结果，包含cancelled、failed、errors和ok
+        """
+        order_ids = [str(order_id) for order_id in order_ids]
+        if not order_ids:
+            return self._cancel_result()
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(order_ids)), 1)) as executor:
+            return self._merge_cancel_results(executor.map(self._cancel_plan_one, order_ids))
+
+    def _cancel_all_kind(self, kind, symbol, max_workers):
+        """
+        撤销一类委托的全部订单：优先一次调用全部撤单接口，失败时查询订单后批量/逐个撤销
+        """
+        try:
+            response = self._request("POST", CANCEL_ALL_PATH, data=self._cancel_all_data(kind, symbol), need_sign=True)
+            return self._format_cancel_all(response)
+        except Exception as e:
+            logger.warning("全部撤单接口失败（%s），改为查询后撤销: %s", kind, e)
+        try:
+            if kind == "plan":
+                order_ids = [order["order_id"] for order in self.iter_current_plan_orders(symbol=symbol)]
+                return self.cancel_plan_orders(order_ids, max_workers)
+            return self.cancel_orders(self.fetch_open_order_ids(symbol), max_workers)
+        except Exception as e:
+            logger.error("查询待撤销的%s委托失败: %s", kind, e)
+            return self._cancel_result(errors=[f"{kind}: {e}"])
+
+    def cancel_all_orders(self, symbol=None, include_plan=True, max_workers=CANCEL_WORKERS):
+        """
+        撤销全部（或某个交易对的）未完成委托，普通委托和计划委托同时撤销
+
+        Args:
+            symbol (str, optional): 交易对，不提供则撤销所有交易对
+            include_plan (bool): 是否同时撤销计划委托
+            max_workers (int): 回退为逐个撤单时的最大并发请求数
+
+        Returns:
+            dict: 汇总结果，包含cancelled（已撤销的订单ID）、failed（[{order_id, error}]）、errors和ok
+        """
+        kinds = ["normal", "plan"] if include_plan else ["normal"]
+        with ThreadPoolExecutor(max_workers=len(kinds)) as executor:
+            result = self._merge_cancel_results(
+                executor.map(lambda kind: self._cancel_all_kind(kind, symbol, max_workers), kinds))
+        logger.info("全部撤单完成，交易对: %s，已撤销%s个，失败%s个", symbol or "所有", len(result["cancelled"]),
+                    len(result["failed"]))
+        return result
+
 
 # 测试用例函数
 def test_weex_client():
@@ -1579,6 +3506,8 @@ def test_weex_client():
 
 # 运行测试用例
 if __name__ == "__main__":
+    # 手动测试时输出SDK的调试日志
+    logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
     print("开始测试WEEX API客户端...")
     success = test_weex_client()
     
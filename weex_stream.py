@@ -0,0 +1,423 @@
+"""
+回放行情推送订阅（离线测试用）
+在后台线程中维护一条到weex_replay_server的推送连接，订阅逐笔价格（ticker）和K线（candle1m等）频道，
+断线自动重连并重新订阅，按频道检测推送序号缺口（缺口时回调并重新订阅以获取最新快照），
+用于在本地用已记录的行情驱动价格推送相关的策略逻辑
+
+只支持下面的本模块消息格式，不是WEEX官方WebSocket的客户端，不能连接交易所；实盘价格来自REST接口。
+传输层可替换：默认使用WebSocketTransport（aiohttp），测试时可以传入任何实现了connect/send/recv/close的对象
+
+消息格式（JSON）:
+    客户端 -> 服务器: {"event": "subscribe" | "unsubscribe", "channel": "ticker", "symbol": "cmt_btcusdt"}
+                      {"event": "ping"}
+    服务器 -> 客户端: {"event": "subscribed", "channel": ..., "symbol": ..., "seq": 当前序号}
+                      {"event": "push", "channel": ..., "symbol": ..., "seq": 序号, "data": ...}
+                      {"event": "pong"}
+    ticker的data为{"ts": 毫秒时间戳, "last": 最新价}，K线的data为[时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]
+
+用法:
+    stream = MarketStream(os.getenv('WEEX_REPLAY_URL'))
+    stream.subscribe('ticker', 'cmt_btcusdt')
+    stream.start()
+    if stream.wait_for_update('cmt_btcusdt', timeout=4):
+        price = stream.latest_price('cmt_btcusdt')
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import aiohttp
+
+from weex_sdk import RetryPolicy, dumps_json, loads_json
+
+logger = logging.getLogger("weex_stream")
+
+# 回放服务器地址（weex_replay_server），只用于测试
+WEEX_REPLAY_URL = os.getenv('WEEX_REPLAY_URL')
+
+TICKER_CHANNEL = "ticker"
+
+
+class StreamTransport:
+    """
+    推送连接的传输层接口，所有方法只在MarketStream的后台线程中调用
+    """
+
+    def connect(self):
+        """
+        建立连接，失败时抛出异常
+        """
+        raise NotImplementedError
+
+    def send(self, message):
+        """
+        发送一条消息（dict）
+        """
+        raise NotImplementedError
+
+    def recv(self, timeout):
+        """
+        接收一条消息
+
+        Args:
+            timeout (float): 最长等待秒数
+
+        Returns:
+            dict: 收到的消息，超时返回None
+
+        Raises:
+            ConnectionError: 连接已断开
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        关闭连接
+        """
+        raise NotImplementedError
+
+
+class WebSocketTransport(StreamTransport):
+    """
+    基于aiohttp的WebSocket传输层，在私有事件循环中同步执行
+
+    按原样收发本模块格式的JSON消息，不做WEEX官方协议的转换
+    """
+
+    def __init__(self, url, connect_timeout=10.0):
+        """
+        Args:
+            url (str): WebSocket地址，如 ws://127.0.0.1:8765/ws
+            connect_timeout (float): 建立连接的超时秒数
+        """
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self._loop = None
+        self._session = None
+        self._ws = None
+
+    def connect(self):
+        self._loop = asyncio.new_event_loop()
+        self._session = self._loop.run_until_complete(self._create_session())
+        self._ws = self._loop.run_until_complete(self._session.ws_connect(self.url))
+
+    async def _create_session(self):
+        # ClientSession需要在事件循环中创建
+        return aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.connect_timeout))
+
+    def send(self, message):
+        self._loop.run_until_complete(self._ws.send_bytes(dumps_json(message)))
+
+    def recv(self, timeout):
+        try:
+            msg = self._loop.run_until_complete(self._ws.receive(timeout=timeout))
+        except asyncio.TimeoutError:
+            return None
+        if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+            return loads_json(msg.data)
+        if msg.type == aiohttp.WSMsgType.ERROR:
+            raise ConnectionError(f"WebSocket错误: {self._ws.exception()}")
+        raise ConnectionError(f"WebSocket连接已关闭: {msg.type.name}")
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            if self._ws is not None:
+                self._loop.run_until_complete(self._ws.close())
+            if self._session is not None:
+                self._loop.run_until_complete(self._session.close())
+        except Exception as e:
+            logger.debug("关闭WebSocket失败: %s", e)
+        finally:
+            self._loop.close()
+            self._loop = None
+            self._ws = None
+            self._session = None
+
+
+class MarketStream:
+    """
+    行情推送订阅：后台线程接收推送，维护各交易对的最新价格和K线
+
+    回调在后台线程中执行，应尽快返回；断线后按指数退避重连并重新订阅全部频道
+    """
+
+    def __init__(self, url=None, transport_factory=None, reconnect_policy=None, idle_timeout=15.0,
+                 ping_interval=5.0, on_gap=None):
+        """
+        Args:
+            url (str, optional): 回放服务器的WebSocket地址，默认读取WEEX_REPLAY_URL环境变量
+            transport_factory (callable, optional): 每次连接时调用，返回StreamTransport，默认WebSocketTransport(url)
+            reconnect_policy (RetryPolicy, optional): 重连退避策略（只使用backoff），默认0.5秒起、最长10秒
+            idle_timeout (float): 超过该秒数没有收到任何消息视为连接失效并重连
+            ping_interval (float): 空闲时发送ping的间隔秒数
+            on_gap (callable, optional): 序号出现缺口时调用on_gap(频道, 交易对, 期望序号, 收到序号)
+        """
+        url = url or WEEX_REPLAY_URL
+        if transport_factory is None:
+            if not url:
+                raise ValueError("未配置回放服务器地址（WEEX_REPLAY_URL）")
+            transport_factory = lambda: WebSocketTransport(url)
+        self.transport_factory = transport_factory
+        self.reconnect_policy = reconnect_policy or RetryPolicy(base_delay=0.5, max_delay=10.0)
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.on_gap = on_gap
+
+        # (频道, 交易对) -> 回调列表
+        self._subscriptions = {}
+        # 等待后台线程发送的订阅变更：(event, 频道, 交易对)
+        self._pending = []
+        # (频道, 交易对) -> 最近处理的序号
+        self._seq = {}
+        self._prices = {}
+        self._candles = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._thread = None
+        self._stats = {"connects": 0, "disconnects": 0, "messages": 0, "gaps": 0, "resubscribes": 0, "stale": 0}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def subscribe(self, channel, symbol, callback=None):
+        """
+        订阅频道，连接建立后（包括重连后）自动发送订阅
+
+        Args:
+            channel (str): 频道，如"ticker"、"candle1m"
+            symbol (str): 交易对
+            callback (callable, optional): 收到推送时调用callback(频道, 交易对, data)
+        """
+        key = (channel, symbol)
+        with self._lock:
+            callbacks = self._subscriptions.setdefault(key, [])
+            if callback is not None:
+                callbacks.append(callback)
+            self._pending.append(("subscribe", channel, symbol))
+
+    def unsubscribe(self, channel, symbol):
+        """
+        取消订阅频道
+        """
+        with self._lock:
+            if self._subscriptions.pop((channel, symbol), None) is not None:
+                self._seq.pop((channel, symbol), None)
+                self._pending.append(("unsubscribe", channel, symbol))
+
+    def start(self):
+        """
+        启动后台接收线程
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="weex-market-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        停止后台线程并关闭连接
+        """
+        self._stop.set()
+        with self._updated:
+            self._updated.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def wait_connected(self, timeout=None):
+        """
+        等待连接建立
+
+        Returns:
+            bool: 是否已连接
+        """
+        return self._connected.wait(timeout)
+
+    def latest_price(self, symbol, max_age=None):
+        """
+        最新推送的价格
+
+        Args:
+            symbol (str): 交易对
+            max_age (float, optional): 价格的最长有效秒数，超过时视为过期返回None
+
+        Returns:
+            float: 最新价，没有数据或已过期时返回None
+        """
+        with self._lock:
+            entry = self._prices.get(symbol)
+            if entry is None:
+                return None
+            price, _, received = entry
+            if max_age is not None and time.monotonic() - received > max_age:
+                self._stats["stale"] += 1
+                return None
+            return price
+
+    def latest_candle(self, channel, symbol):
+        """
+        最新推送的K线 [时间戳, 开盘价, 最高价, 最低价, 收盘价, 成交量]，没有数据时返回None
+        """
+        with self._lock:
+            return self._candles.get((channel, symbol))
+
+    def wait_for_update(self, symbol, timeout=None):
+        """
+        等待交易对的下一次价格推送
+
+        Args:
+            symbol (str): 交易对
+            timeout (float, optional): 最长等待秒数
+
+        Returns:
+            bool: 是否收到新的价格（超时或已停止时返回False）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._updated:
+            version = self._versions.get(symbol, 0)
+            while self._versions.get(symbol, 0) == version and not self._stop.is_set():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._updated.wait(remaining)
+            return self._versions.get(symbol, 0) != version
+
+    def stats(self):
+        """
+        连接和推送统计
+        """
+        with self._lock:
+            return dict(self._stats, connected=self.connected, subscriptions=len(self._subscriptions))
+
+    def _run(self):
+        attempt = 0
+        while not self._stop.is_set():
+            transport = None
+            try:
+                transport = self.transport_factory()
+                transport.connect()
+                attempt = 0
+                self._stats["connects"] += 1
+                logger.info("行情推送已连接")
+                self._receive(transport)
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning("行情推送连接中断: %s", e)
+            finally:
+                if transport is not None:
+                    transport.close()
+                if self._connected.is_set():
+                    self._connected.clear()
+                    self._stats["disconnects"] += 1
+            if self._stop.is_set():
+                break
+            attempt += 1
+            delay = self.reconnect_policy.backoff(attempt)
+            logger.info("%.2f秒后重连行情推送（第%s次）", delay, attempt)
+            self._stop.wait(delay)
+
+    def _receive(self, transport):
+        with self._lock:
+            # 新连接上的序号重新开始，订阅全部频道
+            self._seq.clear()
+            self._pending = [("subscribe", channel, symbol) for channel, symbol in self._subscriptions]
+        self._connected.set()
+        last_message = last_sent = time.monotonic()
+        poll = min(0.5, self.ping_interval, self.idle_timeout)
+        while not self._stop.is_set():
+            with self._lock:
+                pending, self._pending = self._pending, []
+            for event, channel, symbol in pending:
+                transport.send({"event": event, "channel": channel, "symbol": symbol})
+                last_sent = time.monotonic()
+
+            message = transport.recv(poll)
+            now = time.monotonic()
+            if message is None:
+                if now - last_message > self.idle_timeout:
+                    raise ConnectionError(f"{self.idle_timeout}秒内没有收到消息")
+                if now - last_sent > self.ping_interval:
+                    transport.send({"event": "ping"})
+                    last_sent = now
+                continue
+            last_message = now
+            self._stats["messages"] += 1
+            self._handle(message)
+
+    def _handle(self, message):
+        event = message.get("event")
+        if event == "subscribed":
+            with self._lock:
+                key = (message.get("channel"), message.get("symbol"))
+                if key in self._subscriptions and message.get("seq") is not None:
+                    self._seq[key] = int(message["seq"])
+            return
+        if event != "push":
+            return
+
+        channel, symbol, data = message.get("channel"), message.get("symbol"), message.get("data")
+        key = (channel, symbol)
+        seq = message.get("seq")
+        with self._lock:
+            if key not in self._subscriptions:
+                return
+            callbacks = list(self._subscriptions[key])
+            expected = self._seq.get(key)
+            if seq is not None:
+                seq = int(seq)
+                if expected is not None and seq <= expected:
+                    # 重复或过期的推送
+                    return
+                self._seq[key] = seq
+        if seq is not None and expected is not None and seq != expected + 1:
+            self._on_gap(channel, symbol, expected + 1, seq)
+
+        with self._updated:
+            if channel == TICKER_CHANNEL:
+                self._prices[symbol] = (float(data["last"]), data.get("ts"), time.monotonic())
+            else:
+                self._candles[key] = data
+                # 没有订阅ticker时用K线收盘价作为最新价格
+                if (TICKER_CHANNEL, symbol) not in self._subscriptions:
+                    self._prices[symbol] = (float(data[4]), data[0], time.monotonic())
+            self._versions[symbol] = self._versions.get(symbol, 0) + 1
+            self._updated.notify_all()
+
+        for callback in callbacks:
+            try:
+                callback(channel, symbol, data)
+            except Exception as e:
+                logger.error("行情推送回调出错 %s %s: %s", channel, symbol, e)
+
+    def _on_gap(self, channel, symbol, expected, received):
+        """
+        推送序号出现缺口：记录、回调并重新订阅，服务器会回复最新序号
+        """
+        self._stats["gaps"] += 1
+        self._stats["resubscribes"] += 1
+        logger.warning("行情推送序号缺口 %s %s: 期望%s，收到%s，重新订阅", channel, symbol, expected, received)
+        with self._lock:
+            self._pending.append(("subscribe", channel, symbol))
+        if self.on_gap is not None:
+            try:
+                self.on_gap(channel, symbol, expected, received)
+            except Exception as e:
+                logger.error("缺口回调出错: %s", e)